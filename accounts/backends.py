@@ -0,0 +1,35 @@
+"""
+Authentication backend caching the logged-in user.
+
+Django's session authentication loads the user row on every request that
+looks at ``request.user``. ``CachedModelBackend`` keeps it, role included,
+in the default cache for ``settings.USER_CACHE_SECONDS``. Saving or deleting
+a user drops its cache entry (``accounts.signals``); ``QuerySet.update()``
+sends no signals, so users changed that way stay cached until the entry
+expires.
+"""
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+
+def cache_key(user_id):
+    return f'accounts:user:{user_id}'
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend whose get_user() reads through the cache"""
+
+    def get_user(self, user_id):
+        if settings.USER_CACHE_SECONDS <= 0:
+            return super().get_user(user_id)
+        key = cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is None:
+                return None
+            cache.set(key, user, settings.USER_CACHE_SECONDS)
+        # The permission checks still apply to the cached row
+        return user if self.user_can_authenticate(user) else None
+
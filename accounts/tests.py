@@ -1,3 +1,83 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
 
-# Create your tests here.
+from accounts import urls
+from accounts.backends import CachedModelBackend
+from core.testing import QueryBudgetTestCase
+
+
+class AccountsQueryBudgetTests(QueryBudgetTestCase):
+    """Every accounts page stays within its query budget"""
+
+    def test_every_url_has_a_budget(self):
+        self.assertBudgetsDeclared(urls.urlpatterns)
+
+    def test_login(self):
+        user = get_user_model().objects.create_user(
+            'budget', 'budget@example.com', 'budget-password')
+        url = reverse('accounts:login')
+        self.request('get', url)
+        self.request('post', url, {
+            'username': 'budget', 'password': 'wrong-password',
+        }, form=True)
+        self.request('post', url, {
+            'username': user.username, 'password': 'budget-password',
+        }, form=True, status=302)
+
+    def test_register(self):
+        url = reverse('accounts:register')
+        self.request('get', url)
+        self.request('post', url, {
+            'username': 'newuser', 'first_name': 'New', 'last_name': 'User',
+            'email': 'newuser@example.com', 'password1': 'a-long-passw0rd',
+            'password2': 'a-long-passw0rd',
+        }, form=True, status=302)
+
+    def test_logout(self):
+        self.request('get', reverse('accounts:logout'), user=self.fixture.reviewer, status=302)
+
+    def test_profile(self):
+        url = reverse('accounts:profile')
+        self.request('get', url, status=302)
+        self.request('get', url, user=self.fixture.reviewer)
+        self.request('post', url, {
+            'first_name': 'Budget', 'last_name': 'Tester',
+            'email': self.fixture.reviewer.email,
+        }, user=self.fixture.reviewer, form=True, status=302)
+
+
+class CachedUserTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            'cached', 'cached@example.com', 'cached-password')
+
+    def test_user_is_cached_until_saved(self):
+        backend = CachedModelBackend()
+        backend.get_user(self.user.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(backend.get_user(self.user.pk), self.user)
+        self.user.role = 'supervisor'
+        self.user.save()
+        with self.assertNumQueries(1):
+            self.assertTrue(backend.get_user(self.user.pk).is_supervisor())
+
+    def test_inactive_cached_user_is_refused(self):
+        backend = CachedModelBackend()
+        backend.get_user(self.user.pk)
+        self.user.is_active = False
+        self.user.save()
+        self.assertIsNone(backend.get_user(self.user.pk))
+
+    def test_public_api_skips_session_and_user(self):
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('search:categories'))
+        tables = ' '.join(query['sql'] for query in queries)
+        self.assertNotIn('django_session', tables)
+        self.assertNotIn('accounts_customuser', tables)
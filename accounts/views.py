@@ -4,10 +4,12 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.contrib.auth.forms import AuthenticationForm
 from django.contrib.auth import logout
+from core.query_budget import query_budget
 from .forms import UserRegistrationForm, UserProfileForm
 from .models import CustomUser
 
 
+@query_budget(queries=4, sql_ms=50)
 def register_view(request):
     """User registration view"""
     if request.method == 'POST':
@@ -27,6 +29,7 @@ def register_view(request):
     return render(request, 'accounts/register.html', context)
 
 
+@query_budget(queries=10, sql_ms=50)
 def login_view(request):
     """User login view"""
     if request.method == 'POST':
@@ -53,6 +56,7 @@ def login_view(request):
     return render(request, 'accounts/login.html', context)
 
 
+@query_budget(queries=4, sql_ms=20)
 def logout_view(request):
     """User logout view"""
     logout(request)
@@ -60,6 +64,7 @@ def logout_view(request):
     return redirect('status')
 
 
+@query_budget(queries=4, sql_ms=50)
 @login_required
 def profile_view(request):
     """User profile view"""
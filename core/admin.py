@@ -1,5 +1,65 @@
 from django.contrib import admin
-from .models import App, Review, ReviewApproval
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchQuery
+from django.db.models import Avg, Count, Max, Min, Q
+from django.http import FileResponse, Http404
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
+from django.utils.html import format_html
+from . import db_health, profiling
+from .counts import EstimatedCountPaginator
+from .models import (
+    App, ImportCheckpoint, ImportFingerprint, RequestProfile, Review,
+    ReviewApproval, ReviewEnrichmentJob, SlowQuery, WorkerMemorySample,
+)
+
+
+class RatingFilter(admin.SimpleListFilter):
+    """Rating in a few buckets instead of one choice per distinct value"""
+    title = 'rating'
+    parameter_name = 'rating_bucket'
+    buckets = {
+        '4.5': ('4.5 and up', {'rating__gte': 4.5}),
+        '4': ('4 to 4.5', {'rating__gte': 4, 'rating__lt': 4.5}),
+        '3': ('3 to 4', {'rating__gte': 3, 'rating__lt': 4}),
+        'low': ('Below 3', {'rating__lt': 3}),
+        'none': ('Unrated', {'rating__isnull': True}),
+    }
+
+    def lookups(self, request, model_admin):
+        return [(value, label) for value, (label, _) in self.buckets.items()]
+
+    def queryset(self, request, queryset):
+        bucket = self.buckets.get(self.value())
+        return queryset.filter(**bucket[1]) if bucket else queryset
+
+
+class FixedChoicesFilter(admin.SimpleListFilter):
+    """
+    Exact match against a fixed list of values; a plain field filter runs
+    SELECT DISTINCT over the whole table on every changelist render
+    """
+    values = ()
+
+    def lookups(self, request, model_admin):
+        return [(value, value) for value in self.values]
+
+    def queryset(self, request, queryset):
+        if self.value() is None:
+            return queryset
+        return queryset.filter(**{self.parameter_name: self.value()})
+
+
+class AppTypeFilter(FixedChoicesFilter):
+    title = 'type'
+    parameter_name = 'app_type'
+    values = ('Free', 'Paid')
+
+
+class ContentRatingFilter(FixedChoicesFilter):
+    title = 'content rating'
+    parameter_name = 'content_rating'
+    values = ('Everyone', 'Everyone 10+', 'Teen', 'Mature 17+', 'Adults only 18+', 'Unrated')
 
 
 @admin.register(App)
@@ -8,10 +68,13 @@ class AppAdmin(admin.ModelAdmin):
     Admin configuration for App model
     """
     list_display = ('name', 'category', 'rating', 'reviews_count', 'installs', 'app_type')
-    list_filter = ('category', 'app_type', 'content_rating', 'rating')
-    search_fields = ('name', 'genres')
+    list_filter = ('category', AppTypeFilter, ContentRatingFilter, RatingFilter)
+    # Substring search on name is backed by the trigram index
+    search_fields = ('name',)
     readonly_fields = ('created_at', 'updated_at')
     list_per_page = 50
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
     fieldsets = (
         ('Basic Information', {
@@ -34,12 +97,20 @@ class AppAdmin(admin.ModelAdmin):
 class ReviewAdmin(admin.ModelAdmin):
     """
     Admin configuration for Review model
+
+    Built for a table too big to scan: see get_search_results and
+    EstimatedCountPaginator.
     """
     list_display = ('app', 'user', 'sentiment', 'status', 'created_at')
     list_filter = ('status', 'sentiment', 'created_at')
-    search_fields = ('app__name', 'review_text', 'user__username')
+    list_select_related = ('app', 'user')
+    search_fields = ('review_text',)
+    search_help_text = 'Words in the review (web search syntax), an app name, or an exact username'
+    autocomplete_fields = ('app', 'user')
     readonly_fields = ('created_at', 'updated_at', 'sentiment_polarity', 'sentiment_subjectivity')
     list_per_page = 50
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
     fieldsets = (
         ('Review Information', {
@@ -57,8 +128,22 @@ class ReviewAdmin(admin.ModelAdmin):
         }),
     )
 
-    def get_queryset(self, request):
-        return super().get_queryset(request).select_related('app', 'user')
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Full-text search of the review text (search_vector), a substring of
+        the app name (trigram index) or an exact username, each through its
+        index; ILIKE over review_text would scan the table
+        """
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        query = SearchQuery(term, config='english', search_type='websearch')
+        matches = Review.objects.filter(search_vector=query).values('pk').union(
+            Review.objects.filter(
+                app__in=App.objects.filter(name__icontains=term)).values('pk'),
+            Review.objects.filter(user__username=term).values('pk'),
+        )
+        return queryset.filter(pk__in=matches), False
 
 
 @admin.register(ReviewApproval)
@@ -68,12 +153,226 @@ class ReviewApprovalAdmin(admin.ModelAdmin):
     """
     list_display = ('review_app', 'supervisor', 'action', 'timestamp')
     list_filter = ('action', 'timestamp')
-    search_fields = ('review__app__name', 'supervisor__username', 'comments')
+    list_select_related = ('review__app', 'supervisor')
+    search_fields = ('review__app__name',)
+    search_help_text = 'A substring of the app name or an exact supervisor username'
+    autocomplete_fields = ('review', 'supervisor')
     readonly_fields = ('timestamp',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        App name substring through the trigram index or exact supervisor
+        username; comments are not searched, they have no index
+        """
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        return queryset.filter(
+            Q(review__app__in=App.objects.filter(name__icontains=term).values('pk'))
+            | Q(supervisor__username=term)
+        ), False
 
     def review_app(self, obj):
         return obj.review.app.name
     review_app.short_description = 'App'
 
-    def get_queryset(self, request):
-        return super().get_queryset(request).select_related('review__app', 'supervisor')
+
+@admin.register(ReviewEnrichmentJob)
+class ReviewEnrichmentJobAdmin(admin.ModelAdmin):
+    """
+    Admin configuration for ReviewEnrichmentJob model
+    """
+    list_display = (
+        'id', 'review', 'status', 'attempts', 'retry_at', 'created_at', 'finished_at',
+    )
+    list_filter = ('status',)
+    list_select_related = ('review__app',)
+    readonly_fields = ('created_at', 'claimed_at', 'finished_at')
+    raw_id_fields = ('review',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(ImportCheckpoint)
+class ImportCheckpointAdmin(admin.ModelAdmin):
+    """
+    Admin configuration for ImportCheckpoint model
+    """
+    list_display = ('source', 'rows_done', 'completed', 'file_size', 'updated_at')
+    list_filter = ('completed',)
+    readonly_fields = ('updated_at',)
+
+
+@admin.register(ImportFingerprint)
+class ImportFingerprintAdmin(admin.ModelAdmin):
+    """
+    Admin configuration for ImportFingerprint model
+    """
+    list_display = ('source', 'file_size', 'schema_version', 'imported_at')
+    readonly_fields = ('imported_at',)
+
+
+@admin.register(SlowQuery)
+class SlowQueryAdmin(admin.ModelAdmin):
+    """
+    Admin configuration for SlowQuery model, with the captures grouped by
+    fingerprint under "By fingerprint"
+    """
+    list_display = ('view', 'duration_ms', 'seq_scan', 'fingerprint', 'path', 'captured_at')
+    list_filter = ('view', 'seq_scan', 'captured_at')
+    search_fields = ('sql', 'path', 'fingerprint')
+    change_list_template = 'admin/core/slowquery/change_list.html'
+
+    fieldsets = (
+        ('Query', {
+            'fields': ('view', 'path', 'duration_ms', 'captured_at', 'sql', 'params')
+        }),
+        ('Plan', {
+            'fields': ('seq_scan', 'plan')
+        }),
+        ('Grouping', {
+            'fields': ('fingerprint', 'normalized_sql', 'slot'),
+            'classes': ('collapse',)
+        }),
+    )
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_urls(self):
+        return [
+            path(
+                'fingerprints/',
+                self.admin_site.admin_view(self.fingerprints_view),
+                name='core_slowquery_fingerprints',
+            ),
+        ] + super().get_urls()
+
+    def fingerprints_view(self, request):
+        """Captures per fingerprint, worst first"""
+        groups = SlowQuery.objects.values('fingerprint').annotate(
+            normalized_sql=Min('normalized_sql'),
+            views=StringAgg('view', ', ', distinct=True),
+            count=Count('id'),
+            worst_ms=Max('duration_ms'),
+            avg_ms=Avg('duration_ms'),
+            seq_scans=Count('id', filter=Q(seq_scan=True)),
+            last_seen=Max('captured_at'),
+        ).order_by('-worst_ms')
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Slow queries by fingerprint',
+            'groups': groups,
+        }
+        return TemplateResponse(
+            request, 'admin/core/slowquery/fingerprints.html', context)
+
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    """
+    Admin configuration for RequestProfile model; the change page shows the
+    call tree and links the pstats file
+    """
+    list_display = ('path', 'view', 'status_code', 'duration_ms', 'user', 'created_at')
+    list_filter = ('view', 'created_at')
+    list_select_related = ('user',)
+    search_fields = ('path',)
+    fields = (
+        'method', 'path', 'view', 'status_code', 'duration_ms', 'user',
+        'created_at', 'download', 'tree',
+    )
+    readonly_fields = fields
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def delete_queryset(self, request, queryset):
+        # One by one, so RequestProfile.delete() removes the files
+        for profile in queryset:
+            profile.delete()
+
+    def get_urls(self):
+        return [
+            path(
+                '<int:pk>/download/',
+                self.admin_site.admin_view(self.download_view),
+                name='core_requestprofile_download',
+            ),
+        ] + super().get_urls()
+
+    def download_view(self, request, pk):
+        profile = self.get_object(request, pk)
+        if profile is None or not self.has_view_permission(request, profile):
+            raise Http404
+        try:
+            return FileResponse(
+                open(profile.file, 'rb'), as_attachment=True,
+                filename=f'profile-{profile.pk}.prof',
+            )
+        except FileNotFoundError:
+            raise Http404('The profile file is gone')
+
+    @admin.display(description='pstats file')
+    def download(self, obj):
+        url = reverse('admin:core_requestprofile_download', args=[obj.pk])
+        return format_html('<a href="{}">profile-{}.prof</a>', url, obj.pk)
+
+    @admin.display(description='Call tree')
+    def tree(self, obj):
+        try:
+            text = profiling.call_tree(profiling.load(obj))
+        except (OSError, EOFError, TypeError, ValueError) as e:
+            text = f'Cannot read {obj.file}: {e}'
+        return format_html('<pre style="white-space: pre; overflow-x: auto">{}</pre>', text)
+
+
+@admin.register(WorkerMemorySample)
+class WorkerMemorySampleAdmin(admin.ModelAdmin):
+    """
+    Admin configuration for WorkerMemorySample model
+    """
+    list_display = ('hostname', 'pid', 'rss_mib', 'peak_rss_mib', 'sampled_at')
+    list_filter = ('hostname', 'sampled_at')
+    search_fields = ('=pid',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description='RSS (MiB)', ordering='rss_bytes')
+    def rss_mib(self, obj):
+        return f'{obj.rss_bytes / 2**20:.1f}'
+
+    @admin.display(description='Peak RSS (MiB)', ordering='peak_rss_bytes')
+    def peak_rss_mib(self, obj):
+        return f'{obj.peak_rss_bytes / 2**20:.1f}'
+
+
+def db_health_view(request):
+    """Admin page of table and index usage, bloat, cache hits and statements"""
+    database, cache_hits = db_health.cache_hits()
+    context = {
+        **admin.site.each_context(request),
+        'title': 'Database health',
+        'tables': db_health.tables(),
+        'indexes': db_health.indexes(),
+        'duplicate_indexes': db_health.duplicate_indexes(),
+        'table_bloat': db_health.table_bloat(),
+        'index_bloat': db_health.index_bloat(),
+        'database': database,
+        'cache_hits': cache_hits,
+        'statements': db_health.top_statements(),
+    }
+    return TemplateResponse(request, 'admin/db_health.html', context)
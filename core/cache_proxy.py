@@ -0,0 +1,156 @@
+"""
+Caching reverse proxy standing in for a CDN in local and integration tests.
+
+``CachingProxy`` is a WSGI application forwarding every request to an
+upstream server. It keeps GET responses marked ``public`` for their
+``s-maxage`` (or ``max-age``), per URL and Accept/Accept-Encoding, and
+answers ``X-Cache: HIT`` or ``MISS``. A ``PURGE`` request drops every
+response whose ``Surrogate-Key`` header shares a key with the request's
+``Surrogate-Key`` header, the way Fastly or Varnish with xkey would.
+``serve()`` runs it; the ``cache_proxy`` management command wraps that.
+
+Deliberately simple: no revalidation, no request coalescing, everything in
+memory. Not for production.
+"""
+import re
+import threading
+import time
+from socketserver import ThreadingMixIn
+from urllib.error import HTTPError
+from urllib.request import HTTPRedirectHandler, Request, build_opener
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+
+# Headers a proxy must not forward (RFC 9110 section 7.6.1), plus the ones
+# urllib and wsgiref set themselves
+HOP_BY_HOP = {
+    'connection', 'keep-alive', 'proxy-authenticate', 'proxy-authorization',
+    'te', 'trailer', 'transfer-encoding', 'upgrade', 'host', 'content-length',
+    'server', 'date',
+}
+VARY_ON = ('HTTP_ACCEPT', 'HTTP_ACCEPT_ENCODING')
+
+_max_age_re = re.compile(r'(?:^|,)\s*(s-maxage|max-age)\s*=\s*(\d+)')
+
+
+def shared_max_age(cache_control):
+    """Seconds a shared cache may keep a response, 0 when it may not"""
+    directives = cache_control.lower()
+    if 'public' not in directives or 'private' in directives or 'no-store' in directives:
+        return 0
+    ages = dict(_max_age_re.findall(directives))
+    return int(ages.get('s-maxage', ages.get('max-age', 0)))
+
+
+class _NoRedirects(HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class CachingProxy:
+    """WSGI caching reverse proxy; see the module docstring"""
+
+    def __init__(self, upstream):
+        self.upstream = upstream.rstrip('/')
+        self.opener = build_opener(_NoRedirects)
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def __call__(self, environ, start_response):
+        if environ['REQUEST_METHOD'] == 'PURGE':
+            purged = self.purge(environ.get('HTTP_SURROGATE_KEY', '').split())
+            start_response('200 OK', [('Content-Type', 'text/plain')])
+            return [f'{purged} purged\n'.encode()]
+
+        path = environ.get('PATH_INFO', '/')
+        if environ.get('QUERY_STRING'):
+            path += '?' + environ['QUERY_STRING']
+        cacheable = (
+            environ['REQUEST_METHOD'] == 'GET' and
+            'HTTP_AUTHORIZATION' not in environ
+        )
+        key = (path, *(environ.get(name, '') for name in VARY_ON))
+        if cacheable:
+            with self.lock:
+                entry = self.entries.get(key)
+            if entry and entry['expires'] > time.monotonic():
+                start_response(entry['status'], entry['headers'] + [('X-Cache', 'HIT')])
+                return [entry['body']]
+
+        status, headers, body = self.forward(environ, path)
+        max_age = shared_max_age(dict(
+            (name.lower(), value) for name, value in headers).get('cache-control', ''))
+        if cacheable and status.startswith('200') and max_age > 0 and not any(
+                name.lower() == 'set-cookie' for name, _ in headers):
+            surrogate_keys = set()
+            for name, value in headers:
+                if name.lower() == 'surrogate-key':
+                    surrogate_keys.update(value.split())
+            with self.lock:
+                self.entries[key] = {
+                    'status': status,
+                    'headers': headers,
+                    'body': body,
+                    'keys': surrogate_keys,
+                    'expires': time.monotonic() + max_age,
+                }
+        start_response(status, headers + [('X-Cache', 'MISS')])
+        return [body]
+
+    def forward(self, environ, path):
+        """(status, headers, body) of the request made upstream"""
+        headers = {
+            name[5:].replace('_', '-').title(): value
+            for name, value in environ.items()
+            if name.startswith('HTTP_') and name[5:].lower().replace('_', '-') not in HOP_BY_HOP
+        }
+        if environ.get('CONTENT_TYPE'):
+            headers['Content-Type'] = environ['CONTENT_TYPE']
+        length = int(environ.get('CONTENT_LENGTH') or 0)
+        data = environ['wsgi.input'].read(length) if length else None
+        request = Request(
+            self.upstream + path, data=data, headers=headers,
+            method=environ['REQUEST_METHOD'],
+        )
+        try:
+            response = self.opener.open(request, timeout=60)
+        except HTTPError as error:
+            # 3xx (redirects aren't followed), 4xx and 5xx
+            response = error
+        with response:
+            body = response.read()
+            return (
+                f'{response.status} {response.reason}',
+                [
+                    (name, value) for name, value in response.headers.items()
+                    if name.lower() not in HOP_BY_HOP
+                ],
+                body,
+            )
+
+    def purge(self, keys):
+        """Drop the responses tagged with any of ``keys``; returns how many"""
+        keys = set(keys)
+        with self.lock:
+            purged = [key for key, entry in self.entries.items() if entry['keys'] & keys]
+            for key in purged:
+                del self.entries[key]
+        return len(purged)
+
+
+class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(upstream, host='127.0.0.1', port=8080, quiet=False):
+    """A started-up server (call serve_forever()) proxying ``upstream``"""
+    return make_server(
+        host, port, CachingProxy(upstream),
+        server_class=ThreadingWSGIServer,
+        handler_class=QuietHandler if quiet else WSGIRequestHandler,
+    )
@@ -0,0 +1,76 @@
+"""
+Cheap row counts for pages that don't need exact ones.
+
+``estimated_count(model)`` reads the planner's row estimate of the model's
+table (``pg_class.reltuples``, kept current by autovacuum and ANALYZE)
+instead of scanning it. Tables that were never analyzed have no estimate
+and are counted exactly.
+
+``status_counts()`` is the homepage's app and review counts, estimated and
+cached for ``settings.STATUS_COUNTS_SECONDS``.
+
+``EstimatedCountPaginator`` pages admin changelists of big tables without
+an exact ``COUNT(*)``.
+"""
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connection
+from django.utils.functional import cached_property
+
+
+def estimated_count(model):
+    """Approximate number of rows in ``model``'s table"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+            [model._meta.db_table],
+        )
+        row = cursor.fetchone()
+    # -1 (or 0 before PostgreSQL 14) until the first VACUUM or ANALYZE
+    if row is None or row[0] <= 0:
+        return model.objects.count()
+    return row[0]
+
+
+def status_counts():
+    """{'apps': n, 'reviews': n} estimated, from the cache when fresh"""
+    from core.models import App, Review
+
+    return cache.get_or_set(
+        'core:status_counts',
+        lambda: {
+            'apps': estimated_count(App),
+            'reviews': estimated_count(Review),
+        },
+        settings.STATUS_COUNTS_SECONDS,
+    )
+
+
+def estimated_queryset_count(queryset):
+    """
+    Approximate number of rows ``queryset`` returns: the table estimate when
+    it isn't filtered, else the planner's row estimate for the query
+    """
+    if not queryset.query.where and not queryset.query.distinct:
+        return estimated_count(queryset.model)
+    plan = json.loads(queryset.order_by().explain(format='json'))
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator counting exactly only when the planner expects at most
+    ``exact_count_limit`` rows. Past that the count, and so the number of
+    pages, is an estimate: the last pages may turn out empty or missing.
+    """
+    exact_count_limit = 10000
+
+    @cached_property
+    def count(self):
+        estimate = estimated_queryset_count(self.object_list)
+        if estimate > self.exact_count_limit:
+            return estimate
+        return super().count
@@ -0,0 +1,513 @@
+"""
+Row cleaning and COPY helpers for the CSV importers.
+
+The cleaning functions turn CSV rows (dicts keyed by header) from the Google Play Store
+dumps into tuples ready for ``copy_rows``, which streams them into Postgres
+with ``COPY ... FROM STDIN`` in the text format.
+
+Every imported row carries a ``source_hash``: a content hash for apps
+(which are keyed by their unique name) and, for reviews, a natural key made
+of the app name, the review text and the occurrence number of that pair in
+the file. Incremental imports upsert on these.
+
+``CSVSource`` streams rows from a path or stdin, decompressing gzip, bz2 and
+zstd input on the fly, and applies an explicit policy to undecodable bytes.
+
+``csv_chunks`` and ``stage_review_chunk`` let the review import run in
+parallel: the file is cut on record boundaries and each chunk is parsed
+and COPYed into a staging table by a separate process.
+"""
+import bz2
+import csv
+import gzip
+import hashlib
+import io
+import os
+import re
+import stat
+import sys
+import time
+from collections import Counter
+from itertools import islice
+
+from django.db import connection
+
+
+# core_app columns written by the importer, in clean_app_row order
+APP_COLUMNS = [
+    'name', 'category', 'rating', 'reviews_count', 'size', 'installs',
+    'app_type', 'price', 'content_rating', 'genres', 'last_updated',
+    'current_version', 'android_version',
+]
+
+# CSV header for each text column of APP_COLUMNS
+APP_CSV_FIELDS = {
+    'category': 'Category',
+    'size': 'Size',
+    'installs': 'Installs',
+    'app_type': 'Type',
+    'price': 'Price',
+    'content_rating': 'Content Rating',
+    'genres': 'Genres',
+    'last_updated': 'Last Updated',
+    'current_version': 'Current Ver',
+    'android_version': 'Android Ver',
+}
+
+# clean_review_row returns the app name followed by these core_review columns
+REVIEW_COLUMNS = [
+    'review_text', 'sentiment', 'sentiment_polarity', 'sentiment_subjectivity',
+]
+
+
+def parse_float(value):
+    """Float from a CSV cell, None for blanks, 'nan' and garbage"""
+    if not value or value == 'nan':
+        return None
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return None
+
+
+def parse_int(value):
+    """Int from a CSV cell, 0 for blanks and garbage"""
+    if not value:
+        return 0
+    try:
+        return int(value)
+    except (ValueError, TypeError):
+        return 0
+
+
+def is_malformed(row):
+    """True when a DictReader row has missing or extra fields"""
+    return None in row or None in row.values()
+
+
+def clean_app_row(row):
+    """Tuple of APP_COLUMNS values for an apps CSV row, None if unusable"""
+    if is_malformed(row):
+        return None
+
+    name = (row.get('App') or '').strip()
+    if not name:
+        return None
+
+    values = {
+        'name': name,
+        'rating': parse_float(row.get('Rating')),
+        'reviews_count': parse_int(row.get('Reviews')),
+    }
+    for column, field in APP_CSV_FIELDS.items():
+        values[column] = (row.get(field) or '').strip()
+    return tuple(values[column] for column in APP_COLUMNS)
+
+
+def clean_review_row(row):
+    """
+    (app_name, *REVIEW_COLUMNS values) for a reviews CSV row, or None when
+    the row has no app or no review text
+    """
+    if is_malformed(row):
+        return None
+
+    app_name = (row.get('App') or '').strip()
+    review_text = (row.get('Translated_Review') or '').strip()
+    if not app_name or not review_text or review_text.lower() == 'nan':
+        return None
+
+    sentiment = (row.get('Sentiment') or '').strip()
+    if not sentiment or sentiment.lower() == 'nan':
+        sentiment = None
+
+    return (
+        app_name,
+        review_text,
+        sentiment,
+        parse_float(row.get('Sentiment_Polarity')),
+        parse_float(row.get('Sentiment_Subjectivity')),
+    )
+
+
+def app_fingerprint(app):
+    """Content hash of a clean_app_row tuple"""
+    content = '\x1f'.join('' if value is None else str(value) for value in app)
+    return hashlib.md5(content.encode('utf-8')).hexdigest()
+
+
+class ReviewKeys:
+    """
+    Callable assigning source keys to review rows in file order
+
+    The CSV has no review id and the same text often appears several times
+    for one app, so the key is the MD5 of the app name, the text and the
+    occurrence number of that pair. REVIEW_KEY_SQL computes the same value.
+    """
+
+    def __init__(self):
+        self.occurrences = Counter()
+
+    def __call__(self, app_name, review_text):
+        pair = f'{app_name}\x1f{review_text}'
+        digest = hashlib.md5(pair.encode('utf-8')).digest()
+        self.occurrences[digest] += 1
+        key = f'{pair}\x1f{self.occurrences[digest]}'
+        return hashlib.md5(key.encode('utf-8')).hexdigest()
+
+
+# SQL version of ReviewKeys over rows with app_name and review_text columns,
+# ordered by ``order``
+REVIEW_KEY_SQL = """
+    md5(
+        {alias}.app_name || chr(31) || {alias}.review_text || chr(31) ||
+        row_number() OVER (
+            PARTITION BY {alias}.app_name, {alias}.review_text ORDER BY {order}
+        )::text
+    )
+"""
+
+
+def batched(iterable, size):
+    """Yield lists of up to ``size`` items"""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _copy_value(value):
+    if value is None:
+        return '\\N'
+    return (
+        str(value)
+        .replace('\\', '\\\\')
+        .replace('\t', '\\t')
+        .replace('\n', '\\n')
+        .replace('\r', '\\r')
+    )
+
+
+def copy_rows(cursor, table, columns, rows):
+    """COPY an iterable of tuples into ``table``; returns the row count"""
+    buffer = io.StringIO()
+    count = 0
+    for row in rows:
+        buffer.write('\t'.join(_copy_value(value) for value in row))
+        buffer.write('\n')
+        count += 1
+    if not count:
+        return 0
+
+    buffer.seek(0)
+    cursor.copy_expert(
+        f'COPY {table} ({", ".join(columns)}) FROM STDIN', buffer
+    )
+    return count
+
+
+# Path meaning "read standard input"
+STDIN = '-'
+
+# --encoding-errors policies: raise, substitute U+FFFD, or reject the row
+ENCODING_ERRORS = ('strict', 'replace', 'reject')
+
+# Codec error handler per policy; rejected rows are found by the lone
+# surrogates surrogateescape leaves in place of undecodable bytes
+_CODEC_ERRORS = {
+    'strict': 'strict',
+    'replace': 'replace',
+    'reject': 'surrogateescape',
+}
+_UNDECODABLE_RE = re.compile('[\udc80-\udcff]')
+
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+READ_BUFFER_BYTES = 1024 * 1024
+
+
+class CountingReader(io.RawIOBase):
+    """Raw stream wrapper counting the bytes read from the source"""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.bytes_read = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        count = self.raw.readinto(buffer)
+        self.bytes_read += count or 0
+        return count
+
+
+def open_binary(path):
+    """
+    (stream, counter) for a path or STDIN: ``stream`` yields decompressed
+    bytes, ``counter`` counts the bytes read from the file itself.
+    Compression is detected from the magic bytes, so piped input works too.
+    """
+    raw = sys.stdin.buffer if path == STDIN else open(path, 'rb')
+    counter = CountingReader(raw)
+    buffered = io.BufferedReader(counter, READ_BUFFER_BYTES)
+
+    magic = buffered.peek(4)[:4]
+    if magic.startswith(b'\x1f\x8b'):
+        return gzip.GzipFile(fileobj=buffered), counter
+    if magic.startswith(b'BZh'):
+        return bz2.BZ2File(buffered), counter
+    if magic == ZSTD_MAGIC:
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError('Reading zstd files requires the zstandard package')
+        reader = zstandard.ZstdDecompressor().stream_reader(buffered)
+        return io.BufferedReader(reader, READ_BUFFER_BYTES), counter
+    return buffered, counter
+
+
+def is_splittable(path):
+    """True for an uncompressed regular file that csv_chunks can split"""
+    if path == STDIN or not stat.S_ISREG(os.stat(path).st_mode):
+        return False
+    with open(path, 'rb') as file:
+        magic = file.read(4)
+    return not (
+        magic.startswith(b'\x1f\x8b') or magic.startswith(b'BZh') or
+        magic == ZSTD_MAGIC
+    )
+
+
+def read_records(reader, fieldnames, errors):
+    """
+    Yield (fields, row, reason) for each non-blank csv.reader record, where
+    ``row`` is a dict, or None with the reject ``reason``
+    """
+    for fields in reader:
+        if not fields:
+            continue
+        if len(fields) != len(fieldnames):
+            yield fields, None, 'field count'
+        elif errors == 'reject' and _UNDECODABLE_RE.search('\x1f'.join(fields)):
+            yield fields, None, 'encoding'
+        else:
+            yield fields, dict(zip(fieldnames, fields)), None
+
+
+class CSVSource:
+    """
+    Iterable of dict rows from a CSV path or STDIN, read in constant memory
+
+    Rows with the wrong number of fields, or undecodable bytes under the
+    'reject' policy, are counted in ``rejected`` and passed to ``on_reject``
+    (file, record number, reason, fields). ``on_progress`` is called with
+    the source about every PROGRESS_SECONDS.
+    """
+    PROGRESS_SECONDS = 5
+
+    def __init__(self, path, encoding='utf-8', errors='reject',
+                 on_reject=None, on_progress=None):
+        if errors not in ENCODING_ERRORS:
+            raise ValueError(f'Unknown encoding errors policy: {errors}')
+        self.path = path
+        self.encoding = encoding
+        self.errors = errors
+        self.on_reject = on_reject
+        self.on_progress = on_progress
+        self.size = os.path.getsize(path) if os.path.isfile(path) else None
+        self.records = 0
+        self.rejected = 0
+        self.started = None
+        self._counter = None
+
+    @property
+    def name(self):
+        return '<stdin>' if self.path == STDIN else self.path
+
+    @property
+    def bytes_read(self):
+        return self._counter.bytes_read if self._counter else 0
+
+    def elapsed(self):
+        return time.perf_counter() - self.started if self.started else 0.0
+
+    def __iter__(self):
+        self.started = time.perf_counter()
+        stream, self._counter = open_binary(self.path)
+        text = io.TextIOWrapper(
+            stream, encoding=self.encoding, errors=_CODEC_ERRORS[self.errors],
+            newline='',
+        )
+        try:
+            reader = csv.reader(text)
+            fieldnames = next(reader, None)
+            if fieldnames is None:
+                return
+            next_progress = self.started + self.PROGRESS_SECONDS
+
+            for fields, row, reason in read_records(reader, fieldnames, self.errors):
+                self.records += 1
+                if row is None:
+                    self.rejected += 1
+                    if self.on_reject:
+                        self.on_reject(self.name, self.records, reason, fields)
+                else:
+                    yield row
+
+                if self.on_progress and self.records % 1000 == 0 and \
+                        time.perf_counter() >= next_progress:
+                    next_progress = time.perf_counter() + self.PROGRESS_SECONDS
+                    self.on_progress(self)
+        finally:
+            # Leave the process's stdin open
+            text.detach()
+            if self.path != STDIN:
+                self._counter.raw.close()
+
+
+def secondary_indexes(cursor, tables):
+    """
+    (name, definition) of the indexes on ``tables`` that enforce nothing,
+    i.e. everything but primary keys and unique indexes
+    """
+    cursor.execute("""
+        SELECT index_class.relname, pg_get_indexdef(ix.indexrelid)
+        FROM pg_index ix
+        JOIN pg_class index_class ON index_class.oid = ix.indexrelid
+        JOIN pg_class table_class ON table_class.oid = ix.indrelid
+        WHERE table_class.relname = ANY(%s)
+        AND pg_table_is_visible(table_class.oid)
+        AND NOT ix.indisunique
+        AND NOT ix.indisprimary
+        ORDER BY table_class.relname, index_class.relname
+    """, [list(tables)])
+    return cursor.fetchall()
+
+
+def concurrent_index_definition(definition):
+    """CREATE INDEX CONCURRENTLY form of a pg_get_indexdef() definition"""
+    return definition.replace(
+        'CREATE INDEX ', 'CREATE INDEX CONCURRENTLY IF NOT EXISTS ', 1
+    )
+
+
+# Bump when cleaning rules change, so unchanged files are imported again
+IMPORTER_VERSION = 1
+
+# pg_advisory_lock key held while load_initial_data runs
+IMPORT_LOCK_ID = 0x46524b4c
+
+
+def file_sha256(path):
+    """SHA-256 hex digest of a file, read in 1MB blocks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(READ_BUFFER_BYTES), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def schema_version():
+    """Importer version and the latest applied core migration"""
+    from django.db.migrations.recorder import MigrationRecorder
+
+    latest = MigrationRecorder(connection).migration_qs.filter(
+        app='core'
+    ).order_by('-name').values_list('name', flat=True).first()
+    return f'{IMPORTER_VERSION}:{latest}'
+
+
+# Parallel review import: aim for chunks of about this size so memory stays
+# bounded and faster workers pick up more chunks
+CHUNK_TARGET_BYTES = 32 * 1024 * 1024
+
+STAGING_COLUMNS = ['chunk', 'seq', 'app_name'] + REVIEW_COLUMNS
+
+
+def csv_chunks(path, count):
+    """
+    Split a CSV file into ``count`` or more (start, end) byte ranges that
+    begin and end on record boundaries, after the header line.
+
+    A newline only ends a record when it is outside a quoted field, i.e.
+    when an even number of quote characters precede it in the record, so
+    multi-line quoted values are never split.
+    """
+    size = os.path.getsize(path)
+    with open(path, 'rb') as file:
+        file.readline()
+        start = file.tell()
+
+        count = max(count, -(-(size - start) // CHUNK_TARGET_BYTES), 1)
+        targets = [start + (size - start) * i // count for i in range(1, count)]
+
+        boundaries = [start]
+        position = start
+        in_quotes = False
+        for line in file:
+            if line.count(b'"') % 2:
+                in_quotes = not in_quotes
+            position += len(line)
+            if in_quotes or not targets or position < targets[0]:
+                continue
+            boundaries.append(position)
+            while targets and targets[0] <= position:
+                targets.pop(0)
+
+    if boundaries[-1] != size:
+        boundaries.append(size)
+    return list(zip(boundaries, boundaries[1:]))
+
+
+def read_header(path, encoding='utf-8'):
+    """Field names from the first line of a CSV file"""
+    with open(path, 'r', encoding=encoding, errors='replace', newline='') as file:
+        return next(csv.reader(file))
+
+
+def stage_review_chunk(task):
+    """
+    Process pool task: parse, clean and COPY one chunk of the reviews CSV
+    into the staging table. Returns (chunk, pid, staged, skipped, rejects,
+    seconds) where ``rejects`` lists (seq, reason, fields) tuples.
+    """
+    (path, chunk, start, end, fieldnames, staging_table, batch_size,
+     encoding, errors) = task
+    started = time.perf_counter()
+
+    with open(path, 'rb') as file:
+        file.seek(start)
+        data = file.read(end - start).decode(encoding, _CODEC_ERRORS[errors])
+
+    skipped = 0
+    rejects = []
+
+    def staged_rows():
+        nonlocal skipped
+        reader = csv.reader(io.StringIO(data, newline=''))
+        records = read_records(reader, fieldnames, errors)
+        for seq, (fields, row, reason) in enumerate(records):
+            if row is None:
+                rejects.append((seq, reason, fields))
+                continue
+            review = clean_review_row(row)
+            if review is None:
+                skipped += 1
+                continue
+            yield (chunk, seq) + review
+
+    staged = 0
+    try:
+        with connection.cursor() as cursor:
+            for batch in batched(staged_rows(), batch_size):
+                staged += copy_rows(cursor, staging_table, STAGING_COLUMNS, batch)
+    finally:
+        connection.close()
+
+    return (
+        chunk, os.getpid(), staged, skipped, rejects,
+        time.perf_counter() - started,
+    )
@@ -0,0 +1,215 @@
+"""
+Database health figures from the PostgreSQL statistics views.
+
+Every function returns rows as dicts for the admin's database health page.
+The numbers are cumulative since the statistics were last reset
+(``pg_stat_reset()``), so ratios reflect the whole period, not the last
+hour. Table and index bloat are estimated from ``pg_stats`` column widths
+and are only meaningful for analyzed tables.
+"""
+from django.db import DatabaseError, connection, transaction
+
+
+TABLES_SQL = """
+    SELECT relname AS table,
+           seq_scan, seq_tup_read, coalesce(idx_scan, 0) AS idx_scan,
+           coalesce(idx_tup_fetch, 0) AS idx_tup_fetch,
+           n_live_tup, n_dead_tup,
+           pg_total_relation_size(relid) AS total_bytes,
+           greatest(last_vacuum, last_autovacuum) AS last_vacuum,
+           greatest(last_analyze, last_autoanalyze) AS last_analyze
+    FROM pg_stat_user_tables
+    WHERE schemaname = current_schema()
+    ORDER BY seq_tup_read DESC
+"""
+
+INDEXES_SQL = """
+    SELECT s.relname AS table, s.indexrelname AS index, s.idx_scan,
+           s.idx_tup_read, pg_relation_size(s.indexrelid) AS bytes,
+           i.indisunique AS is_unique, i.indisprimary AS is_primary,
+           pg_get_indexdef(s.indexrelid) AS definition
+    FROM pg_stat_user_indexes s
+    JOIN pg_index i ON i.indexrelid = s.indexrelid
+    WHERE s.schemaname = current_schema()
+    ORDER BY s.idx_scan, pg_relation_size(s.indexrelid) DESC
+"""
+
+# Same table, columns, operator classes, expressions and predicate; a unique
+# index makes a plain one on the same columns redundant as well
+DUPLICATE_INDEXES_SQL = """
+    SELECT t.relname AS table,
+           array_agg(c.relname ORDER BY i.indisunique DESC, c.relname) AS indexes,
+           sum(pg_relation_size(i.indexrelid)) AS bytes
+    FROM pg_index i
+    JOIN pg_class c ON c.oid = i.indexrelid
+    JOIN pg_class t ON t.oid = i.indrelid
+    JOIN pg_namespace n ON n.oid = t.relnamespace
+    WHERE n.nspname = current_schema()
+    GROUP BY t.relname, i.indrelid, i.indkey::text, i.indclass::text,
+             i.indcollation::text, coalesce(pg_get_expr(i.indexprs, i.indrelid), ''),
+             coalesce(pg_get_expr(i.indpred, i.indrelid), '')
+    HAVING count(*) > 1
+    ORDER BY sum(pg_relation_size(i.indexrelid)) DESC
+"""
+
+# A btree entry is an 8 byte header plus the key, 8 byte aligned, and a 4 byte
+# line pointer; leaf pages are filled to 90%
+INDEX_BLOAT_SQL = """
+    SELECT t.relname AS table, c.relname AS index,
+           pg_relation_size(c.oid) AS bytes, c.relpages AS pages,
+           ceil(c.reltuples * (4 + 8 * ceil((8 + w.width) / 8.0))
+                / (current_setting('block_size')::numeric * 0.9)) AS expected_pages
+    FROM pg_index i
+    JOIN pg_class c ON c.oid = i.indexrelid
+    JOIN pg_class t ON t.oid = i.indrelid
+    JOIN pg_namespace n ON n.oid = t.relnamespace
+    JOIN pg_am am ON am.oid = c.relam
+    CROSS JOIN LATERAL (
+        SELECT sum(s.avg_width) AS width
+        FROM pg_attribute a
+        JOIN pg_stats s ON s.schemaname = n.nspname AND s.tablename = t.relname
+                       AND s.attname = a.attname
+        WHERE a.attrelid = t.oid AND a.attnum = ANY(i.indkey)
+    ) w
+    WHERE n.nspname = current_schema() AND am.amname = 'btree'
+      AND i.indexprs IS NULL AND w.width IS NOT NULL AND c.relpages > 100
+"""
+
+# A heap tuple is a 24 byte header plus the non-null column widths, 8 byte
+# aligned, and a 4 byte line pointer; pages have a 24 byte header and are
+# filled up to the table's fillfactor. Tables with a column ANALYZE has no
+# width for are left out rather than underestimated
+TABLE_BLOAT_SQL = """
+    SELECT c.relname AS table, pg_relation_size(c.oid) AS bytes, c.relpages AS pages,
+           ceil(c.reltuples * (4 + 24 + 8 * ceil(w.width / 8.0))
+                / ((current_setting('block_size')::numeric - 24) * coalesce(
+                    substring(array_to_string(c.reloptions, ',')
+                              FROM 'fillfactor=([0-9]+)')::numeric, 100) / 100))
+               AS expected_pages
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    CROSS JOIN LATERAL (
+        SELECT sum(s.avg_width * (1 - s.null_frac)) AS width,
+               count(s.attname) = count(*) AS analyzed
+        FROM pg_attribute a
+        LEFT JOIN pg_stats s ON s.schemaname = n.nspname AND s.tablename = c.relname
+                            AND s.attname = a.attname
+        WHERE a.attrelid = c.oid AND a.attnum > 0 AND NOT a.attisdropped
+    ) w
+    WHERE n.nspname = current_schema() AND c.relkind = 'r'
+      AND w.analyzed AND c.relpages > 100
+"""
+
+CACHE_HIT_SQL = """
+    SELECT relname AS table,
+           heap_blks_hit, heap_blks_read,
+           coalesce(idx_blks_hit, 0) AS idx_blks_hit,
+           coalesce(idx_blks_read, 0) AS idx_blks_read
+    FROM pg_statio_user_tables
+    WHERE schemaname = current_schema()
+    ORDER BY heap_blks_hit + heap_blks_read DESC
+"""
+
+DATABASE_SQL = """
+    SELECT blks_hit, blks_read, xact_commit, xact_rollback, deadlocks,
+           temp_bytes, stats_reset, pg_database_size(datname) AS bytes
+    FROM pg_stat_database
+    WHERE datname = current_database()
+"""
+
+STATEMENTS_SQL = """
+    SELECT query, calls, total_exec_time AS total_ms, mean_exec_time AS mean_ms,
+           rows, shared_blks_hit, shared_blks_read
+    FROM pg_stat_statements
+    WHERE dbid = (SELECT oid FROM pg_database WHERE datname = current_database())
+    ORDER BY total_exec_time DESC
+    LIMIT %s
+"""
+
+
+def _fetch(sql, params=None):
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def ratio(part, whole):
+    """part / whole, None when there is nothing to divide"""
+    return part / whole if whole else None
+
+
+def tables():
+    """Per table scans, share of index scans and dead tuples"""
+    rows = _fetch(TABLES_SQL)
+    for row in rows:
+        row['idx_scan_ratio'] = ratio(row['idx_scan'], row['seq_scan'] + row['idx_scan'])
+        row['dead_ratio'] = ratio(row['n_dead_tup'], row['n_live_tup'] + row['n_dead_tup'])
+    return rows
+
+
+def indexes():
+    """Per index scans and size; unused means never scanned and not enforcing a constraint"""
+    rows = _fetch(INDEXES_SQL)
+    for row in rows:
+        row['unused'] = (
+            row['idx_scan'] == 0 and not row['is_unique'] and not row['is_primary']
+        )
+    return rows
+
+
+def duplicate_indexes():
+    return _fetch(DUPLICATE_INDEXES_SQL)
+
+
+def _bloat(rows):
+    for row in rows:
+        row['bloat_ratio'] = max(0.0, 1 - float(row['expected_pages']) / row['pages'])
+        row['wasted_bytes'] = int(row['bytes'] * row['bloat_ratio'])
+    return sorted(rows, key=lambda row: -row['wasted_bytes'])
+
+
+def table_bloat():
+    """
+    Estimated bloat of the analyzed tables over 100 pages, most wasted bytes
+    first. Only the main heap is measured, not its TOAST table; dead rows
+    count as bloat until vacuum frees their space
+    """
+    return _bloat(_fetch(TABLE_BLOAT_SQL))
+
+
+def index_bloat():
+    """
+    Estimated bloat of the analyzed btree indexes over 100 pages (smaller
+    ones are all page overhead), most wasted bytes first
+    """
+    return _bloat(_fetch(INDEX_BLOAT_SQL))
+
+
+def cache_hits():
+    """Buffer cache hit ratios of the database and of each table"""
+    database = _fetch(DATABASE_SQL)[0]
+    database['hit_ratio'] = ratio(
+        database['blks_hit'], database['blks_hit'] + database['blks_read'])
+    rows = _fetch(CACHE_HIT_SQL)
+    for row in rows:
+        row['heap_hit_ratio'] = ratio(
+            row['heap_blks_hit'], row['heap_blks_hit'] + row['heap_blks_read'])
+        row['idx_hit_ratio'] = ratio(
+            row['idx_blks_hit'], row['idx_blks_hit'] + row['idx_blks_read'])
+    return database, rows
+
+
+def top_statements(limit=20):
+    """
+    Statements by total execution time from pg_stat_statements, or None
+    when the extension isn't installed or loaded
+    """
+    if not _fetch("SELECT 1 FROM pg_extension WHERE extname = 'pg_stat_statements'"):
+        return None
+    try:
+        # Installed but not in shared_preload_libraries fails the query
+        with transaction.atomic():
+            return _fetch(STATEMENTS_SQL, [limit])
+    except DatabaseError:
+        return None
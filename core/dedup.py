@@ -0,0 +1,263 @@
+"""
+Near-duplicate review detection with MinHash signatures and LSH banding.
+
+Each review is reduced to the set of its word 3-grams; a MinHash signature
+of NUM_PERMUTATIONS values estimates the Jaccard similarity between two
+such sets. Signatures are split into BANDS bands that are hashed into
+buckets, so a lookup only compares the handful of reviews sharing a bucket
+instead of the whole corpus.
+
+The signatures of the review table are kept in ReviewSignature, whose GIN
+index over the band hashes finds the candidates of ``find_near_duplicate()``
+in the database: no worker holds the corpus in memory. Submitted reviews
+are signed when they are inserted, and ``sign_reviews()`` (the
+``sign_reviews`` command) signs the ones imported in bulk.
+``NearDuplicateIndex`` is the in-memory equivalent for one-off scans.
+"""
+import re
+import sys
+import zlib
+
+import numpy as np
+from django.conf import settings
+from django.db import connection
+
+WORD_RE = re.compile(r'\w+')
+
+SHINGLE_SIZE = 3
+# Reviews with fewer words ("Great app") are too generic to call duplicates
+MIN_WORDS = 6
+
+NUM_PERMUTATIONS = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_PERMUTATIONS // BANDS
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+# Fixed seed: signatures must be comparable across processes and restarts
+_random = np.random.RandomState(1)
+_A = _random.randint(1, 1 << 31, size=NUM_PERMUTATIONS).astype(np.uint64)
+_B = _random.randint(0, 1 << 31, size=NUM_PERMUTATIONS).astype(np.uint64)
+
+
+def shingles(text):
+    """Word 3-grams of a review, or None when it is too short to compare"""
+    words = WORD_RE.findall(text.lower()) if text else []
+    if len(words) < MIN_WORDS:
+        return None
+    return {
+        ' '.join(words[i:i + SHINGLE_SIZE])
+        for i in range(len(words) - SHINGLE_SIZE + 1)
+    }
+
+
+def signature(text):
+    """MinHash signature of a review text, or None for short texts"""
+    grams = shingles(text)
+    if grams is None:
+        return None
+
+    hashes = np.fromiter(
+        (zlib.crc32(gram.encode('utf-8')) for gram in grams),
+        dtype=np.uint64,
+        count=len(grams),
+    )
+    # a * x + b stays below 2**64 because a, b < 2**31 and x < 2**32
+    permuted = (np.outer(_A, hashes) + _B[:, None]) % _MERSENNE_PRIME
+    return (permuted & _MAX_HASH).min(axis=1).astype(np.uint32)
+
+
+def band_keys(sig):
+    """
+    One hash per band of a signature, the band number in the high bits.
+    Stable across processes, unlike hash(): they are stored in the database.
+    """
+    return [
+        (band << 32) | zlib.crc32(
+            sig[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND].astype('<u4').tobytes())
+        for band in range(BANDS)
+    ]
+
+
+class NearDuplicateIndex:
+    """
+    In-memory LSH index mapping review ids to MinHash signatures
+
+    Signatures live in one growing uint32 matrix; each LSH bucket maps a band
+    hash to a matrix row, or to a list of rows once it is shared.
+    """
+
+    def __init__(self, threshold=0.8):
+        self.threshold = threshold
+        self.matrix = np.empty((1024, NUM_PERMUTATIONS), dtype=np.uint32)
+        self.review_ids = []
+        self.rows = {}
+        self.buckets = {}
+
+    def __len__(self):
+        return len(self.review_ids)
+
+    def add(self, review_id, text=None, sig=None):
+        """Index a review; returns False when it is too short to index"""
+        if sig is None:
+            sig = signature(text)
+        if sig is None or review_id in self.rows:
+            return False
+
+        row = len(self.review_ids)
+        if row == len(self.matrix):
+            self.matrix = np.concatenate([self.matrix, np.empty_like(self.matrix)])
+        self.matrix[row] = sig
+        self.review_ids.append(review_id)
+        self.rows[review_id] = row
+
+        for key in band_keys(sig):
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                self.buckets[key] = row
+            elif isinstance(bucket, list):
+                bucket.append(row)
+            else:
+                self.buckets[key] = [bucket, row]
+        return True
+
+    def query(self, text=None, sig=None, exclude=None):
+        """
+        Return (review_id, estimated_similarity) of the most similar indexed
+        review at or above the threshold, or None.
+        """
+        if sig is None:
+            sig = signature(text)
+        if sig is None:
+            return None
+
+        candidates = set()
+        for key in band_keys(sig):
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                continue
+            if isinstance(bucket, list):
+                candidates.update(bucket)
+            else:
+                candidates.add(bucket)
+        candidates.discard(self.rows.get(exclude))
+        if not candidates:
+            return None
+
+        rows = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+        similarities = (self.matrix[rows] == sig).mean(axis=1)
+        eligible = similarities >= self.threshold
+        if not eligible.any():
+            return None
+
+        # Most similar first, the oldest review (lowest row) on ties
+        rows, similarities = rows[eligible], similarities[eligible]
+        best = np.lexsort((rows, -similarities))[0]
+        return self.review_ids[rows[best]], float(similarities[best])
+
+    def memory_usage(self):
+        """Approximate number of bytes held by the index"""
+        bucket_lists = sum(
+            sys.getsizeof(bucket) for bucket in self.buckets.values()
+            if isinstance(bucket, list)
+        )
+        return (
+            self.matrix.nbytes +
+            sys.getsizeof(self.review_ids) +
+            sys.getsizeof(self.rows) +
+            sys.getsizeof(self.buckets) +
+            bucket_lists +
+            # int objects held as dict keys and values
+            28 * (2 * len(self.rows) + 2 * len(self.buckets))
+        )
+
+
+# Existing reviews sharing a band with the submission, loaded per lookup
+SIGNATURE_CANDIDATES_SQL = """
+    SELECT review_id, minhash
+    FROM core_reviewsignature
+    WHERE bands && %s::bigint[]
+    ORDER BY review_id
+    LIMIT %s
+"""
+
+
+def stored_signature(sig):
+    """
+    (minhash, bands) column values of a signature. Reviews too short to
+    compare get empty ones: they are signed, but never match.
+    """
+    if sig is None:
+        return b'', []
+    return sig.astype('<u4').tobytes(), band_keys(sig)
+
+
+def find_near_duplicate(sig):
+    """
+    (review_id, similarity) of the most similar signed review at or above
+    REVIEW_DEDUP_THRESHOLD, or None. Compares at most
+    REVIEW_DEDUP_MAX_CANDIDATES reviews, the oldest first.
+    """
+    if not settings.REVIEW_DEDUP_ENABLED or sig is None:
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(SIGNATURE_CANDIDATES_SQL, [
+            band_keys(sig), settings.REVIEW_DEDUP_MAX_CANDIDATES,
+        ])
+        rows = cursor.fetchall()
+    if not rows:
+        return None
+
+    review_ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    matrix = np.frombuffer(
+        b''.join(bytes(row[1]) for row in rows), dtype='<u4'
+    ).reshape(len(rows), NUM_PERMUTATIONS)
+    similarities = (matrix == sig).mean(axis=1)
+    # Most similar first, the oldest review on ties
+    best = np.lexsort((review_ids, -similarities))[0]
+    if similarities[best] < settings.REVIEW_DEDUP_THRESHOLD:
+        return None
+    return int(review_ids[best]), float(similarities[best])
+
+
+# Reviews without a signature, oldest first, after a review id
+UNSIGNED_REVIEWS_SQL = """
+    SELECT review.id, review.review_text
+    FROM core_review review
+    WHERE review.id > %s
+      AND NOT EXISTS (
+          SELECT 1 FROM core_reviewsignature signature
+          WHERE signature.review_id = review.id
+      )
+    ORDER BY review.id
+    LIMIT %s
+"""
+
+
+def sign_reviews(batch_size=5000, progress=None):
+    """
+    Store the signature of every review that has none; returns how many
+    were signed. Calls ``progress(last_review_id, signed)`` after each
+    batch.
+    """
+    from core.models import ReviewSignature
+
+    last_id = 0
+    signed = 0
+    while True:
+        with connection.cursor() as cursor:
+            cursor.execute(UNSIGNED_REVIEWS_SQL, [last_id, batch_size])
+            rows = cursor.fetchall()
+        if not rows:
+            return signed
+        batch = []
+        for review_id, text in rows:
+            minhash, bands = stored_signature(signature(text))
+            batch.append(ReviewSignature(review_id=review_id, minhash=minhash, bands=bands))
+        # A review signed on submission meanwhile is left alone
+        ReviewSignature.objects.bulk_create(batch, ignore_conflicts=True)
+        signed += len(batch)
+        last_id = rows[-1][0]
+        if progress:
+            progress(last_id, signed)
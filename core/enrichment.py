@@ -0,0 +1,192 @@
+"""
+Postgres-backed queue for asynchronous review sentiment enrichment.
+
+``submit_review`` enqueues a ReviewEnrichmentJob in the same statement that
+inserts the review. Workers (see the ``process_enrichment_jobs`` command)
+claim batches of pending jobs, score the review texts with the local
+lexicon and write the results back with bulk updates. A job that fails is
+retried with exponential backoff, and marked failed after MAX_ATTEMPTS.
+"""
+import time
+from datetime import timedelta
+
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Avg, F
+from django.utils import timezone
+
+from core.models import Review, ReviewEnrichmentJob
+from core.response_cache import purge, reviews_tag
+from core.sentiment import score_text, sentiment_label
+
+
+CLAIM_JOBS_SQL = """
+    SELECT id, review_id
+    FROM core_reviewenrichmentjob
+    WHERE status = 'pending'
+    AND (retry_at IS NULL OR retry_at <= now())
+    ORDER BY id
+    LIMIT %s
+    FOR UPDATE SKIP LOCKED
+"""
+
+# Window used for throughput and latency figures
+STATS_WINDOW = timedelta(minutes=5)
+
+# Attempts before a job is marked failed, and the wait before the first
+# retry, doubled after each further failure
+MAX_ATTEMPTS = 5
+RETRY_DELAY = timedelta(seconds=30)
+
+
+def retry_delay(attempts):
+    """Wait before retrying a job that has failed ``attempts`` times"""
+    return RETRY_DELAY * 2 ** (attempts - 1)
+
+
+def process_batch(batch_size=500):
+    """
+    Claim and enrich up to ``batch_size`` pending jobs.
+
+    Everything happens in one transaction: the claimed rows stay locked (and
+    invisible to other workers) until the results are committed, and are
+    released back to the queue if the worker dies. Reviews are written in a
+    savepoint, so a review that can't be scored or saved fails its own job
+    only. Returns the number of jobs processed.
+    """
+    with transaction.atomic():
+        claimed_at = timezone.now()
+        with connection.cursor() as cursor:
+            cursor.execute(CLAIM_JOBS_SQL, [batch_size])
+            claimed = cursor.fetchall()
+
+        if not claimed:
+            return 0
+
+        reviews = Review.objects.filter(
+            id__in=[review_id for _, review_id in claimed]
+        ).only('id', 'app', 'review_text', 'sentiment')
+
+        enriched = []
+        errors = {}
+        for review in reviews:
+            try:
+                polarity, subjectivity = score_text(review.review_text)
+            except Exception as e:
+                errors[review.id] = str(e)
+                continue
+            review.sentiment_polarity = polarity
+            review.sentiment_subjectivity = subjectivity
+            # Keep the rating-derived label when the text carries no signal
+            if polarity:
+                review.sentiment = sentiment_label(polarity)
+            enriched.append(review)
+
+        fields = ['sentiment_polarity', 'sentiment_subjectivity', 'sentiment']
+        try:
+            with transaction.atomic():
+                Review.objects.bulk_update(enriched, fields)
+        except DatabaseError:
+            # Find the reviews at fault and keep the others
+            for review in enriched:
+                try:
+                    with transaction.atomic():
+                        review.save(update_fields=fields)
+                except DatabaseError as e:
+                    errors[review.id] = str(e)
+        purge(*{
+            reviews_tag(review.app_id) for review in enriched
+            if review.id not in errors
+        })
+
+        finished_at = timezone.now()
+        done_ids = [
+            job_id for job_id, review_id in claimed
+            if review_id not in errors
+        ]
+        ReviewEnrichmentJob.objects.filter(id__in=done_ids).update(
+            status='done',
+            attempts=F('attempts') + 1,
+            retry_at=None,
+            claimed_at=claimed_at,
+            finished_at=finished_at,
+        )
+        failed = ReviewEnrichmentJob.objects.filter(id__in=[
+            job_id for job_id, review_id in claimed if review_id in errors
+        ]).only('id', 'review_id', 'attempts')
+        for job in failed:
+            job.attempts += 1
+            job.last_error = errors[job.review_id]
+            job.claimed_at = claimed_at
+            job.finished_at = finished_at
+            if job.attempts >= MAX_ATTEMPTS:
+                job.status = 'failed'
+                job.retry_at = None
+            else:
+                job.status = 'pending'
+                job.retry_at = finished_at + retry_delay(job.attempts)
+        ReviewEnrichmentJob.objects.bulk_update(failed, [
+            'status', 'attempts', 'last_error', 'retry_at', 'claimed_at', 'finished_at',
+        ])
+
+    return len(claimed)
+
+
+def run_worker(batch_size=500, poll_interval=2.0, drain=False, log=None):
+    """
+    Process batches until interrupted, or until the queue is empty when
+    ``drain`` is set. ``log`` receives a (jobs, seconds) tuple per batch.
+    """
+    while True:
+        started = time.perf_counter()
+        processed = process_batch(batch_size)
+        elapsed = time.perf_counter() - started
+
+        if processed:
+            if log:
+                log(processed, elapsed)
+            continue
+
+        if drain:
+            return
+        time.sleep(poll_interval)
+
+
+def purge_finished_jobs(older_than):
+    """Delete completed jobs that finished before ``now - older_than``"""
+    deleted, _ = ReviewEnrichmentJob.objects.filter(
+        status='done',
+        finished_at__lt=timezone.now() - older_than,
+    ).delete()
+    return deleted
+
+
+def enrichment_stats():
+    """Queue depth, batch latency and throughput over the last few minutes"""
+    since = timezone.now() - STATS_WINDOW
+    recent = ReviewEnrichmentJob.objects.filter(
+        status='done',
+        finished_at__gte=since,
+    )
+    latencies = recent.aggregate(
+        batch_latency=Avg(F('finished_at') - F('claimed_at')),
+        queue_latency=Avg(F('finished_at') - F('created_at')),
+    )
+    processed = recent.count()
+
+    def seconds(value):
+        return value.total_seconds() if value is not None else None
+
+    return {
+        'queue_depth': ReviewEnrichmentJob.objects.filter(
+            status='pending'
+        ).count(),
+        'retrying': ReviewEnrichmentJob.objects.filter(
+            status='pending', attempts__gt=0
+        ).count(),
+        'failed': ReviewEnrichmentJob.objects.filter(status='failed').count(),
+        'window_seconds': int(STATS_WINDOW.total_seconds()),
+        'processed_in_window': processed,
+        'throughput_per_second': processed / STATS_WINDOW.total_seconds(),
+        'avg_batch_latency_seconds': seconds(latencies['batch_latency']),
+        'avg_queue_latency_seconds': seconds(latencies['queue_latency']),
+    }
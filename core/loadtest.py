@@ -0,0 +1,422 @@
+"""
+HTTP load testing against a running server.
+
+Every virtual user is a thread with its own keep-alive connection and
+cookies. It repeatedly picks a scenario from a weighted mix; the scenarios
+replay what the search page and the review management page do in a browser
+(debounced autocomplete while typing, searches with filters and paging, the
+app details modal, review submission, moderation). Each request is recorded
+under an endpoint label, and ``summarize`` turns the recordings into
+throughput and latency percentiles that ``compare`` diffs against a baseline.
+"""
+import http.client
+import json
+import random
+import threading
+import time
+import uuid
+from collections import defaultdict
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode, urlsplit
+
+import numpy as np
+
+from core.synthetic import REVIEW_WORDS
+
+
+SCENARIOS = ['autocomplete', 'search', 'modal', 'submit_review', 'moderation']
+
+DEFAULT_MIX = {
+    'autocomplete': 40,
+    'search': 25,
+    'modal': 20,
+    'submit_review': 10,
+    'moderation': 5,
+}
+
+# The search page waits this long after the last keystroke before it asks
+# for suggestions
+AUTOCOMPLETE_DEBOUNCE = 0.3
+
+LIMIT_CHOICES = [10, 20, 50]
+RATING_CHOICES = ['', '', '3', '4', '4.5']
+
+PERCENTILES = (50, 95, 99)
+
+
+class Recorder:
+    """Thread-safe collection of (label, start, seconds, status, ok) samples"""
+
+    def __init__(self):
+        self.samples = []
+        self.lock = threading.Lock()
+
+    def add(self, label, start, seconds, status, ok):
+        with self.lock:
+            self.samples.append((label, start, seconds, status, ok))
+
+
+class Client:
+    """Keep-alive HTTP client with a cookie jar, one per virtual user"""
+
+    def __init__(self, base_url, recorder, timeout=30):
+        self.base_url = base_url.rstrip('/')
+        parts = urlsplit(base_url)
+        self.https = parts.scheme == 'https'
+        self.host = parts.hostname
+        self.port = parts.port
+        self.prefix = parts.path.rstrip('/')
+        self.recorder = recorder
+        self.timeout = timeout
+        self.cookies = {}
+        self.connection = None
+
+    def connect(self):
+        factory = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+        self.connection = factory(self.host, self.port, timeout=self.timeout)
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def request(self, label, method, path, params=None, data=None, form=None,
+                headers=None, expect=(200,)):
+        """
+        Send one request and record it under ``label``. Returns (status, body),
+        with JSON bodies decoded; status is None if the request failed.
+        """
+        url = self.prefix + path
+        if params:
+            url += '?' + urlencode(params)
+        headers = dict(headers or {})
+        body = None
+        if data is not None:
+            body = json.dumps(data).encode()
+            headers['Content-Type'] = 'application/json'
+        elif form is not None:
+            body = urlencode(form).encode()
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        if method != 'GET' and 'csrftoken' in self.cookies:
+            headers['X-CSRFToken'] = self.cookies['csrftoken']
+            if self.https:
+                # Django checks the referer of secure unsafe requests
+                headers['Referer'] = self.base_url + '/'
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f'{k}={v}' for k, v in self.cookies.items())
+
+        started = time.perf_counter()
+        status, payload = None, None
+        # A kept-alive connection may have been closed by the server between
+        # requests; retry once on a fresh one
+        for attempt in range(2):
+            if self.connection is None:
+                self.connect()
+            try:
+                self.connection.request(method, url, body=body, headers=headers)
+                response = self.connection.getresponse()
+                raw = response.read()
+            except (http.client.HTTPException, OSError):
+                self.close()
+                if attempt:
+                    break
+                started = time.perf_counter()
+                continue
+            status = response.status
+            self.store_cookies(response)
+            if response.getheader('Connection', '').lower() == 'close':
+                self.close()
+            payload = raw
+            if response.getheader('Content-Type', '').startswith('application/json'):
+                try:
+                    payload = json.loads(raw)
+                except ValueError:
+                    pass
+            break
+        seconds = time.perf_counter() - started
+        self.recorder.add(label, started, seconds, status, status in expect)
+        return status, payload
+
+    def store_cookies(self, response):
+        for header in response.msg.get_all('Set-Cookie') or []:
+            cookie = SimpleCookie()
+            cookie.load(header)
+            for name, morsel in cookie.items():
+                if morsel['max-age'] == '0' or not morsel.value:
+                    self.cookies.pop(name, None)
+                else:
+                    self.cookies[name] = morsel.value
+
+    def login(self, username, password):
+        """Log in through the login form like a browser does"""
+        self.request('GET /accounts/login/', 'GET', '/accounts/login/')
+        status, _ = self.request(
+            'POST /accounts/login/', 'POST', '/accounts/login/',
+            form={
+                'username': username,
+                'password': password,
+                'csrfmiddlewaretoken': self.cookies.get('csrftoken', ''),
+            },
+            expect=(302,),
+        )
+        return status == 302 and 'sessionid' in self.cookies
+
+
+class VirtualUser:
+    """One simulated browser session running scenarios until the deadline"""
+
+    def __init__(self, client, rng, catalog, mix, think_time=1.0,
+                 credentials=None, supervisor=None, moderate_prefix=''):
+        self.client = client
+        self.rng = rng
+        self.catalog = catalog
+        self.scenarios = list(mix)
+        self.weights = list(mix.values())
+        self.think_time = think_time
+        self.credentials = credentials
+        self.supervisor = supervisor
+        self.moderate_prefix = moderate_prefix
+        self.session_user = None
+
+    def run(self, deadline):
+        try:
+            while time.perf_counter() < deadline:
+                scenario = self.rng.choices(self.scenarios, self.weights)[0]
+                getattr(self, scenario)()
+                self.pause(1.0, 3.0)
+        finally:
+            self.client.close()
+
+    def pause(self, low, high):
+        if self.think_time:
+            time.sleep(self.rng.uniform(low, high) * self.think_time)
+
+    def ensure_login(self, credentials):
+        """Switch the session to ``credentials``, logging in if needed"""
+        if credentials is None:
+            return False
+        if self.session_user != credentials[0]:
+            self.client.cookies.clear()
+            self.session_user = credentials[0] if self.client.login(*credentials) else None
+        return self.session_user == credentials[0]
+
+    def search_term(self):
+        """A word of a real app name, long enough to search for"""
+        name = self.rng.choice(self.catalog['names'])
+        words = [word for word in name.split() if len(word) >= 3]
+        return self.rng.choice(words) if words else name[:8]
+
+    def autocomplete(self):
+        """Type a term; suggestions are fetched when typing pauses"""
+        term = self.search_term()
+        for length in range(3, len(term) + 1):
+            # The typing rhythm decides which prefixes are sent, the think
+            # time only scales how long we actually wait
+            gap = self.rng.uniform(0.05, 0.45)
+            if length == len(term) or gap >= AUTOCOMPLETE_DEBOUNCE:
+                self.client.request(
+                    'GET /search/api/autocomplete/', 'GET', '/search/api/autocomplete/',
+                    params={'q': term[:length]},
+                )
+            if self.think_time:
+                time.sleep(gap * self.think_time)
+
+    def search(self):
+        """Search with optional filters, then page through the results"""
+        params = {'q': self.search_term(), 'limit': self.rng.choice(LIMIT_CHOICES)}
+        if self.catalog['categories'] and self.rng.random() < 0.3:
+            params['category'] = self.rng.choice(self.catalog['categories'])
+        rating = self.rng.choice(RATING_CHOICES)
+        if rating:
+            params['min_rating'] = rating
+
+        status, body = self.client.request(
+            'GET /search/api/search/', 'GET', '/search/api/search/',
+            params=dict(params, page=1),
+        )
+        if status != 200 or not isinstance(body, dict):
+            return
+        pages = body.get('pagination', {}).get('pages', 0)
+        # Most people look at a few more pages, some jump to the end
+        depth = min(pages, self.rng.choice([1, 1, 2, 3, 5, 10]))
+        for page in range(2, depth + 1):
+            self.pause(0.5, 2.0)
+            self.client.request(
+                'GET /search/api/search/', 'GET', '/search/api/search/',
+                params=dict(params, page=page),
+            )
+        if pages > depth and self.rng.random() < 0.2:
+            self.client.request(
+                'GET /search/api/search/', 'GET', '/search/api/search/',
+                params=dict(params, page=pages),
+            )
+
+    def modal(self):
+        """Open an app's details and page through its reviews"""
+        app_id = self.rng.choice(self.catalog['app_ids'])
+        self.client.request(
+            'GET /search/api/app/<id>/', 'GET', f'/search/api/app/{app_id}/',
+            expect=(200, 404),
+        )
+        status, body = self.client.request(
+            'GET /search/api/app/<id>/reviews/', 'GET',
+            f'/search/api/app/{app_id}/reviews/', params={'page': 1, 'limit': 10},
+            expect=(200, 404),
+        )
+        if status != 200 or not isinstance(body, dict):
+            return
+        pages = body.get('pagination', {}).get('pages', 0)
+        for page in range(2, min(pages, self.rng.choice([1, 1, 2, 4])) + 1):
+            self.pause(1.0, 3.0)
+            self.client.request(
+                'GET /search/api/app/<id>/reviews/', 'GET',
+                f'/search/api/app/{app_id}/reviews/', params={'page': page, 'limit': 10},
+            )
+
+    def submit_review(self):
+        """Open an app and review it; the key makes a retry a replay"""
+        if not self.ensure_login(self.credentials):
+            return
+        app_id = self.rng.choice(self.catalog['app_ids'])
+        self.client.request(
+            'GET /search/api/app/<id>/', 'GET', f'/search/api/app/{app_id}/',
+            expect=(200, 404),
+        )
+        self.pause(5.0, 15.0)
+        words = self.rng.choices(REVIEW_WORDS, k=self.rng.randint(5, 40))
+        self.client.request(
+            'POST /reviews/api/app/<id>/submit-review/', 'POST',
+            f'/reviews/api/app/{app_id}/submit-review/',
+            data={'review_text': ' '.join(words), 'rating': self.rng.randint(1, 5)},
+            headers={'Idempotency-Key': str(uuid.UUID(int=self.rng.getrandbits(128)))},
+            # Already reviewed and unknown app are valid answers
+            expect=(201, 400, 404),
+        )
+
+    def moderation(self):
+        """Review the moderation queue and decide on load test reviews"""
+        if not self.ensure_login(self.supervisor):
+            return
+        page = self.rng.choice([1, 1, 1, 2])
+        status, body = self.client.request(
+            'GET /reviews/api/pending/', 'GET', '/reviews/api/pending/',
+            params={'page': page},
+        )
+        if status != 200 or not isinstance(body, dict):
+            return
+        # Only ever moderate reviews written by the load test users
+        reviews = [
+            review for review in body.get('reviews', [])
+            if review.get('user_name', '').startswith(self.moderate_prefix)
+        ]
+        for review in reviews[:self.rng.randint(1, 3)]:
+            self.pause(2.0, 6.0)
+            action = 'approve' if self.rng.random() < 0.8 else 'reject'
+            self.client.request(
+                f'POST /reviews/api/{action}/<id>/', 'POST',
+                f'/reviews/api/{action}/{review["id"]}/',
+                data={'comments': 'load test'},
+                # Another supervisor may have been quicker
+                expect=(200, 404),
+            )
+
+
+def run(base_url, users, duration, catalog, mix, think_time=1.0, seed=1,
+        credentials=(), supervisors=(), moderate_prefix='', timeout=30):
+    """
+    Run ``users`` virtual users for ``duration`` seconds and return the
+    recorder. Virtual user n logs in as credentials[n] and supervisors[n] (in
+    rotation) when its scenarios need a session.
+    """
+    recorder = Recorder()
+    deadline = time.perf_counter() + duration
+    threads = []
+    for n in range(users):
+        user = VirtualUser(
+            Client(base_url, recorder, timeout=timeout),
+            random.Random(f'{seed}:{n}'),
+            catalog,
+            mix,
+            think_time=think_time,
+            credentials=credentials[n % len(credentials)] if credentials else None,
+            supervisor=supervisors[n % len(supervisors)] if supervisors else None,
+            moderate_prefix=moderate_prefix,
+        )
+        thread = threading.Thread(target=user.run, args=(deadline,), daemon=True)
+        threads.append(thread)
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return recorder
+
+
+def summarize(recorder, started, warmup=0.0):
+    """
+    Per endpoint and overall statistics of the samples taken after the warmup.
+    Latencies are in milliseconds.
+    """
+    cutoff = started + warmup
+    samples = [sample for sample in recorder.samples if sample[1] >= cutoff]
+    if not samples:
+        return {'duration': 0.0, 'endpoints': {}, 'total': None}
+    first = min(sample[1] for sample in samples)
+    last = max(sample[1] + sample[2] for sample in samples)
+    duration = max(last - first, 1e-9)
+
+    by_label = defaultdict(list)
+    for sample in samples:
+        by_label[sample[0]].append(sample)
+    endpoints = {
+        label: endpoint_stats(rows, duration)
+        for label, rows in sorted(by_label.items())
+    }
+    return {
+        'duration': duration,
+        'endpoints': endpoints,
+        'total': endpoint_stats(samples, duration),
+    }
+
+
+def endpoint_stats(samples, duration):
+    latencies = np.array([sample[2] for sample in samples]) * 1000
+    statuses = defaultdict(int)
+    for sample in samples:
+        statuses[str(sample[3])] += 1
+    errors = sum(1 for sample in samples if not sample[4])
+    stats = {
+        'requests': len(samples),
+        'errors': errors,
+        'error_rate': errors / len(samples),
+        'throughput': len(samples) / duration,
+        'mean': float(latencies.mean()),
+        'max': float(latencies.max()),
+        'statuses': dict(statuses),
+    }
+    for percentile, value in zip(PERCENTILES, np.percentile(latencies, PERCENTILES)):
+        stats[f'p{percentile}'] = float(value)
+    return stats
+
+
+def compare(results, baseline, threshold=0.2, min_delta=5.0):
+    """
+    Regressions of ``results`` against ``baseline`` as (endpoint, metric,
+    before, after) tuples. Latency percentiles regress when they grow by more
+    than ``threshold`` and at least ``min_delta`` ms, throughput when it
+    drops by more than ``threshold``, error rates when they grow at all.
+    """
+    regressions = []
+    before_endpoints = dict(baseline.get('endpoints', {}), **{'(total)': baseline.get('total')})
+    after_endpoints = dict(results.get('endpoints', {}), **{'(total)': results.get('total')})
+    for label, after in after_endpoints.items():
+        before = before_endpoints.get(label)
+        if not before or not after:
+            continue
+        for metric in (f'p{percentile}' for percentile in PERCENTILES):
+            if (after[metric] > before[metric] * (1 + threshold) and
+                    after[metric] - before[metric] >= min_delta):
+                regressions.append((label, metric, before[metric], after[metric]))
+        if label == '(total)' and after['throughput'] < before['throughput'] * (1 - threshold):
+            regressions.append((label, 'throughput', before['throughput'], after['throughput']))
+        if after['error_rate'] > before['error_rate'] + 0.001:
+            regressions.append((label, 'error_rate', before['error_rate'], after['error_rate']))
+    return regressions
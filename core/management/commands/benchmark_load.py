@@ -0,0 +1,153 @@
+import csv
+import io
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from core.synthetic import (
+    APP_CSV_HEADER, REVIEW_CSV_HEADER, CatalogModel, app_csv_rows, review_csv_rows,
+)
+
+
+MODES = ['full', 'fast-rebuild', 'incremental', 'incremental-unchanged']
+
+
+class Command(BaseCommand):
+    """
+    Management command to compare load_initial_data modes on synthetic data
+
+    Every mode except incremental-unchanged starts from empty app and review
+    tables, so the command refuses to run without --force.
+    """
+    help = 'Benchmark load_initial_data modes against generated CSV files'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--apps',
+            type=int,
+            default=1000000,
+            help='Number of generated apps (default: 1000000)'
+        )
+        parser.add_argument(
+            '--reviews',
+            type=int,
+            default=20000000,
+            help='Number of generated reviews (default: 20000000)'
+        )
+        parser.add_argument(
+            '--modes',
+            nargs='+',
+            choices=MODES,
+            default=MODES,
+            help='Modes to run, in order (default: all)'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='--workers passed to the full modes (default: 1)'
+        )
+        parser.add_argument(
+            '--data-dir',
+            help='Directory for the generated files (default: a temp directory)'
+        )
+        parser.add_argument(
+            '--keep-files',
+            action='store_true',
+            help='Keep the generated files'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=1,
+            help='Random seed for the generated data (default: 1)'
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Required: the benchmark deletes all apps and reviews'
+        )
+
+    def handle(self, *args, **options):
+        if not options['force']:
+            raise CommandError(
+                'benchmark_load deletes all apps and reviews; pass --force'
+            )
+
+        data_dir = options['data_dir'] or tempfile.mkdtemp(prefix='benchmark_load_')
+        os.makedirs(data_dir, exist_ok=True)
+        apps_file = os.path.join(data_dir, 'apps.csv')
+        reviews_file = os.path.join(data_dir, 'reviews.csv')
+
+        try:
+            started = time.perf_counter()
+            model = CatalogModel.from_vocabulary(options['seed'])
+            rng = random.Random(options['seed'])
+            app_names = self.write_csv(
+                apps_file, APP_CSV_HEADER, app_csv_rows(model, rng, options['apps']),
+                keep_names=True)
+            self.write_csv(
+                reviews_file, REVIEW_CSV_HEADER,
+                review_csv_rows(model, rng, app_names, options['reviews']))
+            self.stdout.write(
+                f'Generated {options["apps"]:,} apps and {options["reviews"]:,} '
+                f'reviews in {time.perf_counter() - started:.1f}s ({data_dir})'
+            )
+
+            results = []
+            for mode in options['modes']:
+                seconds = self.run_mode(mode, apps_file, reviews_file, options)
+                results.append((mode, seconds))
+                self.stdout.write(f'{mode}: {seconds:.1f}s')
+        finally:
+            if not options['keep_files']:
+                shutil.rmtree(data_dir, ignore_errors=True)
+
+        rows = options['apps'] + options['reviews']
+        self.stdout.write('')
+        self.stdout.write(f'{"mode":<24}{"seconds":>10}{"rows/sec":>14}')
+        for mode, seconds in results:
+            self.stdout.write(
+                f'{mode:<24}{seconds:>10.1f}{rows / seconds if seconds else 0:>14,.0f}'
+            )
+
+    def run_mode(self, mode, apps_file, reviews_file, options):
+        """Wall-clock seconds of one load_initial_data run"""
+        if mode != 'incremental-unchanged':
+            with connection.cursor() as cursor:
+                cursor.execute('TRUNCATE core_app, core_review CASCADE')
+
+        arguments = {
+            'apps_file': apps_file,
+            'reviews_file': reviews_file,
+            'stdout': io.StringIO(),
+        }
+        if mode in ('full', 'fast-rebuild'):
+            arguments['workers'] = options['workers']
+        if mode == 'fast-rebuild':
+            arguments['fast_rebuild'] = True
+        if mode.startswith('incremental'):
+            arguments['incremental'] = True
+            arguments['restart'] = True
+
+        started = time.perf_counter()
+        call_command('load_initial_data', **arguments)
+        return time.perf_counter() - started
+
+    def write_csv(self, path, header, rows, keep_names=False):
+        """Write the rows; returns their first column with ``keep_names``"""
+        names = []
+        with open(path, 'w', newline='', encoding='utf-8') as file:
+            writer = csv.writer(file)
+            writer.writerow(header)
+            for row in rows:
+                writer.writerow(row)
+                if keep_names:
+                    names.append(row[0])
+        return names
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+
+from core.cache_proxy import serve
+
+
+class Command(BaseCommand):
+    """
+    Management command to run the caching reverse proxy
+
+    Stands in for a CDN in front of a running server: point
+    RESPONSE_CACHE_PURGE_URLS at it to see surrogate-key purges arrive.
+    """
+    help = 'Run a local caching reverse proxy that honours Surrogate-Key purges'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--upstream',
+            default='http://127.0.0.1:8000',
+            help='Server to proxy (default: http://127.0.0.1:8000)'
+        )
+        parser.add_argument(
+            '--host',
+            default='127.0.0.1',
+            help='Address to listen on (default: 127.0.0.1)'
+        )
+        parser.add_argument(
+            '--port',
+            type=int,
+            default=8080,
+            help='Port to listen on (default: 8080)'
+        )
+
+    def handle(self, *args, **options):
+        server = serve(options['upstream'], options['host'], options['port'])
+        self.stdout.write(
+            f'Proxying {options["upstream"]} on http://{options["host"]}:{options["port"]}/ '
+            f'(PURGE with a Surrogate-Key header to purge)'
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,105 @@
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.dedup import NearDuplicateIndex, signature
+from core.models import Review
+
+
+class Command(BaseCommand):
+    """
+    Management command to find near-duplicate reviews in the existing corpus
+    """
+    help = 'Detect verbatim and near-verbatim duplicate reviews with MinHash LSH'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=settings.REVIEW_DEDUP_THRESHOLD,
+            help='Minimum estimated similarity (default: REVIEW_DEDUP_THRESHOLD)'
+        )
+        parser.add_argument(
+            '--apply',
+            action='store_true',
+            help='Store duplicate_of/duplicate_score on the duplicates found'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=2000,
+            help='Rows per update batch when applying (default: 2000)'
+        )
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=10,
+            help='Number of most duplicated reviews to list (default: 10)'
+        )
+
+    def handle(self, *args, **options):
+        index = NearDuplicateIndex(threshold=options['threshold'])
+        duplicates = []
+        scanned = 0
+        started = time.perf_counter()
+
+        # Reviews are visited oldest first, so each duplicate points at the
+        # earliest similar review
+        reviews = Review.objects.order_by('id').values_list('id', 'review_text')
+        for review_id, text in reviews.iterator(chunk_size=5000):
+            scanned += 1
+            sig = signature(text)
+            if sig is None:
+                continue
+
+            match = index.query(sig=sig)
+            if match:
+                duplicates.append((review_id, *match))
+            index.add(review_id, sig=sig)
+
+            if scanned % 50000 == 0:
+                self.report(scanned, len(duplicates), started)
+
+        self.report(scanned, len(duplicates), started)
+        self.stdout.write(
+            f'Index memory: {index.memory_usage() / 1024 / 1024:.1f} MB '
+            f'for {len(index):,} indexed reviews'
+        )
+
+        originals = Counter(original for _, original, _ in duplicates)
+        if originals:
+            self.stdout.write('Most duplicated reviews:')
+            texts = dict(Review.objects.filter(
+                id__in=[review_id for review_id, _ in originals.most_common(options['top'])]
+            ).values_list('id', 'review_text'))
+            for review_id, count in originals.most_common(options['top']):
+                preview = texts.get(review_id, '')[:60]
+                self.stdout.write(f'  #{review_id} x{count}: "{preview}"')
+
+        if options['apply']:
+            self.apply(duplicates, options['batch_size'])
+
+    def apply(self, duplicates, batch_size):
+        updated = 0
+        with transaction.atomic():
+            for start in range(0, len(duplicates), batch_size):
+                batch = [
+                    Review(id=review_id, duplicate_of_id=original, duplicate_score=score)
+                    for review_id, original, score in duplicates[start:start + batch_size]
+                ]
+                Review.objects.bulk_update(batch, ['duplicate_of', 'duplicate_score'])
+                updated += len(batch)
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Marked {updated:,} reviews as near-duplicates')
+        )
+
+    def report(self, scanned, found, started):
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'  {scanned:,} reviews scanned, {found:,} near-duplicates '
+            f'({scanned / elapsed if elapsed else 0:,.0f} reviews/sec)'
+        )
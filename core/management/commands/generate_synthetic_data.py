@@ -0,0 +1,201 @@
+import multiprocessing
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.utils import timezone
+
+from core.synthetic import CatalogModel, generate_chunk, init_worker
+
+
+class Command(BaseCommand):
+    """
+    Management command to generate synthetic apps and reviews at scale
+
+    Distributions are learned from the data already in the database, so
+    load the bundled CSV files first. Apps and reviews get explicit ids from
+    ranges reserved up front; each chunk of apps is generated from its own
+    seed and committed separately by one of the worker processes.
+    """
+    help = 'Generate synthetic apps, reviews and moderation history for scale testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--apps',
+            type=int,
+            default=100000,
+            help='Number of apps to generate (default: 100000)'
+        )
+        parser.add_argument(
+            '--reviews',
+            type=int,
+            default=1000000,
+            help='Number of reviews to generate (default: 1000000)'
+        )
+        parser.add_argument(
+            '--users',
+            type=int,
+            default=1000,
+            help='Synthetic regular users writing reviews (default: 1000)'
+        )
+        parser.add_argument(
+            '--supervisors',
+            type=int,
+            default=5,
+            help='Synthetic supervisors moderating reviews (default: 5)'
+        )
+        parser.add_argument(
+            '--user-fraction',
+            type=float,
+            default=0.05,
+            help='Share of reviews written by users instead of imported (default: 0.05)'
+        )
+        parser.add_argument(
+            '--pending-fraction',
+            type=float,
+            default=0.3,
+            help='Share of user reviews still pending moderation (default: 0.3)'
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=730,
+            help='Spread creation dates over this many past days (default: 730)'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=5000,
+            help='Apps per generated chunk (default: 5000)'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Generating processes (default: number of CPUs)'
+        )
+        parser.add_argument(
+            '--train-sample',
+            type=int,
+            default=50000,
+            help='Apps and reviews the distributions are learned from (default: 50000)'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=1,
+            help='Random seed (default: 1)'
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        self.stdout.write('Learning distributions from existing data...')
+        try:
+            model = CatalogModel.from_database(options['train_sample'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        user_ids = self.create_users(
+            'regular_user', options['users'], options['seed'])
+        supervisor_ids = self.create_users(
+            'supervisor', max(options['supervisors'], 1), options['seed'])
+
+        tasks = self.plan(options)
+        settings = {
+            'now': timezone.now(),
+            'days': options['days'],
+            'user_fraction': options['user_fraction'],
+            'pending_fraction': options['pending_fraction'],
+        }
+        self.stdout.write(
+            f'Generating {options["apps"]:,} apps and {options["reviews"]:,} '
+            f'reviews in {len(tasks)} chunks with {options["workers"]} workers...'
+        )
+
+        # Forked workers must open their own connections
+        connections.close_all()
+        totals = [0, 0, 0]
+        with multiprocessing.Pool(
+            max(options['workers'], 1),
+            initializer=init_worker,
+            initargs=(model, user_ids, supervisor_ids, settings),
+        ) as pool:
+            for done, (chunk, pid, apps, reviews, approvals, seconds) in enumerate(
+                    pool.imap_unordered(generate_chunk, tasks), 1):
+                totals[0] += apps
+                totals[1] += reviews
+                totals[2] += approvals
+                self.stdout.write(
+                    f'  [worker {pid}] chunk {chunk + 1} ({done}/{len(tasks)}): '
+                    f'{apps:,} apps, {reviews:,} reviews in {seconds:.1f}s '
+                    f'({reviews / seconds if seconds else 0:,.0f} reviews/sec)'
+                )
+
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE core_app, core_review, core_reviewapproval')
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Generated {totals[0]:,} apps, {totals[1]:,} reviews and '
+                f'{totals[2]:,} approvals in {elapsed:.1f}s'
+            )
+        )
+
+    def plan(self, options):
+        """
+        Chunk tasks over id ranges reserved from the app and review sequences.
+        Reviews are split between chunks in proportion to their apps.
+        """
+        apps, reviews, chunk_size = options['apps'], options['reviews'], options['chunk_size']
+        app_start = self.reserve_ids('core_app', apps)
+        review_start = self.reserve_ids('core_review', reviews)
+
+        tasks = []
+        for chunk, offset in enumerate(range(0, apps, chunk_size)):
+            app_count = min(chunk_size, apps - offset)
+            first_review = reviews * offset // apps
+            last_review = reviews * (offset + app_count) // apps
+            tasks.append((
+                chunk, options['seed'], app_start + offset, app_count,
+                review_start + first_review, last_review - first_review,
+            ))
+        return tasks
+
+    def reserve_ids(self, table, count):
+        """First id of ``count`` ids taken from the table's sequence"""
+        with connection.cursor() as cursor:
+            cursor.execute(f"""
+                SELECT setval(
+                    pg_get_serial_sequence('{table}', 'id'),
+                    GREATEST(
+                        (SELECT COALESCE(MAX(id), 0) FROM {table}),
+                        (SELECT last_value FROM {table}_id_seq)
+                    ) + %s
+                ) - %s + 1
+            """, [max(count, 1), max(count, 1)])
+            return cursor.fetchone()[0]
+
+    def create_users(self, role, count, seed):
+        """Ids of ``count`` synthetic users with this role, created if missing"""
+        prefix = f'synthetic_{seed}_{role}'
+        now = timezone.now()
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO accounts_customuser (
+                    password, is_superuser, username, first_name, last_name,
+                    email, is_staff, is_active, date_joined, role, created_at,
+                    updated_at
+                )
+                SELECT '!', false, %(prefix)s || '_' || n, '', '',
+                       %(prefix)s || '_' || n || '@example.com', false, true,
+                       %(now)s, %(role)s, %(now)s, %(now)s
+                FROM generate_series(1, %(count)s) n
+                ON CONFLICT DO NOTHING
+            """, {'prefix': prefix, 'now': now, 'role': role, 'count': count})
+            cursor.execute("""
+                SELECT id FROM accounts_customuser
+                WHERE username LIKE %s ORDER BY id
+            """, [prefix.replace('_', '\\_') + '\\_%'])
+            return [row[0] for row in cursor.fetchall()]
@@ -1,13 +1,54 @@
 import csv
+import multiprocessing
 import os
-from django.core.management.base import BaseCommand
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from django.core.management.base import BaseCommand, CommandError
 from django.conf import settings
-from core.models import App, Review
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+from django.utils import timezone
+from core.data_import import (
+    APP_COLUMNS, ENCODING_ERRORS, IMPORT_LOCK_ID, REVIEW_COLUMNS,
+    REVIEW_KEY_SQL, STDIN, CSVSource, ReviewKeys, app_fingerprint, batched,
+    clean_app_row, clean_review_row, concurrent_index_definition, copy_rows,
+    csv_chunks, file_sha256, is_splittable, read_header, schema_version,
+    secondary_indexes, stage_review_chunk,
+)
+from core.models import App, ImportCheckpoint, ImportFingerprint, Review
+from core.response_cache import CATALOG, purge
 
 
 class Command(BaseCommand):
     """
     Management command to load initial data from CSV files
+
+    Rows are cleaned in Python and streamed into Postgres with COPY in large
+    batches; reviews are linked to their app through a name -> id map built
+    once, and the whole import runs in a single transaction.
+
+    With ``--workers N`` the reviews file is split on record boundaries and
+    parsed by N processes that COPY into an unlogged staging table before
+    the transaction starts; the transaction then merges it in file order.
+
+    Re-running against a database that already holds imported data (or
+    passing ``--incremental``) upserts instead: new rows are inserted,
+    changed rows updated in place, unchanged rows left alone, and rows gone
+    from the files optionally deleted. Each batch commits together with an
+    ImportCheckpoint, so an interrupted run resumes where it stopped.
+
+    Either file may be gzip, bz2 or zstd compressed, or ``-`` for stdin.
+    Rows are streamed, undecodable bytes follow ``--encoding-errors`` and
+    malformed rows can be written to ``--rejects-file``.
+
+    ``--fast-rebuild`` drops the secondary indexes of the app and review
+    tables before a full load and rebuilds them afterwards, followed by
+    ANALYZE, instead of maintaining them row by row.
+
+    Successful imports record an ImportFingerprint per file; with
+    ``--skip-if-unchanged`` a run whose files, importer and schema have not
+    changed exits after a stat() per file. Runs are serialized with a
+    Postgres advisory lock.
     """
     help = 'Load apps and reviews from CSV files'
 
@@ -16,188 +57,873 @@ class Command(BaseCommand):
             '--apps-file',
             type=str,
             default='googleplaystore.csv',
-            help='Path to apps CSV file'
+            help='Path to apps CSV file, optionally compressed, or - for stdin'
         )
         parser.add_argument(
             '--reviews-file',
             type=str,
             default='googleplaystore_user_reviews.csv',
-            help='Path to reviews CSV file'
+            help='Path to reviews CSV file, optionally compressed, or - for stdin'
         )
         parser.add_argument(
             '--clear',
             action='store_true',
             help='Clear existing data before import'
         )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=10000,
+            help='Rows sent per COPY statement (default: 10000)'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Processes parsing the reviews file in parallel (default: 1)'
+        )
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            help='Upsert changed rows (default when imported data already exists)'
+        )
+        parser.add_argument(
+            '--delete-missing',
+            action='store_true',
+            help='Incremental mode: delete imported rows no longer in the files'
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Incremental mode: ignore checkpoints of an interrupted run'
+        )
+        parser.add_argument(
+            '--skip-if-unchanged',
+            action='store_true',
+            help='Do nothing when the files match the last successful import, '
+                 'or when another import is running'
+        )
+        parser.add_argument(
+            '--fast-rebuild',
+            action='store_true',
+            help='Full loads: drop secondary indexes, load, rebuild them and ANALYZE'
+        )
+        parser.add_argument(
+            '--concurrently',
+            action='store_true',
+            help='With --fast-rebuild: rebuild indexes with CREATE INDEX '
+                 'CONCURRENTLY after the load commits, without blocking readers'
+        )
+        parser.add_argument(
+            '--index-workers',
+            type=int,
+            help='With --fast-rebuild: max_parallel_maintenance_workers per index build'
+        )
+        parser.add_argument(
+            '--maintenance-work-mem',
+            help='With --fast-rebuild: maintenance_work_mem for index builds, e.g. 1GB'
+        )
+        parser.add_argument(
+            '--encoding',
+            default='utf-8',
+            help='Encoding of the CSV files (default: utf-8)'
+        )
+        parser.add_argument(
+            '--encoding-errors',
+            choices=ENCODING_ERRORS,
+            default='reject',
+            help='Undecodable bytes: fail, replace with U+FFFD, or reject the row '
+                 '(default: reject)'
+        )
+        parser.add_argument(
+            '--rejects-file',
+            help='Write rejected rows to this CSV file with the reason'
+        )
 
     def handle(self, *args, **options):
         """Main command handler"""
-        if options['clear']:
-            self.stdout.write('Clearing existing data...')
-            Review.objects.all().delete()
-            App.objects.all().delete()
-            self.stdout.write(
-                self.style.SUCCESS('Existing data cleared.')
+        self.batch_size = options['batch_size']
+        self.now = timezone.now()
+        started = time.perf_counter()
+
+        self.encoding = options['encoding']
+        self.encoding_errors = options['encoding_errors']
+        apps_file = self.resolve_path(options['apps_file'])
+        reviews_file = self.resolve_path(options['reviews_file'])
+        if apps_file == reviews_file == STDIN:
+            raise CommandError('Only one of the files can be read from stdin')
+
+        # Held on its own connection: --workers closes the default one
+        lock_connection = connections.create_connection(DEFAULT_DB_ALIAS)
+        try:
+            with lock_connection.cursor() as cursor:
+                cursor.execute('SELECT pg_try_advisory_lock(%s)', [IMPORT_LOCK_ID])
+                locked = cursor.fetchone()[0]
+            if not locked:
+                if options['skip_if_unchanged']:
+                    self.stdout.write('Another data import is running, skipping.')
+                    return
+                raise CommandError('Another data import is running')
+
+            files = {
+                kind: path
+                for kind, path in (('apps', apps_file), ('reviews', reviews_file))
+                if self.source_exists(path)
+            }
+            if options['skip_if_unchanged'] and self.unchanged(files):
+                self.stdout.write(
+                    self.style.SUCCESS('Data files unchanged since the last import, skipping.')
+                )
+                return
+
+            stats = {
+                kind: os.stat(path) for kind, path in files.items() if path != STDIN
+            }
+            self.import_files(apps_file, reviews_file, options)
+            self.record_fingerprints(files, stats)
+            purge(CATALOG)
+        finally:
+            # Closing the session releases the advisory lock
+            lock_connection.close()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Data import completed in {time.perf_counter() - started:.1f}s!'
             )
+        )
 
-        # Load apps
-        apps_file = os.path.join(settings.BASE_DIR, options['apps_file'])
-        if os.path.exists(apps_file):
-            self.load_apps(apps_file)
-        else:
-            self.stdout.write(
-                self.style.ERROR(f'Apps file not found: {apps_file}')
+    def import_files(self, apps_file, reviews_file, options):
+        """Pick the import mode and run it"""
+        incremental = options['incremental']
+        if incremental and options['clear']:
+            raise CommandError('--incremental cannot be combined with --clear')
+        if not incremental and not options['clear'] and \
+                Review.objects.filter(status='imported').exists():
+            if options['fast_rebuild']:
+                raise CommandError(
+                    'Imported data exists: --fast-rebuild requires --clear'
+                )
+            self.stdout.write('Imported data found, running an incremental import.')
+            incremental = True
+        if incremental and options['fast_rebuild']:
+            raise CommandError('--fast-rebuild only applies to full loads')
+
+        self.rejects = None
+        rejects_file = None
+        if options['rejects_file']:
+            rejects_file = open(
+                options['rejects_file'], 'w', newline='',
+                encoding=self.encoding, errors='surrogateescape',
             )
+            self.rejects = csv.writer(rejects_file)
+            self.rejects.writerow(['file', 'record', 'reason', 'fields'])
 
-        # Load reviews
-        reviews_file = os.path.join(settings.BASE_DIR, options['reviews_file'])
-        if os.path.exists(reviews_file):
-            self.load_reviews(reviews_file)
-        else:
-            self.stdout.write(
-                self.style.ERROR(f'Reviews file not found: {reviews_file}')
+        try:
+            if incremental:
+                self.handle_incremental(apps_file, reviews_file, options)
+            else:
+                self.handle_full(apps_file, reviews_file, options)
+        except UnicodeDecodeError as e:
+            raise CommandError(
+                f'Undecodable input ({e}); use --encoding-errors replace or reject'
+            )
+        finally:
+            if rejects_file:
+                rejects_file.close()
+
+    def fingerprint_source(self, kind, path):
+        return f'{kind}:{os.path.abspath(path)}'
+
+    def unchanged(self, files):
+        """
+        True when every file matches its fingerprint. Only a moved mtime
+        with an unchanged size costs a read of the file to compare hashes.
+        """
+        if not files or STDIN in files.values() or not App.objects.exists():
+            return False
+
+        version = schema_version()
+        fingerprints = {
+            fingerprint.source: fingerprint
+            for fingerprint in ImportFingerprint.objects.filter(
+                source__in=[self.fingerprint_source(k, p) for k, p in files.items()]
+            )
+        }
+        for kind, path in files.items():
+            fingerprint = fingerprints.get(self.fingerprint_source(kind, path))
+            if fingerprint is None or fingerprint.schema_version != version:
+                return False
+            stat = os.stat(path)
+            if stat.st_size != fingerprint.file_size:
+                return False
+            if stat.st_mtime != fingerprint.file_mtime:
+                if file_sha256(path) != fingerprint.content_hash:
+                    return False
+                # Touched or copied but identical
+                fingerprint.file_mtime = stat.st_mtime
+                fingerprint.save(update_fields=['file_mtime', 'imported_at'])
+        return True
+
+    def record_fingerprints(self, files, stats):
+        """Fingerprint the files of a successful import"""
+        version = schema_version()
+        for kind, stat in stats.items():
+            path = files[kind]
+            content_hash = file_sha256(path)
+            current = os.stat(path)
+            if (current.st_size, current.st_mtime) != (stat.st_size, stat.st_mtime):
+                # Modified while importing: let the next run import it again
+                continue
+            ImportFingerprint.objects.update_or_create(
+                source=self.fingerprint_source(kind, path),
+                defaults={
+                    'file_size': stat.st_size,
+                    'file_mtime': stat.st_mtime,
+                    'content_hash': content_hash,
+                    'schema_version': version,
+                },
             )
 
+    def resolve_path(self, path):
+        """Path relative to BASE_DIR, or STDIN"""
+        if path == STDIN:
+            return path
+        return os.path.join(settings.BASE_DIR, path)
+
+    def source_exists(self, path):
+        return path == STDIN or os.path.exists(path)
+
+    def open_source(self, path):
+        """Row iterator over a CSV file with the command's encoding policy"""
+        return CSVSource(
+            path,
+            encoding=self.encoding,
+            errors=self.encoding_errors,
+            on_reject=self.write_reject,
+            on_progress=self.report_progress,
+        )
+
+    def write_reject(self, name, record, reason, fields):
+        if self.rejects:
+            self.rejects.writerow([name, record, reason] + fields)
+
+    def report_progress(self, source):
+        """Progress line with throughput for a CSVSource being read"""
+        elapsed = source.elapsed()
+        read_mb = source.bytes_read / 1024 / 1024
+        if source.size:
+            position = (
+                f'{read_mb:,.1f} of {source.size / 1024 / 1024:,.1f} MB '
+                f'({source.bytes_read / source.size:.0%})'
+            )
+        else:
+            position = f'{read_mb:,.1f} MB'
         self.stdout.write(
-            self.style.SUCCESS('Data import completed!')
+            f'  {position}, {read_mb / elapsed:,.1f} MB/sec, '
+            f'{source.records / elapsed:,.0f} rows/sec, '
+            f'{source.rejected:,} rejected'
         )
 
-    def load_apps(self, file_path):
-        """Load apps from CSV file"""
-        self.stdout.write(f'Loading apps from {file_path}...')
+    def report_rejects(self, source):
+        if source.rejected:
+            self.stdout.write(
+                self.style.WARNING(
+                    f'{source.rejected:,} malformed rows rejected from {source.name}'
+                )
+            )
 
-        apps_created = 0
-        apps_updated = 0
-
-        with open(file_path, 'r', encoding='utf-8', errors='ignore') as file:
-            reader = csv.DictReader(file)
-
-            for row in reader:
-                try:
-                    # Clean and prepare data
-                    name = row.get('App', '').strip()
-                    if not name:
-                        continue
-
-                    # Convert rating to float
-                    rating = None
-                    if row.get('Rating') and row.get('Rating') != 'nan':
-                        try:
-                            rating = float(row.get('Rating'))
-                        except (ValueError, TypeError):
-                            rating = None
-
-                    # Convert reviews count
-                    reviews_count = 0
-                    if row.get('Reviews'):
-                        try:
-                            reviews_count = int(row.get('Reviews', 0))
-                        except (ValueError, TypeError):
-                            reviews_count = 0
-
-                    # Create or update app
-                    app, created = App.objects.get_or_create(
-                        name=name,
-                        defaults={
-                            'category': row.get('Category', '').strip(),
-                            'rating': rating,
-                            'reviews_count': reviews_count,
-                            'size': row.get('Size', '').strip(),
-                            'installs': row.get('Installs', '').strip(),
-                            'app_type': row.get('Type', '').strip(),
-                            'price': row.get('Price', '').strip(),
-                            'content_rating': row.get('Content Rating', '').strip(),
-                            'genres': row.get('Genres', '').strip(),
-                            'last_updated': row.get('Last Updated', '').strip(),
-                            'current_version': row.get('Current Ver', '').strip(),
-                            'android_version': row.get('Android Ver', '').strip(),
-                        }
+    def handle_full(self, apps_file, reviews_file, options):
+        """Load both files with COPY in a single transaction"""
+        fast_rebuild = options['fast_rebuild']
+        concurrently = fast_rebuild and options['concurrently']
+        timings = {}
+        staging_table = None
+        try:
+            if options['workers'] > 1 and self.source_exists(reviews_file):
+                if is_splittable(reviews_file):
+                    staging_table = self.stage_reviews(reviews_file, options['workers'])
+                else:
+                    self.stdout.write(
+                        self.style.WARNING(
+                            'Compressed or piped reviews cannot be split, '
+                            'loading them in a single process'
+                        )
                     )
 
-                    if created:
-                        apps_created += 1
-                    else:
-                        apps_updated += 1
-
-                except Exception as e:
+            with transaction.atomic():
+                if options['clear']:
+                    self.stdout.write('Clearing existing data...')
+                    with connection.cursor() as cursor:
+                        # Also empties the tables referencing reviews
+                        cursor.execute('TRUNCATE core_app, core_review CASCADE')
                     self.stdout.write(
-                        self.style.WARNING(f'Error processing app {name}: {e}')
+                        self.style.SUCCESS('Existing data cleared.')
                     )
+
+                if fast_rebuild:
+                    with self.phase(timings, 'drop indexes'):
+                        indexes = self.drop_indexes()
+
+                # Load apps
+                with self.phase(timings, 'load apps'):
+                    if self.source_exists(apps_file):
+                        self.load_apps(apps_file)
+                    else:
+                        self.stdout.write(
+                            self.style.ERROR(f'Apps file not found: {apps_file}')
+                        )
+
+                # Load reviews
+                with self.phase(timings, 'load reviews'):
+                    if staging_table:
+                        self.merge_staged_reviews(staging_table)
+                    elif self.source_exists(reviews_file):
+                        self.load_reviews(reviews_file)
+                    else:
+                        self.stdout.write(
+                            self.style.ERROR(f'Reviews file not found: {reviews_file}')
+                        )
+
+                if fast_rebuild and not concurrently:
+                    with self.phase(timings, 'rebuild indexes'):
+                        self.create_indexes(indexes, options)
+        finally:
+            if staging_table:
+                with connection.cursor() as cursor:
+                    cursor.execute(f'DROP TABLE IF EXISTS {staging_table}')
+
+        if fast_rebuild:
+            if concurrently:
+                with self.phase(timings, 'rebuild indexes'):
+                    self.create_indexes(indexes, options, concurrently=True)
+            with self.phase(timings, 'analyze'):
+                with connection.cursor() as cursor:
+                    cursor.execute('ANALYZE core_app, core_review')
+            self.stdout.write('Phase timings:')
+            for phase, seconds in timings.items():
+                self.stdout.write(f'  {phase:<16} {seconds:8.1f}s')
+
+    @contextmanager
+    def phase(self, timings, name):
+        started = time.perf_counter()
+        yield
+        timings[name] = time.perf_counter() - started
+
+    def drop_indexes(self):
+        """Drop the secondary app and review indexes; returns their definitions"""
+        with connection.cursor() as cursor:
+            indexes = secondary_indexes(cursor, ['core_app', 'core_review'])
+            for name, definition in indexes:
+                # Printed so an interrupted rebuild can be finished by hand
+                self.stdout.write(f'Dropping index {name}: {definition}')
+                cursor.execute(f'DROP INDEX {name}')
+        return indexes
+
+    def create_indexes(self, indexes, options, concurrently=False):
+        """Recreate dropped indexes, CONCURRENTLY outside any transaction"""
+        with connection.cursor() as cursor:
+            # SET LOCAL would not outlive the statement in autocommit mode
+            scope = 'SESSION' if concurrently else 'LOCAL'
+            if options['index_workers'] is not None:
+                cursor.execute(
+                    f'SET {scope} max_parallel_maintenance_workers = %s',
+                    [options['index_workers']],
+                )
+            if options['maintenance_work_mem']:
+                cursor.execute(
+                    f'SET {scope} maintenance_work_mem = %s',
+                    [options['maintenance_work_mem']],
+                )
+
+            if not concurrently:
+                # Run the deferred foreign key checks now: CREATE INDEX is
+                # refused while trigger events are pending
+                cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+
+            for name, definition in indexes:
+                started = time.perf_counter()
+                if concurrently:
+                    try:
+                        cursor.execute(concurrent_index_definition(definition))
+                    except Exception:
+                        # A failed concurrent build leaves an invalid index
+                        cursor.execute(f'DROP INDEX IF EXISTS {name}')
+                        raise
+                else:
+                    cursor.execute(definition)
+                self.stdout.write(
+                    f'Rebuilt index {name} in {time.perf_counter() - started:.1f}s'
+                )
+
+            if concurrently:
+                cursor.execute('RESET max_parallel_maintenance_workers')
+                cursor.execute('RESET maintenance_work_mem')
+
+    def app_ids_by_name(self):
+        """Name -> id map of every app in the database"""
+        return dict(App.objects.values_list('name', 'id'))
+
+    def load_apps(self, file_path):
+        """Load apps from CSV file"""
+        self.stdout.write(f'Loading apps from {file_path}...')
+        started = time.perf_counter()
+
+        # Apps are keyed by name: existing names and repeated rows are skipped
+        seen = set(self.app_ids_by_name())
+        apps_existing = 0
+
+        def new_apps(rows):
+            nonlocal apps_existing
+            for row in rows:
+                app = clean_app_row(row)
+                if app is None:
                     continue
+                if app[0] in seen:
+                    apps_existing += 1
+                    continue
+                seen.add(app[0])
+                yield app + (app_fingerprint(app), self.now, self.now)
+
+        apps_created = 0
+        source = self.open_source(file_path)
+        with connection.cursor() as cursor:
+            for batch in batched(new_apps(source), self.batch_size):
+                apps_created += copy_rows(
+                    cursor, 'core_app',
+                    APP_COLUMNS + ['source_hash', 'created_at', 'updated_at'], batch,
+                )
 
         self.stdout.write(
             self.style.SUCCESS(
-                f'Apps loaded: {apps_created} created, {apps_updated} updated'
+                f'Apps loaded: {apps_created} created, {apps_existing} already '
+                f'present ({time.perf_counter() - started:.1f}s)'
             )
         )
+        self.report_rejects(source)
 
     def load_reviews(self, file_path):
         """Load reviews from CSV file"""
         self.stdout.write(f'Loading reviews from {file_path}...')
+        started = time.perf_counter()
 
-        reviews_created = 0
+        app_ids = self.app_ids_by_name()
+        review_keys = ReviewKeys()
         reviews_skipped = 0
 
-        with open(file_path, 'r', encoding='utf-8', errors='ignore') as file:
-            reader = csv.DictReader(file)
+        def new_reviews(rows):
+            nonlocal reviews_skipped
+            for row in rows:
+                review = clean_review_row(row)
+                app_id = app_ids.get(review[0]) if review else None
+                if app_id is None:
+                    reviews_skipped += 1
+                    continue
+                # Mark as imported from CSV
+                yield (app_id,) + review[1:] + (
+                    review_keys(review[0], review[1]), 'imported', self.now, self.now,
+                )
 
-            for row in reader:
-                try:
-                    app_name = row.get('App', '').strip()
-                    review_text = row.get('Translated_Review', '').strip()
+        reviews_created = 0
+        source = self.open_source(file_path)
+        with connection.cursor() as cursor:
+            for batch in batched(new_reviews(source), self.batch_size):
+                reviews_created += copy_rows(
+                    cursor, 'core_review',
+                    ['app_id'] + REVIEW_COLUMNS +
+                    ['source_hash', 'status', 'created_at', 'updated_at'],
+                    batch,
+                )
 
-                    # Skip if no app name or review text, or if review is 'nan'
-                    if not app_name or not review_text or review_text.lower() == 'nan':
-                        reviews_skipped += 1
-                        continue
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Reviews loaded: {reviews_created} created, {reviews_skipped} '
+                f'skipped ({time.perf_counter() - started:.1f}s)'
+            )
+        )
+        self.report_rejects(source)
 
-                    # Find the app
-                    try:
-                        app = App.objects.get(name=app_name)
-                    except App.DoesNotExist:
-                        reviews_skipped += 1
-                        continue
-
-                    # Convert sentiment data
-                    sentiment = row.get('Sentiment', '').strip()
-                    if sentiment.lower() == 'nan':
-                        sentiment = None
-
-                    sentiment_polarity = None
-                    if row.get('Sentiment_Polarity') and row.get('Sentiment_Polarity') != 'nan':
-                        try:
-                            sentiment_polarity = float(row.get('Sentiment_Polarity'))
-                        except (ValueError, TypeError):
-                            sentiment_polarity = None
-
-                    sentiment_subjectivity = None
-                    if row.get('Sentiment_Subjectivity') and row.get('Sentiment_Subjectivity') != 'nan':
-                        try:
-                            sentiment_subjectivity = float(row.get('Sentiment_Subjectivity'))
-                        except (ValueError, TypeError):
-                            sentiment_subjectivity = None
-
-                    # Create review
-                    Review.objects.create(
-                        app=app,
-                        review_text=review_text,
-                        sentiment=sentiment,
-                        sentiment_polarity=sentiment_polarity,
-                        sentiment_subjectivity=sentiment_subjectivity,
-                        status='imported'  # Mark as imported from CSV
-                    )
+    def stage_reviews(self, file_path, workers):
+        """Parse the reviews file in parallel into an unlogged staging table"""
+        self.stdout.write(
+            f'Staging reviews from {file_path} with {workers} workers...'
+        )
+        started = time.perf_counter()
+
+        staging_table = f'core_review_staging_{os.getpid()}'
+        with connection.cursor() as cursor:
+            cursor.execute(f"""
+                CREATE UNLOGGED TABLE {staging_table} (
+                    chunk integer NOT NULL,
+                    seq integer NOT NULL,
+                    app_name varchar(500) NOT NULL,
+                    review_text text NOT NULL,
+                    sentiment varchar(10),
+                    sentiment_polarity double precision,
+                    sentiment_subjectivity double precision
+                )
+            """)
 
-                    reviews_created += 1
+        fieldnames = read_header(file_path, self.encoding)
+        tasks = [
+            (file_path, chunk, start, end, fieldnames, staging_table,
+             self.batch_size, self.encoding, self.encoding_errors)
+            for chunk, (start, end) in enumerate(csv_chunks(file_path, workers))
+        ]
+
+        # Forked workers must open their own connections
+        connections.close_all()
+        per_worker = defaultdict(lambda: [0, 0.0])
+        staged = skipped = rejected = 0
+        with multiprocessing.Pool(workers) as pool:
+            for chunk, pid, rows, bad, rejects, seconds in pool.imap_unordered(
+                    stage_review_chunk, tasks):
+                staged += rows
+                skipped += bad
+                rejected += len(rejects)
+                for seq, reason, fields in rejects:
+                    self.write_reject(file_path, f'{chunk + 1}:{seq + 1}', reason, fields)
+                per_worker[pid][0] += rows
+                per_worker[pid][1] += seconds
+                self.stdout.write(
+                    f'  [worker {pid}] chunk {chunk + 1}/{len(tasks)}: '
+                    f'{rows:,} rows in {seconds:.1f}s ({rows / seconds:,.0f} rows/sec)'
+                )
+
+        for pid, (rows, seconds) in sorted(per_worker.items()):
+            self.stdout.write(
+                f'  [worker {pid}] total {rows:,} rows '
+                f'({rows / seconds if seconds else 0:,.0f} rows/sec)'
+            )
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'Staged {staged:,} reviews ({skipped:,} skipped) in {elapsed:.1f}s '
+            f'({staged / elapsed if elapsed else 0:,.0f} rows/sec)'
+        )
+        if rejected:
+            self.stdout.write(
+                self.style.WARNING(
+                    f'{rejected:,} malformed rows rejected from {file_path}'
+                )
+            )
+        self.reviews_skipped = skipped
+        return staging_table
+
+    def merge_staged_reviews(self, staging_table):
+        """Move staged reviews into core_review in original file order"""
+        self.stdout.write('Merging staged reviews...')
+        started = time.perf_counter()
+
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT count(*) FROM {staging_table}')
+            staged = cursor.fetchone()[0]
+            cursor.execute(f"""
+                INSERT INTO core_review (
+                    app_id, {', '.join(REVIEW_COLUMNS)},
+                    source_hash, status, created_at, updated_at
+                )
+                SELECT app.id, {', '.join(f'staged.{c}' for c in REVIEW_COLUMNS)},
+                       {REVIEW_KEY_SQL.format(alias='staged', order='staged.chunk, staged.seq')},
+                       'imported', %s, %s
+                FROM {staging_table} staged
+                JOIN core_app app ON app.name = staged.app_name
+                ORDER BY staged.chunk, staged.seq
+            """, [self.now, self.now])
+            reviews_created = cursor.rowcount
+
+        reviews_skipped = self.reviews_skipped + staged - reviews_created
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Reviews loaded: {reviews_created} created, {reviews_skipped} '
+                f'skipped ({time.perf_counter() - started:.1f}s)'
+            )
+        )
+
+    def handle_incremental(self, apps_file, reviews_file, options):
+        """Upsert both files in checkpointed batches"""
+        if options['workers'] > 1:
+            self.stdout.write(
+                self.style.WARNING('--workers is ignored by incremental imports')
+            )
+        self.restart = options['restart']
 
-                except Exception as e:
+        app_names = review_keys = None
+        with connection.cursor() as cursor:
+            try:
+                cursor.execute(f"""
+                    CREATE TEMPORARY TABLE import_app_rows AS
+                    SELECT {', '.join(APP_COLUMNS)}, source_hash
+                    FROM core_app WITH NO DATA
+                """)
+                cursor.execute(f"""
+                    CREATE TEMPORARY TABLE import_review_rows AS
+                    SELECT app_id, {', '.join(REVIEW_COLUMNS)}, source_hash
+                    FROM core_review WITH NO DATA
+                """)
+
+                if self.source_exists(apps_file):
+                    app_names = self.upsert_apps(cursor, apps_file)
+                else:
                     self.stdout.write(
-                        self.style.WARNING(f'Error processing review: {e}')
+                        self.style.ERROR(f'Apps file not found: {apps_file}')
                     )
-                    reviews_skipped += 1
+
+                if self.source_exists(reviews_file):
+                    review_keys = self.upsert_reviews(
+                        cursor, reviews_file, options['delete_missing']
+                    )
+                else:
+                    self.stdout.write(
+                        self.style.ERROR(f'Reviews file not found: {reviews_file}')
+                    )
+
+                # Only delete what a fully read file no longer contains
+                if options['delete_missing']:
+                    self.delete_missing(cursor, app_names, review_keys)
+            finally:
+                cursor.execute('DROP TABLE IF EXISTS import_app_rows, import_review_rows')
+
+    def open_checkpoint(self, kind, file_path):
+        """
+        Checkpoint for this file, reset unless an interrupted run can resume;
+        None for stdin, which cannot be resumed
+        """
+        if file_path == STDIN:
+            return None
+        source = f'{kind}:{os.path.abspath(file_path)}'
+        stat = os.stat(file_path)
+        checkpoint, created = ImportCheckpoint.objects.get_or_create(
+            source=source,
+            defaults={'file_size': stat.st_size, 'file_mtime': stat.st_mtime},
+        )
+
+        unchanged = (
+            checkpoint.file_size == stat.st_size and
+            checkpoint.file_mtime == stat.st_mtime
+        )
+        if not created and checkpoint.rows_done and not checkpoint.completed and \
+                unchanged and not self.restart:
+            self.stdout.write(
+                f'Resuming {kind} import after {checkpoint.rows_done:,} rows'
+            )
+            return checkpoint
+
+        checkpoint.file_size = stat.st_size
+        checkpoint.file_mtime = stat.st_mtime
+        checkpoint.rows_done = 0
+        checkpoint.completed = False
+        checkpoint.save()
+        return checkpoint
+
+    def upsert_file(self, kind, file_path, prepare, upsert):
+        """
+        Feed the rows ``prepare`` accepts to ``upsert`` in batches, each
+        committed with the checkpoint. Rows before the checkpoint are still
+        passed through ``prepare`` (which may keep state) but not upserted.
+        """
+        checkpoint = self.open_checkpoint(kind, file_path)
+        resume_after = checkpoint.rows_done if checkpoint else 0
+        counts = Counter()
+
+        source = self.open_source(file_path)
+        for batch in batched(enumerate(source, 1), self.batch_size):
+            rows = []
+            for number, record in batch:
+                row = prepare(record)
+                if number <= resume_after:
                     continue
+                if row is None:
+                    counts['skipped'] += 1
+                else:
+                    rows.append(row)
+
+            rows_done = batch[-1][0]
+            if rows_done <= resume_after:
+                continue
+            with transaction.atomic():
+                if rows:
+                    counts.update(upsert(rows))
+                if checkpoint:
+                    ImportCheckpoint.objects.filter(pk=checkpoint.pk).update(
+                        rows_done=rows_done, updated_at=timezone.now()
+                    )
+
+        if checkpoint:
+            ImportCheckpoint.objects.filter(pk=checkpoint.pk).update(
+                completed=True, updated_at=timezone.now()
+            )
+        self.report_rejects(source)
+        return counts
+
+    def upsert_counts(self, cursor, rows):
+        """Inserted/updated/unchanged counts of an upsert RETURNING (xmax = 0)"""
+        returned = [inserted for inserted, in cursor.fetchall()]
+        inserted = sum(returned)
+        return {
+            'inserted': inserted,
+            'updated': len(returned) - inserted,
+            'unchanged': len(rows) - len(returned),
+        }
 
+    def upsert_apps(self, cursor, file_path):
+        """Upsert apps by name; returns the set of names in the file"""
+        self.stdout.write(f'Upserting apps from {file_path}...')
+        started = time.perf_counter()
+
+        # The first row for a name wins, like in a full import
+        names = set()
+
+        def prepare(record):
+            app = clean_app_row(record)
+            if app is None or app[0] in names:
+                return None
+            names.add(app[0])
+            return app + (app_fingerprint(app),)
+
+        def upsert(rows):
+            cursor.execute('TRUNCATE import_app_rows')
+            copy_rows(cursor, 'import_app_rows', APP_COLUMNS + ['source_hash'], rows)
+            cursor.execute(f"""
+                INSERT INTO core_app (
+                    {', '.join(APP_COLUMNS)}, source_hash, created_at, updated_at
+                )
+                SELECT {', '.join(APP_COLUMNS)}, source_hash, %s, %s
+                FROM import_app_rows
+                ON CONFLICT (name) DO UPDATE SET
+                    {', '.join(f'{c} = EXCLUDED.{c}' for c in APP_COLUMNS[1:])},
+                    source_hash = EXCLUDED.source_hash,
+                    updated_at = EXCLUDED.updated_at
+                WHERE core_app.source_hash IS DISTINCT FROM EXCLUDED.source_hash
+                RETURNING (xmax = 0) AS inserted
+            """, [self.now, self.now])
+            return self.upsert_counts(cursor, rows)
+
+        counts = self.upsert_file('apps', file_path, prepare, upsert)
+        self.report_upsert('Apps', counts, started)
+        return names
+
+    def upsert_reviews(self, cursor, file_path, collect_keys=False):
+        """
+        Upsert reviews by source key; returns the set of keys in the file when
+        ``collect_keys`` is set, for deleting missing reviews
+        """
+        self.stdout.write(f'Upserting reviews from {file_path}...')
+        started = time.perf_counter()
+
+        app_ids = self.app_ids_by_name()
+        review_keys = ReviewKeys()
+        keys = set() if collect_keys else None
+
+        def prepare(record):
+            review = clean_review_row(record)
+            if review is None:
+                return None
+            key = review_keys(review[0], review[1])
+            if collect_keys:
+                keys.add(key)
+            app_id = app_ids.get(review[0])
+            if app_id is None:
+                return None
+            return (app_id,) + review[1:] + (key,)
+
+        def upsert(rows):
+            cursor.execute('TRUNCATE import_review_rows')
+            copy_rows(
+                cursor, 'import_review_rows',
+                ['app_id'] + REVIEW_COLUMNS + ['source_hash'], rows,
+            )
+            # Values missing from the file do not clear scores computed since
+            current = ', '.join(f'core_review.{c}' for c in REVIEW_COLUMNS[1:])
+            incoming = ', '.join(
+                f'COALESCE(EXCLUDED.{c}, core_review.{c})' for c in REVIEW_COLUMNS[1:]
+            )
+            # An updated text needs a new core.dedup signature (sign_reviews)
+            cursor.execute(f"""
+                WITH upserted AS (
+                    INSERT INTO core_review (
+                        app_id, {', '.join(REVIEW_COLUMNS)},
+                        source_hash, status, created_at, updated_at
+                    )
+                    SELECT app_id, {', '.join(REVIEW_COLUMNS)},
+                           source_hash, 'imported', %s, %s
+                    FROM import_review_rows
+                    ON CONFLICT (source_hash) WHERE source_hash IS NOT NULL
+                    DO UPDATE SET
+                        ({', '.join(REVIEW_COLUMNS[1:])}) = ({incoming}),
+                        updated_at = EXCLUDED.updated_at
+                    WHERE ({current}) IS DISTINCT FROM ({incoming})
+                    RETURNING id, (xmax = 0) AS inserted
+                ), unsigned AS (
+                    DELETE FROM core_reviewsignature
+                    WHERE review_id IN (SELECT id FROM upserted WHERE NOT inserted)
+                )
+                SELECT inserted FROM upserted
+            """, [self.now, self.now])
+            return self.upsert_counts(cursor, rows)
+
+        counts = self.upsert_file('reviews', file_path, prepare, upsert)
+        self.report_upsert('Reviews', counts, started)
+        return keys
+
+    def delete_missing(self, cursor, app_names, review_keys):
+        """Delete imported reviews and apps that the files no longer contain"""
+        if review_keys is not None:
+            cursor.execute(
+                'CREATE TEMPORARY TABLE import_review_keys (source_hash varchar(32) PRIMARY KEY)'
+            )
+            copy_rows(cursor, 'import_review_keys', ['source_hash'], ((k,) for k in review_keys))
+            cursor.execute("""
+                SELECT review.id FROM core_review review
+                WHERE review.status = 'imported'
+                AND review.source_hash IS NOT NULL
+                AND NOT EXISTS (
+                    SELECT 1 FROM import_review_keys imported
+                    WHERE imported.source_hash = review.source_hash
+                )
+            """)
+            deleted = self.delete_ids(Review, [row[0] for row in cursor.fetchall()])
+            cursor.execute('DROP TABLE import_review_keys')
+            self.stdout.write(f'Reviews deleted: {deleted}')
+
+        if app_names is not None:
+            cursor.execute(
+                'CREATE TEMPORARY TABLE import_app_names (name varchar(500) PRIMARY KEY)'
+            )
+            copy_rows(cursor, 'import_app_names', ['name'], ((n,) for n in app_names))
+            # Apps with user-submitted reviews are kept
+            cursor.execute("""
+                SELECT app.id,
+                       EXISTS (
+                           SELECT 1 FROM core_review review
+                           WHERE review.app_id = app.id
+                           AND review.status <> 'imported'
+                       )
+                FROM core_app app
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM import_app_names imported
+                    WHERE imported.name = app.name
+                )
+            """)
+            missing = cursor.fetchall()
+            deleted = self.delete_ids(App, [app_id for app_id, kept in missing if not kept])
+            cursor.execute('DROP TABLE import_app_names')
+            kept = sum(1 for _, kept in missing if kept)
+            self.stdout.write(
+                f'Apps deleted: {deleted} ({kept} kept for their user reviews)'
+            )
+
+    def delete_ids(self, model, ids):
+        """Delete through the ORM so related rows are cascaded or nulled"""
+        with transaction.atomic():
+            for batch in batched(ids, self.batch_size):
+                model.objects.filter(id__in=batch).delete()
+        return len(ids)
+
+    def report_upsert(self, label, counts, started):
         self.stdout.write(
             self.style.SUCCESS(
-                f'Reviews loaded: {reviews_created} created, {reviews_skipped} skipped'
+                f"{label} upserted: {counts['inserted']} inserted, "
+                f"{counts['updated']} updated, {counts['unchanged']} unchanged, "
+                f"{counts['skipped']} skipped "
+                f"({time.perf_counter() - started:.1f}s)"
             )
-        )
\ No newline at end of file
+        )
@@ -0,0 +1,277 @@
+import json
+import random
+import secrets
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from core import loadtest
+from core.models import App
+
+
+USER_PREFIX = 'loadtest_'
+
+
+class Command(BaseCommand):
+    """
+    Management command to load test a running server with a realistic mix
+
+    The command prepares against this project's database: it samples apps to
+    search for and creates the load test users (``loadtest_user_<n>`` and
+    ``loadtest_supervisor_<n>``, with a fresh password every run). The server
+    under test has to use the same database. Supervisors only ever approve
+    or reject reviews written by load test users.
+    """
+    help = 'Replay a realistic request mix against a server and report latency percentiles'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url',
+            default='http://127.0.0.1:8000',
+            help='Base URL of the server under test (default: http://127.0.0.1:8000)'
+        )
+        parser.add_argument(
+            '--users',
+            type=int,
+            default=20,
+            help='Concurrent virtual users (default: 20)'
+        )
+        parser.add_argument(
+            '--duration',
+            type=float,
+            default=60,
+            help='Seconds to run (default: 60)'
+        )
+        parser.add_argument(
+            '--warmup',
+            type=float,
+            default=5,
+            help='Leading seconds excluded from the results (default: 5)'
+        )
+        parser.add_argument(
+            '--think-time',
+            type=float,
+            default=1.0,
+            help='Scale of the pauses between requests; 0 sends requests '
+                 'back to back (default: 1.0)'
+        )
+        parser.add_argument(
+            '--mix',
+            nargs='+',
+            metavar='SCENARIO=WEIGHT',
+            help='Scenario weights, e.g. autocomplete=40 search=25 modal=20 '
+                 'submit_review=10 moderation=5 (default: those)'
+        )
+        parser.add_argument(
+            '--supervisors',
+            type=int,
+            default=2,
+            help='Supervisor accounts shared by the virtual users (default: 2)'
+        )
+        parser.add_argument(
+            '--catalog-size',
+            type=int,
+            default=2000,
+            help='Apps sampled for searches and modals (default: 2000)'
+        )
+        parser.add_argument(
+            '--timeout',
+            type=float,
+            default=30,
+            help='Request timeout in seconds (default: 30)'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=1,
+            help='Random seed (default: 1)'
+        )
+        parser.add_argument(
+            '--output',
+            help='Write the results as JSON to this file'
+        )
+        parser.add_argument(
+            '--baseline',
+            help='Compare against results saved earlier with --output and '
+                 'fail on regressions'
+        )
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=0.2,
+            help='Relative change counted as a regression (default: 0.2)'
+        )
+        parser.add_argument(
+            '--min-delta-ms',
+            type=float,
+            default=5.0,
+            help='Ignore latency changes smaller than this (default: 5.0)'
+        )
+
+    def handle(self, *args, **options):
+        mix = self.parse_mix(options['mix'])
+        baseline = None
+        if options['baseline']:
+            try:
+                with open(options['baseline']) as file:
+                    baseline = json.load(file)
+            except (OSError, ValueError) as e:
+                raise CommandError(f'Cannot read baseline {options["baseline"]}: {e}')
+
+        catalog = self.sample_catalog(options['catalog_size'], options['seed'])
+        users = max(options['users'], 1)
+        credentials = supervisors = ()
+        if mix.get('submit_review'):
+            credentials = self.create_users('user', 'regular_user', users)
+        if mix.get('moderation'):
+            supervisors = self.create_users(
+                'supervisor', 'supervisor', max(options['supervisors'], 1))
+
+        self.stdout.write(
+            f'Running {users} virtual users against {options["url"]} for '
+            f'{options["duration"]:g}s ({options["warmup"]:g}s warmup)...'
+        )
+        started = time.perf_counter()
+        recorder = loadtest.run(
+            options['url'], users, options['duration'], catalog, mix,
+            think_time=options['think_time'],
+            seed=options['seed'],
+            credentials=credentials,
+            supervisors=supervisors,
+            moderate_prefix=USER_PREFIX,
+            timeout=options['timeout'],
+        )
+        summary = loadtest.summarize(recorder, started, options['warmup'])
+        if summary['total'] is None:
+            raise CommandError('No requests completed after the warmup')
+
+        results = {
+            'url': options['url'],
+            'started_at': timezone.now().isoformat(),
+            'users': users,
+            'think_time': options['think_time'],
+            'mix': mix,
+            **summary,
+        }
+        self.print_summary(results)
+
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump(results, file, indent=2, sort_keys=True)
+            self.stdout.write(f'Results written to {options["output"]}')
+
+        if baseline is not None:
+            regressions = loadtest.compare(
+                results, baseline, options['threshold'], options['min_delta_ms'])
+            self.print_comparison(results, baseline)
+            if regressions:
+                for label, metric, before, after in regressions:
+                    self.stdout.write(self.style.ERROR(
+                        f'REGRESSION {label} {metric}: {before:,.3f} -> {after:,.3f}'
+                    ))
+                raise CommandError(
+                    f'{len(regressions)} regression(s) against {options["baseline"]}'
+                )
+            self.stdout.write(self.style.SUCCESS('No regressions against the baseline'))
+
+    def parse_mix(self, values):
+        if not values:
+            return dict(loadtest.DEFAULT_MIX)
+        mix = {}
+        for value in values:
+            name, _, weight = value.partition('=')
+            if name not in loadtest.SCENARIOS:
+                raise CommandError(
+                    f'Unknown scenario {name!r}; choose from '
+                    f'{", ".join(loadtest.SCENARIOS)}'
+                )
+            try:
+                mix[name] = float(weight)
+            except ValueError:
+                raise CommandError(f'Invalid weight in {value!r}')
+        if not any(weight > 0 for weight in mix.values()):
+            raise CommandError('At least one scenario needs a positive weight')
+        return mix
+
+    def sample_catalog(self, size, seed):
+        """Random app ids and names, plus the categories"""
+        bounds = App.objects.aggregate(low=Min('id'), high=Max('id'))
+        if bounds['low'] is None:
+            raise CommandError('No apps in the database; load some data first')
+
+        rng = random.Random(seed)
+        apps = {}
+        # Ids can have gaps, so draw a few times
+        for _ in range(5):
+            ids = [
+                rng.randint(bounds['low'], bounds['high'])
+                for _ in range(size - len(apps))
+            ]
+            apps.update(App.objects.filter(id__in=ids).values_list('id', 'name'))
+            if len(apps) >= size:
+                break
+        if not apps:
+            apps = dict(App.objects.values_list('id', 'name')[:size])
+
+        categories = list(
+            App.objects.values_list('category', flat=True).distinct().order_by('category')
+        )
+        return {
+            'app_ids': sorted(apps),
+            'names': [apps[app_id] for app_id in sorted(apps)],
+            'categories': categories,
+        }
+
+    def create_users(self, kind, role, count):
+        """(username, password) of ``count`` load test users, created if missing"""
+        User = get_user_model()
+        password = secrets.token_urlsafe(16)
+        usernames = [f'{USER_PREFIX}{kind}_{n}' for n in range(1, count + 1)]
+        User.objects.bulk_create([
+            User(
+                username=username,
+                email=f'{username}@loadtest.invalid',
+                role=role,
+            )
+            for username in usernames
+        ], ignore_conflicts=True)
+        # One hash for all of them; hashing is deliberately slow
+        User.objects.filter(username__in=usernames).update(
+            password=make_password(password), role=role, is_active=True)
+        return [(username, password) for username in usernames]
+
+    def print_summary(self, results):
+        self.stdout.write('')
+        self.stdout.write(
+            f'{"endpoint":<44}{"requests":>9}{"errors":>8}{"req/s":>9}'
+            f'{"p50 ms":>9}{"p95 ms":>9}{"p99 ms":>9}'
+        )
+        rows = list(results['endpoints'].items()) + [('(total)', results['total'])]
+        for label, stats in rows:
+            self.stdout.write(
+                f'{label:<44}{stats["requests"]:>9,}{stats["errors"]:>8,}'
+                f'{stats["throughput"]:>9.1f}{stats["p50"]:>9.1f}'
+                f'{stats["p95"]:>9.1f}{stats["p99"]:>9.1f}'
+            )
+
+    def print_comparison(self, results, baseline):
+        self.stdout.write('')
+        self.stdout.write(
+            f'{"endpoint":<44}{"p50 ms":>16}{"p95 ms":>16}{"p99 ms":>16}'
+        )
+        before_endpoints = dict(baseline.get('endpoints', {}), **{'(total)': baseline.get('total')})
+        rows = list(results['endpoints'].items()) + [('(total)', results['total'])]
+        for label, after in rows:
+            before = before_endpoints.get(label)
+            if not before:
+                self.stdout.write(f'{label:<44}{"(not in baseline)":>16}')
+                continue
+            cells = ''.join(
+                f'{before[metric]:>7.1f}->{after[metric]:<7.1f}'
+                for metric in ('p50', 'p95', 'p99')
+            )
+            self.stdout.write(f'{label:<44}{cells}')
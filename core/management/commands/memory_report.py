@@ -0,0 +1,167 @@
+import json
+from datetime import timedelta
+from urllib.error import URLError
+from urllib.parse import urlencode
+from urllib.request import Request, urlopen
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, Max, Min
+from django.utils import timezone
+
+from core.models import WorkerMemorySample
+
+
+def mib(value):
+    return value / 2**20
+
+
+class Command(BaseCommand):
+    """
+    Management command to report worker memory
+
+    Prints the RSS growth of every worker from its WorkerMemorySamples.
+    With --url it also asks one live worker, through /debug/memory/, for
+    its footprints and a tracemalloc snapshot diff.
+    """
+    help = 'Report RSS per worker over time and allocation sites of a live worker'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours',
+            type=float,
+            default=24,
+            help='Report the samples of the last N hours (default: 24)'
+        )
+        parser.add_argument(
+            '--url',
+            help='Base URL of a running server, e.g. http://localhost:8000'
+        )
+        parser.add_argument(
+            '--token',
+            default=settings.METRICS_TOKEN,
+            help='Bearer token for /debug/memory/ (default: METRICS_TOKEN)'
+        )
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=20,
+            help='Allocation sites to show (default: 20)'
+        )
+        parser.add_argument(
+            '--key',
+            choices=['lineno', 'filename', 'traceback'],
+            default='lineno',
+            help='Group allocations by line, file or traceback (default: lineno)'
+        )
+        parser.add_argument(
+            '--against',
+            choices=['previous', 'baseline'],
+            default='previous',
+            help='Diff against the previous or the baseline snapshot (default: previous)'
+        )
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Make this snapshot the new baseline'
+        )
+
+    def handle(self, *args, **options):
+        self.report_samples(options['hours'])
+        if options['url']:
+            self.report_worker(options)
+
+    def report_samples(self, hours):
+        since = timezone.now() - timedelta(hours=hours)
+        samples = WorkerMemorySample.objects.filter(sampled_at__gte=since)
+        workers = samples.values('hostname', 'pid').annotate(
+            count=Count('id'),
+            first_at=Min('sampled_at'),
+            last_at=Max('sampled_at'),
+            min_rss=Min('rss_bytes'),
+            max_rss=Max('rss_bytes'),
+        ).order_by('hostname', 'pid')
+        if not workers:
+            self.stdout.write(f'No worker memory samples in the last {hours:g} hours')
+            return
+
+        self.stdout.write(
+            f'{"worker":<30}{"samples":>8}{"first MiB":>11}{"last MiB":>10}'
+            f'{"max MiB":>9}{"MiB/hour":>10}'
+        )
+        for worker in workers:
+            per_worker = samples.filter(hostname=worker['hostname'], pid=worker['pid'])
+            first = per_worker.order_by('sampled_at').first()
+            last = per_worker.order_by('-sampled_at').first()
+            elapsed = (last.sampled_at - first.sampled_at).total_seconds() / 3600
+            growth = (
+                f'{mib(last.rss_bytes - first.rss_bytes) / elapsed:>10.1f}'
+                if elapsed > 0 else f'{"-":>10}'
+            )
+            name = f'{worker["hostname"]}:{worker["pid"]}'
+            self.stdout.write(
+                f'{name:<30}{worker["count"]:>8}{mib(first.rss_bytes):>11.1f}'
+                f'{mib(last.rss_bytes):>10.1f}{mib(worker["max_rss"]):>9.1f}{growth}'
+            )
+            footprints = ', '.join(
+                f'{name} {mib(size):.1f}MiB'
+                for name, size in sorted(last.footprints.items(), key=lambda item: -item[1])
+                if size
+            )
+            if footprints:
+                self.stdout.write(f'  {footprints}')
+
+    def report_worker(self, options):
+        query = urlencode({
+            'top': options['top'],
+            'key': options['key'],
+            'against': options['against'],
+            'reset': '1' if options['reset'] else '0',
+        })
+        request = Request(f'{options["url"].rstrip("/")}/debug/memory/?{query}')
+        if options['token']:
+            request.add_header('Authorization', f'Bearer {options["token"]}')
+        try:
+            with urlopen(request, timeout=60) as response:
+                data = json.load(response)
+        except (URLError, ValueError) as e:
+            raise CommandError(f'Cannot read {request.full_url}: {e}')
+
+        self.stdout.write(
+            f'\nWorker {data["hostname"]}:{data["pid"]}: RSS {mib(data["rss_bytes"]):.1f}MiB '
+            f'(peak {mib(data["peak_rss_bytes"]):.1f}MiB)'
+        )
+        if data['debug']:
+            self.stdout.write(self.style.WARNING(
+                'DEBUG is on: every connection keeps its last 9000 queries'
+            ))
+        for name, size in sorted(data['footprints'].items(), key=lambda item: -item[1]):
+            self.stdout.write(f'  {name:<40}{mib(size):>10.2f} MiB')
+
+        snapshot = data['snapshot']
+        if snapshot is None:
+            self.stdout.write(
+                'tracemalloc is off in this worker; start the server with '
+                'MEMORY_TRACEMALLOC_FRAMES=1 (or more) for allocation sites'
+            )
+            return
+        compared = snapshot['compared_to']
+        self.stdout.write(
+            f'\nTraced {mib(snapshot["traced_bytes"]):.1f}MiB '
+            f'(peak {mib(snapshot["traced_peak_bytes"]):.1f}MiB); top sites'
+            + (f' by growth since the {compared} snapshot' if compared else
+               ' (first snapshot, run again for growth)')
+        )
+        self.stdout.write(f'{"KiB":>10}{"+KiB":>10}{"blocks":>9}{"+blocks":>9}  site')
+        for site in snapshot['sites']:
+            diff = site['size_diff_bytes']
+            count_diff = site['count_diff']
+            lines = site['site'] if isinstance(site['site'], list) else [site['site']]
+            self.stdout.write(
+                f'{site["size_bytes"] / 1024:>10.1f}'
+                f'{"" if diff is None else f"{diff / 1024:+.1f}":>10}'
+                f'{site["count"]:>9}'
+                f'{"" if count_diff is None else f"{count_diff:+d}":>9}  {lines[0]}'
+            )
+            for line in lines[1:]:
+                self.stdout.write(f'{"":>40}{line}')
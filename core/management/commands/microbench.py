@@ -0,0 +1,161 @@
+import json
+import logging
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import (
+    override_settings, setup_test_environment, teardown_test_environment,
+)
+from django.utils import timezone
+
+from core import microbench
+
+
+class Command(BaseCommand):
+    """
+    Management command to benchmark views and hot helpers in process
+
+    Runs against a freshly created and seeded test database, never against
+    the configured one; the test database is dropped afterwards.
+    """
+    help = 'Benchmark views, result building and row cleaning per call'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '-k', '--filter',
+            help='Only run benchmarks whose name matches this regular expression'
+        )
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=50,
+            help='Measured calls per benchmark (default: 50)'
+        )
+        parser.add_argument(
+            '--warmup',
+            type=int,
+            default=5,
+            help='Unmeasured calls before measuring (default: 5)'
+        )
+        parser.add_argument(
+            '--apps',
+            type=int,
+            default=500,
+            help='Apps in the seeded database (default: 500)'
+        )
+        parser.add_argument(
+            '--reviews-per-app',
+            type=int,
+            default=20,
+            help='Imported reviews per seeded app (default: 20)'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=1,
+            help='Random seed for the seeded database (default: 1)'
+        )
+        parser.add_argument(
+            '--output',
+            help='Write the results as JSON to this file'
+        )
+        parser.add_argument(
+            '--baseline',
+            help='Compare against results saved earlier with --output and '
+                 'fail on regressions'
+        )
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=0.25,
+            help='Relative change in time or memory counted as a regression '
+                 '(default: 0.25)'
+        )
+
+    def handle(self, *args, **options):
+        pattern = re.compile(options['filter']) if options['filter'] else None
+        iterations = max(options['iterations'], 1)
+        warmup = max(options['warmup'], 0)
+        calls = microbench.calls(iterations, warmup)
+        if options['apps'] < calls:
+            raise CommandError(
+                f'--apps must be at least {calls}: every submit_review call '
+                f'needs an app that has not been reviewed yet'
+            )
+        baseline = None
+        if options['baseline']:
+            try:
+                with open(options['baseline']) as file:
+                    baseline = json.load(file)
+            except (OSError, ValueError) as e:
+                raise CommandError(f'Cannot read baseline {options["baseline"]}: {e}')
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            self.stdout.write('Seeding the test database...')
+            fixture = microbench.seed(
+                apps=options['apps'],
+                reviews_per_app=options['reviews_per_app'],
+                # approve_review and reject_review each take one per call
+                pending=2 * calls,
+                seed=options['seed'],
+            )
+            benchmarks = [
+                benchmark for benchmark in (
+                    microbench.view_benchmarks(fixture) +
+                    microbench.function_benchmarks(fixture)
+                )
+                if not pattern or pattern.search(benchmark.name)
+            ]
+            self.stdout.write(f'Running {len(benchmarks)} benchmarks...')
+            # The errors column counts server errors; skip their tracebacks
+            logging.getLogger('django.request').setLevel(logging.CRITICAL)
+            # Time the views, not core.response_cache hits
+            with override_settings(RESPONSE_CACHE_SHARED_MAX_AGE=0):
+                results = {
+                    benchmark.name: microbench.measure(benchmark, iterations, warmup)
+                    for benchmark in benchmarks
+                }
+                allocations = microbench.measure_allocations(benchmarks, iterations)
+            for name, stats in results.items():
+                stats['alloc_kib'] = allocations[name]
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        self.stdout.write(
+            f'\n{"benchmark":<40}{"wall ms":>10}{"p95 ms":>10}{"stdev ms":>10}'
+            f'{"sql ms":>10}{"queries":>9}{"alloc KiB":>11}{"errors":>8}'
+        )
+        for name, stats in results.items():
+            self.stdout.write(
+                f'{name:<40}{stats["wall_ms"]:>10.2f}{stats["wall_p95_ms"]:>10.2f}'
+                f'{stats["wall_stdev_ms"]:>10.2f}{stats["sql_ms"]:>10.2f}'
+                f'{stats["queries"]:>9.1f}{stats["alloc_kib"]:>11.1f}{stats["errors"]:>8}'
+            )
+
+        results = {
+            'started_at': timezone.now().isoformat(),
+            'iterations': iterations,
+            'apps': options['apps'],
+            'reviews_per_app': options['reviews_per_app'],
+            'benchmarks': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump(results, file, indent=2, sort_keys=True)
+            self.stdout.write(f'Results written to {options["output"]}')
+
+        if baseline is not None:
+            regressions = microbench.compare(results, baseline, options['threshold'])
+            for name, metric, before, after in regressions:
+                self.stdout.write(self.style.ERROR(
+                    f'REGRESSION {name} {metric}: {before:,.2f} -> {after:,.2f}'
+                ))
+            if regressions:
+                raise CommandError(
+                    f'{len(regressions)} regression(s) against {options["baseline"]}'
+                )
+            self.stdout.write(self.style.SUCCESS('No regressions against the baseline'))
@@ -0,0 +1,101 @@
+import multiprocessing
+import os
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core.enrichment import enrichment_stats, purge_finished_jobs, run_worker
+
+
+class Command(BaseCommand):
+    """
+    Management command running a pool of review enrichment workers
+    """
+    help = 'Claim queued reviews and fill in sentiment polarity/subjectivity'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Number of worker processes (default: 1)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Jobs claimed per transaction (default: 500)'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=2.0,
+            help='Seconds to sleep when the queue is empty (default: 2)'
+        )
+        parser.add_argument(
+            '--drain',
+            action='store_true',
+            help='Exit once the queue is empty instead of polling forever'
+        )
+        parser.add_argument(
+            '--purge-after-hours',
+            type=int,
+            default=None,
+            help='Delete completed jobs older than this many hours first'
+        )
+        parser.add_argument(
+            '--stats',
+            action='store_true',
+            help='Print queue statistics and exit'
+        )
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            for key, value in enrichment_stats().items():
+                self.stdout.write(f'{key}: {value}')
+            return
+
+        if options['purge_after_hours'] is not None:
+            deleted = purge_finished_jobs(
+                timedelta(hours=options['purge_after_hours'])
+            )
+            self.stdout.write(f'Purged {deleted} completed jobs')
+
+        worker_args = (
+            options['batch_size'], options['poll_interval'], options['drain']
+        )
+
+        if options['workers'] <= 1:
+            self.work(*worker_args)
+            return
+
+        # Children must open their own database connections
+        connections.close_all()
+        processes = [
+            multiprocessing.Process(target=self.work, args=worker_args)
+            for _ in range(options['workers'])
+        ]
+        for process in processes:
+            process.start()
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            for process in processes:
+                process.terminate()
+
+    def work(self, batch_size, poll_interval, drain):
+        pid = os.getpid()
+
+        def log(processed, elapsed):
+            self.stdout.write(
+                f'[worker {pid}] enriched {processed} reviews in '
+                f'{elapsed * 1000:.0f} ms ({processed / elapsed:.0f}/s)'
+            )
+
+        try:
+            run_worker(batch_size, poll_interval, drain, log=log)
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f'[worker {pid}] stopped'))
@@ -0,0 +1,177 @@
+import csv
+import io
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+
+from core.models import Review
+from core.response_cache import CATALOG, purge
+from core.sentiment import score_chunk
+
+
+class Command(BaseCommand):
+    """
+    Management command to backfill sentiment scores for the review corpus
+    """
+    help = 'Score reviews with missing sentiment data using the lexicon model'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=20000,
+            help='Reviews fetched and scored per chunk (default: 20000)'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Scoring processes (default: number of CPUs)'
+        )
+        parser.add_argument(
+            '--overwrite',
+            action='store_true',
+            help='Rescore every review and replace existing values'
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        workers = max(1, options['workers'])
+        overwrite = options['overwrite']
+
+        reviews = Review.objects.order_by()
+        if not overwrite:
+            reviews = reviews.filter(
+                Q(sentiment_polarity__isnull=True) |
+                Q(sentiment_subjectivity__isnull=True) |
+                Q(sentiment__isnull=True) |
+                # Older imports stored missing sentiments as ''
+                Q(sentiment='')
+            )
+
+        # Spawned workers only import core.sentiment and never touch the
+        # database connection holding the server-side cursor
+        executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+        )
+
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                CREATE TEMPORARY TABLE review_sentiment_scores (
+                    id bigint PRIMARY KEY,
+                    polarity double precision,
+                    subjectivity double precision,
+                    sentiment varchar(10)
+                )
+            """)
+
+        started = time.perf_counter()
+        scored = 0
+        pending = set()
+        try:
+            # iterator() streams through a server-side cursor
+            rows = reviews.values_list('id', 'review_text').iterator(
+                chunk_size=chunk_size
+            )
+            for chunk in self.chunks(rows, chunk_size):
+                ids, texts = zip(*chunk)
+                pending.add(executor.submit(score_chunk, ids, texts))
+
+                # Bound memory: never queue more than two chunks per worker
+                if len(pending) >= workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    scored += self.copy_scores(done)
+                    self.report(scored, started)
+
+            done, _ = wait(pending)
+            scored += self.copy_scores(done)
+        finally:
+            executor.shutdown(cancel_futures=True)
+
+        self.stdout.write(f'Scored {scored:,} reviews, applying updates...')
+        apply_started = time.perf_counter()
+        updated = self.apply_scores(overwrite)
+        purge(CATALOG)
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Updated {updated:,} reviews in {elapsed:.1f}s '
+                f'(update: {time.perf_counter() - apply_started:.1f}s, '
+                f'{scored / elapsed if elapsed else 0:,.0f} reviews/sec)'
+            )
+        )
+
+    def chunks(self, rows, size):
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def copy_scores(self, futures):
+        """COPY finished chunk results into the temp table"""
+        copied = 0
+        with connection.cursor() as cursor:
+            for future in futures:
+                ids, polarity, subjectivity, labels = future.result()
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                writer.writerows(zip(
+                    ids, polarity.tolist(), subjectivity.tolist(),
+                    labels.tolist(),
+                ))
+                buffer.seek(0)
+                cursor.copy_expert(
+                    'COPY review_sentiment_scores FROM STDIN WITH (FORMAT csv)',
+                    buffer,
+                )
+                copied += len(ids)
+        return copied
+
+    def apply_scores(self, overwrite):
+        """Write all scores back with a single UPDATE ... FROM"""
+        if overwrite:
+            assignments = """
+                sentiment_polarity = scores.polarity,
+                sentiment_subjectivity = scores.subjectivity,
+                sentiment = scores.sentiment
+            """
+        else:
+            # Only fill the gaps, keep values that came with the CSV
+            assignments = """
+                sentiment_polarity = COALESCE(
+                    review.sentiment_polarity, scores.polarity),
+                sentiment_subjectivity = COALESCE(
+                    review.sentiment_subjectivity, scores.subjectivity),
+                sentiment = COALESCE(
+                    NULLIF(review.sentiment, ''), scores.sentiment)
+            """
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute('ANALYZE review_sentiment_scores')
+            cursor.execute(f"""
+                UPDATE core_review review
+                SET {assignments}
+                FROM review_sentiment_scores scores
+                WHERE review.id = scores.id
+            """)
+            updated = cursor.rowcount
+            cursor.execute('DROP TABLE review_sentiment_scores')
+        return updated
+
+    def report(self, scored, started):
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'  {scored:,} reviews scored '
+            f'({scored / elapsed if elapsed else 0:,.0f} reviews/sec)'
+        )
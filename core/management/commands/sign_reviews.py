@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.dedup import sign_reviews
+
+
+class Command(BaseCommand):
+    """
+    Management command storing the MinHash signatures of unsigned reviews
+    """
+    help = 'Sign the reviews imported since the last run for near-duplicate detection'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Reviews signed per batch (default: 5000)'
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+
+        def progress(last_review_id, signed):
+            if signed and signed % 100000 < options['batch_size']:
+                self.report(signed, started)
+
+        signed = sign_reviews(options['batch_size'], progress)
+        self.stdout.write(self.style.SUCCESS(
+            f'Signed {signed:,} reviews in {time.perf_counter() - started:.1f}s'
+        ))
+
+    def report(self, signed, started):
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'  {signed:,} reviews signed ({signed / elapsed if elapsed else 0:,.0f} reviews/sec)'
+        )
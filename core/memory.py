@@ -0,0 +1,207 @@
+"""
+Memory instrumentation of the worker processes.
+
+- ``register(name, function)`` adds an in-process cache or index to the
+  footprint report; ``function`` returns its approximate size in bytes.
+  Every such structure should register itself where it is defined.
+- ``WorkerMemoryMiddleware`` runs once per worker at startup: it starts
+  tracemalloc when ``settings.MEMORY_TRACEMALLOC_FRAMES`` is set and a
+  thread that stores a WorkerMemorySample (RSS and footprints) every
+  ``settings.MEMORY_SAMPLE_SECONDS``. Then it takes itself out of the
+  middleware chain.
+- ``snapshot_report()`` takes a tracemalloc snapshot and diffs it against
+  the previous (or the baseline) snapshot of the process; ``/debug/memory/``
+  serves it.
+
+tracemalloc is only ever started at startup, never by a request: starting
+and stopping it while other threads allocate has crashed the interpreter.
+"""
+import logging
+import os
+import resource
+import socket
+import sys
+import threading
+import time
+import tracemalloc
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import close_old_connections, connections
+from django.utils import timezone
+
+
+logger = logging.getLogger(__name__)
+
+_footprints = {}
+
+
+def register(name, function):
+    """Report ``function()`` bytes as the footprint of ``name``"""
+    _footprints[name] = function
+
+
+def _debug_queries():
+    # Django keeps the last 9000 queries per connection while DEBUG is on
+    return sum(
+        sys.getsizeof(query['sql']) + sys.getsizeof(query['time'])
+        for connection in connections.all(initialized_only=True)
+        for query in connection.queries_log
+    )
+
+
+register('debug_queries_log (this thread)', _debug_queries)
+
+
+def footprints():
+    """Approximate bytes held by each registered structure and cache"""
+    sizes = {}
+    for name, function in sorted(_footprints.items()):
+        try:
+            sizes[name] = int(function())
+        except Exception:
+            logger.exception('Footprint of %s failed', name)
+    for alias in settings.CACHES:
+        cache = caches[alias]
+        if hasattr(cache, 'memory_usage'):
+            sizes[f'cache:{alias}'] = int(cache.memory_usage())
+    return sizes
+
+
+def rss():
+    """(current, peak) resident set size of this process in bytes"""
+    try:
+        with open('/proc/self/status') as status:
+            fields = dict(line.split(':', 1) for line in status if ':' in line)
+        return (
+            int(fields['VmRSS'].split()[0]) * 1024,
+            int(fields['VmHWM'].split()[0]) * 1024,
+        )
+    except (OSError, KeyError, ValueError):
+        # No procfs: only the peak is known (kilobytes on Linux, bytes on macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        peak *= 1 if sys.platform == 'darwin' else 1024
+        return peak, peak
+
+
+def sample():
+    """Store a WorkerMemorySample of this process and forget old ones"""
+    from core.models import WorkerMemorySample
+
+    current, peak = rss()
+    WorkerMemorySample.objects.create(
+        hostname=socket.gethostname()[:100],
+        pid=os.getpid(),
+        rss_bytes=current,
+        peak_rss_bytes=peak,
+        footprints=footprints(),
+        sampled_at=timezone.now(),
+    )
+    WorkerMemorySample.objects.filter(
+        sampled_at__lt=timezone.now() - timedelta(days=settings.MEMORY_SAMPLE_RETENTION_DAYS)
+    ).delete()
+
+
+def _sample_forever(interval):
+    while True:
+        close_old_connections()
+        try:
+            sample()
+        except Exception:
+            logger.exception('Sampling worker memory failed')
+        time.sleep(interval)
+
+
+_baseline = None
+_previous = None
+_snapshot_lock = threading.Lock()
+
+# Allocations of the instrumentation itself
+_IGNORED = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>'),
+)
+
+
+def snapshot_report(top=20, key='lineno', against='previous', reset=False):
+    """
+    Take a tracemalloc snapshot and return the ``top`` allocation sites,
+    grouped by ``key`` ('lineno', 'filename' or 'traceback'), as growth
+    since the previous snapshot, or since the baseline (the first snapshot,
+    or the last one taken with ``reset``). None when tracemalloc is off.
+    """
+    global _baseline, _previous
+    if not tracemalloc.is_tracing():
+        return None
+    snapshot = tracemalloc.take_snapshot().filter_traces(_IGNORED)
+    with _snapshot_lock:
+        old = _baseline if against == 'baseline' else _previous
+        if _baseline is None or reset:
+            _baseline = snapshot
+        _previous = snapshot
+    traced, peak = tracemalloc.get_traced_memory()
+    if old is None:
+        stats = snapshot.statistics(key)[:top]
+    else:
+        stats = snapshot.compare_to(old, key)[:top]
+    return {
+        'traced_bytes': traced,
+        'traced_peak_bytes': peak,
+        'compared_to': against if old is not None else None,
+        'sites': [
+            {
+                # Frames as file:line, the allocating one first
+                'site': (
+                    [str(frame) for frame in reversed(stat.traceback)]
+                    if key == 'traceback' else str(stat.traceback[0])
+                ),
+                'size_bytes': stat.size,
+                'count': stat.count,
+                'size_diff_bytes': getattr(stat, 'size_diff', None),
+                'count_diff': getattr(stat, 'count_diff', None),
+            }
+            for stat in stats
+        ],
+    }
+
+
+def report():
+    """RSS and footprints of this worker"""
+    current, peak = rss()
+    return {
+        'hostname': socket.gethostname(),
+        'pid': os.getpid(),
+        'rss_bytes': current,
+        'peak_rss_bytes': peak,
+        'debug': settings.DEBUG,
+        'tracemalloc': tracemalloc.is_tracing(),
+        'footprints': footprints(),
+    }
+
+
+_started = False
+
+
+class WorkerMemoryMiddleware:
+    """Start this worker's memory instrumentation; see the module docstring"""
+
+    def __init__(self, get_response):
+        global _started
+        # Every handler loads the middleware, the test client's included
+        if _started:
+            raise MiddlewareNotUsed
+        _started = True
+        frames = settings.MEMORY_TRACEMALLOC_FRAMES
+        if frames > 0 and not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        interval = settings.MEMORY_SAMPLE_SECONDS
+        if interval > 0:
+            threading.Thread(
+                target=_sample_forever, args=(interval,),
+                name='worker-memory-sampler', daemon=True,
+            ).start()
+        raise MiddlewareNotUsed
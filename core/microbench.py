@@ -0,0 +1,335 @@
+"""
+In-process microbenchmarks for the views and their hot helpers.
+
+``seed()`` fills the (test) database with a deterministic catalog. The view
+benchmarks call every API endpoint through the Django test client; the
+function benchmarks time the pure Python parts on their own: the search
+result builders, ``App.install_count_numeric`` and the CSV row cleaning of
+the loader. ``measure`` reports per call wall time, SQL time and query
+count; ``measure_allocations`` repeats the benchmarks under tracemalloc for
+the memory allocated per call.
+"""
+import random
+import statistics
+import time
+import tracemalloc
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client
+from django.utils import timezone
+
+from core.data_import import clean_app_row, clean_review_row
+from core.models import App, Review
+from core.query_budget import QueryTimer
+
+
+WORDS = (
+    'photo editor music player puzzle quest weather radar budget tracker '
+    'fitness coach chess master recipe book flashlight pro calendar notes '
+    'translator offline maps kids learning video chat banking wallet'
+).split()
+
+CATEGORIES = ['GAME', 'TOOLS', 'FAMILY', 'PHOTOGRAPHY', 'FINANCE', 'HEALTH_AND_FITNESS']
+
+INSTALLS = ['0', '10+', '1,000+', '50,000+', '1,000,000+', '5M', '100K', 'Free', '']
+
+SENTIMENTS = ['Positive', 'Negative', 'Neutral']
+
+USER_PREFIX = 'microbench_'
+
+REVIEW_TEXT = (
+    'Works well most of the time but the latest update made it slower and '
+    'the ads are getting annoying'
+)
+
+
+class Fixture:
+    """What ``seed`` created, handed to the benchmark factories"""
+
+    def __init__(self, apps, reviewer, supervisor, pending_reviews, queries):
+        self.apps = apps
+        self.reviewer = reviewer
+        self.supervisor = supervisor
+        self.pending_reviews = pending_reviews
+        self.queries = queries
+
+
+def seed(apps=500, reviews_per_app=20, pending=200, seed=1):
+    """
+    Deterministic catalog: ``apps`` apps with ``reviews_per_app`` imported
+    reviews each, ``pending`` reviews waiting for moderation, their authors,
+    a reviewer without reviews and a supervisor.
+    """
+    User = get_user_model()
+    rng = random.Random(seed)
+    now = timezone.now()
+
+    supervisor = User.objects.create(
+        username=f'{USER_PREFIX}supervisor', email=f'{USER_PREFIX}supervisor@example.com',
+        role='supervisor',
+    )
+    # Each author reviews every app at most once, as the constraint requires
+    authors = User.objects.bulk_create([
+        User(username=f'{USER_PREFIX}user_{n}', email=f'{USER_PREFIX}user_{n}@example.com')
+        for n in range(-(-pending // apps) + 1)
+    ])
+
+    names = set()
+    while len(names) < apps:
+        names.add(' '.join(rng.sample(WORDS, rng.randint(1, 3))).title() + f' {len(names)}')
+    app_rows = App.objects.bulk_create([
+        App(
+            name=name,
+            category=rng.choice(CATEGORIES),
+            rating=round(rng.uniform(1, 5), 1) if rng.random() > 0.05 else None,
+            reviews_count=rng.randint(0, 100000),
+            size=f'{rng.randint(1, 100)}M',
+            installs=rng.choice(INSTALLS),
+            app_type='Free',
+            price='0',
+            content_rating='Everyone',
+        )
+        for name in sorted(names)
+    ])
+
+    reviews = []
+    for app in app_rows:
+        for _ in range(reviews_per_app):
+            reviews.append(Review(
+                app=app,
+                review_text=' '.join(rng.choices(WORDS, k=rng.randint(5, 30))),
+                sentiment=rng.choice(SENTIMENTS),
+                sentiment_polarity=round(rng.uniform(-1, 1), 3),
+                sentiment_subjectivity=round(rng.random(), 3),
+                status='imported',
+            ))
+    Review.objects.bulk_create(reviews, batch_size=5000)
+
+    pending_reviews = Review.objects.bulk_create([
+        Review(
+            app=app_rows[n % len(app_rows)],
+            user=authors[n // len(app_rows)],
+            review_text=f'{REVIEW_TEXT} ({n})',
+            rating=rng.randint(1, 5),
+            sentiment=rng.choice(SENTIMENTS),
+            status='pending',
+        )
+        for n in range(pending)
+    ])
+    # Spread the creation dates so orderings do some work
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'UPDATE core_review SET created_at = %s - id * interval \'1 minute\'',
+            [now],
+        )
+
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE core_app, core_review')
+    queries = sorted({word for name in names for word in name.lower().split() if len(word) > 3})
+    return Fixture(
+        apps=app_rows,
+        reviewer=authors[-1],
+        supervisor=supervisor,
+        pending_reviews=[review.id for review in pending_reviews],
+        queries=queries,
+    )
+
+
+class Benchmark:
+    """A named callable run once per iteration"""
+
+    def __init__(self, name, call):
+        self.name = name
+        self.call = call
+
+
+def client_for(user=None):
+    # Server errors are counted per benchmark instead of aborting the run
+    client = Client(raise_request_exception=False)
+    if user is not None:
+        client.force_login(user)
+    return client
+
+
+def cycle(values):
+    """Callable returning the next of ``values`` on every call, wrapping around"""
+    state = {'next': 0}
+
+    def take():
+        value = values[state['next'] % len(values)]
+        state['next'] += 1
+        return value
+    return take
+
+
+def view_benchmarks(fixture):
+    anonymous = client_for()
+    user = client_for(fixture.reviewer)
+    supervisor = client_for(fixture.supervisor)
+    query = cycle(fixture.queries)
+    app = cycle([app.id for app in fixture.apps])
+    # Every moderation call needs a review that is still pending
+    to_approve = cycle(fixture.pending_reviews[::2])
+    to_reject = cycle(fixture.pending_reviews[1::2])
+    to_review = cycle([app.id for app in fixture.apps])
+
+    def get(client, path):
+        return lambda: client.get(path)
+
+    return [
+        Benchmark('search.search_apps', lambda: anonymous.get(
+            '/search/api/search/', {'q': query()})),
+        Benchmark('search.search_apps filtered page 5', lambda: anonymous.get(
+            '/search/api/search/',
+            {'q': query(), 'category': 'GAME', 'min_rating': '3', 'page': 5, 'limit': 10})),
+        Benchmark('search.autocomplete_apps', lambda: anonymous.get(
+            '/search/api/autocomplete/', {'q': query()[:4]})),
+        Benchmark('search.get_app_details', lambda: anonymous.get(
+            f'/search/api/app/{app()}/')),
+        Benchmark('search.get_app_reviews', lambda: anonymous.get(
+            f'/search/api/app/{app()}/reviews/', {'page': 1, 'limit': 10})),
+        Benchmark('search.get_categories', get(anonymous, '/search/api/categories/')),
+        Benchmark('search.search_page', get(anonymous, '/search/')),
+        Benchmark('reviews.get_app_reviews', lambda: anonymous.get(
+            f'/reviews/api/app/{app()}/reviews/', {'page': 1, 'limit': 10})),
+        Benchmark('reviews.search_reviews', lambda: anonymous.get(
+            '/reviews/api/search/', {'q': query()})),
+        Benchmark('reviews.submit_review', lambda: user.post(
+            f'/reviews/api/app/{to_review()}/submit-review/',
+            {'review_text': REVIEW_TEXT, 'rating': 4}, content_type='application/json')),
+        Benchmark('reviews.get_pending_reviews', get(supervisor, '/reviews/api/pending/')),
+        Benchmark('reviews.approve_review', lambda: supervisor.post(
+            f'/reviews/api/approve/{to_approve()}/', {}, content_type='application/json')),
+        Benchmark('reviews.reject_review', lambda: supervisor.post(
+            f'/reviews/api/reject/{to_reject()}/', {}, content_type='application/json')),
+        Benchmark('reviews.get_enrichment_stats', get(supervisor, '/reviews/api/enrichment/stats/')),
+        Benchmark('reviews.review_management_page', get(supervisor, '/reviews/')),
+    ]
+
+
+def function_benchmarks(fixture):
+    from search.views import autocomplete_suggestion, search_result
+
+    apps = list(App.objects.order_by('id')[:20])
+    for n, app in enumerate(apps):
+        app.name_similarity = 1 / (n + 1)
+    installs = list(App.objects.order_by('id')[:1000])
+    app_rows = [
+        {
+            'App': app.name, 'Category': app.category, 'Rating': str(app.rating),
+            'Reviews': str(app.reviews_count), 'Size': app.size,
+            'Installs': app.installs, 'Type': app.app_type, 'Price': app.price,
+            'Content Rating': app.content_rating, 'Genres': app.category.title(),
+            'Last Updated': 'January 7, 2018', 'Current Ver': '1.0.0',
+            'Android Ver': '4.0.3 and up',
+        }
+        for app in installs
+    ]
+    review_rows = [
+        {
+            'App': review.app.name, 'Translated_Review': review.review_text,
+            'Sentiment': review.sentiment,
+            'Sentiment_Polarity': str(review.sentiment_polarity),
+            'Sentiment_Subjectivity': str(review.sentiment_subjectivity),
+        }
+        for review in Review.objects.select_related('app').order_by('id')[:1000]
+    ]
+
+    return [
+        Benchmark('search_result x20', lambda: [search_result(app) for app in apps]),
+        Benchmark('autocomplete_suggestion x20',
+                  lambda: [autocomplete_suggestion(app) for app in apps]),
+        Benchmark('App.install_count_numeric x1000',
+                  lambda: [app.install_count_numeric for app in installs]),
+        Benchmark('clean_app_row x1000', lambda: [clean_app_row(row) for row in app_rows]),
+        Benchmark('clean_review_row x1000',
+                  lambda: [clean_review_row(row) for row in review_rows]),
+    ]
+
+
+def calls(iterations, warmup):
+    """How often ``measure`` calls a benchmark"""
+    return warmup + iterations + max(iterations // 5, 1)
+
+
+def measure(benchmark, iterations=50, warmup=5):
+    """
+    Per call statistics of ``benchmark``: wall time median, p95 and standard
+    deviation, SQL time and queries
+    """
+    for _ in range(warmup):
+        benchmark.call()
+
+    wall = []
+    sql = []
+    queries = []
+    errors = 0
+    for _ in range(iterations):
+        timer = QueryTimer()
+        with connection.execute_wrapper(timer):
+            started = time.perf_counter()
+            result = benchmark.call()
+            wall.append(time.perf_counter() - started)
+        if getattr(result, 'status_code', 200) >= 500:
+            errors += 1
+        queries.append(timer.queries)
+        sql.append(timer.seconds)
+
+    wall_ms = sorted(seconds * 1000 for seconds in wall)
+    return {
+        'iterations': iterations,
+        'errors': errors,
+        'wall_ms': statistics.median(wall_ms),
+        'wall_p95_ms': wall_ms[min(int(len(wall_ms) * 0.95), len(wall_ms) - 1)],
+        'wall_stdev_ms': statistics.stdev(wall_ms) if len(wall_ms) > 1 else 0.0,
+        'sql_ms': statistics.mean(sql) * 1000,
+        'queries': statistics.mean(queries),
+    }
+
+
+def measure_allocations(benchmarks, iterations=50):
+    """
+    Median peak KiB allocated per call of each benchmark, by name. Tracing
+    slows everything down, so this is a separate pass over all benchmarks;
+    tracemalloc is started and stopped only once because stopping it while
+    other threads allocate can crash Python 3.11.
+    """
+    allocations = {}
+    tracemalloc.start()
+    try:
+        for benchmark in benchmarks:
+            peaks = []
+            for _ in range(max(iterations // 5, 1)):
+                tracemalloc.reset_peak()
+                baseline = tracemalloc.get_traced_memory()[0]
+                benchmark.call()
+                peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+            allocations[benchmark.name] = statistics.median(peaks) / 1024
+    finally:
+        tracemalloc.stop()
+    return allocations
+
+
+def compare(results, baseline, threshold=0.25, min_delta_ms=0.5):
+    """
+    Regressions against ``baseline`` as (benchmark, metric, before, after).
+    More queries per call is always a regression; time and memory are when
+    they grow by more than ``threshold`` (times also by ``min_delta_ms``).
+    """
+    regressions = []
+    for name, after in results['benchmarks'].items():
+        before = baseline.get('benchmarks', {}).get(name)
+        if not before:
+            continue
+        if after['queries'] > before['queries']:
+            regressions.append((name, 'queries', before['queries'], after['queries']))
+        if after['errors'] > before['errors']:
+            regressions.append((name, 'errors', before['errors'], after['errors']))
+        for metric in ('wall_ms', 'sql_ms'):
+            if (after[metric] > before[metric] * (1 + threshold) and
+                    after[metric] - before[metric] >= min_delta_ms):
+                regressions.append((name, metric, before[metric], after[metric]))
+        if after['alloc_kib'] > before['alloc_kib'] * (1 + threshold):
+            regressions.append((name, 'alloc_kib', before['alloc_kib'], after['alloc_kib']))
+    return regressions
@@ -0,0 +1,32 @@
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    # 0002 and 0003 for new databases: both add Review.rating, so 0003 fails
+    # on a database that just ran 0002
+    replaces = [
+        ('core', '0002_add_rating_to_review'),
+        ('core', '0003_add_rating_field'),
+    ]
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='review',
+            name='rating',
+            field=models.FloatField(
+                blank=True,
+                null=True,
+                validators=[
+                    django.core.validators.MinValueValidator(1.0),
+                    django.core.validators.MaxValueValidator(5.0)
+                ],
+                help_text='User rating (1-5 stars, null for imported reviews)'
+            ),
+        ),
+    ]
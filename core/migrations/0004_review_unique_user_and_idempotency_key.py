@@ -0,0 +1,67 @@
+# Generated by Django 4.2.7 on 2026-10-19 09:07
+
+from django.db import migrations, models
+
+
+# Reviews the unique constraint would refuse: all but one per user and app.
+# A moderated (approved or rejected) review is kept over a pending one, then
+# the newest. The others are moved, with their approvals, to archive tables
+# that the reverse migration restores from.
+EXTRA_USER_REVIEWS = """
+    SELECT id FROM (
+        SELECT id, row_number() OVER (
+            PARTITION BY app_id, user_id
+            ORDER BY status IN ('approved', 'rejected') DESC, created_at DESC, id DESC
+        ) AS position
+        FROM core_review
+        WHERE user_id IS NOT NULL
+    ) ranked
+    WHERE position > 1
+"""
+
+ARCHIVE_EXTRA_USER_REVIEWS = [
+    f"""
+    CREATE TABLE core_review_0004_archive AS
+    SELECT * FROM core_review WHERE id IN ({EXTRA_USER_REVIEWS})
+    """,
+    """
+    CREATE TABLE core_reviewapproval_0004_archive AS
+    SELECT * FROM core_reviewapproval
+    WHERE review_id IN (SELECT id FROM core_review_0004_archive)
+    """,
+    """
+    DELETE FROM core_reviewapproval
+    WHERE review_id IN (SELECT id FROM core_review_0004_archive)
+    """,
+    'DELETE FROM core_review WHERE id IN (SELECT id FROM core_review_0004_archive)',
+    # Run the deferred foreign key checks now: ALTER TABLE refuses to run
+    # with trigger events pending
+    'SET CONSTRAINTS ALL IMMEDIATE',
+]
+
+RESTORE_EXTRA_USER_REVIEWS = [
+    'INSERT INTO core_review SELECT * FROM core_review_0004_archive',
+    'INSERT INTO core_reviewapproval SELECT * FROM core_reviewapproval_0004_archive',
+    'DROP TABLE core_reviewapproval_0004_archive, core_review_0004_archive',
+    'SET CONSTRAINTS ALL IMMEDIATE',
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_add_rating_field'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='review',
+            name='idempotency_key',
+            field=models.CharField(blank=True, help_text='Client-supplied Idempotency-Key of the submitting request', max_length=255, null=True),
+        ),
+        migrations.RunSQL(ARCHIVE_EXTRA_USER_REVIEWS, RESTORE_EXTRA_USER_REVIEWS),
+        migrations.AddConstraint(
+            model_name='review',
+            constraint=models.UniqueConstraint(condition=models.Q(('user__isnull', False)), fields=('app', 'user'), name='unique_user_review_per_app'),
+        ),
+    ]
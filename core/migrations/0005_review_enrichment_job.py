@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-19 09:08
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_review_unique_user_and_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReviewEnrichmentJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('done', 'Done'), ('failed', 'Failed')], default='pending', help_text='Job state', max_length=10)),
+                ('attempts', models.PositiveSmallIntegerField(default=0, help_text='Number of times a worker processed this job')),
+                ('last_error', models.TextField(blank=True, help_text='Error raised by the last failed attempt')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('claimed_at', models.DateTimeField(blank=True, help_text='When the batch containing this job was claimed', null=True)),
+                ('finished_at', models.DateTimeField(blank=True, help_text='When the batch containing this job was committed', null=True)),
+                ('review', models.ForeignKey(help_text='Review to enrich', on_delete=django.db.models.deletion.CASCADE, related_name='enrichment_jobs', to='core.review')),
+            ],
+            options={
+                'verbose_name': 'Review Enrichment Job',
+                'verbose_name_plural': 'Review Enrichment Jobs',
+                'ordering': ['id'],
+                'indexes': [models.Index(condition=models.Q(('status', 'pending')), fields=['id'], name='enrichment_job_pending_idx'), models.Index(fields=['status', 'finished_at'], name='core_review_status_29a6d5_idx')],
+            },
+        ),
+    ]
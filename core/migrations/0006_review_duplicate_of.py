@@ -0,0 +1,24 @@
+# Generated by Django 4.2.7 on 2026-10-19 09:11
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_review_enrichment_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='review',
+            name='duplicate_of',
+            field=models.ForeignKey(blank=True, help_text='Earlier review this one nearly duplicates', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='near_duplicates', to='core.review'),
+        ),
+        migrations.AddField(
+            model_name='review',
+            name='duplicate_score',
+            field=models.FloatField(blank=True, help_text='Estimated similarity to the duplicated review (0 to 1)', null=True),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 4.2.7 on 2026-10-19 09:12
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+# Only recompute the vector when the text changes, so bulk updates of other
+# columns (sentiment backfills, moderation) don't pay for to_tsvector
+CREATE_TRIGGER_SQL = """
+CREATE OR REPLACE FUNCTION core_review_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' OR NEW.review_text IS DISTINCT FROM OLD.review_text THEN
+        NEW.search_vector := to_tsvector('pg_catalog.english', coalesce(NEW.review_text, ''));
+    ELSE
+        NEW.search_vector := OLD.search_vector;
+    END IF;
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER core_review_search_vector_trigger
+BEFORE INSERT OR UPDATE ON core_review
+FOR EACH ROW EXECUTE FUNCTION core_review_search_vector_update();
+"""
+
+DROP_TRIGGER_SQL = """
+DROP TRIGGER IF EXISTS core_review_search_vector_trigger ON core_review;
+DROP FUNCTION IF EXISTS core_review_search_vector_update();
+"""
+
+# Backfill before the trigger exists (it would keep the NULL old value) and
+# before the GIN index exists (building it once is much cheaper)
+BACKFILL_SQL = """
+UPDATE core_review
+SET search_vector = to_tsvector('pg_catalog.english', coalesce(review_text, ''));
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_review_duplicate_of'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='review',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, help_text='English tsvector of review_text', null=True),
+        ),
+        migrations.RunSQL(BACKFILL_SQL, migrations.RunSQL.noop),
+        migrations.RunSQL(CREATE_TRIGGER_SQL, DROP_TRIGGER_SQL),
+        migrations.AddIndex(
+            model_name='review',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='review_search_vector_idx'),
+        ),
+    ]
@@ -0,0 +1,143 @@
+# Generated by Django 4.2.7 on 2026-10-19 09:20
+
+from django.db import migrations, models
+
+
+# Apps whose name an older app already has, with the id of that oldest app.
+# They are merged into it before the name becomes unique: their reviews are
+# moved over and the apps themselves kept in core_app_0008_archive, which
+# the reverse migration restores from.
+DUPLICATE_APPS = """
+    SELECT app.id AS app_id, keeper.id AS keeper_id
+    FROM core_app app
+    JOIN (
+        SELECT name, min(id) AS id FROM core_app GROUP BY name HAVING count(*) > 1
+    ) keeper ON keeper.name = app.name AND app.id <> keeper.id
+"""
+
+MERGE_DUPLICATE_APPS = [
+    f'CREATE TABLE core_app_0008_merged AS {DUPLICATE_APPS}',
+    # Merging must not leave a user with two reviews of one app
+    """
+    DO $$
+    BEGIN
+        IF EXISTS (
+            SELECT 1
+            FROM core_review review
+            LEFT JOIN core_app_0008_merged merged ON merged.app_id = review.app_id
+            WHERE review.user_id IS NOT NULL
+            GROUP BY COALESCE(merged.keeper_id, review.app_id), review.user_id
+            HAVING count(*) > 1
+        ) THEN
+            RAISE EXCEPTION USING
+                MESSAGE = 'Cannot merge apps with the same name: a user reviewed '
+                          'more than one of them',
+                HINT = 'Delete all but one review per user among the apps sharing '
+                       'a name, then run migrate again.';
+        END IF;
+    END
+    $$
+    """,
+    """
+    CREATE TABLE core_review_0008_app AS
+    SELECT review.id AS review_id, review.app_id
+    FROM core_review review
+    JOIN core_app_0008_merged merged ON merged.app_id = review.app_id
+    """,
+    """
+    UPDATE core_review review SET app_id = merged.keeper_id
+    FROM core_app_0008_merged merged
+    WHERE review.app_id = merged.app_id
+    """,
+    """
+    CREATE TABLE core_app_0008_archive AS
+    SELECT * FROM core_app WHERE id IN (SELECT app_id FROM core_app_0008_merged)
+    """,
+    'DELETE FROM core_app WHERE id IN (SELECT app_id FROM core_app_0008_merged)',
+    # Run the deferred foreign key checks now: ALTER TABLE refuses to run
+    # with trigger events pending
+    'SET CONSTRAINTS ALL IMMEDIATE',
+]
+
+UNMERGE_DUPLICATE_APPS = [
+    'INSERT INTO core_app SELECT * FROM core_app_0008_archive',
+    """
+    UPDATE core_review review SET app_id = moved.app_id
+    FROM core_review_0008_app moved
+    WHERE review.id = moved.review_id
+    """,
+    'DROP TABLE core_review_0008_app, core_app_0008_archive, core_app_0008_merged',
+    'SET CONSTRAINTS ALL IMMEDIATE',
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_review_search_vector'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(help_text='Import kind and absolute path of the CSV file', max_length=500, unique=True)),
+                ('file_size', models.BigIntegerField(help_text='Size of the file when the import started')),
+                ('file_mtime', models.FloatField(help_text='Modification time of the file when the import started')),
+                ('rows_done', models.BigIntegerField(default=0, help_text='CSV records committed so far')),
+                ('completed', models.BooleanField(default=False, help_text='Whether the whole file was imported')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Import Checkpoint',
+                'verbose_name_plural': 'Import Checkpoints',
+                'ordering': ['source'],
+            },
+        ),
+        migrations.RemoveIndex(
+            model_name='app',
+            name='core_app_name_70c407_idx',
+        ),
+        migrations.AddField(
+            model_name='app',
+            name='source_hash',
+            field=models.CharField(blank=True, editable=False, help_text='MD5 of the imported CSV row, used to detect changed rows', max_length=32, null=True),
+        ),
+        migrations.AddField(
+            model_name='review',
+            name='source_hash',
+            field=models.CharField(blank=True, editable=False, help_text='MD5 of app name, review text and occurrence number of the imported CSV row', max_length=32, null=True),
+        ),
+        migrations.RunSQL(MERGE_DUPLICATE_APPS, UNMERGE_DUPLICATE_APPS),
+        # Key reviews imported so far the way load_initial_data does: repeated
+        # (app, text) pairs are numbered in insertion order
+        migrations.RunSQL(
+            sql="""
+                UPDATE core_review review
+                SET source_hash = keyed.source_hash
+                FROM (
+                    SELECT r.id, md5(
+                        a.name || chr(31) || r.review_text || chr(31) ||
+                        row_number() OVER (
+                            PARTITION BY a.name, r.review_text ORDER BY r.id
+                        )::text
+                    ) AS source_hash
+                    FROM core_review r
+                    JOIN core_app a ON a.id = r.app_id
+                    WHERE r.status = 'imported'
+                ) keyed
+                WHERE review.id = keyed.id
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AlterField(
+            model_name='app',
+            name='name',
+            field=models.CharField(help_text='Application name', max_length=500, unique=True),
+        ),
+        migrations.AddConstraint(
+            model_name='review',
+            constraint=models.UniqueConstraint(condition=models.Q(('source_hash__isnull', False)), fields=('source_hash',), name='unique_review_source_hash'),
+        ),
+    ]
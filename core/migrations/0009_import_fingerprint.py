@@ -0,0 +1,30 @@
+# Generated by Django 4.2.7 on 2026-10-19 09:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_incremental_import'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportFingerprint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(help_text='Import kind and absolute path of the CSV file', max_length=500, unique=True)),
+                ('file_size', models.BigIntegerField(help_text='Size of the imported file')),
+                ('file_mtime', models.FloatField(help_text='Modification time of the imported file')),
+                ('content_hash', models.CharField(help_text='SHA-256 of the imported file', max_length=64)),
+                ('schema_version', models.CharField(help_text='Importer version and latest core migration at import time', max_length=100)),
+                ('imported_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Import Fingerprint',
+                'verbose_name_plural': 'Import Fingerprints',
+                'ordering': ['source'],
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.7 on 2026-10-19 09:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_import_fingerprint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlowQuery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('slot', models.PositiveIntegerField(help_text='Position in the ring buffer', unique=True)),
+                ('fingerprint', models.CharField(db_index=True, help_text='MD5 of the normalized SQL', max_length=32)),
+                ('normalized_sql', models.TextField(help_text='SQL with literals and parameters replaced by ?')),
+                ('sql', models.TextField()),
+                ('params', models.TextField(blank=True, help_text='Query parameters as JSON')),
+                ('duration_ms', models.FloatField(help_text='Time the query took in the request')),
+                ('view', models.CharField(help_text='View that ran the query', max_length=100)),
+                ('path', models.CharField(help_text='Request path and query string', max_length=500)),
+                ('plan', models.TextField(blank=True, help_text='EXPLAIN (ANALYZE, BUFFERS) output; empty when not explained')),
+                ('seq_scan', models.BooleanField(help_text='Whether the plan has a sequential scan; unknown without a plan', null=True)),
+                ('captured_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Slow Query',
+                'verbose_name_plural': 'Slow Queries',
+                'ordering': ['-captured_at'],
+            },
+        ),
+        # Ring buffer position of the next capture (core.slow_queries)
+        migrations.RunSQL(
+            'CREATE SEQUENCE core_slowquery_slot_seq',
+            'DROP SEQUENCE core_slowquery_slot_seq',
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.7 on 2026-10-19 09:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_request_profile'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WorkerMemorySample',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hostname', models.CharField(max_length=100)),
+                ('pid', models.PositiveIntegerField()),
+                ('rss_bytes', models.BigIntegerField(help_text='Resident set size')),
+                ('peak_rss_bytes', models.BigIntegerField(help_text='Highest resident set size so far')),
+                ('footprints', models.JSONField(default=dict, help_text='Approximate bytes held by each in-process cache and index')),
+                ('sampled_at', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'verbose_name': 'Worker Memory Sample',
+                'verbose_name_plural': 'Worker Memory Samples',
+                'ordering': ['-sampled_at'],
+                'indexes': [models.Index(fields=['hostname', 'pid', 'sampled_at'], name='worker_memory_sample_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:02
+
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_worker_memory_sample'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='app',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name'], name='app_name_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['created_at', 'id'], name='review_created_id_idx'),
+        ),
+    ]
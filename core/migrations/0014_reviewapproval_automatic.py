@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:22
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('core', '0013_admin_changelist_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='reviewapproval',
+            name='supervisor',
+            field=models.ForeignKey(blank=True, help_text='Supervisor who took action (empty for automatic rejections)', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='review_actions', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
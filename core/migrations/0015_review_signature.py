@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:23
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_reviewapproval_automatic'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReviewSignature',
+            fields=[
+                ('review', models.OneToOneField(help_text='Signed review', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='signature', serialize=False, to='core.review')),
+                ('minhash', models.BinaryField(help_text='MinHash signature, as little-endian uint32 values')),
+                ('bands', django.contrib.postgres.fields.ArrayField(base_field=models.BigIntegerField(), help_text='Hash of each band of the signature', size=None)),
+            ],
+            options={
+                'verbose_name': 'Review Signature',
+                'verbose_name_plural': 'Review Signatures',
+                'indexes': [django.contrib.postgres.indexes.GinIndex(fields=['bands'], name='review_signature_bands_idx')],
+            },
+        ),
+    ]
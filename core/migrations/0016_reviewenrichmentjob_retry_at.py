@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_review_signature'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reviewenrichmentjob',
+            name='retry_at',
+            field=models.DateTimeField(blank=True, help_text='When a job that failed an attempt may be claimed again', null=True),
+        ),
+    ]
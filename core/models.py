@@ -1,7 +1,11 @@
+import os
+
 from django.db import models
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.contrib.postgres.fields import ArrayField
 from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 
 
 User = get_user_model()
@@ -14,7 +18,7 @@ class App(models.Model):
     # Basic app information
     name = models.CharField(
         max_length=500,
-        db_index=True,
+        unique=True,
         help_text='Application name'
     )
     category = models.CharField(
@@ -78,6 +82,15 @@ class App(models.Model):
         help_text='Required Android version'
     )
 
+    # CSV import bookkeeping
+    source_hash = models.CharField(
+        max_length=32,
+        null=True,
+        blank=True,
+        editable=False,
+        help_text='MD5 of the imported CSV row, used to detect changed rows'
+    )
+
     # Metadata
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -87,15 +100,23 @@ class App(models.Model):
         verbose_name_plural = 'Apps'
         ordering = ['-rating', '-reviews_count']
         indexes = [
-            models.Index(fields=['name']),
             models.Index(fields=['category']),
             models.Index(fields=['rating']),
             GinIndex(fields=['name'], name='app_name_gin_idx'),
+            # Substring (icontains) search of names in the admin
+            GinIndex(fields=['name'], name='app_name_trgm_idx', opclasses=['gin_trgm_ops']),
         ]
 
     def __str__(self):
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        app = super().from_db(db, field_names, values)
+        # core.response_cache purges the category the app is moved out of
+        app.loaded_category = app.__dict__.get('category')
+        return app
+
     @property
     def install_count_numeric(self):
         """Convert install string to numeric value for sorting"""
@@ -187,6 +208,43 @@ class Review(models.Model):
         db_index=True,
         help_text='Review approval status'
     )
+    idempotency_key = models.CharField(
+        max_length=255,
+        blank=True,
+        null=True,
+        help_text='Client-supplied Idempotency-Key of the submitting request'
+    )
+
+    # Near-duplicate detection
+    duplicate_of = models.ForeignKey(
+        'self',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='near_duplicates',
+        help_text='Earlier review this one nearly duplicates'
+    )
+    duplicate_score = models.FloatField(
+        null=True,
+        blank=True,
+        help_text='Estimated similarity to the duplicated review (0 to 1)'
+    )
+
+    # Full-text search, maintained by a database trigger
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+        help_text='English tsvector of review_text'
+    )
+
+    # CSV import bookkeeping
+    source_hash = models.CharField(
+        max_length=32,
+        null=True,
+        blank=True,
+        editable=False,
+        help_text='MD5 of app name, review text and occurrence number of the imported CSV row'
+    )
 
     # Metadata
     created_at = models.DateTimeField(auto_now_add=True)
@@ -200,6 +258,23 @@ class Review(models.Model):
             models.Index(fields=['app', 'status']),
             models.Index(fields=['status', 'created_at']),
             models.Index(fields=['sentiment']),
+            GinIndex(fields=['search_vector'], name='review_search_vector_idx'),
+            # The admin changelist's order: -created_at, then -pk
+            models.Index(fields=['created_at', 'id'], name='review_created_id_idx'),
+        ]
+        constraints = [
+            # One review per user and app; imported reviews have no user
+            models.UniqueConstraint(
+                fields=['app', 'user'],
+                condition=models.Q(user__isnull=False),
+                name='unique_user_review_per_app',
+            ),
+            # Natural key of imported reviews for incremental imports
+            models.UniqueConstraint(
+                fields=['source_hash'],
+                condition=models.Q(source_hash__isnull=False),
+                name='unique_review_source_hash',
+            ),
         ]
 
     def __str__(self):
@@ -228,8 +303,10 @@ class ReviewApproval(models.Model):
     supervisor = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
+        null=True,
+        blank=True,
         related_name='review_actions',
-        help_text='Supervisor who took action'
+        help_text='Supervisor who took action (empty for automatic rejections)'
     )
     action = models.CharField(
         max_length=10,
@@ -253,6 +330,322 @@ class ReviewApproval(models.Model):
 
     def __str__(self):
         return (
-            f"{self.supervisor} {self.action}d review for "
+            f"{self.supervisor or 'System'} {self.action}d review for "
             f"{self.review.app.name}"
         )
+
+
+class ReviewEnrichmentJob(models.Model):
+    """
+    Queued sentiment enrichment for a user-submitted review
+
+    Workers claim pending jobs with FOR UPDATE SKIP LOCKED inside a
+    transaction, so a crashed worker simply returns its batch to the queue.
+    A job whose scoring fails goes back to pending until ``retry_at``, and
+    is only marked failed after core.enrichment.MAX_ATTEMPTS attempts.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    review = models.ForeignKey(
+        Review,
+        on_delete=models.CASCADE,
+        related_name='enrichment_jobs',
+        help_text='Review to enrich'
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default='pending',
+        help_text='Job state'
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        help_text='Number of times a worker processed this job'
+    )
+    last_error = models.TextField(
+        blank=True,
+        help_text='Error raised by the last failed attempt'
+    )
+    retry_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text='When a job that failed an attempt may be claimed again'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    claimed_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text='When the batch containing this job was claimed'
+    )
+    finished_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text='When the batch containing this job was committed'
+    )
+
+    class Meta:
+        verbose_name = 'Review Enrichment Job'
+        verbose_name_plural = 'Review Enrichment Jobs'
+        ordering = ['id']
+        indexes = [
+            models.Index(
+                fields=['id'],
+                condition=models.Q(status='pending'),
+                name='enrichment_job_pending_idx',
+            ),
+            models.Index(fields=['status', 'finished_at']),
+        ]
+
+    def __str__(self):
+        return f"Enrichment job {self.id} for review {self.review_id} ({self.status})"
+
+
+class ReviewSignature(models.Model):
+    """
+    MinHash signature of a review and its LSH band hashes (core.dedup)
+
+    The GIN index over the band hashes finds the reviews sharing a band with
+    a new submission, so every worker looks up near-duplicates without
+    holding an index of the whole corpus in memory.
+    """
+    review = models.OneToOneField(
+        Review,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='signature',
+        help_text='Signed review'
+    )
+    minhash = models.BinaryField(
+        help_text='MinHash signature, as little-endian uint32 values'
+    )
+    bands = ArrayField(
+        models.BigIntegerField(),
+        help_text='Hash of each band of the signature'
+    )
+
+    class Meta:
+        verbose_name = 'Review Signature'
+        verbose_name_plural = 'Review Signatures'
+        indexes = [
+            GinIndex(fields=['bands'], name='review_signature_bands_idx'),
+        ]
+
+    def __str__(self):
+        return f"Signature of review {self.review_id}"
+
+
+class ImportCheckpoint(models.Model):
+    """
+    Progress of an incremental CSV import, committed with each batch
+
+    An interrupted import of an unchanged file resumes after ``rows_done``
+    records instead of starting over.
+    """
+    source = models.CharField(
+        max_length=500,
+        unique=True,
+        help_text='Import kind and absolute path of the CSV file'
+    )
+    file_size = models.BigIntegerField(
+        help_text='Size of the file when the import started'
+    )
+    file_mtime = models.FloatField(
+        help_text='Modification time of the file when the import started'
+    )
+    rows_done = models.BigIntegerField(
+        default=0,
+        help_text='CSV records committed so far'
+    )
+    completed = models.BooleanField(
+        default=False,
+        help_text='Whether the whole file was imported'
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Import Checkpoint'
+        verbose_name_plural = 'Import Checkpoints'
+        ordering = ['source']
+
+    def __str__(self):
+        state = 'completed' if self.completed else f'{self.rows_done} rows'
+        return f"{self.source} ({state})"
+
+
+class ImportFingerprint(models.Model):
+    """
+    Fingerprint of a CSV file as of its last successful import
+
+    ``load_initial_data --skip-if-unchanged`` compares size and mtime (and
+    the content hash only when the mtime moved) to skip re-importing an
+    unchanged file on container start.
+    """
+    source = models.CharField(
+        max_length=500,
+        unique=True,
+        help_text='Import kind and absolute path of the CSV file'
+    )
+    file_size = models.BigIntegerField(
+        help_text='Size of the imported file'
+    )
+    file_mtime = models.FloatField(
+        help_text='Modification time of the imported file'
+    )
+    content_hash = models.CharField(
+        max_length=64,
+        help_text='SHA-256 of the imported file'
+    )
+    schema_version = models.CharField(
+        max_length=100,
+        help_text='Importer version and latest core migration at import time'
+    )
+    imported_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Import Fingerprint'
+        verbose_name_plural = 'Import Fingerprints'
+        ordering = ['source']
+
+    def __str__(self):
+        return f"{self.source} ({self.content_hash[:12]})"
+
+
+class SlowQuery(models.Model):
+    """
+    A query that ran longer than ``settings.SLOW_QUERY_MS``
+
+    The table is a ring buffer of ``settings.SLOW_QUERY_BUFFER_SIZE`` slots:
+    each capture overwrites the slot after the previous one (see
+    ``core.slow_queries``).
+    """
+    slot = models.PositiveIntegerField(
+        unique=True,
+        help_text='Position in the ring buffer'
+    )
+    fingerprint = models.CharField(
+        max_length=32,
+        db_index=True,
+        help_text='MD5 of the normalized SQL'
+    )
+    normalized_sql = models.TextField(
+        help_text='SQL with literals and parameters replaced by ?'
+    )
+    sql = models.TextField()
+    params = models.TextField(
+        blank=True,
+        help_text='Query parameters as JSON'
+    )
+    duration_ms = models.FloatField(
+        help_text='Time the query took in the request'
+    )
+    view = models.CharField(
+        max_length=100,
+        help_text='View that ran the query'
+    )
+    path = models.CharField(
+        max_length=500,
+        help_text='Request path and query string'
+    )
+    plan = models.TextField(
+        blank=True,
+        help_text='EXPLAIN (ANALYZE, BUFFERS) output; empty when not explained'
+    )
+    seq_scan = models.BooleanField(
+        null=True,
+        help_text='Whether the plan has a sequential scan; unknown without a plan'
+    )
+    captured_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name = 'Slow Query'
+        verbose_name_plural = 'Slow Queries'
+        ordering = ['-captured_at']
+
+    def __str__(self):
+        return f"{self.view} {self.duration_ms:.0f}ms ({self.fingerprint[:12]})"
+
+
+class RequestProfile(models.Model):
+    """
+    cProfile profile of one request, asked for by a staff user
+
+    The pstats file lives in ``settings.PROFILE_DIR``; see
+    ``core.profiling``.
+    """
+    method = models.CharField(max_length=10)
+    path = models.CharField(
+        max_length=500,
+        help_text='Request path and query string'
+    )
+    view = models.CharField(
+        max_length=100,
+        help_text='View that handled the request'
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='request_profiles'
+    )
+    status_code = models.PositiveSmallIntegerField()
+    duration_ms = models.FloatField(
+        help_text='Wall time of the request under the profiler'
+    )
+    file = models.CharField(
+        max_length=500,
+        help_text='Path of the pstats file'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Request Profile'
+        verbose_name_plural = 'Request Profiles'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration_ms:.0f}ms)"
+
+    def delete(self, *args, **kwargs):
+        try:
+            os.remove(self.file)
+        except FileNotFoundError:
+            pass
+        return super().delete(*args, **kwargs)
+
+
+class WorkerMemorySample(models.Model):
+    """
+    Resident memory of one worker process at one point in time
+
+    Each worker stores one every ``settings.MEMORY_SAMPLE_SECONDS``; see
+    ``core.memory``.
+    """
+    hostname = models.CharField(max_length=100)
+    pid = models.PositiveIntegerField()
+    rss_bytes = models.BigIntegerField(
+        help_text='Resident set size'
+    )
+    peak_rss_bytes = models.BigIntegerField(
+        help_text='Highest resident set size so far'
+    )
+    footprints = models.JSONField(
+        default=dict,
+        help_text='Approximate bytes held by each in-process cache and index'
+    )
+    sampled_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        verbose_name = 'Worker Memory Sample'
+        verbose_name_plural = 'Worker Memory Samples'
+        ordering = ['-sampled_at']
+        indexes = [
+            models.Index(fields=['hostname', 'pid', 'sampled_at'],
+                         name='worker_memory_sample_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.hostname}:{self.pid} {self.rss_bytes / 2**20:.0f}MiB"
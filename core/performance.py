@@ -0,0 +1,310 @@
+"""
+Per-request performance instrumentation.
+
+``PerformanceMiddleware`` measures a sample of the requests
+(``settings.PERFORMANCE_SAMPLE_RATE``): wall time, time in the view, SQL
+time and query count, DRF/template rendering time, cache hits and misses and
+response bytes. It reports them in a ``Server-Timing`` header and records
+them per view name into histograms that ``render_metrics()`` prints in the
+Prometheus text format for the ``/metrics`` endpoint.
+
+The histograms are per process. Every thread writes to its own store, so
+recording takes no lock; the scrape adds the stores up and folds the stores
+of finished threads into one.
+"""
+import random
+import sys
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.redis import RedisCache
+from django.db import connection
+
+from core import memory
+
+
+DURATION_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+BYTES_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+HISTOGRAMS = {
+    'franklin_request_duration_seconds': ('Wall time of the request', DURATION_BUCKETS),
+    'franklin_request_view_seconds': ('Time spent in the view', DURATION_BUCKETS),
+    'franklin_request_db_seconds': ('Time spent running SQL', DURATION_BUCKETS),
+    'franklin_request_render_seconds': (
+        'Time spent rendering (serializing) the response', DURATION_BUCKETS),
+    'franklin_request_queries': ('SQL queries per request', QUERY_BUCKETS),
+    'franklin_response_bytes': ('Response body size', BYTES_BUCKETS),
+}
+
+COUNTERS = {
+    'franklin_requests_total': 'Sampled requests by view and status class',
+    'franklin_cache_requests_total': 'Cache lookups by view and result',
+}
+
+
+class _Store:
+    """One thread's histograms and counters"""
+
+    def __init__(self):
+        self.thread = threading.current_thread()
+        # (name, view) -> [bucket counts..., +Inf count, sum]
+        self.histograms = {}
+        # (name, labels) -> count
+        self.counters = {}
+
+    def observe(self, name, view, value):
+        key = (name, view)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            buckets = HISTOGRAMS[name][1]
+            histogram = self.histograms[key] = [0] * (len(buckets) + 2)
+        histogram[bisect_left(HISTOGRAMS[name][1], value)] += 1
+        histogram[-1] += value
+
+    def count(self, name, labels, amount=1):
+        key = (name, labels)
+        self.counters[key] = self.counters.get(key, 0) + amount
+
+    def merge(self, other):
+        for key, values in other.histograms.items():
+            histogram = self.histograms.setdefault(key, [0] * len(values))
+            for i, value in enumerate(values):
+                histogram[i] += value
+        for key, value in other.counters.items():
+            self.counters[key] = self.counters.get(key, 0) + value
+
+
+_local = threading.local()
+_stores = []
+_retired = _Store()
+_stores_lock = threading.Lock()
+
+
+def _store():
+    store = getattr(_local, 'store', None)
+    if store is None:
+        store = _local.store = _Store()
+        with _stores_lock:
+            _stores.append(store)
+    return store
+
+
+def snapshot():
+    """All threads' measurements added up into one _Store"""
+    total = _Store()
+    with _stores_lock:
+        # Threads that are gone can't write anymore; fold them in for good
+        for store in [store for store in _stores if not store.thread.is_alive()]:
+            _stores.remove(store)
+            _retired.merge(store)
+        total.merge(_retired)
+        for store in _stores:
+            total.merge(store)
+    return total
+
+
+def reset():
+    """Forget everything measured so far (for tests)"""
+    global _retired
+    with _stores_lock:
+        _stores.clear()
+        _retired = _Store()
+    if hasattr(_local, 'store'):
+        del _local.store
+
+
+def memory_usage():
+    """Approximate bytes held by the stores"""
+    with _stores_lock:
+        stores = _stores + [_retired]
+        return sum(
+            sys.getsizeof(store.histograms) + sys.getsizeof(store.counters) +
+            sum(sys.getsizeof(values) + 32 * len(values)
+                for values in list(store.histograms.values()))
+            for store in stores
+        )
+
+
+memory.register('performance_metrics', memory_usage)
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def render_metrics():
+    """Prometheus text exposition of the recorded measurements"""
+    total = snapshot()
+    lines = [
+        '# HELP franklin_performance_sample_rate Share of requests measured',
+        '# TYPE franklin_performance_sample_rate gauge',
+        f'franklin_performance_sample_rate {settings.PERFORMANCE_SAMPLE_RATE}',
+    ]
+    for name, (help_text, buckets) in HISTOGRAMS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} histogram')
+        for (metric, view), values in sorted(total.histograms.items()):
+            if metric != name:
+                continue
+            view = _label(view)
+            cumulative = 0
+            for bound, count in zip(buckets + ('+Inf',), values):
+                cumulative += count
+                lines.append(f'{name}_bucket{{view="{view}",le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_sum{{view="{view}"}} {values[-1]}')
+            lines.append(f'{name}_count{{view="{view}"}} {cumulative}')
+    for name, help_text in COUNTERS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} counter')
+        for (metric, labels), value in sorted(total.counters.items()):
+            if metric != name:
+                continue
+            rendered = ','.join(f'{key}="{_label(value)}"' for key, value in labels)
+            lines.append(f'{name}{{{rendered}}} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+class RequestStats:
+    """Measurements of one sampled request"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.view_done = None
+        self.rendered = None
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        """Execute wrapper timing the request's queries"""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_seconds += time.perf_counter() - started
+
+    def mark_rendered(self, response):
+        self.rendered = time.perf_counter()
+        return response
+
+
+def current_request():
+    """RequestStats of the request this thread is measuring, if any"""
+    return getattr(_local, 'request', None)
+
+
+def record_cache(hits=0, misses=0):
+    stats = current_request()
+    if stats is not None:
+        stats.cache_hits += hits
+        stats.cache_misses += misses
+
+
+class InstrumentedCacheMixin:
+    """Cache backend mixin counting hits and misses of measured requests"""
+    _missing = object()
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, self._missing, version)
+        if value is self._missing:
+            record_cache(misses=1)
+            return default
+        record_cache(hits=1)
+        return value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        found = super().get_many(keys, version)
+        record_cache(hits=len(found), misses=len(keys) - len(found))
+        return found
+
+
+class InstrumentedLocMemCache(InstrumentedCacheMixin, LocMemCache):
+
+    def memory_usage(self):
+        """Approximate bytes held by the cache (values are stored pickled)"""
+        with self._lock:
+            return sys.getsizeof(self._cache) + sum(
+                sys.getsizeof(key) + sys.getsizeof(value)
+                for key, value in self._cache.items()
+            )
+
+
+class InstrumentedRedisCache(InstrumentedCacheMixin, RedisCache):
+    """Shared cache for several processes; needs the redis package"""
+
+
+class PerformanceMiddleware:
+    """Measure a sample of the requests; see the module docstring"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        rate = settings.PERFORMANCE_SAMPLE_RATE
+        if rate <= 0 or (rate < 1 and random.random() >= rate):
+            return self.get_response(request)
+
+        stats = _local.request = RequestStats()
+        try:
+            with connection.execute_wrapper(stats):
+                response = self.get_response(request)
+        finally:
+            _local.request = None
+        finished = time.perf_counter()
+        if getattr(request, 'profiled', False):
+            # Under core.profiling the timings are mostly profiler overhead
+            return response
+
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else 'unresolved'
+        total = finished - stats.started
+        # Without a separate render step the view did all the work
+        view_seconds = (stats.view_done or finished) - stats.started
+        render_seconds = (
+            stats.rendered - stats.view_done
+            if stats.view_done and stats.rendered else 0.0
+        )
+        size = 0 if response.streaming else len(response.content)
+
+        store = _store()
+        store.observe('franklin_request_duration_seconds', view, total)
+        store.observe('franklin_request_view_seconds', view, view_seconds)
+        store.observe('franklin_request_db_seconds', view, stats.db_seconds)
+        store.observe('franklin_request_render_seconds', view, render_seconds)
+        store.observe('franklin_request_queries', view, stats.queries)
+        store.observe('franklin_response_bytes', view, size)
+        store.count('franklin_requests_total', (
+            ('view', view), ('status', f'{response.status_code // 100}xx')))
+        if stats.cache_hits:
+            store.count('franklin_cache_requests_total',
+                        (('view', view), ('result', 'hit')), stats.cache_hits)
+        if stats.cache_misses:
+            store.count('franklin_cache_requests_total',
+                        (('view', view), ('result', 'miss')), stats.cache_misses)
+
+        if settings.PERFORMANCE_SERVER_TIMING:
+            response['Server-Timing'] = ', '.join([
+                f'total;dur={total * 1000:.1f}',
+                f'view;dur={view_seconds * 1000:.1f}',
+                f'db;dur={stats.db_seconds * 1000:.1f};desc="{stats.queries} queries"',
+                f'render;dur={render_seconds * 1000:.1f}',
+                f'cache;desc="{stats.cache_hits} hits, {stats.cache_misses} misses"',
+            ])
+        return response
+
+    def process_template_response(self, request, response):
+        """The view returned a response that still has to be rendered"""
+        stats = current_request()
+        if stats is not None:
+            stats.view_done = time.perf_counter()
+            response.add_post_render_callback(stats.mark_rendered)
+        return response
@@ -0,0 +1,157 @@
+"""
+On-demand profiling of single requests.
+
+A staff user adds ``?__profile=1`` to any URL, or sends ``X-Profile: 1``, and
+``ProfilingMiddleware`` runs the rest of the request under cProfile: the
+view, DRF, the ORM and serialization. The profile is saved to
+``settings.PROFILE_DIR`` as a pstats file (for snakeviz, gprof2dot or
+``python -m pstats``) and listed in the admin as a RequestProfile.
+
+With the query parameter the response is replaced by the call tree of the
+request as text; with the header the response is returned as usual with an
+``X-Profile-Id`` header naming the saved profile.
+"""
+import cProfile
+import os
+import pstats
+import sys
+import time
+import uuid
+
+from django.conf import settings
+from django.http import HttpResponse
+
+
+QUERY_PARAMETER = '__profile'
+HEADER = 'X-Profile'
+
+
+def wants_profile(request):
+    """A staff user asked for the request to be profiled"""
+    if not (request.GET.get(QUERY_PARAMETER) or request.headers.get(HEADER)):
+        return False
+    user = getattr(request, 'user', None)
+    return bool(user and user.is_authenticated and user.is_staff)
+
+
+def _location(func, roots):
+    filename, line, name = func
+    if filename == '~':
+        # Built-in function: the name is like <built-in method ...>
+        return name
+    for root in roots:
+        if filename.startswith(root + os.sep):
+            filename = filename[len(root) + 1:]
+            break
+    return f'{name} ({filename}:{line})'
+
+
+def call_tree(stats, min_share=0.005, max_depth=40):
+    """
+    Text call tree of ``stats`` (a pstats.Stats), cumulative time first.
+    cProfile only knows callers one level up, so below the top level a
+    function's time is its time when called from its parent, over all the
+    paths that reached that parent. A function's calls are listed the
+    first time it shows up only, and calls under ``min_share`` of the total
+    are left out.
+    """
+    children = {}
+    roots = {}
+    for func, (_, calls, _, cumulative, callers) in stats.stats.items():
+        for caller, edge in callers.items():
+            children.setdefault(caller, []).append((func, edge[3]))
+        # Calls from the frame that enabled the profiler have no caller
+        if sum(edge[1] for edge in callers.values()) < calls:
+            roots[func] = cumulative
+    total = stats.total_tt or 1e-9
+    # Longest first, so site-packages wins over the Python prefix
+    path_roots = sorted({entry for entry in sys.path if entry}, key=len, reverse=True)
+    lines = [f'{total * 1000:.1f}ms total, {stats.total_calls} calls']
+
+    expanded = set()
+
+    def walk(func, seconds, depth):
+        if seconds < total * min_share or depth > max_depth:
+            return
+        again = func in expanded and func in children
+        lines.append(
+            f'{seconds * 1000:9.1f}ms {seconds / total * 100:5.1f}%  '
+            f'{"  " * depth}{_location(func, path_roots)}'
+            + (' (see above)' if again else '')
+        )
+        if again:
+            return
+        expanded.add(func)
+        for child, child_seconds in sorted(
+                children.get(func, ()), key=lambda item: -item[1]):
+            walk(child, child_seconds, depth + 1)
+
+    for func, seconds in sorted(roots.items(), key=lambda item: -item[1]):
+        if func not in expanded:
+            walk(func, seconds, 0)
+    return '\n'.join(lines) + '\n'
+
+
+def load(profile):
+    """pstats.Stats of a saved RequestProfile"""
+    return pstats.Stats(profile.file)
+
+
+def save(request, user, response, profiler, duration_ms):
+    """Write the profile to PROFILE_DIR and record it as a RequestProfile"""
+    from core.models import RequestProfile
+
+    os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+    path = os.path.join(settings.PROFILE_DIR, f'{uuid.uuid4().hex}.prof')
+    profiler.dump_stats(path)
+    match = getattr(request, 'resolver_match', None)
+    profile = RequestProfile.objects.create(
+        method=request.method,
+        path=request.get_full_path()[:500],
+        view=(match.view_name if match else 'unresolved')[:100],
+        user=user,
+        status_code=response.status_code,
+        duration_ms=duration_ms,
+        file=path,
+    )
+    # Model.delete() removes the file as well
+    for old in RequestProfile.objects.order_by('-created_at')[settings.PROFILE_KEEP:]:
+        old.delete()
+    return profile
+
+
+class ProfilingMiddleware:
+    """
+    Profile the requests of staff users that ask for it; see the module
+    docstring. Goes after AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.PROFILE_DIR or not wants_profile(request):
+            return self.get_response(request)
+
+        # DRF views without authentication replace request.user
+        user = request.user
+        profiler = cProfile.Profile()
+        # Budgets and metrics would measure the profiler's overhead
+        request.profiled = True
+        started = time.perf_counter()
+        profiler.enable()
+        try:
+            # The handler renders template responses before returning them
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+        duration_ms = (time.perf_counter() - started) * 1000
+
+        profile = save(request, user, response, profiler, duration_ms)
+        if request.GET.get(QUERY_PARAMETER):
+            response = HttpResponse(
+                call_tree(pstats.Stats(profiler)),
+                content_type='text/plain; charset=utf-8',
+            )
+        response['X-Profile-Id'] = str(profile.pk)
+        return response
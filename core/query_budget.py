@@ -0,0 +1,114 @@
+"""
+Per-view query budgets.
+
+``@query_budget(queries=4, sql_ms=100)`` declares how many queries, and how
+many milliseconds of SQL, one request to a view may use. Everything the
+request runs counts, including the session and user lookups of the
+middleware, so budgets are written for a logged-in user.
+
+``QueryBudgetMiddleware`` measures every request and checks it against the
+budget of the view that handled it. ``settings.QUERY_BUDGET_MODE`` decides
+what a breach does: 'raise' raises QueryBudgetExceeded (the default with
+DEBUG and in tests), 'log' logs a warning and 'off' skips the measuring.
+``settings.QUERY_BUDGET_TIME_MODE`` ('raise' or 'log') overrides it for the
+SQL milliseconds, which depend on the machine: tests only log them.
+"""
+import logging
+import time
+
+from django.conf import settings
+from django.db import connection
+
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    """A request ran more or slower queries than its view's budget allows"""
+
+
+class QueryBudget:
+    """Maximum queries and SQL milliseconds per request; None is unlimited"""
+
+    def __init__(self, queries=None, sql_ms=None):
+        self.queries = queries
+        self.sql_ms = sql_ms
+
+    def breaches(self, timer):
+        """(limit, description) of the limits ``timer`` went over"""
+        breaches = []
+        if self.queries is not None and timer.queries > self.queries:
+            breaches.append(('queries', f'{timer.queries} queries (budget {self.queries})'))
+        if self.sql_ms is not None and timer.seconds * 1000 > self.sql_ms:
+            breaches.append((
+                'sql_ms',
+                f'{timer.seconds * 1000:.1f}ms of SQL (budget {self.sql_ms}ms)',
+            ))
+        return breaches
+
+
+def query_budget(queries=None, sql_ms=None):
+    """
+    View decorator declaring the view's QueryBudget. Apply it outermost,
+    above @api_view and @login_required.
+    """
+    def decorator(view):
+        view.query_budget = QueryBudget(queries, sql_ms)
+        return view
+    return decorator
+
+
+def get_budget(view):
+    return getattr(view, 'query_budget', None)
+
+
+class QueryTimer:
+    """Execute wrapper counting queries and the time spent in them"""
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.seconds += time.perf_counter() - started
+
+
+class QueryBudgetMiddleware:
+    """Check every request against the budget of the view that handled it"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        mode = getattr(settings, 'QUERY_BUDGET_MODE', 'log')
+        if mode == 'off':
+            return self.get_response(request)
+
+        timer = QueryTimer()
+        with connection.execute_wrapper(timer):
+            response = self.get_response(request)
+        if getattr(request, 'profiled', False):
+            # core.profiling slowed the request down and ran its own queries
+            return response
+
+        match = getattr(request, 'resolver_match', None)
+        budget = get_budget(match.func) if match else None
+        breaches = budget.breaches(timer) if budget else []
+        if breaches:
+            modes = {
+                'queries': mode,
+                'sql_ms': getattr(settings, 'QUERY_BUDGET_TIME_MODE', mode),
+            }
+            message = (
+                f'{request.method} {request.path} ({match.view_name}) used '
+                + ' and '.join(description for _, description in breaches)
+            )
+            if any(modes[limit] == 'raise' for limit, _ in breaches):
+                raise QueryBudgetExceeded(message)
+            logger.warning('Query budget exceeded: %s', message)
+        return response
@@ -0,0 +1,284 @@
+"""
+Full-response cache of the public read-only API, with surrogate-key purging.
+
+``@cache_response(tags)`` marks a view whose responses depend on the URL
+alone, never on the user. ``tags(request, response, **view_kwargs)`` names
+what a 200 response shows as surrogate keys, e.g. ``app:42``; every response
+also carries ``catalog``. ``ResponseCacheMiddleware`` then:
+
+- sends ``Cache-Control: public`` (``RESPONSE_CACHE_MAX_AGE`` for browsers,
+  ``RESPONSE_CACHE_SHARED_MAX_AGE`` for shared caches) and a
+  ``Surrogate-Key`` header for a CDN or reverse proxy;
+- keeps the response in the ``responses`` cache of the process for the
+  shared max age, and serves it from there without running the view.
+
+``purge(*tags)`` drops every response carrying one of the tags once the
+transaction commits: in the proxies listed in ``RESPONSE_CACHE_PURGE_URLS``,
+which get a ``PURGE`` request with the tags in a ``Surrogate-Key`` header,
+and in the ``responses`` cache of every process, through a timestamp per
+tag in the default cache. Only a default cache shared by all processes
+(Redis, Memcached, a database) carries those timestamps to the others, so
+with a process-local one (``shared_cache()`` is False) the middleware keeps
+no responses itself and only sends the headers. App and Review changes
+purge through signals (``connect_signals()``); raw SQL and bulk writes must
+call ``purge()`` themselves.
+
+``core.cache_proxy`` is a caching reverse proxy that understands these
+headers, for trying the whole setup locally.
+"""
+import atexit
+import hashlib
+import logging
+import queue
+import threading
+import time
+from urllib.request import Request, urlopen
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.http import HttpResponse
+
+
+logger = logging.getLogger(__name__)
+
+CATALOG = 'catalog'
+APPS = 'apps'
+# Response headers kept with a cached response
+STORED_HEADERS = ('Content-Type', 'Vary', 'Allow')
+
+
+def app_tag(app_id):
+    return f'app:{app_id}'
+
+
+def reviews_tag(app_id):
+    return f'reviews:{app_id}'
+
+
+def category_tag(category):
+    return f'category:{category.lower()}'
+
+
+def cache_response(tags):
+    """
+    View decorator caching the view's responses; see the module docstring.
+    Apply it right below @query_budget.
+    """
+    def decorator(view):
+        view.response_cache_tags = tags
+        return view
+    return decorator
+
+
+def shared_cache():
+    """Whether the default cache, which holds the purge times, is shared"""
+    return not isinstance(caches['default'], (LocMemCache, DummyCache))
+
+
+def _tag_key(tag):
+    return f'response-cache:tag:{tag}'
+
+
+def _entry_key(request):
+    # DRF picks the renderer from the Accept header
+    url = f'{request.get_full_path()}|{request.headers.get("Accept", "")}'
+    return 'response-cache:' + hashlib.md5(url.encode()).hexdigest()
+
+
+def _tag_times(tags):
+    """
+    When each tag was last purged. A tag never purged, or forgotten by the
+    cache, gets a new negative value: it differs from whatever the entries
+    stored before, without looking like a purge during the request.
+    """
+    keys = {_tag_key(tag): tag for tag in tags}
+    found = cache.get_many(keys)
+    for key in keys.keys() - found.keys():
+        cache.add(key, -time.time(), None)
+        found[key] = cache.get(key)
+    return {keys[key]: value for key, value in found.items()}
+
+
+def _purge_now(tags):
+    now = time.time()
+    cache.set_many({_tag_key(tag): now for tag in tags}, None)
+    if settings.RESPONSE_CACHE_PURGE_URLS:
+        enqueue(tags)
+
+
+def purge(*tags):
+    """Drop the cached responses carrying any of ``tags`` once committed"""
+    tags = sorted(set(tags))
+    if tags:
+        transaction.on_commit(lambda: _purge_now(tags))
+
+
+_queue = queue.Queue(maxsize=1000)
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def send_purge(url, tags):
+    request = Request(url, method='PURGE', headers={'Surrogate-Key': ' '.join(tags)})
+    with urlopen(request, timeout=5) as response:
+        response.read()
+
+
+def _work():
+    while True:
+        tags = _queue.get()
+        for url in settings.RESPONSE_CACHE_PURGE_URLS:
+            try:
+                send_purge(url, tags)
+            except Exception:
+                logger.exception('Purging %s from %s failed', ' '.join(tags), url)
+        _queue.task_done()
+
+
+def flush(timeout=10):
+    """Wait up to ``timeout`` seconds for the queued purges to be sent"""
+    deadline = time.monotonic() + timeout
+    while _queue.unfinished_tasks and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+
+def enqueue(tags):
+    """Hand a purge to the background thread that tells the proxies"""
+    global _worker
+    if _worker is None:
+        with _worker_lock:
+            if _worker is None:
+                _worker = threading.Thread(
+                    target=_work, name='response-cache-purger', daemon=True)
+                _worker.start()
+                # Management commands exit right after their last purge
+                atexit.register(flush)
+    try:
+        _queue.put_nowait(tags)
+    except queue.Full:
+        logger.warning('Response cache purge queue full, dropping %s', ' '.join(tags))
+
+
+def _app_saving(sender, instance, raw, **kwargs):
+    if not instance._state.adding and getattr(instance, 'loaded_category', None) is None:
+        # Not loaded from the database (see App.from_db), or without its category
+        instance.loaded_category = sender.objects.filter(
+            pk=instance.pk).values_list('category', flat=True).first()
+
+
+def _app_saved(sender, instance, created, **kwargs):
+    old_category = getattr(instance, 'loaded_category', None)
+    # A deferred category wasn't saved, so it didn't change
+    category = instance.__dict__.get('category', old_category)
+    # The app can start or stop matching any search, and the categories
+    # listed can change
+    tags = [APPS, app_tag(instance.pk)]
+    tags += [category_tag(name) for name in (old_category, category) if name]
+    instance.loaded_category = category
+    purge(*tags)
+
+
+def _app_deleted(sender, instance, **kwargs):
+    purge(APPS, app_tag(instance.pk))
+
+
+def _review_changed(sender, instance, **kwargs):
+    purge(reviews_tag(instance.app_id))
+
+
+def connect_signals():
+    pre_save.connect(_app_saving, sender='core.App')
+    post_save.connect(_app_saved, sender='core.App')
+    post_delete.connect(_app_deleted, sender='core.App')
+    post_save.connect(_review_changed, sender='core.Review')
+    post_delete.connect(_review_changed, sender='core.Review')
+
+
+def _add_headers(response, tags, result):
+    response['Cache-Control'] = (
+        f'public, max-age={settings.RESPONSE_CACHE_MAX_AGE}, '
+        f's-maxage={settings.RESPONSE_CACHE_SHARED_MAX_AGE}'
+    )
+    response['Surrogate-Key'] = ' '.join(tags)
+    response['X-Response-Cache'] = result
+
+
+_warned = False
+
+
+class ResponseCacheMiddleware:
+    """
+    Serve and store the responses of @cache_response views; see the module
+    docstring. Goes last, so the other middleware still handle hits.
+    """
+
+    def __init__(self, get_response):
+        global _warned
+        self.get_response = get_response
+        self.responses = caches['responses'] if shared_cache() else None
+        if (self.responses is None and not _warned and
+                settings.RESPONSE_CACHE_SHARED_MAX_AGE > 0):
+            _warned = True
+            logger.warning(
+                'The default cache is local to the process: the response '
+                'cache only sends Cache-Control headers. Configure a shared '
+                'CACHE_BACKEND to keep responses in memory too.'
+            )
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        pending = getattr(request, 'response_cache', None)
+        if pending is not None:
+            self.store(request, response, *pending)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        tags = getattr(view_func, 'response_cache_tags', None)
+        if (
+            tags is None or request.method != 'GET' or
+            settings.RESPONSE_CACHE_SHARED_MAX_AGE <= 0 or
+            # core.profiling wants the view to run
+            getattr(request, 'profiled', False)
+        ):
+            return None
+
+        key = _entry_key(request)
+        entry = self.responses.get(key) if self.responses is not None else None
+        if entry is not None and _tag_times(entry['tags']) == entry['tags']:
+            response = HttpResponse(entry['content'], status=entry['status'])
+            for header, value in entry['headers']:
+                response[header] = value
+            _add_headers(response, entry['tags'], 'hit')
+            return response
+        request.response_cache = (key, tags, view_kwargs, time.time())
+        return None
+
+    def store(self, request, response, key, tags, view_kwargs, started):
+        session = getattr(request, 'session', None)
+        if (
+            response.status_code != 200 or response.streaming or response.cookies or
+            # The response may depend on who is asking after all
+            (session is not None and session.accessed)
+        ):
+            return
+        tags = sorted({CATALOG, *tags(request, response, **view_kwargs)})
+        _add_headers(response, tags, 'miss')
+        if self.responses is None:
+            return
+        purged = _tag_times(tags)
+        if any(when > started for when in purged.values()):
+            # Purged while the view ran: the response may be stale already
+            return
+        self.responses.set(key, {
+            'status': response.status_code,
+            'content': response.content,
+            'headers': [
+                (header, response[header])
+                for header in STORED_HEADERS if response.has_header(header)
+            ],
+            'tags': purged,
+        }, settings.RESPONSE_CACHE_SHARED_MAX_AGE)
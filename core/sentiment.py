@@ -0,0 +1,282 @@
+"""
+Lexicon-based sentiment scoring for review texts.
+
+Produces the same polarity (-1 to 1) and subjectivity (0 to 1) scales as the
+TextBlob scores shipped in the reviews CSV, without any external service:
+each review is the average of the lexicon entries it contains, with an
+intensifier ("very good") scaling the following word and a negator
+("not good") flipping and damping it.
+
+``score_text`` scores a single review; ``score_many`` applies the same model
+to a whole batch at once with NumPy for bulk backfills.
+"""
+import re
+
+import numpy as np
+
+
+TOKEN_RE = re.compile(r"[a-z]+(?:'[a-z]+)?")
+
+# word -> (polarity, subjectivity)
+LEXICON = {
+    # Positive
+    'amazing': (0.6, 0.9),
+    'awesome': (1.0, 1.0),
+    'beautiful': (0.85, 1.0),
+    'best': (1.0, 0.3),
+    'better': (0.5, 0.5),
+    'brilliant': (0.9, 1.0),
+    'clean': (0.37, 0.69),
+    'convenient': (0.5, 0.6),
+    'cool': (0.35, 0.65),
+    'easy': (0.43, 0.83),
+    'effective': (0.6, 0.8),
+    'excellent': (1.0, 1.0),
+    'fantastic': (0.4, 0.9),
+    'fast': (0.2, 0.6),
+    'favorite': (0.5, 1.0),
+    'fine': (0.42, 0.5),
+    'free': (0.4, 0.8),
+    'fun': (0.3, 0.2),
+    'glad': (0.5, 1.0),
+    'good': (0.7, 0.6),
+    'great': (0.8, 0.75),
+    'happy': (0.8, 1.0),
+    'helpful': (0.5, 0.5),
+    'impressive': (1.0, 1.0),
+    'interesting': (0.5, 0.5),
+    'like': (0.2, 0.4),
+    'liked': (0.4, 0.6),
+    'love': (0.5, 0.6),
+    'loved': (0.7, 0.8),
+    'lovely': (0.5, 0.75),
+    'nice': (0.6, 1.0),
+    'perfect': (1.0, 1.0),
+    'pleasant': (0.73, 0.97),
+    'recommend': (0.4, 0.5),
+    'recommended': (0.4, 0.5),
+    'reliable': (0.5, 0.6),
+    'simple': (0.1, 0.4),
+    'smooth': (0.4, 0.69),
+    'super': (0.33, 0.67),
+    'thank': (0.2, 0.2),
+    'thanks': (0.2, 0.2),
+    'useful': (0.3, 0.1),
+    'well': (0.2, 0.3),
+    'wonderful': (1.0, 1.0),
+    'worth': (0.3, 0.1),
+    # Negative
+    'annoying': (-0.8, 0.9),
+    'awful': (-1.0, 1.0),
+    'bad': (-0.7, 0.67),
+    'boring': (-1.0, 1.0),
+    'broken': (-0.4, 0.4),
+    'bug': (-0.3, 0.4),
+    'buggy': (-0.5, 0.6),
+    'bugs': (-0.3, 0.4),
+    'crap': (-0.8, 0.8),
+    'crash': (-0.4, 0.5),
+    'crashes': (-0.4, 0.5),
+    'difficult': (-0.5, 1.0),
+    'disappointed': (-0.75, 0.75),
+    'disappointing': (-0.6, 0.7),
+    'error': (-0.3, 0.4),
+    'expensive': (-0.5, 0.7),
+    'fail': (-0.5, 0.3),
+    'failed': (-0.5, 0.3),
+    'fake': (-0.5, 1.0),
+    'frustrating': (-0.4, 0.7),
+    'garbage': (-0.8, 0.8),
+    'hard': (-0.29, 0.54),
+    'hate': (-0.8, 0.9),
+    'horrible': (-1.0, 1.0),
+    'junk': (-0.6, 0.7),
+    'lag': (-0.3, 0.4),
+    'laggy': (-0.4, 0.5),
+    'poor': (-0.4, 0.6),
+    'problem': (-0.2, 0.3),
+    'problems': (-0.2, 0.3),
+    'scam': (-0.8, 0.8),
+    'slow': (-0.3, 0.39),
+    'spam': (-0.6, 0.7),
+    'stupid': (-0.8, 1.0),
+    'terrible': (-1.0, 1.0),
+    'ugly': (-0.7, 1.0),
+    'uninstall': (-0.3, 0.3),
+    'uninstalled': (-0.4, 0.4),
+    'useless': (-0.5, 0.2),
+    'waste': (-0.6, 0.6),
+    'worse': (-0.4, 0.6),
+    'worst': (-1.0, 1.0),
+    'wrong': (-0.5, 0.9),
+}
+
+# Words that flip the polarity of the next sentiment word
+NEGATORS = frozenset({
+    'not', 'no', 'never', 'nothing', 'none', 'nor', 'cannot',
+    "don't", "doesn't", "didn't", "isn't", "wasn't", "aren't", "weren't",
+    "can't", "couldn't", "won't", "wouldn't", "shouldn't", "hasn't",
+    "haven't",
+})
+
+# word -> multiplier applied to the next sentiment word
+INTENSIFIERS = {
+    'absolutely': 1.4,
+    'extremely': 1.5,
+    'highly': 1.3,
+    'incredibly': 1.4,
+    'pretty': 1.1,
+    'quite': 1.1,
+    'really': 1.3,
+    'so': 1.2,
+    'somewhat': 0.7,
+    'slightly': 0.6,
+    'too': 1.2,
+    'totally': 1.3,
+    'very': 1.3,
+}
+
+# TextBlob damps negated words instead of mirroring them
+NEGATION_FACTOR = -0.5
+
+
+def tokenize(text):
+    """Split review text into lowercase word tokens"""
+    return TOKEN_RE.findall(text.lower()) if text else []
+
+
+def score_tokens(tokens):
+    """Return (polarity, subjectivity) for an already tokenized review"""
+    polarity_sum = 0.0
+    subjectivity_sum = 0.0
+    matched = 0
+
+    for i, token in enumerate(tokens):
+        entry = LEXICON.get(token)
+        if entry is None:
+            continue
+
+        polarity, subjectivity = entry
+        previous = tokens[i - 1] if i > 0 else None
+        before_previous = tokens[i - 2] if i > 1 else None
+
+        if previous in INTENSIFIERS:
+            factor = INTENSIFIERS[previous]
+            polarity *= factor
+            subjectivity *= factor
+            # "not very good": the negator sits before the intensifier
+            if before_previous in NEGATORS:
+                polarity *= NEGATION_FACTOR
+        elif previous in NEGATORS:
+            polarity *= NEGATION_FACTOR
+
+        polarity_sum += max(-1.0, min(1.0, polarity))
+        subjectivity_sum += max(0.0, min(1.0, subjectivity))
+        matched += 1
+
+    if not matched:
+        return 0.0, 0.0
+    return polarity_sum / matched, subjectivity_sum / matched
+
+
+def score_text(text):
+    """Return (polarity, subjectivity) for a review text"""
+    return score_tokens(tokenize(text))
+
+
+def sentiment_label(polarity):
+    """Map a polarity score to the Review.SENTIMENT_CHOICES labels"""
+    if polarity > 0:
+        return 'Positive'
+    if polarity < 0:
+        return 'Negative'
+    return 'Neutral'
+
+
+# Dense lookup tables for score_many: every lexicon, negator and intensifier
+# word gets a vocabulary id, id 0 stands for any other token. The vocabulary
+# is a few hundred words, so exact ids index small arrays directly. Hashed
+# tokens would need a sparse matrix (scipy) and could collide with lexicon
+# words, which would break equivalence with score_text.
+VOCABULARY = [''] + sorted(set(LEXICON) | NEGATORS | set(INTENSIFIERS))
+VOCABULARY_IDS = {word: i for i, word in enumerate(VOCABULARY)}
+
+_POLARITY = np.array([LEXICON.get(w, (0.0, 0.0))[0] for w in VOCABULARY])
+_SUBJECTIVITY = np.array([LEXICON.get(w, (0.0, 0.0))[1] for w in VOCABULARY])
+_IS_SENTIMENT = np.array([w in LEXICON for w in VOCABULARY])
+_IS_NEGATOR = np.array([w in NEGATORS for w in VOCABULARY])
+_IS_INTENSIFIER = np.array([w in INTENSIFIERS for w in VOCABULARY])
+_INTENSITY = np.array([INTENSIFIERS.get(w, 1.0) for w in VOCABULARY])
+
+
+def _shift(token_ids, review_index, by):
+    """Vocabulary id of the token ``by`` positions back within the same review"""
+    shifted = np.zeros_like(token_ids)
+    if len(token_ids) > by:
+        same_review = review_index[by:] == review_index[:-by]
+        shifted[by:] = np.where(same_review, token_ids[:-by], 0)
+    return shifted
+
+
+def score_many(texts):
+    """
+    Score a batch of review texts, equivalent to ``score_text`` per text.
+
+    All tokens of the batch are flattened into one id array; modifiers are
+    resolved by shifting that array and per-review sums are aggregated with
+    ``np.bincount``. Returns (polarity, subjectivity) float arrays.
+    """
+    count = len(texts)
+    lengths = np.zeros(count, dtype=np.int64)
+    ids = []
+    for i, text in enumerate(texts):
+        tokens = tokenize(text)
+        lengths[i] = len(tokens)
+        ids.extend(VOCABULARY_IDS.get(token, 0) for token in tokens)
+
+    token_ids = np.array(ids, dtype=np.int64)
+    review_index = np.repeat(np.arange(count), lengths)
+    previous = _shift(token_ids, review_index, 1)
+    before_previous = _shift(token_ids, review_index, 2)
+
+    intensified = _IS_INTENSIFIER[previous]
+    factor = _INTENSITY[previous]
+    polarity = _POLARITY[token_ids] * factor
+    subjectivity = _SUBJECTIVITY[token_ids] * factor
+
+    negated = np.where(
+        intensified, _IS_NEGATOR[before_previous], _IS_NEGATOR[previous]
+    )
+    polarity = np.where(negated, polarity * NEGATION_FACTOR, polarity)
+
+    matched = _IS_SENTIMENT[token_ids]
+    owners = review_index[matched]
+    matches = np.bincount(owners, minlength=count)
+    polarity_sum = np.bincount(
+        owners, weights=np.clip(polarity[matched], -1.0, 1.0), minlength=count
+    )
+    subjectivity_sum = np.bincount(
+        owners, weights=np.clip(subjectivity[matched], 0.0, 1.0),
+        minlength=count,
+    )
+
+    has_matches = matches > 0
+    polarity_avg = np.zeros(count)
+    subjectivity_avg = np.zeros(count)
+    np.divide(polarity_sum, matches, out=polarity_avg, where=has_matches)
+    np.divide(subjectivity_sum, matches, out=subjectivity_avg, where=has_matches)
+    return polarity_avg, subjectivity_avg
+
+
+def sentiment_labels(polarities):
+    """Vectorized ``sentiment_label``"""
+    return np.where(
+        polarities > 0, 'Positive',
+        np.where(polarities < 0, 'Negative', 'Neutral'),
+    )
+
+
+def score_chunk(ids, texts):
+    """Process pool task: score one chunk of (id, text) pairs"""
+    polarity, subjectivity = score_many(texts)
+    return ids, polarity, subjectivity, sentiment_labels(polarity)
@@ -0,0 +1,171 @@
+"""
+Capture of slow queries with their plans.
+
+Views decorated with ``@capture_slow_queries`` time each of their queries.
+A query slower than ``settings.SLOW_QUERY_MS`` is handed, with its
+parameters, to a background thread so the request doesn't wait: the thread
+runs ``EXPLAIN (ANALYZE, BUFFERS)`` on it (SELECTs only, inside a transaction
+that is rolled back) and stores a SlowQuery.
+
+SlowQuery is a ring buffer of ``settings.SLOW_QUERY_BUFFER_SIZE`` rows.
+Queries are grouped by a fingerprint of their SQL with literals and
+parameters taken out, and each fingerprint is explained at most once per
+``settings.SLOW_QUERY_EXPLAIN_INTERVAL`` seconds; EXPLAIN ANALYZE runs the
+query again, and a query that is slow once is usually slow every time.
+"""
+import functools
+import hashlib
+import json
+import logging
+import queue
+import re
+import sys
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connection, transaction
+from django.utils import timezone
+
+from core import memory
+
+
+logger = logging.getLogger(__name__)
+
+SLOT_SEQUENCE = 'core_slowquery_slot_seq'
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_SPACE = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    """(normalized SQL, MD5 of it): literals, parameters and IN lists as ?"""
+    normalized = _STRING.sub('?', sql).replace('%s', '?')
+    normalized = _NUMBER.sub('?', normalized)
+    normalized = _LIST.sub('(?)', normalized)
+    normalized = _SPACE.sub(' ', normalized).strip()
+    return normalized, hashlib.md5(normalized.encode()).hexdigest()
+
+
+def explain(sql, params):
+    """EXPLAIN (ANALYZE, BUFFERS) output of a SELECT, run and rolled back"""
+    timeout = int(settings.SLOW_QUERY_EXPLAIN_TIMEOUT_MS)
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(f'SET LOCAL statement_timeout = {timeout}')
+            cursor.execute('EXPLAIN (ANALYZE, BUFFERS) ' + sql, params)
+            plan = '\n'.join(row[0] for row in cursor.fetchall())
+        transaction.set_rollback(True)
+    return plan
+
+
+_explained = {}
+memory.register(
+    'slow_query_fingerprints',
+    lambda: sys.getsizeof(_explained) + 81 * len(_explained),
+)
+
+
+def record(sql, params, duration_ms, view, path, captured_at=None):
+    """Explain a slow query if due and store it in the next ring buffer slot"""
+    from core.models import SlowQuery
+
+    normalized, digest = fingerprint(sql)
+    plan = ''
+    seq_scan = None
+    now = time.monotonic()
+    last = _explained.get(digest)
+    due = last is None or now - last >= settings.SLOW_QUERY_EXPLAIN_INTERVAL
+    if due and sql.lstrip()[:6].lower() == 'select':
+        _explained[digest] = now
+        try:
+            plan = explain(sql, params)
+            seq_scan = 'Seq Scan' in plan
+        except DatabaseError as e:
+            plan = f'EXPLAIN failed: {e}'
+
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT nextval(%s)', [SLOT_SEQUENCE])
+        position = cursor.fetchone()[0]
+    slot = (position - 1) % settings.SLOW_QUERY_BUFFER_SIZE
+    return SlowQuery.objects.update_or_create(slot=slot, defaults={
+        'fingerprint': digest,
+        'normalized_sql': normalized,
+        'sql': sql,
+        'params': json.dumps(params, default=str),
+        'duration_ms': duration_ms,
+        'view': view[:100],
+        'path': path[:500],
+        'plan': plan,
+        'seq_scan': seq_scan,
+        'captured_at': captured_at or timezone.now(),
+    })[0]
+
+
+_queue = queue.Queue(maxsize=100)
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def _work():
+    while True:
+        item = _queue.get()
+        close_old_connections()
+        try:
+            record(*item)
+        except Exception:
+            logger.exception('Could not record a slow query')
+
+
+def enqueue(sql, params, duration_ms, view, path):
+    """Hand a slow query to the background thread; dropped when it's behind"""
+    global _worker
+    if _worker is None:
+        with _worker_lock:
+            if _worker is None:
+                _worker = threading.Thread(
+                    target=_work, name='slow-query-recorder', daemon=True)
+                _worker.start()
+    try:
+        _queue.put_nowait((sql, params, duration_ms, view, path, timezone.now()))
+    except queue.Full:
+        logger.debug('Slow query queue full, dropping %.0fms query', duration_ms)
+
+
+class SlowQueryCapture:
+    """Execute wrapper handing queries slower than the threshold to enqueue()"""
+
+    def __init__(self, request, threshold_ms):
+        self.request = request
+        self.threshold_ms = threshold_ms
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration_ms = (time.perf_counter() - started) * 1000
+            if duration_ms >= self.threshold_ms and not many:
+                match = getattr(self.request, 'resolver_match', None)
+                enqueue(
+                    sql, params, duration_ms,
+                    match.view_name if match else 'unresolved',
+                    self.request.get_full_path(),
+                )
+
+
+def capture_slow_queries(view):
+    """
+    View decorator capturing the view's slow queries; a no-op while
+    ``settings.SLOW_QUERY_MS`` is 0. Apply it right below @query_budget.
+    """
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        threshold_ms = settings.SLOW_QUERY_MS
+        if threshold_ms <= 0:
+            return view(request, *args, **kwargs)
+        with connection.execute_wrapper(SlowQueryCapture(request, threshold_ms)):
+            return view(request, *args, **kwargs)
+    return wrapper
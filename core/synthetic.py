@@ -0,0 +1,357 @@
+"""
+Synthetic catalog and review generation for scale testing.
+
+``CatalogModel.from_database()`` learns from the imported rows: word Markov
+chains over app names and review texts, real apps as per-category templates
+for the remaining app columns, the category mix and the distribution of
+reviews per app. ``CatalogModel.from_vocabulary()`` makes up the same
+from ``REVIEW_WORDS`` and ``CATEGORIES`` when there is no data to learn from.
+
+``generate_chunk`` turns one slice of app and review ids into rows and
+COPYs them; every chunk has its own seed, so the output only depends on the
+model, the seed and the chunk layout, not on the number of worker
+processes. ``app_csv_rows`` and ``review_csv_rows`` write the CSV files of
+the importer instead.
+"""
+import os
+import random
+import time
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from datetime import timedelta
+from itertools import accumulate
+
+import numpy as np
+from django.db import connection, transaction
+from django.db.models import Count
+
+from core.data_import import APP_COLUMNS, batched, copy_rows
+from core.sentiment import score_many, sentiment_labels
+
+
+# App columns copied from a template app of the same category
+TEMPLATE_COLUMNS = APP_COLUMNS[1:]
+
+REVIEW_COPY_COLUMNS = [
+    'id', 'app_id', 'user_id', 'review_text', 'rating', 'sentiment',
+    'sentiment_polarity', 'sentiment_subjectivity', 'status', 'created_at',
+    'updated_at',
+]
+
+APPROVAL_COPY_COLUMNS = [
+    'review_id', 'supervisor_id', 'action', 'comments', 'timestamp',
+]
+
+# Outcome of moderated user reviews
+APPROVED_SHARE = 0.85
+
+MAX_NAME_WORDS = 6
+MAX_REVIEW_WORDS = 60
+
+# Words of the made-up reviews (from_vocabulary, and the load tests)
+REVIEW_WORDS = (
+    'great app love it works fine but crashes sometimes after the update slow '
+    'battery drain useful features easy to use ads annoying best game ever '
+    'waste of time good support would recommend design simple clean interface'
+).split()
+
+CATEGORIES = [
+    'GAME', 'FAMILY', 'TOOLS', 'BUSINESS', 'MEDICAL', 'PRODUCTIVITY',
+    'PERSONALIZATION', 'COMMUNICATION', 'SPORTS', 'LIFESTYLE', 'FINANCE',
+]
+
+SENTIMENTS = ['Positive', 'Negative', 'Neutral']
+
+# Headers of the Google Play Store CSV files read by load_initial_data
+APP_CSV_HEADER = [
+    'App', 'Category', 'Rating', 'Reviews', 'Size', 'Installs', 'Type',
+    'Price', 'Content Rating', 'Genres', 'Last Updated', 'Current Ver',
+    'Android Ver',
+]
+REVIEW_CSV_HEADER = [
+    'App', 'Translated_Review', 'Sentiment', 'Sentiment_Polarity',
+    'Sentiment_Subjectivity',
+]
+
+
+class MarkovChain:
+    """Word-level Markov chain of a given order"""
+    START = '\x02'
+    END = '\x03'
+
+    def __init__(self, order=1):
+        self.order = order
+        self.transitions = {}
+
+    @classmethod
+    def train(cls, sequences, order=1):
+        """Chain over token lists"""
+        counts = defaultdict(Counter)
+        for tokens in sequences:
+            state = (cls.START,) * order
+            for token in tokens:
+                counts[state][token] += 1
+                state = state[1:] + (token,)
+            counts[state][cls.END] += 1
+
+        chain = cls(order)
+        chain.transitions = {
+            state: (list(following), list(accumulate(following.values())))
+            for state, following in counts.items()
+        }
+        return chain
+
+    def generate(self, rng, max_words):
+        """Space-joined token sequence, possibly empty"""
+        words = []
+        state = (self.START,) * self.order
+        while len(words) < max_words:
+            tokens, cumulative = self.transitions[state]
+            token = tokens[bisect_left(cumulative, rng.random() * cumulative[-1])]
+            if token == self.END:
+                break
+            words.append(token)
+            state = state[1:] + (token,)
+        return ' '.join(words)
+
+
+class CatalogModel:
+    """Distributions learned from the existing apps and reviews"""
+
+    def __init__(self, name_chain, review_chain, templates, category_weights,
+                 review_counts):
+        self.name_chain = name_chain
+        self.review_chain = review_chain
+        self.templates = templates
+        self.categories = list(category_weights)
+        self.category_cumulative = list(accumulate(category_weights.values()))
+        self.review_counts = review_counts
+
+    @classmethod
+    def from_database(cls, sample_size=50000):
+        """Train on up to ``sample_size`` apps and reviews, lowest ids first"""
+        from core.models import App, Review
+
+        # Learn from CSV imports (which carry a source_hash), not from earlier
+        # synthetic rows, when there are any
+        app_rows = App.objects.all()
+        if app_rows.filter(source_hash__isnull=False).exists():
+            app_rows = app_rows.filter(source_hash__isnull=False)
+        review_rows = Review.objects.all()
+        if review_rows.filter(source_hash__isnull=False).exists():
+            review_rows = review_rows.filter(source_hash__isnull=False)
+
+        templates = defaultdict(list)
+        category_weights = Counter()
+        names = []
+        apps = app_rows.order_by('id').values_list('name', *TEMPLATE_COLUMNS)
+        for name, *template in apps[:sample_size].iterator(chunk_size=5000):
+            names.append(name.split())
+            templates[template[0]].append(tuple(template))
+            category_weights[template[0]] += 1
+        if not names:
+            raise ValueError('No apps to learn from; load the bundled data first')
+
+        texts = review_rows.order_by('id').values_list('review_text', flat=True)
+        reviews = [
+            text.split() for text in texts[:sample_size].iterator(chunk_size=5000)
+            if text.strip()
+        ]
+        if not reviews:
+            raise ValueError('No reviews to learn from; load the bundled data first')
+
+        # Reviews per app, apps without reviews included
+        per_app = [
+            count for _, count in
+            review_rows.order_by().values_list('app').annotate(count=Count('id'))
+        ]
+        per_app += [0] * max(app_rows.count() - len(per_app), 0)
+
+        return cls(
+            name_chain=MarkovChain.train(names, order=1),
+            review_chain=MarkovChain.train(reviews, order=2),
+            templates=dict(templates),
+            category_weights=category_weights,
+            review_counts=np.array(per_app, dtype=np.float64),
+        )
+
+    @classmethod
+    def from_vocabulary(cls, seed=1, templates_per_category=20):
+        """Model of made-up apps named "Synthetic App" and word-salad reviews"""
+        rng = random.Random(seed)
+        reviews = [
+            rng.choices(REVIEW_WORDS, k=rng.randint(3, 30)) for _ in range(2000)
+        ]
+        templates = {}
+        for category in CATEGORIES:
+            templates[category] = []
+            for _ in range(templates_per_category):
+                paid = rng.random() < 0.08
+                templates[category].append((
+                    category,
+                    round(rng.uniform(1, 5), 1),
+                    rng.randint(0, 100000),
+                    f'{rng.randint(1, 100)}M',
+                    f'{10 ** rng.randint(1, 8):,}+',
+                    'Paid' if paid else 'Free',
+                    f'${rng.randint(1, 20)}.99' if paid else '0',
+                    'Everyone',
+                    category.title(),
+                    'January 7, 2018',
+                    f'{rng.randint(1, 9)}.{rng.randint(0, 9)}',
+                    '4.0.3 and up',
+                ))
+        return cls(
+            name_chain=MarkovChain.train([['Synthetic', 'App']]),
+            review_chain=MarkovChain.train(reviews, order=1),
+            templates=templates,
+            category_weights=dict.fromkeys(CATEGORIES, 1),
+            review_counts=np.ones(1),
+        )
+
+    def category(self, rng):
+        position = rng.random() * self.category_cumulative[-1]
+        return self.categories[bisect_left(self.category_cumulative, position)]
+
+    def app_name(self, rng, app_id):
+        """Generated name, made unique by the app id"""
+        name = ''
+        for _ in range(5):
+            name = self.name_chain.generate(rng, MAX_NAME_WORDS)
+            if name:
+                break
+        return f'{name} {app_id}'.strip()
+
+    def review_text(self, rng):
+        for _ in range(5):
+            text = self.review_chain.generate(rng, MAX_REVIEW_WORDS)
+            if text:
+                return text
+        return 'good'
+
+
+def app_csv_rows(model, rng, count):
+    """APP_CSV_HEADER rows of ``count`` generated apps, ids 0 to count - 1"""
+    for app_id in range(count):
+        template = rng.choice(model.templates[model.category(rng)])
+        yield [model.app_name(rng, app_id), *template]
+
+
+def review_csv_rows(model, rng, app_names, count):
+    """REVIEW_CSV_HEADER rows of ``count`` reviews of random ``app_names``"""
+    for _ in range(count):
+        yield [
+            rng.choice(app_names),
+            model.review_text(rng),
+            rng.choice(SENTIMENTS),
+            round(rng.uniform(-1, 1), 3),
+            round(rng.random(), 3),
+        ]
+
+
+# Set in each worker process by init_worker
+_worker = {}
+
+
+def init_worker(model, user_ids, supervisor_ids, settings):
+    """Process pool initializer: share the model once per worker"""
+    _worker.update(
+        model=model,
+        user_ids=user_ids,
+        supervisor_ids=supervisor_ids,
+        settings=settings,
+    )
+
+
+def generate_chunk(task):
+    """
+    Process pool task: generate and COPY apps ``app_start`` onwards and their
+    reviews and approvals. Returns (chunk, pid, apps, reviews, approvals,
+    seconds).
+    """
+    chunk, seed, app_start, app_count, review_start, review_count = task
+    started = time.perf_counter()
+    model = _worker['model']
+    user_ids = _worker['user_ids']
+    supervisor_ids = _worker['supervisor_ids']
+    settings = _worker['settings']
+
+    rng = random.Random(f'{seed}:{chunk}')
+    np_rng = np.random.default_rng([seed, chunk])
+    now = settings['now']
+    span = settings['days'] * 86400
+
+    apps = []
+    app_created = []
+    for app_id in range(app_start, app_start + app_count):
+        template = rng.choice(model.templates[model.category(rng)])
+        created = now - timedelta(seconds=rng.random() * span)
+        apps.append((app_id, model.app_name(rng, app_id)) + template + (created, created))
+        app_created.append(created)
+
+    # Share the chunk's reviews between its apps like the real data does
+    weights = np_rng.choice(model.review_counts, size=app_count)
+    if not weights.sum():
+        weights = np.ones(app_count)
+    per_app = np_rng.multinomial(review_count, weights / weights.sum())
+
+    reviews = []
+    texts = []
+    moderated = []
+    review_id = review_start
+    for app_id, created, count in zip(range(app_start, app_start + app_count),
+                                      app_created, per_app.tolist()):
+        users = min(np_rng.binomial(count, settings['user_fraction']), len(user_ids))
+        authors = rng.sample(user_ids, users) + [None] * (count - users)
+        for author in authors:
+            text = model.review_text(rng)
+            written = created + (now - created) * rng.random()
+            if author is None:
+                status = 'imported'
+            elif rng.random() < settings['pending_fraction']:
+                status = 'pending'
+            else:
+                status = 'approved' if rng.random() < APPROVED_SHARE else 'rejected'
+            reviews.append([review_id, app_id, author, text, status, written])
+            texts.append(text)
+            if status in ('approved', 'rejected'):
+                moderated.append((review_id, status, written))
+            review_id += 1
+
+    polarity, subjectivity = score_many(texts)
+    labels = sentiment_labels(polarity)
+    review_rows = []
+    for (review_id, app_id, author, text, status, written), pol, subj, label in zip(
+            reviews, polarity.tolist(), subjectivity.tolist(), labels.tolist()):
+        rating = None
+        if author is not None:
+            rating = float(min(5, max(1, round(3 + 2 * pol + rng.gauss(0, 0.7)))))
+        review_rows.append((
+            review_id, app_id, author, text, rating, label, pol, subj, status,
+            written, written,
+        ))
+
+    approvals = []
+    for review_id, status, written in moderated:
+        decided = min(written + timedelta(hours=1 + rng.random() * 71), now)
+        approvals.append((
+            review_id, rng.choice(supervisor_ids),
+            'approve' if status == 'approved' else 'reject', '', decided,
+        ))
+
+    try:
+        with transaction.atomic(), connection.cursor() as cursor:
+            copy_rows(
+                cursor, 'core_app',
+                ['id'] + APP_COLUMNS + ['created_at', 'updated_at'], apps,
+            )
+            for batch in batched(review_rows, 50000):
+                copy_rows(cursor, 'core_review', REVIEW_COPY_COLUMNS, batch)
+            copy_rows(cursor, 'core_reviewapproval', APPROVAL_COPY_COLUMNS, approvals)
+    finally:
+        connection.close()
+
+    return (
+        chunk, os.getpid(), len(apps), len(review_rows), len(approvals),
+        time.perf_counter() - started,
+    )
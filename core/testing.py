@@ -0,0 +1,57 @@
+"""
+Test helpers shared by the apps' test suites.
+
+``QueryBudgetTestCase`` runs with query budgets raising on a breach of
+the query count, so a request running more queries than its view's budget
+fails the test with QueryBudgetExceeded. SQL time breaches are only
+logged: they depend on how fast the machine is. The class data is the small catalog of
+``core.microbench.seed``. core.response_cache is off, so every request
+runs its view.
+"""
+from django.test import TestCase, override_settings
+
+from core import microbench
+from core.query_budget import get_budget
+
+
+@override_settings(
+    QUERY_BUDGET_MODE='raise',
+    QUERY_BUDGET_TIME_MODE='log',
+    RESPONSE_CACHE_SHARED_MAX_AGE=0,
+    REVIEW_DEDUP_ENABLED=False,
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+)
+class QueryBudgetTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.fixture = microbench.seed(apps=30, reviews_per_app=12, pending=20)
+        cls.app = cls.fixture.apps[0]
+        cls.query = cls.app.name.split()[0][:4]
+
+    def assertBudgetsDeclared(self, urlpatterns):
+        """Every view routed by ``urlpatterns`` declares a query budget"""
+        missing = [
+            pattern.name for pattern in urlpatterns
+            if get_budget(pattern.callback) is None
+        ]
+        self.assertEqual(missing, [], 'views without a @query_budget')
+
+    def request(self, method, url, data=None, user=None, status=200,
+                form=False, **extra):
+        """
+        Send a request as ``user`` (anonymous if None) and check the status;
+        a budget breach raises out of the test client. POST data is sent as
+        JSON unless ``form`` is set.
+        """
+        self.client.logout()
+        if user is not None:
+            self.client.force_login(user)
+        if method == 'get':
+            response = self.client.get(url, data, **extra)
+        elif form:
+            response = self.client.post(url, data, **extra)
+        else:
+            response = self.client.post(url, data, content_type='application/json', **extra)
+        self.assertEqual(response.status_code, status, getattr(response, 'data', None))
+        return response
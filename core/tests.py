@@ -1,3 +1,1318 @@
-from django.test import TestCase
+import bz2
+import csv
+import gzip
+import io
+import json
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import threading
+from urllib.request import urlopen
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.core.cache import cache, caches
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError, connection, transaction
+from django.http import HttpResponse, JsonResponse
+from django.test import (
+    LiveServerTestCase, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import ResolverMatch
+from django.utils import timezone
+
+from accounts.models import CustomUser
+from core import (
+    compression, db_health, enrichment, loadtest, memory, microbench, performance,
+    response_cache, slow_queries,
+)
+from core.cache_proxy import serve
+from core.compression import CompressionMiddleware
+from core.counts import EstimatedCountPaginator, estimated_count
+from core.data_import import (
+    IMPORT_LOCK_ID, CSVSource, csv_chunks, file_sha256, secondary_indexes,
+)
+from core.dedup import NearDuplicateIndex, find_near_duplicate, sign_reviews, signature
+from core.models import (
+    App, ImportCheckpoint, ImportFingerprint, RequestProfile, Review, ReviewApproval,
+    ReviewEnrichmentJob, ReviewSignature, SlowQuery, WorkerMemorySample,
+)
+from core.performance import PerformanceMiddleware
+from core.query_budget import QueryBudgetExceeded, QueryBudgetMiddleware, query_budget
+from core.sentiment import score_many, score_text, sentiment_label, sentiment_labels
+from core.synthetic import (
+    APP_CSV_HEADER, REVIEW_CSV_HEADER, CatalogModel, MarkovChain, app_csv_rows,
+    review_csv_rows,
+)
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def unbudgeted(request):
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1')
+        cursor.execute('SELECT 2')
+    return HttpResponse()
+
+
+@query_budget(queries=1)
+def two_queries(request):
+    return unbudgeted(request)
+
+
+@query_budget(queries=1, sql_ms=1)
+def slow_query(request):
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_sleep(0.01)')
+    return HttpResponse()
+
+
+class QueryBudgetMiddlewareTests(SimpleTestCase):
+    databases = {'default'}
+
+    def call(self, view):
+        request = RequestFactory().get('/budget/')
+
+        def get_response(request):
+            request.resolver_match = ResolverMatch(view, (), {}, url_name='budget')
+            return view(request)
+        return QueryBudgetMiddleware(get_response)(request)
+
+    @override_settings(QUERY_BUDGET_MODE='raise')
+    def test_breach_raises(self):
+        with self.assertRaisesMessage(QueryBudgetExceeded, '2 queries (budget 1)'):
+            self.call(two_queries)
+
+    @override_settings(QUERY_BUDGET_MODE='log')
+    def test_breach_is_logged(self):
+        with self.assertLogs('core.query_budget', 'WARNING') as logs:
+            self.assertEqual(self.call(two_queries).status_code, 200)
+        self.assertIn('/budget/', logs.output[0])
+
+    @override_settings(QUERY_BUDGET_MODE='raise', QUERY_BUDGET_TIME_MODE='log')
+    def test_sql_time_breach_is_only_logged(self):
+        with self.assertLogs('core.query_budget', 'WARNING') as logs:
+            self.assertEqual(self.call(slow_query).status_code, 200)
+        self.assertIn('ms of SQL (budget 1ms)', logs.output[0])
+
+    @override_settings(QUERY_BUDGET_MODE='raise', QUERY_BUDGET_TIME_MODE='raise')
+    def test_sql_time_breach_raises(self):
+        with self.assertRaisesMessage(QueryBudgetExceeded, 'ms of SQL (budget 1ms)'):
+            self.call(slow_query)
+
+    @override_settings(QUERY_BUDGET_MODE='off')
+    def test_off_skips_the_check(self):
+        self.assertEqual(self.call(two_queries).status_code, 200)
+
+    @override_settings(QUERY_BUDGET_MODE='raise')
+    def test_views_without_budget_are_not_checked(self):
+        self.assertEqual(self.call(unbudgeted).status_code, 200)
+
+
+@override_settings(PERFORMANCE_SAMPLE_RATE=1.0, PERFORMANCE_SERVER_TIMING=True)
+class PerformanceMiddlewareTests(SimpleTestCase):
+    databases = {'default'}
+
+    def setUp(self):
+        performance.reset()
+
+    def call(self, view):
+        request = RequestFactory().get('/measured/')
+
+        def get_response(request):
+            request.resolver_match = ResolverMatch(view, (), {}, url_name='measured')
+            cache.get('performance-test-missing')
+            cache.set('performance-test', 1)
+            cache.get('performance-test')
+            return view(request)
+        return PerformanceMiddleware(get_response)(request)
+
+    def test_server_timing_header(self):
+        response = self.call(unbudgeted)
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertIn('desc="2 queries"', response['Server-Timing'])
+        self.assertIn('desc="1 hits, 1 misses"', response['Server-Timing'])
+
+    def test_metrics_histograms(self):
+        self.call(unbudgeted)
+        self.call(unbudgeted)
+        metrics = performance.render_metrics()
+        self.assertIn('franklin_request_queries_bucket{view="measured",le="1"} 0', metrics)
+        self.assertIn('franklin_request_queries_bucket{view="measured",le="2"} 2', metrics)
+        self.assertIn('franklin_request_queries_count{view="measured"} 2', metrics)
+        self.assertIn(
+            'franklin_cache_requests_total{view="measured",result="miss"} 2', metrics)
+        self.assertIn('franklin_requests_total{view="measured",status="2xx"} 2', metrics)
+
+    @override_settings(METRICS_TOKEN='')
+    def test_metrics_are_not_served_without_a_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 404)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics_require_the_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 401)
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('franklin_requests_total', response.content.decode())
+
+    @override_settings(PERFORMANCE_SAMPLE_RATE=0.0)
+    def test_unsampled_requests_are_not_measured(self):
+        response = self.call(unbudgeted)
+        self.assertFalse(response.has_header('Server-Timing'))
+        self.assertNotIn('view="measured"', performance.render_metrics())
+
+
+@override_settings(COMPRESSION_MIN_BYTES=100)
+class CompressionMiddlewareTests(SimpleTestCase):
+    data = {'apps': [{'name': f'App {n}', 'rating': 4.5} for n in range(50)]}
+
+    def call(self, accept_encoding, response=None):
+        request = RequestFactory().get('/api/', HTTP_ACCEPT_ENCODING=accept_encoding)
+        return CompressionMiddleware(
+            lambda request: response or JsonResponse(self.data))(request)
+
+    def test_gzip(self):
+        response = self.call('gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(json.loads(gzip.decompress(response.content)), self.data)
+        self.assertEqual(response['Content-Length'], str(len(response.content)))
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+    def test_brotli_when_available(self):
+        response = self.call('br;q=1.0, gzip;q=0.5')
+        expected = 'br' if compression.brotli else 'gzip'
+        self.assertEqual(response['Content-Encoding'], expected)
+
+    def test_left_alone(self):
+        self.assertFalse(self.call('identity').has_header('Content-Encoding'))
+        self.assertFalse(self.call('gzip;q=0').has_header('Content-Encoding'))
+        small = self.call('gzip', JsonResponse({'ok': True}))
+        self.assertFalse(small.has_header('Content-Encoding'))
+        self.assertIn('Accept-Encoding', small['Vary'])
+        html = self.call('gzip', HttpResponse('<p>csrf</p>' * 100))
+        self.assertFalse(html.has_header('Content-Encoding'))
+
+
+class SlowQueryTests(TestCase):
+
+    def setUp(self):
+        slow_queries._explained.clear()
+
+    def test_fingerprint_ignores_literals_and_list_lengths(self):
+        first = slow_queries.fingerprint(
+            "SELECT * FROM core_app WHERE id IN (%s, %s) AND name = 'a' LIMIT 20")
+        second = slow_queries.fingerprint(
+            "SELECT  *  FROM core_app WHERE id IN (%s) AND name = 'it''s'\nLIMIT 5")
+        self.assertEqual(first, second)
+        self.assertEqual(
+            first[0], 'SELECT * FROM core_app WHERE id IN (?) AND name = ? LIMIT ?')
+
+    @override_settings(SLOW_QUERY_BUFFER_SIZE=2)
+    def test_record_explains_into_the_ring_buffer(self):
+        sql = 'SELECT * FROM core_app WHERE rating > %s'
+        first = slow_queries.record(sql, [0], 500.0, 'search_apps', '/api/search/')
+        self.assertIn('Execution Time', first.plan)
+        self.assertIsNotNone(first.seq_scan)
+        for i in (1, 2):
+            slow_queries.record(sql, [i], 500.0, 'search_apps', '/api/search/')
+        # The third capture took the first one's slot; the fingerprint was
+        # explained already
+        self.assertEqual(
+            sorted(SlowQuery.objects.values_list('params', 'plan')),
+            [('[1]', ''), ('[2]', '')],
+        )
+
+    def test_writes_are_not_explained(self):
+        captured = slow_queries.record(
+            'DELETE FROM core_app WHERE id = %s', [0], 500.0, 'x', '/')
+        self.assertEqual(captured.plan, '')
+        self.assertIsNone(captured.seq_scan)
+
+    @override_settings(SLOW_QUERY_MS=0.0001)
+    def test_capture_hands_slow_queries_over(self):
+        view = slow_queries.capture_slow_queries(unbudgeted)
+        with mock.patch.object(slow_queries, 'enqueue') as enqueue:
+            view(RequestFactory().get('/slow/?q=x'))
+        self.assertEqual(enqueue.call_count, 2)
+        self.assertEqual(enqueue.call_args[0][4], '/slow/?q=x')
+
+
+class ProfilingMiddlewareTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = CustomUser.objects.create_user('profiler', 'profiler@example.com', is_staff=True)
+        cls.user = CustomUser.objects.create_user('visitor', 'visitor@example.com')
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.enterContext(override_settings(PROFILE_DIR=directory))
+        self.client.force_login(self.staff)
+
+    def test_query_parameter_returns_the_call_tree(self):
+        response = self.client.get('/search/api/categories/?__profile=1')
+        self.assertEqual(response['Content-Type'], 'text/plain; charset=utf-8')
+        self.assertIn('get_categories (search/views.py:', response.content.decode())
+        profile = RequestProfile.objects.get(pk=response['X-Profile-Id'])
+        self.assertEqual(profile.view, 'search:categories')
+        self.assertTrue(os.path.exists(profile.file))
+
+    def test_header_keeps_the_response(self):
+        response = self.client.get('/search/api/categories/', HTTP_X_PROFILE='1')
+        self.assertIn('categories', response.json())
+        self.assertTrue(RequestProfile.objects.filter(pk=response['X-Profile-Id']).exists())
+
+    def test_only_staff_can_profile(self):
+        self.client.force_login(self.user)
+        response = self.client.get('/search/api/categories/?__profile=1')
+        self.assertNotIn('X-Profile-Id', response)
+        self.assertFalse(RequestProfile.objects.exists())
+
+    @override_settings(PROFILE_KEEP=1)
+    def test_old_profiles_are_deleted_with_their_files(self):
+        first = self.client.get('/search/api/categories/?__profile=1')
+        first_file = RequestProfile.objects.get(pk=first['X-Profile-Id']).file
+        self.client.get('/search/api/categories/?__profile=1')
+        self.assertEqual(RequestProfile.objects.count(), 1)
+        self.assertFalse(os.path.exists(first_file))
+
+
+class MemoryTests(TestCase):
+
+    def test_sample_records_rss_and_footprints(self):
+        memory.sample()
+        sample = WorkerMemorySample.objects.get()
+        self.assertEqual(sample.pid, os.getpid())
+        self.assertGreater(sample.rss_bytes, 0)
+        self.assertGreaterEqual(sample.peak_rss_bytes, sample.rss_bytes)
+        self.assertIn('cache:default', sample.footprints)
+        self.assertIn('performance_metrics', sample.footprints)
+
+    def test_endpoint_is_staff_only(self):
+        self.assertEqual(self.client.get('/debug/memory/').status_code, 403)
+        staff = CustomUser.objects.create_user(
+            'memory', 'memory@example.com', is_staff=True)
+        self.client.force_login(staff)
+        response = self.client.get('/debug/memory/?top=5')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['pid'], os.getpid())
+        self.assertEqual(self.client.get('/debug/memory/?key=x').status_code, 400)
+
+
+class EnrichmentQueueTests(TransactionTestCase):
+    """Workers claim jobs with SKIP LOCKED; needs commits, so no TestCase"""
+
+    def setUp(self):
+        app = App.objects.create(name='Enriched', category='TOOLS')
+        self.reviews = Review.objects.bulk_create([
+            Review(app=app, review_text=f'I love this great app, version {n}', sentiment='Neutral')
+            for n in range(5)
+        ])
+        self.jobs = ReviewEnrichmentJob.objects.bulk_create([
+            ReviewEnrichmentJob(review=review) for review in self.reviews
+        ])
+
+    def test_batch_scores_reviews_and_finishes_jobs(self):
+        self.assertEqual(enrichment.process_batch(batch_size=3), 3)
+        self.assertEqual(enrichment.process_batch(batch_size=3), 2)
+        self.assertEqual(enrichment.process_batch(), 0)
+        for review in Review.objects.all():
+            self.assertGreater(review.sentiment_polarity, 0)
+            self.assertEqual(review.sentiment, 'Positive')
+        self.assertFalse(ReviewEnrichmentJob.objects.exclude(status='done').exists())
+        self.assertFalse(ReviewEnrichmentJob.objects.filter(claimed_at=None).exists())
+
+    def test_locked_jobs_are_skipped_by_other_workers(self):
+        claimed = threading.Event()
+        release = threading.Event()
+
+        def slow_worker():
+            try:
+                with transaction.atomic(), connection.cursor() as cursor:
+                    cursor.execute(enrichment.CLAIM_JOBS_SQL, [2])
+                    claimed.set()
+                    release.wait(10)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=slow_worker)
+        thread.start()
+        try:
+            self.assertTrue(claimed.wait(10))
+            # The first two jobs are locked by the other transaction
+            self.assertEqual(enrichment.process_batch(batch_size=10), 3)
+        finally:
+            release.set()
+            thread.join()
+        pending = ReviewEnrichmentJob.objects.filter(status='pending')
+        self.assertEqual(sorted(pending.values_list('id', flat=True)),
+                         [job.id for job in self.jobs[:2]])
+        # Released back to the queue when that worker's transaction ended
+        self.assertEqual(enrichment.process_batch(batch_size=10), 2)
+
+    def test_scoring_errors_fail_only_their_job(self):
+        failing = self.reviews[0].id
+        score_text = enrichment.score_text
+
+        def flaky(text):
+            if text.endswith('version 0'):
+                raise ValueError('unscorable')
+            return score_text(text)
+
+        with mock.patch.object(enrichment, 'score_text', flaky):
+            self.assertEqual(enrichment.process_batch(), 5)
+            self.assertEqual(ReviewEnrichmentJob.objects.filter(status='done').count(), 4)
+            job = ReviewEnrichmentJob.objects.exclude(status='done').get()
+            self.assertEqual(job.review_id, failing)
+            self.assertEqual((job.status, job.attempts, job.last_error), ('pending', 1, 'unscorable'))
+            self.assertEqual(job.retry_at - job.finished_at, enrichment.RETRY_DELAY)
+            # Not claimed again before its retry time
+            self.assertEqual(enrichment.process_batch(), 0)
+
+            for attempt in range(2, enrichment.MAX_ATTEMPTS + 1):
+                ReviewEnrichmentJob.objects.filter(id=job.id).update(retry_at=timezone.now())
+                self.assertEqual(enrichment.process_batch(), 1)
+                job.refresh_from_db()
+                self.assertEqual(job.attempts, attempt)
+                if job.retry_at:
+                    self.assertEqual(job.retry_at - job.finished_at,
+                                     enrichment.retry_delay(attempt))
+        self.assertEqual((job.status, job.retry_at), ('failed', None))
+        self.assertEqual(enrichment.enrichment_stats()['failed'], 1)
+
+    def test_write_errors_fail_only_their_job(self):
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                CREATE FUNCTION test_refuse_review() RETURNS trigger AS $$
+                BEGIN
+                    RAISE EXCEPTION 'refused by test trigger';
+                END
+                $$ LANGUAGE plpgsql;
+                CREATE TRIGGER test_refuse_review BEFORE UPDATE ON core_review
+                FOR EACH ROW WHEN (NEW.review_text LIKE '%%version 0')
+                EXECUTE FUNCTION test_refuse_review();
+            """)
+        self.addCleanup(
+            connection.cursor().execute,
+            'DROP TRIGGER test_refuse_review ON core_review; DROP FUNCTION test_refuse_review()',
+        )
+        self.assertEqual(enrichment.process_batch(), 5)
+        job = ReviewEnrichmentJob.objects.exclude(status='done').get()
+        self.assertEqual((job.review_id, job.status, job.attempts),
+                         (self.reviews[0].id, 'pending', 1))
+        self.assertIn('refused by test trigger', job.last_error)
+        self.assertEqual(Review.objects.filter(sentiment='Positive').count(), 4)
+
+
+class LoadTestStatsTests(SimpleTestCase):
+
+    def recorder(self):
+        """
+        Warmup requests taking 10s from t=100, then from t=102 /a answering
+        in 1 to 100 ms and /b in 20 ms with one error in four
+        """
+        recorder = loadtest.Recorder()
+        for n in range(5):
+            recorder.add('GET /a', 100 + n * 0.1, 10.0, 200, True)
+        for n in range(100):
+            recorder.add('GET /a', 102 + n * 0.08, (n + 1) / 1000, 200, True)
+        for n in range(8):
+            recorder.add('GET /b', 102 + n, 0.02, 500 if n % 4 == 0 else 200, n % 4 != 0)
+        return recorder
+
+    def test_percentiles_after_the_warmup(self):
+        summary = loadtest.summarize(self.recorder(), started=100, warmup=2)
+        a = summary['endpoints']['GET /a']
+        self.assertEqual(a['requests'], 100)
+        self.assertAlmostEqual(a['p50'], 50.5)
+        self.assertAlmostEqual(a['p95'], 95.05)
+        self.assertAlmostEqual(a['p99'], 99.01)
+        self.assertAlmostEqual(a['max'], 100)
+        b = summary['endpoints']['GET /b']
+        self.assertEqual((b['errors'], b['error_rate']), (2, 0.25))
+        self.assertEqual(b['statuses'], {'200': 6, '500': 2})
+        # From the first request after the warmup to the end of the last one
+        self.assertAlmostEqual(summary['duration'], 8.02)
+        self.assertEqual(summary['total']['requests'], 108)
+        self.assertAlmostEqual(summary['total']['throughput'], 108 / 8.02)
+
+        with_warmup = loadtest.summarize(self.recorder(), started=100)
+        self.assertEqual(with_warmup['endpoints']['GET /a']['requests'], 105)
+        self.assertAlmostEqual(with_warmup['endpoints']['GET /a']['max'], 10000)
+        self.assertEqual(
+            loadtest.summarize(self.recorder(), started=100, warmup=60),
+            {'duration': 0.0, 'endpoints': {}, 'total': None})
+
+    def test_compare_needs_ratio_and_delta(self):
+        baseline = loadtest.summarize(self.recorder(), started=100, warmup=2)
+        after = json.loads(json.dumps(baseline))
+        a = after['endpoints']['GET /a']
+        b = after['endpoints']['GET /b']
+        # +22% but only +4.5 ms: noise
+        b['p50'] = 24.5
+        # +10 ms but only +10%: noise
+        a['p99'] += 9.9
+        # +30% and +15 ms
+        a['p50'] += 15.15
+        self.assertEqual(loadtest.compare(after, baseline), [
+            ('GET /a', 'p50', 50.5, 65.65),
+        ])
+        self.assertEqual(loadtest.compare(after, baseline, threshold=0.5), [])
+        self.assertEqual(
+            [metric for _, metric, _, _ in loadtest.compare(after, baseline, min_delta=1)],
+            ['p50', 'p50'])
+
+        after['total']['throughput'] *= 0.7
+        b['error_rate'] = 0.5
+        # Not in the baseline: nothing to compare with
+        after['endpoints']['GET /new'] = a
+        self.assertEqual(
+            [(label, metric) for label, metric, _, _ in loadtest.compare(after, baseline)],
+            [('GET /a', 'p50'), ('GET /b', 'error_rate'), ('(total)', 'throughput')])
+
+
+class FakeClock:
+    """Stands in for the time module: perf_counter() only moves when told"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def perf_counter(self):
+        return self.now
+
+
+class MicrobenchTests(TestCase):
+
+    def test_measure(self):
+        clock = FakeClock()
+        durations = iter([100, 100, 1, 2, 3, 4, 10])
+        calls = []
+
+        def call():
+            calls.append(1)
+            clock.now += next(durations) / 1000
+            if len(calls) % 2:
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+            return HttpResponse(status=500 if len(calls) == 7 else 200)
+
+        with mock.patch.object(microbench, 'time', clock):
+            stats = microbench.measure(microbench.Benchmark('stub', call), iterations=5, warmup=2)
+        self.assertEqual(len(calls), 7)
+        # The two 100 ms warmup calls are left out
+        self.assertEqual(stats['iterations'], 5)
+        self.assertAlmostEqual(stats['wall_ms'], 3)
+        self.assertAlmostEqual(stats['wall_p95_ms'], 10)
+        self.assertAlmostEqual(stats['wall_stdev_ms'], statistics.stdev([1, 2, 3, 4, 10]))
+        # Calls 3, 5 and 7 ran a query
+        self.assertAlmostEqual(stats['queries'], 3 / 5)
+        self.assertEqual(stats['errors'], 1)
+        self.assertEqual(microbench.calls(5, 2), 2 + 5 + 1)
+
+    def test_measure_allocations(self):
+        calls = []
+
+        def allocate():
+            calls.append(1)
+            return len(bytearray(1024 * 1024))
+
+        benchmarks = [
+            microbench.Benchmark('allocating', allocate),
+            microbench.Benchmark('idle', lambda: None),
+        ]
+        allocations = microbench.measure_allocations(benchmarks, iterations=10)
+        self.assertEqual(len(calls), 2)
+        self.assertGreaterEqual(allocations['allocating'], 1024)
+        self.assertLess(allocations['allocating'], 1100)
+        self.assertLess(allocations['idle'], 10)
+
+    def test_compare(self):
+        def stats(wall_ms=10.0, sql_ms=10.0, queries=2, errors=0, alloc_kib=100.0):
+            return {'wall_ms': wall_ms, 'sql_ms': sql_ms, 'queries': queries,
+                    'errors': errors, 'alloc_kib': alloc_kib}
+
+        baseline = {'benchmarks': {
+            name: stats() for name in ('same', 'noise', 'slower', 'more', 'fatter')
+        }}
+        baseline['benchmarks']['noise'] = stats(wall_ms=1.0)
+        results = {'benchmarks': {
+            'same': stats(wall_ms=12.0),
+            # +40% but only +0.4 ms
+            'noise': stats(wall_ms=1.4),
+            'slower': stats(sql_ms=13.0, errors=1),
+            'more': stats(queries=2.5),
+            'fatter': stats(alloc_kib=130.0),
+            'new': stats(wall_ms=1000.0, queries=50),
+        }}
+        self.assertEqual(microbench.compare(results, baseline), [
+            ('slower', 'errors', 0, 1),
+            ('slower', 'sql_ms', 10.0, 13.0),
+            ('more', 'queries', 2, 2.5),
+            ('fatter', 'alloc_kib', 100.0, 130.0),
+        ])
+        self.assertEqual(microbench.compare(results, baseline, threshold=0.1), [
+            ('same', 'wall_ms', 10.0, 12.0),
+            ('slower', 'errors', 0, 1),
+            ('slower', 'sql_ms', 10.0, 13.0),
+            ('more', 'queries', 2, 2.5),
+            ('fatter', 'alloc_kib', 100.0, 130.0),
+        ])
+        self.assertIn(('noise', 'wall_ms', 1.0, 1.4),
+                      microbench.compare(results, baseline, min_delta_ms=0.1))
+
+
+class SentimentTests(SimpleTestCase):
+    TEXTS = [
+        'Great app, I love it',
+        'not good at all, very bad update',
+        'not very good',
+        'really really awful',
+        'It opens. It closes.',
+        '',
+        None,
+        'Good good GOOD!!! but too slow and buggy',
+        'very',
+        'not',
+    ]
+
+    def test_score_many_matches_score_text(self):
+        polarity, subjectivity = score_many(self.TEXTS)
+        for text, pol, subj in zip(self.TEXTS, polarity, subjectivity):
+            expected = score_text(text)
+            self.assertAlmostEqual(pol, expected[0], msg=text)
+            self.assertAlmostEqual(subj, expected[1], msg=text)
+        self.assertEqual(
+            sentiment_labels(polarity).tolist(),
+            [sentiment_label(score_text(text)[0]) for text in self.TEXTS])
+
+    def test_modifiers(self):
+        good = score_text('good')[0]
+        self.assertGreater(score_text('very good')[0], good)
+        self.assertLess(score_text('not good')[0], 0)
+        self.assertLess(score_text('not very good')[0], 0)
+        self.assertEqual(score_text('It opens. It closes.'), (0.0, 0.0))
+
+    def test_empty_batch(self):
+        polarity, subjectivity = score_many([])
+        self.assertEqual(len(polarity), 0)
+        self.assertEqual(len(subjectivity), 0)
+
+
+class ScoreReviewSentimentTests(TestCase):
+
+    def test_backfills_missing_scores(self):
+        app = App.objects.create(name='Scored', category='TOOLS')
+        unscored, scored, blank = Review.objects.bulk_create([
+            Review(app=app, review_text='Terrible, it crashes all the time'),
+            Review(app=app, review_text='Terrible', sentiment='Positive',
+                   sentiment_polarity=0.5, sentiment_subjectivity=0.5),
+            Review(app=app, review_text='Great', sentiment='',
+                   sentiment_polarity=0.5, sentiment_subjectivity=0.5),
+        ])
+        call_command('score_review_sentiment', workers=1, stdout=io.StringIO())
+        unscored.refresh_from_db()
+        scored.refresh_from_db()
+        blank.refresh_from_db()
+        self.assertEqual(blank.sentiment, 'Positive')
+        self.assertEqual(blank.sentiment_polarity, 0.5)
+        self.assertEqual(
+            (unscored.sentiment_polarity, unscored.sentiment_subjectivity),
+            score_text(unscored.review_text))
+        self.assertEqual(unscored.sentiment, 'Negative')
+        # Only missing values are filled in without --overwrite
+        self.assertEqual(scored.sentiment, 'Positive')
+
+
+@override_settings(REVIEW_DEDUP_ENABLED=True, REVIEW_DEDUP_THRESHOLD=0.8)
+class NearDuplicateTests(TestCase):
+    ORIGINAL = (
+        'The offline maps stopped loading after the last update and support never '
+        'answered my emails, so I had to plan the whole road trip with a paper atlas'
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        app = App.objects.create(name='Deduplicated Maps', category='TRAVEL')
+        cls.original, cls.short, cls.other = Review.objects.bulk_create([
+            Review(app=app, review_text=cls.ORIGINAL),
+            Review(app=app, review_text='Great app'),
+            Review(app=app, review_text='Lovely colours and the widgets are handy on my tablet every day'),
+        ])
+
+    def test_sign_reviews_signs_each_review_once(self):
+        self.assertEqual(sign_reviews(batch_size=2), 3)
+        self.assertEqual(sign_reviews(), 0)
+        # Too short to compare: signed, but never a candidate
+        self.assertEqual(ReviewSignature.objects.get(review=self.short).bands, [])
+
+    def test_near_copy_matches_the_original(self):
+        sign_reviews()
+        review_id, similarity = find_near_duplicate(signature(self.ORIGINAL + ' instead'))
+        self.assertEqual(review_id, self.original.id)
+        self.assertGreaterEqual(similarity, 0.8)
+        self.assertEqual(find_near_duplicate(signature(self.ORIGINAL)), (self.original.id, 1.0))
+
+    def test_threshold_and_unrelated_texts(self):
+        sign_reviews()
+        near_copy = signature(self.ORIGINAL + ' instead')
+        with override_settings(REVIEW_DEDUP_THRESHOLD=1.0):
+            self.assertIsNone(find_near_duplicate(near_copy))
+        self.assertIsNone(find_near_duplicate(
+            signature('Battery drain is terrible since version two and it crashes on start')))
+        self.assertIsNone(find_near_duplicate(signature('Great app')))
+
+    def test_unsigned_reviews_are_not_candidates(self):
+        self.assertIsNone(find_near_duplicate(signature(self.ORIGINAL)))
+
+    def test_in_memory_index(self):
+        index = NearDuplicateIndex(threshold=0.8)
+        self.assertTrue(index.add(1, self.ORIGINAL))
+        self.assertFalse(index.add(2, 'Great app'))
+        self.assertFalse(index.add(1, self.ORIGINAL))
+        self.assertEqual(len(index), 1)
+        review_id, similarity = index.query(self.ORIGINAL + ' instead')
+        self.assertEqual(review_id, 1)
+        self.assertGreaterEqual(similarity, 0.8)
+        self.assertIsNone(index.query(self.ORIGINAL, exclude=1))
+        index.threshold = 1.0
+        self.assertIsNone(index.query(self.ORIGINAL + ' instead'))
+        self.assertEqual(index.query(self.ORIGINAL), (1, 1.0))
+
+    def test_dedupe_reviews_marks_later_copies(self):
+        copy = Review.objects.create(app=self.original.app, review_text=self.ORIGINAL + ' instead')
+        call_command('dedupe_reviews', apply=True, stdout=io.StringIO())
+        copy.refresh_from_db()
+        self.original.refresh_from_db()
+        self.assertEqual(copy.duplicate_of_id, self.original.id)
+        self.assertGreaterEqual(copy.duplicate_score, 0.8)
+        self.assertIsNone(self.original.duplicate_of_id)
+
+
+class DbHealthTests(TestCase):
+
+    def test_duplicate_indexes(self):
+        with connection.cursor() as cursor:
+            cursor.execute('CREATE INDEX test_rating_a ON core_app (rating)')
+            cursor.execute('CREATE INDEX test_rating_b ON core_app (rating)')
+        duplicates = [row['indexes'] for row in db_health.duplicate_indexes()]
+        self.assertTrue(any(
+            {'test_rating_a', 'test_rating_b'} <= set(indexes) for indexes in duplicates
+        ))
+
+    def test_table_bloat(self):
+        with connection.cursor() as cursor:
+            for table in ('test_bloat_tight', 'test_bloat_sparse'):
+                cursor.execute(f'CREATE TABLE {table} (id int, pad text)')
+                cursor.execute(
+                    f"INSERT INTO {table} SELECT i, repeat('x', 100) "
+                    'FROM generate_series(1, 20000) i')
+            cursor.execute('DELETE FROM test_bloat_sparse WHERE id % 10 <> 0')
+            cursor.execute('ANALYZE test_bloat_tight')
+            cursor.execute('ANALYZE test_bloat_sparse')
+        bloat = {row['table']: row['bloat_ratio'] for row in db_health.table_bloat()}
+        self.assertLess(bloat['test_bloat_tight'], 0.1)
+        self.assertGreater(bloat['test_bloat_sparse'], 0.85)
+
+    def test_admin_page(self):
+        staff = CustomUser.objects.create_superuser(
+            'health', 'health@example.com', 'password')
+        self.client.force_login(staff)
+        response = self.client.get('/admin/db-health/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('core_review', [row['table'] for row in response.context['tables']])
+
+
+class AdminChangelistTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = CustomUser.objects.create_superuser(
+            'changelist', 'changelist@example.com', 'password')
+        chess = App.objects.create(name='Chess Master', category='GAME', rating=4.7)
+        notes = App.objects.create(name='Notes', category='TOOLS', rating=2.5)
+        cls.crashes = Review.objects.create(
+            app=notes, review_text='Crashes every time I open it', sentiment='Negative')
+        cls.openings = Review.objects.create(
+            app=chess, review_text='Lovely openings trainer', sentiment='Positive')
+        cls.by_staff = Review.objects.create(
+            app=notes, user=cls.staff, review_text='Does what it says', sentiment='Neutral')
+
+    def setUp(self):
+        self.client.force_login(self.staff)
+
+    def search(self, term):
+        response = self.client.get('/admin/core/review/', {'q': term})
+        self.assertEqual(response.status_code, 200)
+        return set(response.context['cl'].result_list)
+
+    def test_review_search(self):
+        self.assertEqual(self.search('crashing'), {self.crashes})
+        self.assertEqual(self.search('chess'), {self.openings})
+        self.assertEqual(self.search('changelist'), {self.by_staff})
+
+    def test_rating_buckets(self):
+        response = self.client.get('/admin/core/app/', {'rating_bucket': '4.5'})
+        self.assertEqual(
+            [app.name for app in response.context['cl'].result_list], ['Chess Master'])
+
+    def test_fixed_choice_filters(self):
+        App.objects.filter(name='Chess Master').update(app_type='Paid', content_rating='Teen')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/admin/core/app/', {'app_type': 'Paid'})
+        self.assertEqual(
+            [app.name for app in response.context['cl'].result_list], ['Chess Master'])
+        distinct = [q['sql'] for q in queries.captured_queries if 'DISTINCT' in q['sql']]
+        self.assertFalse([sql for sql in distinct if 'app_type' in sql or 'content_rating' in sql])
+        response = self.client.get('/admin/core/app/', {'content_rating': 'Everyone'})
+        self.assertEqual(list(response.context['cl'].result_list), [])
+
+    def test_approval_search(self):
+        chess_approval = ReviewApproval.objects.create(
+            review=self.openings, supervisor=self.staff, action='approve', comments='fine')
+        notes_approval = ReviewApproval.objects.create(
+            review=self.crashes, action='reject', comments='chess spam')
+
+        def search(term):
+            response = self.client.get('/admin/core/reviewapproval/', {'q': term})
+            self.assertEqual(response.status_code, 200)
+            return set(response.context['cl'].result_list)
+
+        self.assertEqual(search('chess'), {chess_approval})
+        self.assertEqual(search('note'), {notes_approval})
+        self.assertEqual(search('changelist'), {chess_approval})
+        self.assertEqual(search('spam'), set())
+
+    def test_paginator_estimates_past_the_limit(self):
+        paginator = EstimatedCountPaginator(Review.objects.order_by('pk'), 2)
+        paginator.exact_count_limit = 0
+        with mock.patch('core.counts.estimated_count', return_value=1000000):
+            self.assertEqual(paginator.count, 1000000)
+        exact = EstimatedCountPaginator(Review.objects.order_by('pk'), 2)
+        self.assertEqual(exact.count, 3)
+
+
+class HealthTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_healthz_touches_no_database(self):
+        with self.assertNumQueries(0):
+            response = self.client.get('/healthz')
+        self.assertEqual(response.json(), {'status': 'ok'})
+
+    def test_readyz(self):
+        response = self.client.get('/readyz')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['databases']['default']['status'], 'ok')
+
+    def test_readyz_reports_unavailable_databases(self):
+        with mock.patch('django.db.backends.utils.CursorWrapper.execute',
+                        side_effect=DatabaseError('down')):
+            response = self.client.get('/readyz')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()['databases']['default']['error'], 'down')
+
+    def test_status_counts_are_cached(self):
+        App.objects.create(name='Counted', category='TOOLS')
+        self.assertEqual(estimated_count(App), 1)
+        self.assertEqual(self.client.get('/?format=json').json()['apps_count'], 1)
+        with self.assertNumQueries(0):
+            self.client.get('/?format=json')
+
+
+# core.response_cache only keeps responses with a shared default cache
+SHARED_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(tempfile.gettempdir(), 'franklin-search-test-cache'),
+    },
+    'responses': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'responses',
+    },
+}
+
+
+@override_settings(CACHES=SHARED_CACHES)
+class ResponseCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        caches['responses'].clear()
+        self.app = App.objects.create(name='Cached Chess', category='GAME', rating=4.2)
+
+    def results(self, url):
+        """(X-Response-Cache, the ids of the results) of a search"""
+        response = self.client.get(url)
+        return response['X-Response-Cache'], [app['id'] for app in response.json()['results']]
+
+    def test_second_request_is_served_from_the_cache(self):
+        url = f'/search/api/app/{self.app.id}/'
+        first = self.client.get(url)
+        self.assertEqual(first['X-Response-Cache'], 'miss')
+        self.assertIn('s-maxage=', first['Cache-Control'])
+        self.assertEqual(
+            first['Surrogate-Key'].split(),
+            [f'app:{self.app.id}', 'catalog', f'reviews:{self.app.id}'])
+        with self.assertNumQueries(0):
+            second = self.client.get(url)
+        self.assertEqual(second['X-Response-Cache'], 'hit')
+        self.assertEqual(second.content, first.content)
+
+    def test_approving_a_review_purges_the_app_reviews(self):
+        review = Review.objects.create(
+            app=self.app, review_text='Pending until approved', status='pending')
+        url = f'/search/api/app/{self.app.id}/reviews/'
+        self.assertEqual(self.client.get(url).json()['reviews'], [])
+        self.assertEqual(self.client.get(url)['X-Response-Cache'], 'hit')
+        with self.captureOnCommitCallbacks(execute=True):
+            review.status = 'approved'
+            review.save()
+        response = self.client.get(url)
+        self.assertEqual(response['X-Response-Cache'], 'miss')
+        self.assertEqual(len(response.json()['reviews']), 1)
+
+    def test_errors_are_not_cached(self):
+        url = '/search/api/app/0/'
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertFalse(self.client.get(url).has_header('X-Response-Cache'))
+
+    def test_app_update_purges_searches_and_both_categories(self):
+        self.app = App.objects.get(pk=self.app.pk)
+        game = '/search/api/search/?q=Chess&category=GAME'
+        tools = '/search/api/search/?q=Chess&category=TOOLS'
+        rated = '/search/api/search/?q=Chess&min_rating=4'
+        categories = '/search/api/categories/'
+        self.assertEqual(self.results(game), ('miss', [self.app.id]))
+        self.assertEqual(self.results(tools), ('miss', []))
+        self.assertEqual(self.results(rated), ('miss', [self.app.id]))
+        self.client.get(categories)
+        for url in (game, tools, rated, categories):
+            self.assertEqual(self.client.get(url)['X-Response-Cache'], 'hit')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.app.category = 'TOOLS'
+            self.app.rating = 3.5
+            self.app.save()
+        self.assertEqual(self.results(game), ('miss', []))
+        self.assertEqual(self.results(tools), ('miss', [self.app.id]))
+        self.assertEqual(self.results(rated), ('miss', []))
+        response = self.client.get(categories)
+        self.assertEqual(response['X-Response-Cache'], 'miss')
+
+    def test_app_loaded_without_category_purges_the_old_one(self):
+        app = App.objects.only('id').get(pk=self.app.pk)
+        with self.captureOnCommitCallbacks() as callbacks:
+            app.category = 'TOOLS'
+            app.save()
+        with mock.patch.object(response_cache, '_purge_now') as purge_now:
+            for callback in callbacks:
+                callback()
+        self.assertEqual(purge_now.call_args.args[0], [
+            f'app:{self.app.id}', 'apps', 'category:game', 'category:tools'])
+
+    @override_settings(CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+        'responses': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    })
+    def test_process_local_default_cache_keeps_no_responses(self):
+        url = f'/search/api/app/{self.app.id}/'
+        with mock.patch.object(response_cache, '_warned', False), \
+                self.assertLogs('core.response_cache', 'WARNING'):
+            self.client.get(url)
+        response = self.client.get(url)
+        self.assertEqual(response['X-Response-Cache'], 'miss')
+        self.assertIn('s-maxage=', response['Cache-Control'])
+
+
+@override_settings(CACHES=SHARED_CACHES)
+class CacheProxyIntegrationTests(LiveServerTestCase):
+    """The public API behind core.cache_proxy, purged through signals"""
+
+    def setUp(self):
+        caches['responses'].clear()
+        self.proxy = serve(self.live_server_url, port=0, quiet=True)
+        threading.Thread(target=self.proxy.serve_forever, daemon=True).start()
+        self.addCleanup(self.proxy.server_close)
+        self.addCleanup(self.proxy.shutdown)
+        self.proxy_url = f'http://127.0.0.1:{self.proxy.server_port}'
+
+    def get(self, path):
+        with urlopen(self.proxy_url + path) as response:
+            return response.headers['X-Cache'], json.load(response)
+
+    def test_app_change_is_purged_from_the_proxy(self):
+        with override_settings(RESPONSE_CACHE_PURGE_URLS=[self.proxy_url]):
+            app = App.objects.create(name='Proxied', category='TOOLS')
+            path = f'/search/api/app/{app.id}/'
+            self.assertEqual(self.get(path)[0], 'MISS')
+            self.assertEqual(self.get(path)[0], 'HIT')
+            app.name = 'Renamed'
+            app.save()
+            response_cache.flush()
+            result, data = self.get(path)
+        self.assertEqual(result, 'MISS')
+        self.assertEqual(data['name'], 'Renamed')
+
+
+def app_row(name, category='TOOLS', rating='4.1', reviews='10'):
+    """An APP_CSV_HEADER row"""
+    return [
+        name, category, rating, reviews, '5M', '1,000+', 'Free', '0', 'Everyone',
+        'Tools', 'January 7, 2018', '1.0', '4.0 and up',
+    ]
+
+
+class ImportTestCase(TransactionTestCase):
+    """
+    load_initial_data runs against CSV files written to a temporary
+    directory. The command commits as it goes, like it does in production.
+    """
+
+    APPS = [
+        app_row('Chess Clock'),
+        app_row('Chess Clock', rating='1.0'),
+        app_row('Pocket Atlas', 'TRAVEL', rating='nan', reviews='many'),
+        app_row('  '),
+    ]
+    REVIEWS = [
+        ['Chess Clock', 'Handy for blitz games', 'Positive', '0.4', '0.6'],
+        ['Chess Clock', 'Handy for blitz games', 'Positive', '0.4', '0.6'],
+        ['Chess Clock', 'nan', 'nan', 'nan', 'nan'],
+        ['Pocket Atlas', 'The maps are out of date', 'nan', '', ''],
+        ['Unknown App', 'Never imported', 'Neutral', '0', '0'],
+    ]
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def write_csv(self, name, header, rows, opener=open):
+        path = os.path.join(self.directory, name)
+        with opener(path, 'wt', newline='', encoding='utf-8') as file:
+            writer = csv.writer(file)
+            writer.writerow(header)
+            writer.writerows(rows)
+        return path
+
+    def load(self, apps=None, reviews=None, **options):
+        """Run load_initial_data on the given rows (APPS and REVIEWS by default)"""
+        if 'apps_file' not in options:
+            options['apps_file'] = self.write_csv(
+                'apps.csv', APP_CSV_HEADER, self.APPS if apps is None else apps)
+        if 'reviews_file' not in options:
+            options['reviews_file'] = self.write_csv(
+                'reviews.csv', REVIEW_CSV_HEADER, self.REVIEWS if reviews is None else reviews)
+        stdout = io.StringIO()
+        call_command('load_initial_data', stdout=stdout, **options)
+        return stdout.getvalue()
+
+    def imported(self):
+        """(app name, text, sentiment, polarity) of every review, in file order"""
+        return list(Review.objects.order_by('id').values_list(
+            'app__name', 'review_text', 'sentiment', 'sentiment_polarity'))
+
+
+class LoadInitialDataTests(ImportTestCase):
+
+    def test_full_load_cleans_rows(self):
+        self.load()
+        self.assertEqual(
+            list(App.objects.order_by('name').values_list('name', 'rating', 'reviews_count')),
+            [('Chess Clock', 4.1, 10), ('Pocket Atlas', None, 0)])
+        self.assertEqual(self.imported(), [
+            ('Chess Clock', 'Handy for blitz games', 'Positive', 0.4),
+            ('Chess Clock', 'Handy for blitz games', 'Positive', 0.4),
+            ('Pocket Atlas', 'The maps are out of date', None, None),
+        ])
+        reviews = Review.objects.all()
+        self.assertEqual({review.status for review in reviews}, {'imported'})
+        # Repeated texts get their own source keys
+        self.assertEqual(len({review.source_hash for review in reviews}), 3)
+
+        self.load(clear=True)
+        self.assertEqual(App.objects.count(), 2)
+        self.assertEqual(len(self.imported()), 3)
+
+    def test_chunks_keep_multi_line_records_whole(self):
+        reviews = [
+            ['Chess Clock', f'Review {number}\nwith "quotes", commas\n\nand lines', 'Positive', '', '']
+            if number % 3 else ['Pocket Atlas', f'Review {number}', 'Neutral', '', '']
+            for number in range(200)
+        ]
+        path = self.write_csv('reviews.csv', REVIEW_CSV_HEADER, reviews)
+        with open(path, 'rb') as file:
+            data = file.read()
+        for count in (1, 2, 7, 50):
+            chunks = csv_chunks(path, count)
+            self.assertEqual(len(chunks) > 1, count > 1)
+            self.assertEqual(chunks[0][0], data.index(b'\n') + 1)
+            self.assertEqual(chunks[-1][1], len(data))
+            self.assertEqual([end for _, end in chunks[:-1]], [start for start, _ in chunks[1:]])
+            records = []
+            for start, end in chunks:
+                text = data[start:end].decode()
+                records += list(csv.reader(io.StringIO(text, newline='')))
+            self.assertEqual(records, reviews)
+
+    def test_parallel_load_matches_a_single_process(self):
+        reviews = [
+            [name, f'Line one of {number}\nline two', 'Positive', '0.5', '0.5']
+            for number in range(50) for name in ('Chess Clock', 'Pocket Atlas')
+        ] + self.REVIEWS
+        self.load(reviews=reviews, workers=1)
+        expected = list(Review.objects.order_by('id').values_list(
+            'app__name', 'review_text', 'sentiment_polarity', 'source_hash'))
+        self.load(reviews=reviews, workers=3, clear=True)
+        self.assertEqual(list(Review.objects.order_by('id').values_list(
+            'app__name', 'review_text', 'sentiment_polarity', 'source_hash')), expected)
+
+
+class IncrementalImportTests(ImportTestCase):
+
+    def test_rerun_upserts_changes_only(self):
+        self.load()
+        pending = Review.objects.create(
+            app=App.objects.get(name='Chess Clock'), review_text='Submitted here',
+            status='pending')
+        apps = self.APPS + [app_row('Paper Maps', 'TRAVEL')]
+        apps[2] = app_row('Pocket Atlas', 'TRAVEL', rating='3.5')
+        reviews = [
+            self.REVIEWS[0],
+            ['Pocket Atlas', 'The maps are out of date', 'Negative', '-0.3', ''],
+            ['Paper Maps', 'Brand new', 'Positive', '0.2', '0.3'],
+        ]
+        output = self.load(apps=apps, reviews=reviews, delete_missing=True)
+        self.assertIn('running an incremental import', output)
+        self.assertIn('Apps upserted: 1 inserted, 1 updated, 1 unchanged, 2 skipped', output)
+        self.assertIn('Reviews upserted: 1 inserted, 1 updated, 1 unchanged', output)
+        self.assertIn('Reviews deleted: 1', output)
+
+        self.assertEqual(App.objects.get(name='Pocket Atlas').rating, 3.5)
+        self.assertEqual(self.imported(), [
+            ('Chess Clock', 'Handy for blitz games', 'Positive', 0.4),
+            ('Pocket Atlas', 'The maps are out of date', 'Negative', -0.3),
+            ('Chess Clock', 'Submitted here', None, None),
+            ('Paper Maps', 'Brand new', 'Positive', 0.2),
+        ])
+        self.assertEqual(Review.objects.get(id=pending.id).status, 'pending')
+
+    def interrupt_after(self, rows_done):
+        """Reviews file with new polarities, checkpointed as if a run stopped"""
+        path = self.write_csv('reviews.csv', REVIEW_CSV_HEADER, [
+            row[:3] + ['-0.9', '0.9'] for row in self.REVIEWS
+        ])
+        stat = os.stat(path)
+        ImportCheckpoint.objects.update_or_create(
+            source=f'reviews:{os.path.abspath(path)}',
+            defaults={
+                'file_size': stat.st_size, 'file_mtime': stat.st_mtime,
+                'rows_done': rows_done, 'completed': False,
+            },
+        )
+        return path
+
+    def test_interrupted_run_resumes_after_the_checkpoint(self):
+        self.load()
+        output = self.load(reviews_file=self.interrupt_after(2), batch_size=1)
+        self.assertIn('Resuming reviews import after 2 rows', output)
+        self.assertEqual([review[3] for review in self.imported()], [0.4, 0.4, -0.9])
+        self.assertTrue(ImportCheckpoint.objects.get(source__startswith='reviews:').completed)
+
+        output = self.load(reviews_file=self.interrupt_after(2), batch_size=1, restart=True)
+        self.assertNotIn('Resuming', output)
+        self.assertEqual([review[3] for review in self.imported()], [-0.9, -0.9, -0.9])
+
+
+class ImportSourceTests(ImportTestCase):
+
+    def test_compressed_files(self):
+        openers = {'gz': gzip.open, 'bz2': bz2.open}
+        if zstandard is not None:
+            openers['zst'] = zstandard.open
+        for extension, opener in openers.items():
+            with self.subTest(extension):
+                self.load(
+                    clear=True,
+                    apps_file=self.write_csv(
+                        f'apps.csv.{extension}', APP_CSV_HEADER, self.APPS, opener),
+                    reviews_file=self.write_csv(
+                        f'reviews.csv.{extension}', REVIEW_CSV_HEADER, self.REVIEWS, opener),
+                    # Compressed files can't be split: loaded by this process
+                    workers=2,
+                )
+                self.assertEqual(App.objects.count(), 2)
+                self.assertEqual(len(self.imported()), 3)
+
+    @skipUnless(zstandard is None, 'zstandard is installed')
+    def test_zstd_needs_zstandard(self):
+        path = os.path.join(self.directory, 'reviews.csv.zst')
+        with open(path, 'wb') as file:
+            file.write(b'\x28\xb5\x2f\xfd')
+        with self.assertRaises(ImportError):
+            list(CSVSource(path))
+
+    def test_stdin(self):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows([REVIEW_CSV_HEADER] + self.REVIEWS)
+        stdin = io.TextIOWrapper(io.BytesIO(gzip.compress(buffer.getvalue().encode())))
+        with mock.patch('sys.stdin', stdin):
+            self.load(reviews_file='-')
+        self.assertEqual(len(self.imported()), 3)
+        self.assertFalse(stdin.closed)
+        with self.assertRaises(CommandError):
+            self.load(apps_file='-', reviews_file='-')
+
+    def write_undecodable(self):
+        """Reviews file with a latin-1 row and a row with a missing field"""
+        path = os.path.join(self.directory, 'latin1.csv')
+        with open(path, 'wb') as file:
+            file.write(','.join(REVIEW_CSV_HEADER).encode() + b'\r\n')
+            file.write(b'Chess Clock,Good,Positive,0.5,0.5\r\n')
+            file.write(b'Chess Clock,Tr\xe8s bien,Positive,0.5,0.5\r\n')
+            file.write(b'Chess Clock,Missing a field,Positive,0.5\r\n')
+        return path
+
+    def test_undecodable_rows_are_rejected(self):
+        rejects = os.path.join(self.directory, 'rejects.csv')
+        output = self.load(reviews_file=self.write_undecodable(), rejects_file=rejects)
+        self.assertIn('2 malformed rows rejected', output)
+        self.assertEqual([review[1] for review in self.imported()], ['Good'])
+        with open(rejects, newline='', encoding='utf-8', errors='surrogateescape') as file:
+            rows = list(csv.reader(file))
+        self.assertEqual(rows[0], ['file', 'record', 'reason', 'fields'])
+        self.assertEqual([row[1:3] for row in rows[1:]], [['2', 'encoding'], ['3', 'field count']])
+        self.assertEqual(rows[1][4].encode('utf-8', 'surrogateescape'), b'Tr\xe8s bien')
+
+    def test_encoding_errors_policies(self):
+        path = self.write_undecodable()
+        with self.assertRaises(CommandError):
+            self.load(reviews_file=path, encoding_errors='strict')
+        self.load(reviews_file=path, encoding_errors='replace', clear=True)
+        self.assertEqual(
+            [review[1] for review in self.imported()], ['Good', 'Tr\ufffds bien'])
+
+
+class FastRebuildTests(ImportTestCase):
+
+    def indexes(self):
+        with connection.cursor() as cursor:
+            return secondary_indexes(cursor, ['core_app', 'core_review'])
+
+    def test_indexes_are_rebuilt(self):
+        self.load()
+        expected, indexes = self.imported(), self.indexes()
+        self.assertTrue(indexes)
+        for concurrently in (False, True):
+            with self.subTest(concurrently=concurrently):
+                output = self.load(clear=True, fast_rebuild=True, concurrently=concurrently)
+                self.assertIn('Phase timings', output)
+                self.assertEqual(self.imported(), expected)
+                self.assertEqual(self.indexes(), indexes)
+
+    def test_only_for_full_loads(self):
+        self.load()
+        with self.assertRaises(CommandError):
+            self.load(fast_rebuild=True)
+        with self.assertRaises(CommandError):
+            self.load(fast_rebuild=True, incremental=True)
+
+
+class SkipIfUnchangedTests(ImportTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.load()
+        self.files = {
+            'apps_file': os.path.join(self.directory, 'apps.csv'),
+            'reviews_file': os.path.join(self.directory, 'reviews.csv'),
+        }
+
+    def test_unchanged_files_are_skipped(self):
+        self.assertEqual(ImportFingerprint.objects.count(), 2)
+        output = self.load(skip_if_unchanged=True, **self.files)
+        self.assertIn('unchanged since the last import, skipping', output)
+
+        # Touched but identical: hashed once, then skipped on the stat alone
+        os.utime(self.files['reviews_file'], (0, 0))
+        with mock.patch('core.management.commands.load_initial_data.file_sha256',
+                        wraps=file_sha256) as hashed:
+            self.assertIn('skipping', self.load(skip_if_unchanged=True, **self.files))
+            self.assertIn('skipping', self.load(skip_if_unchanged=True, **self.files))
+        self.assertEqual(hashed.call_count, 1)
+        self.assertEqual(ImportFingerprint.objects.get(
+            source__startswith='reviews:').file_mtime, 0)
+
+    def test_changed_files_are_imported(self):
+        self.write_csv('reviews.csv', REVIEW_CSV_HEADER, self.REVIEWS + [
+            ['Pocket Atlas', 'Finally updated', 'Positive', '0.5', '0.5'],
+        ])
+        output = self.load(skip_if_unchanged=True, **self.files)
+        self.assertNotIn('skipping', output)
+        self.assertEqual(len(self.imported()), 4)
+        self.assertIn('skipping', self.load(skip_if_unchanged=True, **self.files))
+
+    def test_concurrent_import(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_lock(%s)', [IMPORT_LOCK_ID])
+        try:
+            output = self.load(skip_if_unchanged=True, **self.files)
+            self.assertIn('Another data import is running, skipping', output)
+            with self.assertRaises(CommandError):
+                self.load(**self.files)
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT pg_advisory_unlock(%s)', [IMPORT_LOCK_ID])
+
+
+class SyntheticDataTests(ImportTestCase):
+
+    def test_markov_chain_follows_its_training(self):
+        chain = MarkovChain.train([['a', 'b', 'c'], ['a', 'c']], order=1)
+        texts = {chain.generate(random.Random(seed), 10) for seed in range(50)}
+        self.assertEqual(texts, {'a b c', 'a c'})
+        self.assertEqual(chain.generate(random.Random(1), 1), 'a')
+
+    def test_vocabulary_csv_files_load(self):
+        model = CatalogModel.from_vocabulary(seed=3)
+        apps = list(app_csv_rows(model, random.Random(1), 30))
+        self.assertEqual(apps, list(app_csv_rows(model, random.Random(1), 30)))
+        self.assertEqual({len(row) for row in apps}, {len(APP_CSV_HEADER)})
+        names = [row[0] for row in apps]
+        self.assertEqual(len(set(names)), 30)
+        reviews = list(review_csv_rows(model, random.Random(2), names, 200))
+        self.assertEqual({len(row) for row in reviews}, {len(REVIEW_CSV_HEADER)})
+
+        self.load(apps=apps, reviews=reviews)
+        self.assertEqual(App.objects.count(), 30)
+        self.assertEqual(Review.objects.count(), 200)
+
+    def test_generate_synthetic_data(self):
+        self.load()
+        call_command(
+            'generate_synthetic_data', apps=20, reviews=300, users=5, supervisors=2,
+            user_fraction=0.5, chunk_size=6, workers=2, stdout=io.StringIO(),
+        )
+        self.assertEqual(App.objects.count(), 22)
+        generated = Review.objects.filter(source_hash__isnull=True)
+        self.assertEqual(generated.count(), 300)
+        self.assertEqual(
+            generated.filter(user__isnull=True).exclude(status='imported').count(), 0)
+        moderated = generated.filter(status__in=['approved', 'rejected'])
+        self.assertEqual(
+            ReviewApproval.objects.filter(review__in=moderated).count(), moderated.count())
+        review = generated.order_by('id').first()
+        self.assertEqual(
+            (review.sentiment_polarity, review.sentiment_subjectivity),
+            score_text(review.review_text))
+        # New rows keep using the sequences
+        self.assertGreater(App.objects.create(name='After', category='TOOLS').id,
+                           App.objects.exclude(name='After').order_by('-id')[0].id)
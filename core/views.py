@@ -1,14 +1,27 @@
-from django.http import JsonResponse, HttpResponse
+import time
+
+from django.http import Http404, JsonResponse, HttpResponse
 from django.shortcuts import render
-from core.models import App, Review
-from django.db.models import Count
+from django.db import DatabaseError, connections
 from django.template import Template, Context
+from django.conf import settings
+from django.utils.crypto import constant_time_compare
+from core import memory
+from core.counts import status_counts
+from core.performance import render_metrics
+from core.query_budget import query_budget
 
+@query_budget(queries=4)
 def status_view(request):
-    """Simple status view showing database stats"""
+    """
+    Simple status view showing database stats; the counts are estimates
+    refreshed every STATUS_COUNTS_SECONDS. Probes should use /healthz and
+    /readyz.
+    """
     try:
-        app_count = App.objects.count()
-        review_count = Review.objects.count()
+        counts = status_counts()
+        app_count = counts['apps']
+        review_count = counts['reviews']
 
         if request.GET.get('format') == 'json':
             return JsonResponse({
@@ -16,6 +29,7 @@ def status_view(request):
                 'database': 'connected',
                 'apps_count': app_count,
                 'reviews_count': review_count,
+                'counts_estimated': True,
                 'message': 'Franklin Google Play Store Search App is running!'
             })
 
@@ -109,3 +123,107 @@ def status_view(request):
             'status': 'error',
             'message': f'Database connection error: {str(e)}'
         }, status=500)
+
+
+@query_budget(queries=0)
+def metrics_view(request):
+    """
+    Request metrics of this process in the Prometheus text format. Not
+    served at all unless METRICS_TOKEN is set.
+    """
+    if not settings.METRICS_TOKEN:
+        raise Http404
+    if not constant_time_compare(
+        request.headers.get('Authorization', ''),
+        f'Bearer {settings.METRICS_TOKEN}',
+    ):
+        return HttpResponse('Unauthorized', status=401)
+    return HttpResponse(
+        render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
+
+
+@query_budget(queries=2)
+def memory_view(request):
+    """
+    RSS, cache footprints and a tracemalloc snapshot diff of the worker that
+    handles the request. Staff only, or the METRICS_TOKEN bearer token.
+
+    ``top`` allocation sites grouped by ``key`` (lineno, filename or
+    traceback), compared ``against`` the previous or the baseline snapshot;
+    ``reset=1`` makes this snapshot the baseline.
+    """
+    token_ok = settings.METRICS_TOKEN and constant_time_compare(
+        request.headers.get('Authorization', ''),
+        f'Bearer {settings.METRICS_TOKEN}',
+    )
+    if not token_ok and not (request.user.is_authenticated and request.user.is_staff):
+        return JsonResponse({'error': 'Staff only'}, status=403)
+
+    key = request.GET.get('key', 'lineno')
+    against = request.GET.get('against', 'previous')
+    if key not in ('lineno', 'filename', 'traceback') or against not in ('previous', 'baseline'):
+        return JsonResponse({'error': 'Invalid key or against'}, status=400)
+    try:
+        top = min(max(int(request.GET.get('top', 20)), 1), 200)
+    except ValueError:
+        return JsonResponse({'error': 'Invalid top'}, status=400)
+
+    data = memory.report()
+    data['snapshot'] = memory.snapshot_report(
+        top=top, key=key, against=against, reset=request.GET.get('reset') == '1',
+    )
+    return JsonResponse(data)
+
+
+READINESS_SQL = """
+    SELECT pg_is_in_recovery(),
+           extract(epoch FROM now() - pg_last_xact_replay_timestamp()),
+           (SELECT count(*) FROM pg_stat_activity WHERE datname = current_database()),
+           current_setting('max_connections')::int
+"""
+
+
+@query_budget(queries=0)
+def healthz_view(request):
+    """Liveness: the process serves requests; touches no database"""
+    return JsonResponse({'status': 'ok'})
+
+
+# One query per configured database
+@query_budget(queries=len(settings.DATABASES))
+def readyz_view(request):
+    """
+    Readiness: every configured database answers; replicas must not lag
+    more than READINESS_MAX_REPLICA_LAG_SECONDS. 503 otherwise.
+    """
+    ready = True
+    databases = {}
+    for alias in settings.DATABASES:
+        started = time.perf_counter()
+        try:
+            with connections[alias].cursor() as cursor:
+                cursor.execute(READINESS_SQL)
+                replica, lag, connections_used, max_connections = cursor.fetchone()
+        except DatabaseError as e:
+            ready = False
+            databases[alias] = {'status': 'unavailable', 'error': str(e)}
+            continue
+        status = 'ok'
+        # An idle primary has no replay timestamp, so no lag
+        if replica and lag is not None and lag > settings.READINESS_MAX_REPLICA_LAG_SECONDS:
+            ready = False
+            status = 'lagging'
+        databases[alias] = {
+            'status': status,
+            'ping_ms': round((time.perf_counter() - started) * 1000, 1),
+            'replica': replica,
+            'replica_lag_seconds': float(lag) if replica and lag is not None else None,
+            'connections': connections_used,
+            'max_connections': max_connections,
+            'persistent_connections': connections[alias].settings_dict['CONN_MAX_AGE'] != 0,
+        }
+    return JsonResponse(
+        {'status': 'ok' if ready else 'unavailable', 'databases': databases},
+        status=200 if ready else 503,
+    )
@@ -11,6 +11,10 @@ echo "PostgreSQL started"
 echo "Running migrations..."
 python manage.py migrate
 
+# Hash and compress the static files for WhiteNoise
+echo "Collecting static files..."
+python manage.py collectstatic --noinput
+
 # Create superuser if it doesn't exist
 echo "Creating superuser..."
 python manage.py shell -c "
@@ -27,9 +31,23 @@ else:
 echo "Creating seed users..."
 python manage.py seed_users
 
-# Load initial data if not already loaded
-echo "Loading initial data..."
-python manage.py load_initial_data
+# Load initial data unless the CSV files are unchanged since the last import,
+# then sign the new reviews for near-duplicate detection.
+# LOAD_INITIAL_DATA=background (default) imports while the server starts,
+# foreground waits for the import, skip does not run it at all.
+case "${LOAD_INITIAL_DATA:-background}" in
+  background)
+    echo "Loading initial data in the background..."
+    (python manage.py load_initial_data --skip-if-unchanged && python manage.py sign_reviews) &
+    ;;
+  foreground)
+    echo "Loading initial data..."
+    python manage.py load_initial_data --skip-if-unchanged && python manage.py sign_reviews
+    ;;
+  *)
+    echo "Skipping initial data load"
+    ;;
+esac
 
 # Start server
 exec "$@"
\ No newline at end of file
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 
 from pathlib import Path
 import os
+import sys
 from decouple import config
 import dj_database_url
 
@@ -28,6 +29,8 @@ SECRET_KEY = config('SECRET_KEY', default='django-insecure-2qd%(!lpl01%_lunyh6+p
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = config('DEBUG', default=True, cast=bool)
 
+TESTING = len(sys.argv) > 1 and sys.argv[1] == 'test'
+
 ALLOWED_HOSTS = config('ALLOWED_HOSTS', default='localhost,127.0.0.1,0.0.0.0').split(',')
 
 
@@ -56,14 +59,20 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
+    'core.performance.PerformanceMiddleware',
+    'core.compression.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.memory.WorkerMemoryMiddleware',
+    'core.query_budget.QueryBudgetMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.profiling.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.response_cache.ResponseCacheMiddleware',
 ]
 
 ROOT_URLCONF = 'franklin_search.urls'
@@ -150,6 +159,21 @@ STATICFILES_DIRS = [
     BASE_DIR / 'static',
 ]
 
+# collectstatic writes content-hashed copies of the static files, gzipped
+# and, with the brotli package, brotli-compressed; WhiteNoise serves the
+# hashed names as immutable. Tests render templates without collectstatic.
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': (
+            'django.contrib.staticfiles.storage.StaticFilesStorage' if TESTING else
+            'whitenoise.storage.CompressedManifestStaticFilesStorage'
+        ),
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -180,6 +204,99 @@ EMAIL_BACKEND = config('EMAIL_BACKEND',
 # Custom user model
 AUTH_USER_MODEL = 'accounts.CustomUser'
 
+# Near-duplicate review detection (core.dedup)
+REVIEW_DEDUP_ENABLED = config('REVIEW_DEDUP_ENABLED', default=True, cast=bool)
+REVIEW_DEDUP_THRESHOLD = config('REVIEW_DEDUP_THRESHOLD', default=0.8, cast=float)
+# Reviews sharing a band with a submission compared with it, at most
+REVIEW_DEDUP_MAX_CANDIDATES = config('REVIEW_DEDUP_MAX_CANDIDATES', default=500, cast=int)
+# Submissions at least this similar to an existing review are rejected
+# without moderation; 0 disables auto-rejection
+REVIEW_DEDUP_AUTO_REJECT_SCORE = config('REVIEW_DEDUP_AUTO_REJECT_SCORE', default=0.0, cast=float)
+
+# Review full-text search: only the newest N matches are ranked
+REVIEW_SEARCH_MAX_CANDIDATES = config('REVIEW_SEARCH_MAX_CANDIDATES', default=10000, cast=int)
+
+# Request instrumentation (core.performance): share of requests measured,
+# whether they get a Server-Timing header (internal timings: only with DEBUG
+# by default), and the bearer token /metrics requires (404 when empty)
+PERFORMANCE_SAMPLE_RATE = config('PERFORMANCE_SAMPLE_RATE', default=1.0, cast=float)
+PERFORMANCE_SERVER_TIMING = config('PERFORMANCE_SERVER_TIMING', default=DEBUG, cast=bool)
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+
+# The default cache counts hits and misses for the request metrics. It is
+# local to the process: with several server processes use a shared one,
+# e.g. CACHE_BACKEND=core.performance.InstrumentedRedisCache and
+# CACHE_LOCATION=redis://redis:6379/0, or logging out in one process leaves
+# the session and user cached in the others
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='core.performance.InstrumentedLocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default=''),
+    },
+    # Whole API responses (core.response_cache), always local to the process;
+    # only used with a shared default cache, which carries the purges
+    'responses': {
+        'BACKEND': 'core.performance.InstrumentedLocMemCache',
+        'LOCATION': 'responses',
+        'OPTIONS': {
+            'MAX_ENTRIES': config('RESPONSE_CACHE_MAX_ENTRIES', default=5000, cast=int),
+        },
+    },
+}
+
+# Sessions are read from the cache and written through to the database;
+# users are cached for USER_CACHE_SECONDS (accounts.backends, 0 disables)
+SESSION_ENGINE = config('SESSION_ENGINE', default='django.contrib.sessions.backends.cached_db')
+AUTHENTICATION_BACKENDS = ['accounts.backends.CachedModelBackend']
+USER_CACHE_SECONDS = config('USER_CACHE_SECONDS', default=60, cast=int)
+
+# Per-view query budgets (core.query_budget): 'raise' on a breach, 'log' it,
+# or 'off'. SQL time depends on the machine, so tests only log its breaches
+QUERY_BUDGET_MODE = config(
+    'QUERY_BUDGET_MODE', default='raise' if DEBUG or TESTING else 'log'
+)
+QUERY_BUDGET_TIME_MODE = config(
+    'QUERY_BUDGET_TIME_MODE', default='log' if TESTING else QUERY_BUDGET_MODE
+)
+
+# Slow query capture (core.slow_queries): queries of the search and review
+# listing views slower than this many milliseconds are stored with their
+# plan (0 disables); the ring buffer size, how often one query fingerprint is
+# explained again and how long EXPLAIN ANALYZE may run
+SLOW_QUERY_MS = config('SLOW_QUERY_MS', default=0 if TESTING else 200, cast=float)
+SLOW_QUERY_BUFFER_SIZE = config('SLOW_QUERY_BUFFER_SIZE', default=1000, cast=int)
+SLOW_QUERY_EXPLAIN_INTERVAL = config('SLOW_QUERY_EXPLAIN_INTERVAL', default=300, cast=int)
+SLOW_QUERY_EXPLAIN_TIMEOUT_MS = config('SLOW_QUERY_EXPLAIN_TIMEOUT_MS', default=10000, cast=int)
+
+# Request profiling (core.profiling): where staff users' profiles are saved
+# (empty disables profiling) and how many are kept
+PROFILE_DIR = config('PROFILE_DIR', default=str(BASE_DIR / 'profiles'))
+PROFILE_KEEP = config('PROFILE_KEEP', default=200, cast=int)
+
+# Worker memory (core.memory): how often each worker stores its RSS (0
+# disables), for how long samples are kept, and how many frames tracemalloc
+# records per allocation (0 leaves it off; /debug/memory/ needs it)
+MEMORY_SAMPLE_SECONDS = config('MEMORY_SAMPLE_SECONDS', default=0 if TESTING else 60, cast=int)
+MEMORY_SAMPLE_RETENTION_DAYS = config('MEMORY_SAMPLE_RETENTION_DAYS', default=7, cast=int)
+MEMORY_TRACEMALLOC_FRAMES = config('MEMORY_TRACEMALLOC_FRAMES', default=0, cast=int)
+
+# JSON responses of at least this many bytes are compressed (core.compression)
+COMPRESSION_MIN_BYTES = config('COMPRESSION_MIN_BYTES', default=1024, cast=int)
+
+# Public API response cache (core.response_cache): max-age for browsers,
+# s-maxage for shared caches and this process (0 disables caching here), and
+# comma-separated proxy URLs that get a PURGE request on every purge
+RESPONSE_CACHE_MAX_AGE = config('RESPONSE_CACHE_MAX_AGE', default=30, cast=int)
+RESPONSE_CACHE_SHARED_MAX_AGE = config('RESPONSE_CACHE_SHARED_MAX_AGE', default=300, cast=int)
+RESPONSE_CACHE_PURGE_URLS = [
+    url for url in config('RESPONSE_CACHE_PURGE_URLS', default='').split(',') if url
+]
+
+# Health endpoints (core.views): how long the homepage's estimated counts
+# are cached, and the replica lag at which /readyz reports unavailable
+STATUS_COUNTS_SECONDS = config('STATUS_COUNTS_SECONDS', default=60, cast=int)
+READINESS_MAX_REPLICA_LAG_SECONDS = config('READINESS_MAX_REPLICA_LAG_SECONDS', default=30, cast=float)
+
 # Login URLs
 LOGIN_URL = '/accounts/login/'
 LOGIN_REDIRECT_URL = '/'
@@ -16,10 +16,18 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
-from core.views import status_view
+from core.admin import db_health_view
+from core.views import (
+    healthz_view, memory_view, metrics_view, readyz_view, status_view,
+)
 
 urlpatterns = [
     path('', status_view, name='status'),
+    path('healthz', healthz_view, name='healthz'),
+    path('readyz', readyz_view, name='readyz'),
+    path('metrics', metrics_view, name='metrics'),
+    path('debug/memory/', memory_view, name='debug_memory'),
+    path('admin/db-health/', admin.site.admin_view(db_health_view), name='admin_db_health'),
     path('admin/', admin.site.urls),
     path('accounts/', include('accounts.urls')),
     path('search/', include('search.urls')),
@@ -1,3 +1,233 @@
-from django.test import TestCase
+import threading
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from core.models import App, Review, ReviewApproval, ReviewEnrichmentJob, ReviewSignature
+from core.testing import QueryBudgetTestCase
+from reviews import urls
+
+
+class ReviewsQueryBudgetTests(QueryBudgetTestCase):
+    """Every reviews endpoint stays within its query budget"""
+
+    def test_every_url_has_a_budget(self):
+        self.assertBudgetsDeclared(urls.urlpatterns)
+
+    def test_app_reviews(self):
+        url = reverse('reviews:app_reviews', args=[self.app.id])
+        for user in (None, self.fixture.reviewer):
+            self.request('get', url, {'page': 2, 'limit': 5, 'sentiment': 'Positive'}, user=user)
+        self.request('get', reverse('reviews:app_reviews', args=[0]), status=404)
+
+    def test_submit_review(self):
+        url = reverse('reviews:submit_review', args=[self.app.id])
+        data = {'review_text': 'A perfectly ordinary review', 'rating': 4}
+        headers = {'HTTP_IDEMPOTENCY_KEY': 'budget-test'}
+        self.request('post', url, data, user=self.fixture.reviewer, status=201, **headers)
+        # The retry is replayed, a new submission for the same app refused
+        self.request('post', url, data, user=self.fixture.reviewer, status=201, **headers)
+        self.request('post', url, data, user=self.fixture.reviewer, status=400)
+        self.request('post', url, data, status=403)
+
+    @override_settings(REVIEW_DEDUP_ENABLED=True)
+    def test_submission_is_signed_and_flagged_as_near_duplicate(self):
+        text = (
+            'The offline maps stopped loading after the last update and support never '
+            'answered my emails, so I had to plan the whole road trip with a paper atlas'
+        )
+        first = self.request(
+            'post', reverse('reviews:submit_review', args=[self.app.id]),
+            {'review_text': text, 'rating': 2}, user=self.fixture.reviewer, status=201)
+        original = Review.objects.get(id=first.data['review']['id'])
+        self.assertEqual(len(ReviewSignature.objects.get(review=original).bands), 16)
+
+        second = self.request(
+            'post', reverse('reviews:submit_review', args=[self.fixture.apps[1].id]),
+            {'review_text': text + ' instead', 'rating': 2},
+            user=self.fixture.reviewer, status=201)
+        copy = Review.objects.get(id=second.data['review']['id'])
+        self.assertEqual(copy.duplicate_of_id, original.id)
+        self.assertGreaterEqual(copy.duplicate_score, 0.8)
+        self.assertEqual(copy.status, 'pending')
+
+    @override_settings(REVIEW_DEDUP_AUTO_REJECT_SCORE=0.9)
+    def test_near_duplicate_is_rejected_and_audited(self):
+        original = Review.objects.filter(app=self.app).first()
+        url = reverse('reviews:submit_review', args=[self.app.id])
+        data = {'review_text': original.review_text + '!', 'rating': 4}
+        headers = {'HTTP_IDEMPOTENCY_KEY': 'near-duplicate'}
+        with mock.patch('reviews.views.find_near_duplicate', return_value=(original.id, 0.95)):
+            response = self.request(
+                'post', url, data, user=self.fixture.reviewer, status=422, **headers)
+            self.assertIn('near-duplicate', response.data['error'])
+            self.assertEqual(response.data['review']['status'], 'rejected')
+            # The retry gets the same answer, and no second audit row
+            self.request('post', url, data, user=self.fixture.reviewer, status=422, **headers)
+
+        review = Review.objects.get(id=response.data['review']['id'])
+        self.assertEqual(review.duplicate_of_id, original.id)
+        approval = ReviewApproval.objects.get(review=review)
+        self.assertIsNone(approval.supervisor)
+        self.assertEqual(approval.action, 'reject')
+        self.assertEqual(
+            approval.comments,
+            f'Automatically rejected: 95% similar to review {original.id}')
+
+    def search_pages(self, params, user=None):
+        """The ids of every page of a review search, following the cursor"""
+        url = reverse('reviews:search_reviews')
+        pages = []
+        cursor = None
+        while True:
+            page_params = dict(params, cursor=cursor) if cursor else params
+            response = self.request('get', url, page_params, user=user)
+            pages.append([result['id'] for result in response.data['results']])
+            cursor = response.data['pagination']['next_cursor']
+            self.assertEqual(response.data['pagination']['has_next'], cursor is not None)
+            if cursor is None:
+                return pages
+
+    def test_search_reviews(self):
+        url = reverse('reviews:search_reviews')
+        # The pending reviews all share one text: the cursor goes by id
+        pending = self.search_pages(
+            {'q': 'update', 'status': 'pending', 'limit': 5}, user=self.fixture.supervisor)
+        self.assertEqual([len(page) for page in pending], [5, 5, 5, 5])
+        self.assertNotEqual(pending[0], pending[1])
+        ids = [review_id for page in pending for review_id in page]
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertEqual(sorted(ids), sorted(self.fixture.pending_reviews))
+        # ... and anonymous users don't see them
+        self.assertEqual(self.search_pages({'q': 'update'}), [[]])
+
+        public = self.search_pages({'q': 'photo', 'limit': 5})
+        self.assertGreater(len(public), 1)
+        self.assertNotEqual(public[0], public[1])
+        ids = [review_id for page in public for review_id in page]
+        self.assertEqual(len(ids), len(set(ids)))
+        self.request('get', url, {'q': 'update', 'cursor': 'not-a-cursor'}, status=400)
+        self.request('get', url, {
+            'q': 'update', 'app': self.app.id, 'sentiment': 'Positive',
+            'status': 'pending',
+        }, user=self.fixture.supervisor)
+
+    def test_search_ranking_and_headlines(self):
+        more, less, markup, hidden = Review.objects.bulk_create([
+            Review(app=self.app, status='approved',
+                   review_text='Zeppelin mode is great, zeppelin sounds and zeppelin skins'),
+            Review(app=self.app, status='approved',
+                   review_text='The new zeppelin mode is fine I guess'),
+            Review(app=self.app, status='imported',
+                   review_text='Zeppelin <script>alert(1)</script> & 2 < 3 friends'),
+            Review(app=self.app, status='rejected', review_text='zeppelin zeppelin'),
+        ])
+        response = self.request('get', reverse('reviews:search_reviews'), {'q': 'zeppelin'})
+        results = response.data['results']
+        ids = [result['id'] for result in results]
+        self.assertEqual(ids[0], more.id)
+        self.assertEqual(sorted(ids), sorted([more.id, less.id, markup.id]))
+        ranks = [result['rank'] for result in results]
+        self.assertEqual(ranks, sorted(ranks, reverse=True))
+
+        headline = next(result['headline'] for result in results if result['id'] == markup.id)
+        self.assertIn('<mark>Zeppelin</mark>', headline)
+        # ts_headline drops the tags; what's left is escaped
+        self.assertNotIn('<script>', headline)
+        self.assertIn('&amp; 2 &lt; 3', headline)
+
+    def test_pending_reviews(self):
+        url = reverse('reviews:pending_reviews')
+        self.request('get', url, user=self.fixture.supervisor)
+        self.request('get', url, {'page': 2, 'limit': 5}, user=self.fixture.supervisor)
+        self.request('get', url, user=self.fixture.reviewer, status=403)
+
+    def test_approve_and_reject(self):
+        to_approve, to_reject = self.fixture.pending_reviews[:2]
+        for name, review_id in (('reviews:approve_review', to_approve),
+                                ('reviews:reject_review', to_reject)):
+            url = reverse(name, args=[review_id])
+            self.request('post', url, {'comments': 'ok'}, user=self.fixture.reviewer, status=403)
+            self.request('post', url, {'comments': 'ok'}, user=self.fixture.supervisor)
+            self.request('post', url, {'comments': 'ok'}, user=self.fixture.supervisor, status=404)
+
+    def test_enrichment_stats(self):
+        url = reverse('reviews:enrichment_stats')
+        self.request('get', url, user=self.fixture.supervisor)
+        self.request('get', url, user=self.fixture.reviewer, status=403)
+
+    def test_review_management_page(self):
+        url = reverse('reviews:review_management')
+        for user in (None, self.fixture.reviewer, self.fixture.supervisor):
+            self.request('get', url, user=user)
+
+
+@override_settings(
+    QUERY_BUDGET_MODE='raise',
+    RESPONSE_CACHE_SHARED_MAX_AGE=0,
+    REVIEW_DEDUP_ENABLED=False,
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+)
+class SubmitReviewTests(TransactionTestCase):
+    """Review submission is a single statement, safe to race and to retry"""
+
+    def setUp(self):
+        self.app = App.objects.create(name='Submitted To', category='TOOLS')
+        self.user = get_user_model().objects.create_user('submitter', 'submitter@example.com')
+        self.url = reverse('reviews:submit_review', args=[self.app.id])
+        self.data = {'review_text': 'Does what it says and nothing more', 'rating': 4}
+
+    def submit(self, key=None, data=None):
+        client = Client()
+        client.force_login(self.user)
+        headers = {'HTTP_IDEMPOTENCY_KEY': key} if key else {}
+        return client.post(
+            self.url, data or self.data, content_type='application/json', **headers)
+
+    def test_retry_with_the_same_key_is_replayed(self):
+        first = self.submit('retry-key')
+        self.assertEqual(first.status_code, 201)
+        self.assertFalse(first.has_header('Idempotent-Replayed'))
+        retry = self.submit('retry-key', {'review_text': 'Changed my mind entirely', 'rating': 1})
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        # The original review, not the retried body
+        self.assertEqual(retry.json()['review'], first.json()['review'])
+        self.assertEqual(Review.objects.count(), 1)
+        self.assertEqual(ReviewEnrichmentJob.objects.count(), 1)
+
+    def test_another_key_or_none_is_refused(self):
+        self.assertEqual(self.submit('first-key').status_code, 201)
+        self.assertEqual(self.submit('second-key').status_code, 400)
+        self.assertEqual(self.submit().status_code, 400)
+        self.assertEqual(self.submit('x' * 256).status_code, 400)
+
+    def test_unknown_app(self):
+        self.url = reverse('reviews:submit_review', args=[0])
+        self.assertEqual(self.submit().status_code, 404)
+        # Before the body is validated
+        self.assertEqual(self.submit(data={'review_text': 'short'}).status_code, 404)
+        self.assertEqual(self.submit('x' * 256).status_code, 404)
+
+    def test_concurrent_submissions_create_one_review(self):
+        barrier = threading.Barrier(4)
+        statuses = []
+
+        def submit():
+            try:
+                barrier.wait()
+                statuses.append(self.submit().status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=submit) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sorted(statuses), [201, 400, 400, 400])
+        self.assertEqual(Review.objects.filter(app=self.app, user=self.user).count(), 1)
+        self.assertEqual(ReviewEnrichmentJob.objects.count(), 1)
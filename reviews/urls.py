@@ -9,11 +9,14 @@ urlpatterns = [
          name='app_reviews'),
     path('api/app/<int:app_id>/submit-review/', views.submit_review,
          name='submit_review'),
+    path('api/search/', views.search_reviews, name='search_reviews'),
     path('api/pending/', views.get_pending_reviews, name='pending_reviews'),
     path('api/approve/<int:review_id>/', views.approve_review,
          name='approve_review'),
     path('api/reject/<int:review_id>/', views.reject_review,
          name='reject_review'),
+    path('api/enrichment/stats/', views.get_enrichment_stats,
+         name='enrichment_stats'),
 
     # Web interface
     path('', views.review_management_page, name='review_management'),
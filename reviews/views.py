@@ -1,12 +1,29 @@
+import base64
+import binascii
+import json
+
 from django.shortcuts import render
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import F, FloatField, Q, Subquery
+from django.db.models.functions import Cast
+from django.utils.html import escape
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
+from core.dedup import find_near_duplicate, signature, stored_signature
+from core.enrichment import enrichment_stats
 from core.models import App, Review, ReviewApproval
+from core.query_budget import query_budget
+from core.response_cache import purge, reviews_tag
+from core.slow_queries import capture_slow_queries
 
 
+@query_budget(queries=5, sql_ms=50)
+@capture_slow_queries
 @api_view(['GET'])
 def get_app_reviews(request, app_id):
     """
@@ -83,201 +100,174 @@ def get_app_reviews(request, app_id):
         }, status=status.HTTP_404_NOT_FOUND)
 
 
+# Inserts the review, or returns the user's existing review for the app, in a
+# single statement. The no-op DO UPDATE makes RETURNING yield the existing row
+# on conflict; ``xmax = 0`` is only true for freshly inserted tuples. Selecting
+# the values from core_app means an unknown app returns no row at all. New
+# reviews are queued for sentiment enrichment and signed for core.dedup in
+# the same round trip, and the automatic rejection of a near-duplicate is
+# recorded as a ReviewApproval without a supervisor.
+SUBMIT_REVIEW_SQL = """
+    WITH review AS (
+        INSERT INTO core_review (
+            app_id, user_id, review_text, rating, sentiment, status,
+            idempotency_key, duplicate_of_id, duplicate_score,
+            created_at, updated_at
+        )
+        SELECT app.id, %s, %s, %s, %s, %s, %s, %s, %s, now(), now()
+        FROM core_app app
+        WHERE app.id = %s
+        ON CONFLICT (app_id, user_id) WHERE user_id IS NOT NULL
+        DO UPDATE SET updated_at = core_review.updated_at
+        RETURNING id, review_text, sentiment, rating, status,
+                  idempotency_key, created_at, (xmax = 0) AS inserted
+    ), job AS (
+        INSERT INTO core_reviewenrichmentjob (
+            review_id, status, attempts, last_error, created_at
+        )
+        SELECT id, 'pending', 0, '', now()
+        FROM review
+        WHERE inserted
+    ), signature AS (
+        INSERT INTO core_reviewsignature (review_id, minhash, bands)
+        SELECT id, %s, %s::bigint[]
+        FROM review
+        WHERE inserted
+    ), approval AS (
+        INSERT INTO core_reviewapproval (
+            review_id, supervisor_id, action, comments, timestamp
+        )
+        SELECT id, NULL, 'reject', %s, now()
+        FROM review
+        WHERE inserted AND status = 'rejected'
+    )
+    SELECT * FROM review
+"""
+
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+
+
+@query_budget(queries=4, sql_ms=100)
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def submit_review(request, app_id):
     """
     Submit a new review for an app (requires authentication)
-    """
-    try:
-        app = App.objects.get(id=app_id)
-
-        # Check if user already reviewed this app
-        existing_review = Review.objects.filter(
-            app=app,
-            user=request.user
-        ).first()
-
-        if existing_review:
-            return Response({
-                'error': 'You have already reviewed this app'
-            }, status=status.HTTP_400_BAD_REQUEST)
-
-        # Get review data
-        review_text = request.data.get('review_text', '').strip()
-        rating = request.data.get('rating')
-
-        # Validate input
-        if not review_text or len(review_text) < 10:
-            return Response({
-                'error': 'Review text must be at least 10 characters long'
-            }, status=status.HTTP_400_BAD_REQUEST)
 
+    Clients may send an ``Idempotency-Key`` header; retrying a POST with the
+    same key returns the original response instead of an error.
+    """
+    idempotency_key = request.headers.get('Idempotency-Key', '').strip() or None
+    review_text = request.data.get('review_text', '').strip()
+    rating = request.data.get('rating')
+
+    # Validate input
+    error = None
+    if idempotency_key and len(idempotency_key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+        error = (
+            'Idempotency-Key must be at most '
+            f'{IDEMPOTENCY_KEY_MAX_LENGTH} characters'
+        )
+    elif not review_text or len(review_text) < 10:
+        error = 'Review text must be at least 10 characters long'
+    else:
         try:
             rating = float(rating)
             if not (1 <= rating <= 5):
                 raise ValueError
         except (ValueError, TypeError):
-            return Response({
-                'error': 'Rating must be a number between 1 and 5'
-            }, status=status.HTTP_400_BAD_REQUEST)
+            error = 'Rating must be a number between 1 and 5'
 
-        # Simple sentiment analysis based on rating
-        if rating >= 4:
-            sentiment = 'Positive'
-        elif rating >= 3:
-            sentiment = 'Neutral'
-        else:
-            sentiment = 'Negative'
-
-        # Create review with pending status for user-submitted reviews
-        review = Review.objects.create(
-            app=app,
-            user=request.user,
-            review_text=review_text,
-            sentiment=sentiment,
-            rating=rating,
-            status='pending'  # User-submitted reviews need approval
+    if error:
+        # An unknown app is a 404 whatever the body; valid submissions find
+        # out in SUBMIT_REVIEW_SQL without a query of their own
+        if not App.objects.filter(id=app_id).exists():
+            return Response({
+                'error': 'App not found'
+            }, status=status.HTTP_404_NOT_FOUND)
+        return Response({
+            'error': error
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    # Provisional sentiment from the rating; the enrichment workers refine
+    # it from the review text and fill in polarity/subjectivity
+    if rating >= 4:
+        sentiment = 'Positive'
+    elif rating >= 3:
+        sentiment = 'Neutral'
+    else:
+        sentiment = 'Negative'
+
+    # Flag copy-pasted submissions for the moderation queue
+    sig = signature(review_text)
+    duplicate_of_id = duplicate_score = None
+    duplicate = find_near_duplicate(sig)
+    if duplicate:
+        duplicate_of_id, duplicate_score = duplicate
+
+    # User-submitted reviews need approval, unless they are obvious copies
+    review_status = 'pending'
+    rejection = ''
+    auto_reject_score = settings.REVIEW_DEDUP_AUTO_REJECT_SCORE
+    if duplicate_score and auto_reject_score and duplicate_score >= auto_reject_score:
+        review_status = 'rejected'
+        rejection = (
+            f'Automatically rejected: {duplicate_score:.0%} similar to '
+            f'review {duplicate_of_id}'
         )
 
-        return Response({
-            'message': 'Review submitted successfully and is pending approval',
-            'review': {
-                'id': review.id,
-                'review_text': review.review_text,
-                'sentiment': review.sentiment,
-                'rating': review.rating,
-                'status': 'pending',
-                'created_at': review.created_at,
-            }
-        }, status=status.HTTP_201_CREATED)
+    with connection.cursor() as cursor:
+        cursor.execute(SUBMIT_REVIEW_SQL, [
+            request.user.id, review_text, rating, sentiment, review_status,
+            idempotency_key, duplicate_of_id, duplicate_score, app_id,
+            *stored_signature(sig), rejection,
+        ])
+        row = cursor.fetchone()
 
-    except App.DoesNotExist:
+    if row is None:
         return Response({
             'error': 'App not found'
         }, status=status.HTTP_404_NOT_FOUND)
 
+    (review_id, stored_text, stored_sentiment, stored_rating, stored_status,
+     stored_key, created_at, inserted) = row
 
-@api_view(['GET'])
-@permission_classes([IsAuthenticated])
-def get_pending_reviews(request):
-    """
-    Get pending reviews for supervisor approval
-    (Only accessible by supervisors)
-    """
-    if not request.user.is_supervisor():
-        return Response({
-            'error': 'Access denied. Supervisor privileges required.'
-        }, status=status.HTTP_403_FORBIDDEN)
-
-    # Get query parameters
-    page = int(request.GET.get('page', 1))
-    limit = int(request.GET.get('limit', 20))
-
-    # Get pending reviews
-    pending_reviews = ReviewApproval.objects.filter(
-        status='pending'
-    ).select_related('review', 'review__app', 'review__user').order_by(
-        'created_at'
+    # A retry of the request that created the review replays its response
+    is_replay = (
+        not inserted and
+        idempotency_key is not None and
+        stored_key == idempotency_key
     )
-
-    # Pagination
-    start = (page - 1) * limit
-    end = start + limit
-    paginated_reviews = pending_reviews[start:end]
-
-    # Prepare response
-    review_data = []
-    for approval in paginated_reviews:
-        review = approval.review
-        review_data.append({
-            'approval_id': approval.id,
-            'review_id': review.id,
-            'app': {
-                'id': review.app.id,
-                'name': review.app.name,
-                'category': review.app.category,
-            },
-            'user': review.user.username if review.user else 'Anonymous',
-            'review_text': review.review_text,
-            'sentiment': review.sentiment,
-            'rating': review.rating,
-            'submitted_at': review.created_at,
-            'days_pending': (
-                approval.created_at - review.created_at
-            ).days if approval.created_at else 0,
-        })
-
-    total_count = pending_reviews.count()
-
-    return Response({
-        'reviews': review_data,
-        'pagination': {
-            'page': page,
-            'limit': limit,
-            'total': total_count,
-            'has_next': end < total_count,
-            'has_previous': page > 1,
-        },
-        'stats': {
-            'total_pending': total_count,
-        }
-    })
-
-
-@api_view(['POST'])
-@permission_classes([IsAuthenticated])
-def approve_review(request, approval_id):
-    """
-    Approve or reject a pending review
-    (Only accessible by supervisors)
-    """
-    if not request.user.is_supervisor():
+    if not inserted and not is_replay:
         return Response({
-            'error': 'Access denied. Supervisor privileges required.'
-        }, status=status.HTTP_403_FORBIDDEN)
-
-    try:
-        approval = ReviewApproval.objects.select_related(
-            'review', 'review__app'
-        ).get(id=approval_id)
-
-        if approval.status != 'pending':
-            return Response({
-                'error': 'Review has already been processed'
-            }, status=status.HTTP_400_BAD_REQUEST)
-
-        # Get action from request
-        action = request.data.get('action')  # 'approve' or 'reject'
-        supervisor_notes = request.data.get('notes', '').strip()
-
-        if action not in ['approve', 'reject']:
-            return Response({
-                'error': 'Action must be either "approve" or "reject"'
-            }, status=status.HTTP_400_BAD_REQUEST)
-
-        # Update approval record
-        approval.status = 'approved' if action == 'approve' else 'rejected'
-        approval.supervisor = request.user
-        approval.supervisor_notes = supervisor_notes
-        approval.save()
-
-        return Response({
-            'message': f'Review {action}d successfully',
-            'review': {
-                'id': approval.review.id,
-                'app_name': approval.review.app.name,
-                'status': approval.status,
-                'supervisor_notes': approval.supervisor_notes,
-                'processed_by': request.user.username,
-                'processed_at': approval.updated_at,
-            }
-        })
-
-    except ReviewApproval.DoesNotExist:
-        return Response({
-            'error': 'Review approval record not found'
-        }, status=status.HTTP_404_NOT_FOUND)
+            'error': 'You have already reviewed this app'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    if inserted:
+        # Inserted with raw SQL: no post_save signal
+        purge(reviews_tag(app_id))
+
+    review = {
+        'id': review_id,
+        'review_text': stored_text,
+        'sentiment': stored_sentiment,
+        'rating': stored_rating,
+        'status': stored_status,
+        'created_at': created_at,
+    }
+    if stored_status == 'rejected':
+        response = Response({
+            'error': 'Review rejected as a near-duplicate of an existing review',
+            'review': review,
+        }, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+    else:
+        response = Response({
+            'message': 'Review submitted successfully and is pending approval',
+            'review': review,
+        }, status=status.HTTP_201_CREATED)
+    if is_replay:
+        response['Idempotent-Replayed'] = 'true'
+    return response
 
 
 @api_view(['GET'])
@@ -321,6 +311,7 @@ def supervisor_dashboard(request):
     return Response(stats)
 
 
+@query_budget(queries=2, sql_ms=20)
 def review_management_page(request):
     """
     Render the review management interface
@@ -335,6 +326,8 @@ def review_management_page(request):
     return render(request, 'reviews/review_management.html', context)
 
 
+@query_budget(queries=4, sql_ms=100)
+@capture_slow_queries
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_pending_reviews(request):
@@ -351,10 +344,13 @@ def get_pending_reviews(request):
     page = int(request.GET.get('page', 1))
     limit = int(request.GET.get('limit', 20))
 
-    # Get pending reviews
+    # Get pending reviews, suspected duplicates first so they can be
+    # rejected in bulk
     reviews = Review.objects.filter(
         status='pending'
-    ).select_related('user', 'app').order_by('-created_at')
+    ).select_related('user', 'app').order_by(
+        F('duplicate_score').desc(nulls_last=True), '-created_at'
+    )
 
     # Pagination
     start = (page - 1) * limit
@@ -375,7 +371,9 @@ def get_pending_reviews(request):
             'rating': review.rating,
             'sentiment': review.sentiment,
             'created_at': review.created_at,
-            'status': review.status
+            'status': review.status,
+            'duplicate_of': review.duplicate_of_id,
+            'duplicate_score': review.duplicate_score,
         })
 
     return Response({
@@ -390,6 +388,7 @@ def get_pending_reviews(request):
     })
 
 
+@query_budget(queries=5, sql_ms=50)
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def approve_review(request, review_id):
@@ -429,6 +428,7 @@ def approve_review(request, review_id):
         }, status=status.HTTP_404_NOT_FOUND)
 
 
+@query_budget(queries=5, sql_ms=50)
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def reject_review(request, review_id):
@@ -466,3 +466,161 @@ def reject_review(request, review_id):
         return Response({
             'error': 'Review not found or already processed'
         }, status=status.HTTP_404_NOT_FOUND)
+
+
+@query_budget(queries=6, sql_ms=200)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_enrichment_stats(request):
+    """
+    Get sentiment enrichment queue depth, latency and throughput
+    """
+    # Check if user is supervisor
+    if not request.user.is_supervisor():
+        return Response({
+            'error': 'Access denied. Supervisor privileges required.'
+        }, status=status.HTTP_403_FORBIDDEN)
+
+    return Response(enrichment_stats())
+
+
+# ts_headline markers; the headline is HTML-escaped before they become <mark>
+HEADLINE_START = '\x02'
+HEADLINE_STOP = '\x03'
+
+PUBLIC_REVIEW_STATUSES = ['approved', 'imported']
+
+
+def _encode_cursor(rank, review_id):
+    payload = json.dumps([rank, review_id]).encode()
+    return base64.urlsafe_b64encode(payload).decode()
+
+
+def _decode_cursor(cursor):
+    try:
+        rank, review_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return float(rank), int(review_id)
+    except (binascii.Error, ValueError, TypeError, UnicodeDecodeError):
+        raise ValueError('Invalid cursor')
+
+
+@query_budget(queries=4, sql_ms=300)
+@capture_slow_queries
+@api_view(['GET'])
+def search_reviews(request):
+    """
+    Full-text search over review content
+
+    Matches are ranked with ts_rank over the maintained search_vector column
+    and paginated with an opaque (rank, id) cursor. Only the newest
+    REVIEW_SEARCH_MAX_CANDIDATES matches are ranked, which keeps very common
+    terms cheap on large tables. Highlights are computed for the returned
+    page only.
+    """
+    query_text = request.GET.get('q', '').strip()
+    app_id = request.GET.get('app', '')
+    sentiment_filter = request.GET.get('sentiment', '')
+    status_filter = request.GET.get('status', '')
+    cursor = request.GET.get('cursor', '')
+
+    if len(query_text) < 2:
+        return Response({
+            'error': 'Query must be at least 2 characters long'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        limit = min(max(int(request.GET.get('limit', 20)), 1), 100)
+        after = _decode_cursor(cursor) if cursor else None
+        app_id = int(app_id) if app_id else None
+    except ValueError:
+        return Response({
+            'error': 'Invalid parameters'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    # Moderation states are only searchable by supervisors
+    is_supervisor = (
+        request.user.is_authenticated and request.user.is_supervisor()
+    )
+    if status_filter and is_supervisor:
+        if status_filter not in dict(Review.STATUS_CHOICES):
+            return Response({
+                'error': 'Invalid status'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        statuses = [status_filter]
+    else:
+        statuses = PUBLIC_REVIEW_STATUSES
+
+    query = SearchQuery(query_text, config='english', search_type='websearch')
+    matches = Review.objects.filter(search_vector=query, status__in=statuses)
+
+    if app_id:
+        matches = matches.filter(app_id=app_id)
+    if sentiment_filter:
+        matches = matches.filter(sentiment=sentiment_filter)
+
+    candidates = matches.order_by('-id').values('id')[
+        :settings.REVIEW_SEARCH_MAX_CANDIDATES
+    ]
+    ranked = Review.objects.filter(id__in=Subquery(candidates)).annotate(
+        # Cast so the rank round-trips exactly through the cursor
+        rank=Cast(SearchRank(F('search_vector'), query), FloatField())
+    )
+    if after:
+        after_rank, after_id = after
+        ranked = ranked.filter(
+            Q(rank__lt=after_rank) | Q(rank=after_rank, id__lt=after_id)
+        )
+
+    page = list(
+        ranked.order_by('-rank', '-id').values_list('id', 'rank')[:limit + 1]
+    )
+    has_next = len(page) > limit
+    page = page[:limit]
+
+    reviews = Review.objects.filter(
+        id__in=[review_id for review_id, _ in page]
+    ).select_related('app', 'user').annotate(
+        headline=SearchHeadline(
+            'review_text', query, config='english',
+            start_sel=HEADLINE_START, stop_sel=HEADLINE_STOP,
+            max_words=35, min_words=15,
+        )
+    )
+    reviews_by_id = {review.id: review for review in reviews}
+
+    # Prepare response
+    results = []
+    for review_id, rank in page:
+        review = reviews_by_id[review_id]
+        result = {
+            'id': review.id,
+            'app': {
+                'id': review.app.id,
+                'name': review.app.name,
+            },
+            'headline': escape(review.headline).replace(
+                HEADLINE_START, '<mark>'
+            ).replace(HEADLINE_STOP, '</mark>'),
+            'sentiment': review.sentiment,
+            'rating': review.rating,
+            'user': review.user.username if review.user else None,
+            'created_at': review.created_at,
+            'rank': rank,
+        }
+        if is_supervisor:
+            result['status'] = review.status
+        results.append(result)
+
+    next_cursor = None
+    if has_next:
+        next_cursor = _encode_cursor(page[-1][1], page[-1][0])
+
+    return Response({
+        'query': query_text,
+        'results': results,
+        'pagination': {
+            'limit': limit,
+            'next_cursor': next_cursor,
+            'has_next': has_next,
+        }
+    })
@@ -1,3 +1,71 @@
-from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
 
-# Create your tests here.
+from core.models import Review
+from core.testing import QueryBudgetTestCase
+from search import urls
+
+
+class SearchQueryBudgetTests(QueryBudgetTestCase):
+    """Every search endpoint stays within its query budget"""
+
+    def users(self):
+        return [None, self.fixture.reviewer, self.fixture.supervisor]
+
+    def test_every_url_has_a_budget(self):
+        self.assertBudgetsDeclared(urls.urlpatterns)
+
+    def test_search_apps(self):
+        url = reverse('search:search_apps')
+        for user in self.users():
+            self.request('get', url, {'q': self.query}, user=user)
+            self.request('get', url, {
+                'q': self.query, 'category': self.app.category,
+                'min_rating': '3', 'page': 2, 'limit': 5,
+            }, user=user)
+        self.request('get', url, {'q': 'ab'}, status=400)
+
+    def test_autocomplete_apps(self):
+        url = reverse('search:autocomplete_apps')
+        for user in self.users():
+            self.request('get', url, {'q': self.query}, user=user)
+
+    def test_app_details(self):
+        for user in self.users():
+            self.request('get', reverse('search:app_details', args=[self.app.id]), user=user)
+        self.request('get', reverse('search:app_details', args=[0]), status=404)
+
+    def test_app_reviews(self):
+        url = reverse('search:app_reviews', args=[self.app.id])
+        for user in self.users():
+            self.request('get', url, {'page': 1, 'limit': 10}, user=user)
+        self.request('get', reverse('search:app_reviews', args=[0]), status=404)
+
+    def test_app_reviews_user_is_not_fetched_per_review(self):
+        url = reverse('search:app_reviews', args=[self.app.id])
+        reviews = list(Review.objects.filter(app=self.app, status='imported'))
+        authors = get_user_model().objects.bulk_create([
+            get_user_model()(username=f'author_{n}', email=f'author_{n}@example.com')
+            for n in range(len(reviews))
+        ])
+        for review, author in zip(reviews, authors):
+            review.user = author
+        Review.objects.bulk_update(reviews, ['user'])
+
+        with CaptureQueriesContext(connection) as one:
+            self.request('get', url, {'limit': 1})
+        with CaptureQueriesContext(connection) as ten:
+            response = self.request('get', url, {'limit': 10})
+
+        self.assertEqual(len(response.data['reviews']), 10)
+        self.assertEqual(len(ten), len(one))
+
+    def test_categories(self):
+        for user in self.users():
+            self.request('get', reverse('search:categories'), user=user)
+
+    def test_search_page(self):
+        for user in self.users():
+            self.request('get', reverse('search:search_page'), user=user)
@@ -1,13 +1,70 @@
 from django.shortcuts import render
 from django.db.models import Q
 from django.contrib.postgres.search import TrigramSimilarity
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, authentication_classes
 from rest_framework.response import Response
 from rest_framework import status
 from core.models import App, Review
+from core.query_budget import query_budget
+from core.response_cache import APPS, app_tag, cache_response, category_tag, reviews_tag
+from core.slow_queries import capture_slow_queries
+
+
+def finite_or_none(value):
+    """The value, or None for NaN and infinities (not valid in JSON)"""
+    if value is not None and (
+        value != value or
+        value == float('inf') or
+        value == float('-inf')
+    ):
+        return None
+    return value
+
+
+def search_result(app):
+    """Search result entry of an app annotated with ``name_similarity``"""
+    similarity_score = finite_or_none(getattr(app, 'name_similarity', 0))
+    return {
+        'id': app.id,
+        'name': app.name,
+        'category': app.category,
+        'rating': finite_or_none(app.rating),
+        'reviews_count': app.reviews_count,
+        'installs': app.installs,
+        'app_type': app.app_type,
+        'similarity_score': (
+            float(similarity_score) if similarity_score else 0
+        ),
+    }
+
+
+def autocomplete_suggestion(app):
+    """Autocomplete entry of an app"""
+    return {
+        'id': app.id,
+        'name': app.name,
+        'category': app.category,
+        'rating': finite_or_none(app.rating),
+    }
+
 
+def search_tags(request, response):
+    tags = [APPS] + [app_tag(result['id']) for result in response.data['results']]
+    category = request.GET.get('category', '')
+    return tags + [category_tag(category)] if category else tags
+
+
+def app_tags(request, response, app_id):
+    return [app_tag(app_id), reviews_tag(app_id)]
 
+
+# The public API views don't authenticate, so they never load the session
+# or the user, and their responses can be cached for everyone
+@query_budget(queries=4, sql_ms=300)
+@cache_response(search_tags)
+@capture_slow_queries
 @api_view(['GET'])
+@authentication_classes([])
 def search_apps(request):
     """
     Advanced search for apps using PostgreSQL trigram similarity
@@ -62,35 +119,7 @@ def search_apps(request):
     apps = apps[offset:offset + limit]
 
     # Prepare results
-    results = []
-    for app in apps:
-        # Handle invalid float values
-        rating = app.rating
-        if rating is not None and (
-            rating != rating or
-            rating == float('inf') or
-            rating == float('-inf')
-        ):
-            rating = None
-
-        similarity_score = getattr(app, 'name_similarity', 0)
-        if (similarity_score != similarity_score or
-                similarity_score == float('inf') or
-                similarity_score == float('-inf')):
-            similarity_score = 0
-
-        results.append({
-            'id': app.id,
-            'name': app.name,
-            'category': app.category,
-            'rating': rating,
-            'reviews_count': app.reviews_count,
-            'installs': app.installs,
-            'app_type': app.app_type,
-            'similarity_score': (
-                float(similarity_score) if similarity_score else 0
-            ),
-        })
+    results = [search_result(app) for app in apps]
 
     return Response({
         'results': results,
@@ -111,7 +140,10 @@ def search_apps(request):
     })
 
 
+@query_budget(queries=3, sql_ms=200)
+@capture_slow_queries
 @api_view(['GET'])
+@authentication_classes([])
 def autocomplete_apps(request):
     """
     Autocomplete suggestions for app names
@@ -134,23 +166,7 @@ def autocomplete_apps(request):
         Q(name__istartswith=query)  # Prefix matching
     ).order_by('-similarity', '-rating')[:limit]
 
-    suggestions = []
-    for app in apps:
-        # Handle invalid float values
-        rating = app.rating
-        if rating is not None and (
-            rating != rating or
-            rating == float('inf') or
-            rating == float('-inf')
-        ):
-            rating = None
-
-        suggestions.append({
-            'id': app.id,
-            'name': app.name,
-            'category': app.category,
-            'rating': rating,
-        })
+    suggestions = [autocomplete_suggestion(app) for app in apps]
 
     return Response({
         'suggestions': suggestions,
@@ -159,7 +175,10 @@ def autocomplete_apps(request):
     })
 
 
+@query_budget(queries=4, sql_ms=50)
+@cache_response(app_tags)
 @api_view(['GET'])
+@authentication_classes([])
 def get_app_details(request, app_id):
     """
     Get detailed information about a specific app
@@ -176,7 +195,7 @@ def get_app_details(request, app_id):
             'id': app.id,
             'name': app.name,
             'category': app.category,
-            'rating': app.rating,
+            'rating': finite_or_none(app.rating),
             'reviews_count': app.reviews_count,
             'size': app.size,
             'installs': app.installs,
@@ -205,7 +224,10 @@ def get_app_details(request, app_id):
         }, status=status.HTTP_404_NOT_FOUND)
 
 
+@query_budget(queries=3, sql_ms=100)
+@cache_response(lambda request, response: [APPS])
 @api_view(['GET'])
+@authentication_classes([])
 def get_categories(request):
     """
     Get all available app categories
@@ -218,7 +240,11 @@ def get_categories(request):
     })
 
 
+@query_budget(queries=5, sql_ms=50)
+@cache_response(app_tags)
+@capture_slow_queries
 @api_view(['GET'])
+@authentication_classes([])
 def get_app_reviews(request, app_id):
     """
     Get reviews for a specific app with pagination
@@ -235,7 +261,7 @@ def get_app_reviews(request, app_id):
         reviews = Review.objects.filter(
             app=app,
             status__in=['approved', 'imported']
-        ).select_related('app')
+        ).select_related('user')
         reviews = reviews.order_by('-created_at', 'id')[offset:offset + limit]
         total_reviews = Review.objects.filter(
             app=app,
@@ -290,6 +316,7 @@ def get_app_reviews(request, app_id):
         }, status=status.HTTP_400_BAD_REQUEST)
 
 
+@query_budget(queries=2, sql_ms=20)
 def search_page(request):
     """
     Render the search interface page
@@ -0,0 +1,249 @@
+let currentPage = 1;
+let totalPages = 1;
+let currentAction = null;
+let currentReviewId = null;
+
+// Load pending reviews on page load
+document.addEventListener('DOMContentLoaded', function() {
+    loadPendingReviews();
+
+    // Auto-refresh every 30 seconds
+    setInterval(loadPendingReviews, 30000);
+});
+
+async function loadPendingReviews(page = 1) {
+    const loading = document.getElementById('loading');
+    const container = document.getElementById('reviewsContainer');
+    const pagination = document.getElementById('pagination');
+
+    loading.style.display = 'block';
+    container.innerHTML = '';
+
+    try {
+        const response = await fetch(`/reviews/api/pending/?page=${page}`, {
+            credentials: 'same-origin'
+        });
+
+        if (!response.ok) {
+            throw new Error(`HTTP ${response.status}`);
+        }
+
+        const data = await response.json();
+
+        currentPage = data.pagination.current_page;
+        totalPages = data.pagination.total_pages;
+
+        // Update stats
+        updateStats(data.pagination.total_count);
+
+        // Render reviews
+        renderReviews(data.reviews);
+
+        // Update pagination
+        updatePagination(data.pagination);
+
+        // Update last updated time
+        document.getElementById('lastUpdated').textContent = `Last updated: ${new Date().toLocaleTimeString()}`;
+
+    } catch (error) {
+        console.error('Error loading reviews:', error);
+        container.innerHTML = `
+            <div class="alert alert-error">
+                <strong>Error:</strong> Failed to load pending reviews. Please refresh the page.
+            </div>
+        `;
+    } finally {
+        loading.style.display = 'none';
+    }
+}
+
+function renderReviews(reviews) {
+    const container = document.getElementById('reviewsContainer');
+
+    if (reviews.length === 0) {
+        container.innerHTML = `
+            <div class="review-card" style="text-align: center; padding: 3rem;">
+                <div style="font-size: 3rem; margin-bottom: 1rem;">🎉</div>
+                <h3 style="color: #10b981; margin-bottom: 0.5rem;">All caught up!</h3>
+                <p style="color: #666;">No pending reviews to approve at the moment.</p>
+            </div>
+        `;
+        return;
+    }
+
+    const reviewsHTML = reviews.map(review => `
+        <div class="review-card pending">
+            <div class="review-header">
+                <div>
+                    <h3 style="color: #333; margin-bottom: 0.5rem;">${review.app_name}</h3>
+                    <div class="review-meta">
+                        <span><strong>By:</strong> ${review.user_full_name || review.user_name}</span>
+                        <span><strong>Submitted:</strong> ${new Date(review.created_at).toLocaleDateString()}</span>
+                        ${review.rating ? `
+                        <div class="rating-display">
+                            <span class="rating-stars">${'★'.repeat(Math.floor(review.rating))}${'☆'.repeat(5 - Math.floor(review.rating))}</span>
+                            <span>${review.rating}/5</span>
+                        </div>
+                        ` : ''}
+                    </div>
+                </div>
+                <div>
+                    ${review.duplicate_of ? `
+                    <div style="background: #fee2e2; color: #991b1b; padding: 0.25rem 0.75rem; border-radius: 20px; font-size: 0.8rem; font-weight: 500; margin-bottom: 0.25rem;" title="Near-duplicate of review #${review.duplicate_of}">
+                        POSSIBLE DUPLICATE (${Math.round(review.duplicate_score * 100)}%)
+                    </div>
+                    ` : ''}
+                    <div style="background: #fef3c7; color: #92400e; padding: 0.25rem 0.75rem; border-radius: 20px; font-size: 0.8rem; font-weight: 500;">
+                        PENDING
+                    </div>
+                </div>
+            </div>
+
+            <div class="review-content">
+                <p>${review.review_text}</p>
+                ${review.sentiment ? `<div style="margin-top: 0.5rem;"><span style="background: ${getSentimentColor(review.sentiment)}; color: white; padding: 0.25rem 0.5rem; border-radius: 4px; font-size: 0.8rem;">${review.sentiment}</span></div>` : ''}
+            </div>
+
+            <div class="review-actions">
+                <button class="btn btn-approve" onclick="openActionModal('approve', ${review.id}, '${review.app_name}', '${review.user_full_name || review.user_name}')">
+                    ✓ Approve
+                </button>
+                <button class="btn btn-reject" onclick="openActionModal('reject', ${review.id}, '${review.app_name}', '${review.user_full_name || review.user_name}')">
+                    ✗ Reject
+                </button>
+            </div>
+        </div>
+    `).join('');
+
+    container.innerHTML = reviewsHTML;
+}
+
+function getSentimentColor(sentiment) {
+    switch(sentiment) {
+        case 'Positive': return '#10b981';
+        case 'Negative': return '#ef4444';
+        case 'Neutral': return '#6b7280';
+        default: return '#6b7280';
+    }
+}
+
+function updateStats(totalPending) {
+    const statsElements = document.querySelectorAll('#reviewStats div:first-child div:first-child');
+    statsElements[0].textContent = totalPending;
+    // You could add more stats here, like reviews processed today
+}
+
+function updatePagination(pagination) {
+    const paginationDiv = document.getElementById('pagination');
+    const prevBtn = document.getElementById('prevBtn');
+    const nextBtn = document.getElementById('nextBtn');
+    const pageInfo = document.getElementById('pageInfo');
+
+    pageInfo.textContent = `Page ${pagination.current_page} of ${pagination.total_pages}`;
+    prevBtn.disabled = !pagination.has_previous;
+    nextBtn.disabled = !pagination.has_next;
+
+    paginationDiv.style.display = pagination.total_pages > 1 ? 'flex' : 'none';
+}
+
+function changePage(direction) {
+    const newPage = currentPage + direction;
+    if (newPage >= 1 && newPage <= totalPages) {
+        loadPendingReviews(newPage);
+    }
+}
+
+function openActionModal(action, reviewId, appName, userName) {
+    currentAction = action;
+    currentReviewId = reviewId;
+
+    const modal = document.getElementById('actionModal');
+    const title = document.getElementById('modalTitle');
+    const details = document.getElementById('reviewDetails');
+    const confirmBtn = document.getElementById('confirmActionBtn');
+
+    title.textContent = action === 'approve' ? 'Approve Review' : 'Reject Review';
+
+    details.innerHTML = `
+        <h4 style="margin: 0 0 0.5rem 0; color: #333;">Review for "${appName}"</h4>
+        <p style="margin: 0; color: #666;">By: ${userName}</p>
+    `;
+
+    confirmBtn.textContent = action === 'approve' ? 'Approve Review' : 'Reject Review';
+    confirmBtn.className = action === 'approve' ? 'btn btn-approve' : 'btn btn-reject';
+
+    document.getElementById('actionComments').value = '';
+    modal.style.display = 'block';
+}
+
+function closeActionModal() {
+    document.getElementById('actionModal').style.display = 'none';
+    currentAction = null;
+    currentReviewId = null;
+}
+
+async function confirmAction() {
+    if (!currentAction || !currentReviewId) return;
+
+    const comments = document.getElementById('actionComments').value;
+    const confirmBtn = document.getElementById('confirmActionBtn');
+
+    confirmBtn.disabled = true;
+    confirmBtn.textContent = 'Processing...';
+
+    try {
+        // Get CSRF token
+        const csrfToken = document.querySelector('meta[name=csrf-token]')?.getAttribute('content') ||
+                         document.querySelector('[name=csrfmiddlewaretoken]')?.value;
+
+        const response = await fetch(`/reviews/api/${currentAction}/${currentReviewId}/`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': csrfToken,
+            },
+            credentials: 'same-origin',
+            body: JSON.stringify({
+                comments: comments
+            })
+        });
+
+        if (response.ok) {
+            closeActionModal();
+            loadPendingReviews(currentPage); // Reload current page
+
+            // Show success message
+            const container = document.getElementById('reviewsContainer');
+            container.insertAdjacentHTML('afterbegin', `
+                <div class="alert alert-success" style="margin-bottom: 1rem;">
+                    Review ${currentAction}d successfully!
+                </div>
+            `);
+
+            // Remove success message after 3 seconds
+            setTimeout(() => {
+                const alert = container.querySelector('.alert-success');
+                if (alert) alert.remove();
+            }, 3000);
+
+        } else {
+            const errorData = await response.json();
+            throw new Error(errorData.error || 'Action failed');
+        }
+
+    } catch (error) {
+        console.error('Error processing action:', error);
+        alert('Error: ' + error.message);
+    } finally {
+        confirmBtn.disabled = false;
+        confirmBtn.textContent = currentAction === 'approve' ? 'Approve Review' : 'Reject Review';
+    }
+}
+
+// Close modal when clicking outside
+window.onclick = function(event) {
+    const modal = document.getElementById('actionModal');
+    if (event.target === modal) {
+        closeActionModal();
+    }
+}
@@ -0,0 +1,882 @@
+// Search functionality
+let searchTimeout;
+let currentResults = [];
+let currentPage = 1;
+let currentQuery = '';
+let currentFilters = {};
+let hasMoreResults = true;
+
+// Search pagination variables
+let searchCurrentPage = 1;
+let searchTotalPages = 1;
+let searchTotalResults = 0;
+
+// Modal and review variables
+let currentApp = null;
+let reviewIdempotencyKey = null;
+let reviewCurrentPage = 1;
+let reviewTotalPages = 1;
+let isAuthenticated = document.currentScript.dataset.authenticated;
+
+// Review pagination variables
+let reviewsCurrentPage = 1;
+let reviewsHasMore = false;
+
+const searchInput = document.getElementById('searchInput');
+const autocompleteDropdown = document.getElementById('autocompleteDropdown');
+const resultsSection = document.getElementById('resultsSection');
+const searchResults = document.getElementById('searchResults');
+const loading = document.getElementById('loading');
+const noResults = document.getElementById('noResults');
+const resultsCount = document.getElementById('resultsCount');
+
+// Initialize categories
+fetchCategories();
+
+// Search input event listener
+searchInput.addEventListener('input', handleSearchInput);
+searchInput.addEventListener('keydown', handleSearchKeydown);
+searchInput.addEventListener('focus', showAutocomplete);
+
+// Filter event listeners
+document.getElementById('categoryFilter').addEventListener('change', performSearch);
+document.getElementById('ratingFilter').addEventListener('input', performSearch);
+document.getElementById('limitFilter').addEventListener('change', performSearch);
+
+// Pagination event listeners
+document.getElementById('searchPrevBtn').addEventListener('click', function(e) {
+    e.preventDefault();
+    e.stopPropagation();
+    console.log('Previous button clicked, current page:', searchCurrentPage);
+    changeSearchPage(-1);
+});
+
+document.getElementById('searchNextBtn').addEventListener('click', function(e) {
+    e.preventDefault();
+    e.stopPropagation();
+    console.log('Next button clicked, current page:', searchCurrentPage);
+    changeSearchPage(1);
+});
+
+// Hide autocomplete when clicking outside
+document.addEventListener('click', function(e) {
+    if (!searchInput.contains(e.target) && !autocompleteDropdown.contains(e.target)) {
+        hideAutocomplete();
+    }
+});
+
+function handleSearchInput(e) {
+    const query = e.target.value.trim();
+
+    // Clear previous timeout
+    clearTimeout(searchTimeout);
+
+    // Show autocomplete for queries >= 3 characters
+    if (query.length >= 3) {
+        searchTimeout = setTimeout(() => {
+            fetchAutocomplete(query);
+        }, 300);
+    } else {
+        hideAutocomplete();
+        if (query.length === 0) {
+            clearResults();
+        }
+    }
+}
+
+function handleSearchKeydown(e) {
+    const items = autocompleteDropdown.querySelectorAll('.autocomplete-item');
+    const highlighted = autocompleteDropdown.querySelector('.autocomplete-item.highlighted');
+
+    if (e.key === 'Enter') {
+        e.preventDefault();
+        if (highlighted) {
+            selectAutocompleteItem(highlighted);
+        } else {
+            performSearch();
+        }
+    } else if (e.key === 'ArrowDown') {
+        e.preventDefault();
+        navigateAutocomplete(items, highlighted, 'down');
+    } else if (e.key === 'ArrowUp') {
+        e.preventDefault();
+        navigateAutocomplete(items, highlighted, 'up');
+    } else if (e.key === 'Escape') {
+        hideAutocomplete();
+    }
+}
+
+function navigateAutocomplete(items, highlighted, direction) {
+    let newIndex = 0;
+
+    if (highlighted) {
+        highlighted.classList.remove('highlighted');
+        const currentIndex = Array.from(items).indexOf(highlighted);
+        newIndex = direction === 'down'
+            ? (currentIndex + 1) % items.length
+            : currentIndex === 0 ? items.length - 1 : currentIndex - 1;
+    }
+
+    if (items[newIndex]) {
+        items[newIndex].classList.add('highlighted');
+    }
+}
+
+function fetchAutocomplete(query) {
+    const url = `/search/api/autocomplete/?q=${encodeURIComponent(query)}`;
+
+    fetch(url)
+        .then(response => response.json())
+        .then(data => {
+            displayAutocomplete(data.suggestions);
+        })
+        .catch(error => {
+            console.error('Autocomplete error:', error);
+            hideAutocomplete();
+        });
+}
+
+function displayAutocomplete(suggestions) {
+    if (suggestions.length === 0) {
+        hideAutocomplete();
+        return;
+    }
+
+    autocompleteDropdown.innerHTML = suggestions
+        .map(app => `
+            <div class="autocomplete-item" data-name="${app.name}" data-id="${app.id}">
+                <strong>${app.name}</strong>
+                <span style="color: #666; margin-left: 0.5rem;">${app.category}</span>
+                ${app.rating ? `<span style="color: #f59e0b; margin-left: 0.5rem;">★ ${app.rating}</span>` : ''}
+            </div>
+        `)
+        .join('');
+
+    // Add click listeners to autocomplete items
+    autocompleteDropdown.querySelectorAll('.autocomplete-item').forEach(item => {
+        item.addEventListener('click', () => selectAutocompleteItem(item));
+    });
+
+    showAutocomplete();
+}
+
+function selectAutocompleteItem(item) {
+    const name = item.dataset.name;
+    searchInput.value = name;
+    hideAutocomplete();
+    performSearch();
+}
+
+function showAutocomplete() {
+    autocompleteDropdown.style.display = 'block';
+}
+
+function hideAutocomplete() {
+    autocompleteDropdown.style.display = 'none';
+    autocompleteDropdown.querySelectorAll('.highlighted').forEach(item => {
+        item.classList.remove('highlighted');
+    });
+}
+
+function performSearch(resetResults = true, page = 1) {
+    console.log('performSearch called with:', { resetResults, page });
+
+    const query = searchInput.value.trim();
+
+    if (query.length < 3) {
+        if (query.length === 0) {
+            clearResults();
+        }
+        return;
+    }
+
+    if (resetResults) {
+        currentResults = [];
+        currentPage = 1;
+        // Don't reset searchCurrentPage here - use the page parameter
+        hasMoreResults = true;
+    } else {
+        searchCurrentPage = page;
+    }
+
+    // Set the current page to the requested page
+    searchCurrentPage = page;
+
+    currentQuery = query;
+    currentFilters = {
+        category: document.getElementById('categoryFilter').value,
+        min_rating: document.getElementById('ratingFilter').value,
+        limit: document.getElementById('limitFilter').value
+    };
+
+    hideAutocomplete();
+    showLoading();
+
+    const params = new URLSearchParams({
+        q: query,
+        page: searchCurrentPage,
+        limit: currentFilters.limit,
+        ...currentFilters
+    });
+
+    // Remove empty parameters
+    for (const [key, value] of [...params.entries()]) {
+        if (!value) params.delete(key);
+    }
+
+    fetch(`/search/api/search/?${params}`)
+        .then(response => response.json())
+        .then(data => {
+            hideLoading();
+
+            // Get pagination info from API response
+            if (data.pagination) {
+                searchTotalResults = data.pagination.total;
+                searchTotalPages = data.pagination.pages;
+                searchCurrentPage = data.pagination.page;
+            } else {
+                // Fallback for backward compatibility
+                const limit = parseInt(currentFilters.limit);
+                searchTotalResults = data.count;
+                searchTotalPages = Math.ceil(searchTotalResults / limit);
+                searchCurrentPage = page;
+            }
+
+            if (resetResults) {
+                currentResults = data.results;
+                displayResults(data.results, data.count);
+            } else {
+                currentResults = [...currentResults, ...data.results];
+                appendResults(data.results);
+            }
+
+            // Update pagination UI
+            updateSearchPagination();
+
+            // updateLoadMoreButton(); // Removed - using pagination instead
+        })
+        .catch(error => {
+            console.error('Search error:', error);
+            hideLoading();
+            showError('An error occurred while searching. Please try again.');
+        });
+}
+
+function loadMore() {
+    console.log('loadMore function called, currentPage:', currentPage);
+    currentPage++;
+    // For now, just perform the same search (API doesn't support pagination yet)
+    // In a real implementation, you'd add offset/page parameters
+    performSearch(false);
+}
+
+function displayResults(results, totalCount) {
+    if (results.length === 0) {
+        showNoResults();
+        return;
+    }
+
+    hideNoResults();
+    resultsSection.style.display = 'block';
+    resultsCount.textContent = `${searchTotalResults} result${searchTotalResults !== 1 ? 's' : ''} found for "${currentQuery}"`;
+
+    searchResults.innerHTML = results.map(app => createAppCard(app)).join('');
+
+    // Add click listeners to app cards
+    searchResults.querySelectorAll('.app-card').forEach(card => {
+        card.addEventListener('click', () => {
+            const appId = card.dataset.appId;
+            openReviewsModal(appId);
+        });
+        card.setAttribute('data-has-listener', 'true');
+    });
+}    function appendResults(results) {
+    const newCardsHTML = results.map(app => createAppCard(app)).join('');
+    searchResults.insertAdjacentHTML('beforeend', newCardsHTML);
+
+    // Add click listeners to new cards
+    const newCards = searchResults.querySelectorAll('.app-card:not([data-has-listener])');
+    newCards.forEach(card => {
+        card.addEventListener('click', () => {
+            const appId = card.dataset.appId;
+            openReviewsModal(appId);
+        });
+        card.setAttribute('data-has-listener', 'true');
+    });
+}
+
+function createAppCard(app) {
+    const rating = app.rating ? parseFloat(app.rating).toFixed(1) : 'N/A';
+    const installs = app.installs || 'Unknown';
+    const similarity = (app.similarity_score * 100).toFixed(0);
+
+    return `
+        <div class="app-card" data-app-id="${app.id}">
+            <div class="app-name">${app.name}</div>
+            <div class="app-meta">
+                <div class="app-meta-item">
+                    <span>📱</span>
+                    <span>${app.category || 'Unknown'}</span>
+                </div>
+                <div class="app-meta-item">
+                    <span>⭐</span>
+                    <span>${rating}</span>
+                </div>
+                <div class="app-meta-item">
+                    <span>📊</span>
+                    <span>${installs} installs</span>
+                </div>
+                <div class="app-meta-item">
+                    <span>💬</span>
+                    <span>${app.reviews_count || 0} reviews</span>
+                </div>
+                <div class="similarity-score">
+                    ${similarity}% match
+                </div>
+            </div>
+        </div>
+    `;
+}
+
+function fetchCategories() {
+    fetch('/search/api/categories/')
+        .then(response => response.json())
+        .then(data => {
+            const categorySelect = document.getElementById('categoryFilter');
+            data.categories.forEach(category => {
+                const option = document.createElement('option');
+                option.value = category;
+                option.textContent = category;
+                categorySelect.appendChild(option);
+            });
+        })
+        .catch(error => {
+            console.error('Error fetching categories:', error);
+        });
+}
+
+function showLoading() {
+    loading.style.display = 'block';
+    resultsSection.style.display = 'none';
+    noResults.style.display = 'none';
+}
+
+function hideLoading() {
+    loading.style.display = 'none';
+}
+
+function showNoResults() {
+    noResults.style.display = 'block';
+    resultsSection.style.display = 'none';
+}
+
+function hideNoResults() {
+    noResults.style.display = 'none';
+}
+
+function clearResults() {
+    resultsSection.style.display = 'none';
+    noResults.style.display = 'none';
+    document.getElementById('searchPagination').style.display = 'none';
+    currentResults = [];
+    currentPage = 1;
+    searchCurrentPage = 1;
+    searchTotalPages = 1;
+    searchTotalResults = 0;
+}
+
+function showError(message) {
+    // Simple error display - in a real app you'd have proper error UI
+    alert(message);
+}
+
+// Search pagination functions
+function updateSearchPagination() {
+    console.log('updateSearchPagination called:', {
+        searchCurrentPage,
+        searchTotalPages,
+        searchTotalResults
+    });
+
+    const pageInfo = document.getElementById('searchPageInfo');
+    const prevBtn = document.getElementById('searchPrevBtn');
+    const nextBtn = document.getElementById('searchNextBtn');
+    const paginationDiv = document.getElementById('searchPagination');
+
+    if (pageInfo && prevBtn && nextBtn && paginationDiv) {
+        pageInfo.textContent = `Page ${searchCurrentPage} of ${searchTotalPages} (${searchTotalResults} results)`;
+        prevBtn.disabled = searchCurrentPage <= 1;
+        nextBtn.disabled = searchCurrentPage >= searchTotalPages;
+
+        // Show pagination if more than one page
+        if (searchTotalPages > 1) {
+            paginationDiv.style.display = 'flex';
+            console.log('Showing pagination');
+        } else {
+            paginationDiv.style.display = 'none';
+            console.log('Hiding pagination - only', searchTotalPages, 'page(s)');
+        }
+    } else {
+        console.log('Pagination elements not found:', {
+            pageInfo: !!pageInfo,
+            prevBtn: !!prevBtn,
+            nextBtn: !!nextBtn,
+            paginationDiv: !!paginationDiv
+        });
+    }
+}
+
+function changeSearchPage(direction) {
+    console.log('changeSearchPage called with direction:', direction);
+    console.log('Current state:', {
+        searchCurrentPage,
+        searchTotalPages,
+        direction
+    });
+
+    const newPage = searchCurrentPage + direction;
+    console.log('Calculated newPage:', newPage);
+
+    if (newPage >= 1 && newPage <= searchTotalPages) {
+        console.log('Page change valid, calling performSearch');
+        searchCurrentPage = newPage;
+        performSearch(true, newPage);
+    } else {
+        console.log('Page change invalid - out of bounds');
+    }
+}
+
+// Modal functionality for app reviews
+let currentModalAppId = null;
+let currentReviewsPage = 1;
+let hasMoreReviews = true;
+
+function openReviewsModal(appId) {
+    currentModalAppId = appId;
+    currentReviewsPage = 1;
+    reviewCurrentPage = 1;  // Initialize review pagination
+    hasMoreReviews = true;
+
+    const modal = document.getElementById('reviewsModal');
+    const appDetails = document.getElementById('appDetails');
+    const reviewsContainer = document.getElementById('reviewsContainer');
+    const reviewsLoading = document.getElementById('reviewsLoading');
+    const noReviews = document.getElementById('noReviews');
+    const loadMoreBtn = document.getElementById('loadMoreReviewsBtn');
+    const paginationDiv = document.getElementById('reviewsPagination');
+
+    // Reset modal content
+    appDetails.innerHTML = '';
+    reviewsContainer.innerHTML = '';
+    reviewsLoading.style.display = 'block';
+    noReviews.style.display = 'none';
+    loadMoreBtn.style.display = 'none';
+    paginationDiv.style.display = 'none';
+
+    // Show modal
+    modal.style.display = 'block';
+
+    // Fetch app details and reviews
+    Promise.all([
+        fetch(`/search/api/app/${appId}/`),
+        fetch(`/search/api/app/${appId}/reviews/?page=1&limit=10`)
+    ])
+    .then(responses => Promise.all(responses.map(r => r.json())))
+    .then(([appData, reviewsData]) => {
+        reviewsLoading.style.display = 'none';
+
+        // Store current app for review form
+        currentApp = appData;
+
+        // Update Write Review button based on authentication
+        const writeReviewBtn = document.getElementById('writeReviewBtn');
+        if (writeReviewBtn) {
+            if (isAuthenticated === 'true' || isAuthenticated === true) {
+                writeReviewBtn.textContent = 'Write Review';
+                writeReviewBtn.onclick = openReviewForm;
+                writeReviewBtn.style.display = 'inline-block';
+            } else {
+                writeReviewBtn.textContent = 'Login to Write Review';
+                writeReviewBtn.onclick = function() {
+                    window.location.href = '/accounts/login/?next=' + encodeURIComponent(window.location.pathname);
+                };
+                writeReviewBtn.style.display = 'inline-block';
+            }
+        }
+
+        // Update modal title
+        document.getElementById('modalAppName').textContent = appData.name;
+
+        // Display app details
+        displayAppDetails(appData);
+
+        // Display reviews
+        if (reviewsData.reviews && reviewsData.reviews.length > 0) {
+            displayReviews(reviewsData.reviews, true);
+
+            // Update pagination variables
+            reviewCurrentPage = reviewsData.pagination.page;
+            reviewTotalPages = reviewsData.pagination.pages;
+
+            // Show pagination if more than one page
+            if (reviewTotalPages > 1) {
+                updateReviewsPagination();
+                paginationDiv.style.display = 'flex';
+                loadMoreBtn.style.display = 'none';  // Hide load more when using pagination
+            } else {
+                // Use load more for single page or remaining items
+                hasMoreReviews = reviewsData.pagination.page < reviewsData.pagination.pages;
+                updateLoadMoreReviewsButton();
+            }
+        } else {
+            noReviews.style.display = 'block';
+        }
+    })
+    .catch(error => {
+        console.error('Error fetching app data:', error);
+        reviewsLoading.style.display = 'none';
+        showError('Failed to load app details. Please try again.');
+    });
+}
+
+function closeReviewsModal() {
+    const modal = document.getElementById('reviewsModal');
+    modal.style.display = 'none';
+    currentModalAppId = null;
+}
+
+function displayAppDetails(app) {
+    const appDetails = document.getElementById('appDetails');
+    const rating = app.rating ? parseFloat(app.rating).toFixed(1) : 'N/A';
+
+    appDetails.innerHTML = `
+        <h3>${app.name}</h3>
+        <div class="app-info-grid">
+            <div class="app-info-item">
+                <div class="app-info-label">Category</div>
+                <div class="app-info-value">${app.category || 'Unknown'}</div>
+            </div>
+            <div class="app-info-item">
+                <div class="app-info-label">Rating</div>
+                <div class="app-info-value">⭐ ${rating}</div>
+            </div>
+            <div class="app-info-item">
+                <div class="app-info-label">Installs</div>
+                <div class="app-info-value">${app.installs || 'Unknown'}</div>
+            </div>
+            <div class="app-info-item">
+                <div class="app-info-label">Reviews</div>
+                <div class="app-info-value">${app.reviews_count || 0}</div>
+            </div>
+            <div class="app-info-item">
+                <div class="app-info-label">Type</div>
+                <div class="app-info-value">${app.app_type || 'Unknown'}</div>
+            </div>
+            ${app.size ? `
+            <div class="app-info-item">
+                <div class="app-info-label">Size</div>
+                <div class="app-info-value">${app.size}</div>
+            </div>` : ''}
+        </div>
+    `;
+}
+
+function displayReviews(reviews, clearPrevious = false) {
+    const reviewsContainer = document.getElementById('reviewsContainer');
+
+    if (clearPrevious) {
+        reviewsContainer.innerHTML = '';
+    }
+
+    const reviewsHTML = reviews.map(review => createReviewItem(review)).join('');
+    reviewsContainer.insertAdjacentHTML('beforeend', reviewsHTML);
+}
+
+function createReviewItem(review) {
+    const sentimentClass = getSentimentClass(review.sentiment);
+    const rating = review.rating ? '⭐'.repeat(Math.round(review.rating)) : '';
+    const date = review.created_at ? new Date(review.created_at).toLocaleDateString() : '';
+
+    return `
+        <div class="review-item">
+            <div class="review-header">
+                <div class="review-rating">
+                    ${rating} ${review.rating ? `(${review.rating})` : ''}
+                </div>
+                <div class="review-date">${date}</div>
+            </div>
+            <div class="review-text">${review.review_text}</div>
+            <div class="review-footer">
+                <div class="review-user">
+                    ${review.user ? `By: ${review.user}` : 'Anonymous'}
+                </div>
+                <div class="sentiment-badge ${sentimentClass}">
+                    ${review.sentiment || 'neutral'}
+                </div>
+            </div>
+        </div>
+    `;
+}
+
+function getSentimentClass(sentiment) {
+    if (!sentiment) return 'sentiment-neutral';
+
+    const sentimentLower = sentiment.toLowerCase();
+    if (sentimentLower.includes('positive')) return 'sentiment-positive';
+    if (sentimentLower.includes('negative')) return 'sentiment-negative';
+    return 'sentiment-neutral';
+}
+
+function loadMoreReviews() {
+    if (!currentModalAppId || !hasMoreReviews) return;
+
+    currentReviewsPage++;
+    const loadMoreBtn = document.getElementById('loadMoreReviewsBtn');
+
+    loadMoreBtn.disabled = true;
+    loadMoreBtn.textContent = 'Loading...';
+
+    fetch(`/search/api/app/${currentModalAppId}/reviews/?page=${currentReviewsPage}&limit=10`)
+        .then(response => response.json())
+        .then(data => {
+            if (data.reviews && data.reviews.length > 0) {
+                displayReviews(data.reviews, false);
+                hasMoreReviews = data.pagination.page < data.pagination.pages;
+                updateLoadMoreReviewsButton();
+            } else {
+                hasMoreReviews = false;
+                loadMoreBtn.style.display = 'none';
+            }
+        })
+        .catch(error => {
+            console.error('Error loading more reviews:', error);
+            showError('Failed to load more reviews. Please try again.');
+        })
+        .finally(() => {
+            loadMoreBtn.disabled = false;
+            loadMoreBtn.textContent = 'Load More Reviews';
+        });
+}
+
+function updateLoadMoreReviewsButton() {
+    const loadMoreBtn = document.getElementById('loadMoreReviewsBtn');
+    if (hasMoreReviews) {
+        loadMoreBtn.style.display = 'block';
+    } else {
+        loadMoreBtn.style.display = 'none';
+    }
+}
+
+// Pagination functions for reviews
+function updateReviewsPagination() {
+    const pageInfo = document.getElementById('pageInfo');
+    const prevBtn = document.getElementById('prevBtn');
+    const nextBtn = document.getElementById('nextBtn');
+
+    pageInfo.textContent = `Page ${reviewCurrentPage} of ${reviewTotalPages}`;
+    prevBtn.disabled = reviewCurrentPage <= 1;
+    nextBtn.disabled = reviewCurrentPage >= reviewTotalPages;
+}
+
+function changePage(direction) {
+    if (!currentModalAppId) return;
+
+    const newPage = reviewCurrentPage + direction;
+    if (newPage >= 1 && newPage <= reviewTotalPages) {
+        loadReviewsPage(currentModalAppId, newPage);
+    }
+}
+
+function loadReviewsPage(appId, page) {
+    const reviewsLoading = document.getElementById('reviewsLoading');
+    const reviewsContainer = document.getElementById('reviewsContainer');
+    const paginationDiv = document.getElementById('reviewsPagination');
+
+    reviewsLoading.style.display = 'block';
+    reviewsContainer.innerHTML = '';
+    paginationDiv.style.display = 'none';
+
+    fetch(`/search/api/app/${appId}/reviews/?page=${page}&limit=10`)
+        .then(response => response.json())
+        .then(data => {
+            reviewsLoading.style.display = 'none';
+
+            if (data.reviews && data.reviews.length > 0) {
+                displayReviews(data.reviews, true);
+                reviewCurrentPage = data.pagination.page;
+                reviewTotalPages = data.pagination.pages;
+                updateReviewsPagination();
+                paginationDiv.style.display = 'flex';
+            } else {
+                document.getElementById('noReviews').style.display = 'block';
+            }
+        })
+        .catch(error => {
+            console.error('Error loading reviews page:', error);
+            reviewsLoading.style.display = 'none';
+            showError('Failed to load reviews. Please try again.');
+        });
+}
+
+// Review form functions
+function openReviewForm() {
+    if (!currentApp) return;
+
+    // Check if user is logged in
+    if (isAuthenticated !== 'true' && isAuthenticated !== true) {
+        alert('Please login to write a review.');
+        window.location.href = '/accounts/login/?next=' + encodeURIComponent(window.location.pathname);
+        return;
+    }
+
+    // Update review modal with app info
+    document.getElementById('reviewAppTitle').textContent = currentApp.name;
+    document.getElementById('reviewAppCategory').textContent = currentApp.category || 'Unknown';
+    document.getElementById('reviewAppRating').textContent = (currentApp.rating ? parseFloat(currentApp.rating).toFixed(1) : 'N/A');
+
+    // Reset form
+    document.getElementById('reviewForm').reset();
+    document.getElementById('reviewSubmissionMessage').style.display = 'none';
+
+    // One key per opened form so retries and double submits are deduplicated
+    reviewIdempotencyKey = (window.crypto && crypto.randomUUID)
+        ? crypto.randomUUID()
+        : `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+
+    // Reset star ratings
+    document.querySelectorAll('.rating-input label').forEach(label => {
+        label.style.color = '#d1d5db';
+    });
+
+    // Show review modal
+    document.getElementById('reviewModal').style.display = 'block';
+}
+
+function closeReviewForm() {
+    document.getElementById('reviewModal').style.display = 'none';
+}
+
+async function submitReview(event) {
+    event.preventDefault();
+
+    if (!currentApp) return;
+
+    const formData = new FormData(event.target);
+    const rating = formData.get('rating');
+    const reviewText = document.getElementById('reviewText').value.trim();
+
+    // Validate input
+    if (!rating) {
+        alert('Please select a rating');
+        return;
+    }
+
+    if (reviewText.length < 10) {
+        alert('Review must be at least 10 characters long');
+        return;
+    }
+
+    try {
+        // Get CSRF token
+        const csrfToken = document.querySelector('meta[name=csrf-token]').getAttribute('content');
+
+        const response = await fetch(`/reviews/api/app/${currentApp.id}/submit-review/`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': csrfToken,
+                'Idempotency-Key': reviewIdempotencyKey,
+            },
+            credentials: 'same-origin',
+            body: JSON.stringify({
+                rating: parseFloat(rating),
+                review_text: reviewText
+            })
+        });
+
+        const result = await response.json();
+
+        if (response.ok) {
+            // Show success message
+            const messageDiv = document.getElementById('reviewSubmissionMessage');
+            messageDiv.innerHTML = `
+                <div style="color: #059669; background: #d1fae5; padding: 1rem; border-radius: 6px;">
+                    <strong>Review submitted successfully!</strong><br>
+                    Your review has been submitted and is pending approval by our supervisors.
+                </div>
+            `;
+            messageDiv.style.display = 'block';
+
+            // Hide form
+            document.getElementById('reviewForm').style.display = 'none';
+
+            // Auto-close after 3 seconds
+            setTimeout(() => {
+                closeReviewForm();
+            }, 3000);
+
+        } else {
+            throw new Error(result.error || 'Failed to submit review');
+        }
+    } catch (error) {
+        console.error('Error submitting review:', error);
+        const messageDiv = document.getElementById('reviewSubmissionMessage');
+        messageDiv.innerHTML = `
+            <div style="color: #dc2626; background: #fef2f2; padding: 1rem; border-radius: 6px;">
+                <strong>Error:</strong> ${error.message}
+            </div>
+        `;
+        messageDiv.style.display = 'block';
+    }
+}
+
+// Star rating functionality
+document.addEventListener('DOMContentLoaded', function() {
+    const ratingInputs = document.querySelectorAll('.rating-input input[type="radio"]');
+    const ratingLabels = document.querySelectorAll('.rating-input label');
+
+    ratingLabels.forEach((label, index) => {
+        label.addEventListener('click', function() {
+            const value = this.getAttribute('for').replace('star', '');
+
+            // Reset all stars
+            ratingLabels.forEach(l => l.style.color = '#d1d5db');
+
+            // Highlight selected stars (reverse order)
+            for (let i = ratingLabels.length - 1; i >= ratingLabels.length - value; i--) {
+                ratingLabels[i].style.color = '#fbbf24';
+            }
+        });
+
+        label.addEventListener('mouseover', function() {
+            const value = this.getAttribute('for').replace('star', '');
+
+            // Highlight on hover (reverse order)
+            ratingLabels.forEach(l => l.style.color = '#d1d5db');
+            for (let i = ratingLabels.length - 1; i >= ratingLabels.length - value; i--) {
+                ratingLabels[i].style.color = '#fbbf24';
+            }
+        });
+    });
+
+    // Close modals when clicking outside
+    window.addEventListener('click', function(event) {
+        const reviewsModal = document.getElementById('reviewsModal');
+        const reviewModal = document.getElementById('reviewModal');
+
+        if (event.target === reviewsModal) {
+            closeReviewsModal();
+        }
+        if (event.target === reviewModal) {
+            closeReviewForm();
+        }
+    });
+});
+
+// Close modal when clicking outside
+window.addEventListener('click', function(event) {
+    const modal = document.getElementById('reviewsModal');
+    if (event.target === modal) {
+        closeReviewsModal();
+    }
+});